@@ -4,6 +4,7 @@ Actions для админ-панели.
 Содержит бизнес-логику для действий админ-панели.
 """
 
+from .dead_letter_actions import DeadLetterActions
 from .notification_actions import NotificationActions
 
-__all__ = ["NotificationActions"] 
\ No newline at end of file
+__all__ = ["DeadLetterActions", "NotificationActions"]
\ No newline at end of file
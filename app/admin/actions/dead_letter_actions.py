@@ -0,0 +1,86 @@
+"""
+Действия для работы с очередью недоставленных уведомлений в админ-панели.
+"""
+
+from fastapi import Request
+from sqlalchemy.future import select
+
+from app.models.sql.dead_letter import DeadLetter
+
+
+class DeadLetterActions:
+    """Класс для выполнения действий с очередью недоставленных уведомлений."""
+
+    @staticmethod
+    def _parse_ids(pks: list) -> list[int]:
+        """Преобразует выбранные ключи в ID записей очереди."""
+        return [int(pk) for pk in pks]
+
+    @staticmethod
+    def _format_redrive(result: dict) -> str:
+        """Форматирует результат повторной отправки."""
+        if not result.get("success"):
+            return f"❌ {result.get('error')}"
+        lines = [f"Повторная отправка {result['total']} записей: {result['sent']} доставлено, {result['failed']} ошибок"]
+        for notification_id, item in result["notifications"].items():
+            if not item.get("success"):
+                lines.append(f"❌ Уведомление {notification_id}: {item.get('error')}")
+                continue
+            lines.append(
+                f"✅ Уведомление {notification_id}: {item['sent']} из {item['total']} доставлено, {item['failed']} ошибок"
+            )
+        return "<br>".join(lines)
+
+    @staticmethod
+    async def summary(request: Request, pks: list) -> str:
+        """Показывает количество недоставленных уведомлений по типам ошибок."""
+        service = request.app.state.notification_service
+        rows = await service.get_dead_letter_summary()
+        if not rows:
+            return "Очередь недоставленных пуста."
+
+        body = "".join(
+            f"<tr><td>{row['notification_id']}</td><td>{row['error_type']}</td><td>{row['count']}</td></tr>"
+            for row in rows
+        )
+        return f"""
+        <table class="table table-sm">
+            <thead><tr><th>Уведомление</th><th>Тип ошибки</th><th>Получателей</th></tr></thead>
+            <tbody>{body}</tbody>
+        </table>
+        """
+
+    @staticmethod
+    async def redrive(request: Request, pks: list) -> str:
+        """Повторно отправляет выбранные записи очереди."""
+        try:
+            ids = DeadLetterActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID записи: {pks}"
+
+        service = request.app.state.notification_service
+        result = await service.redrive_dead_letters(ids=ids, limit=len(ids))
+        return DeadLetterActions._format_redrive(result)
+
+    @staticmethod
+    async def redrive_error_type(request: Request, pks: list) -> str:
+        """Повторно отправляет все записи с теми же уведомлением и типом ошибки, что и выбранные."""
+        try:
+            ids = DeadLetterActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID записи: {pks}"
+
+        async with request.app.state.session_pool() as session:
+            result = await session.execute(
+                select(DeadLetter.notification_id, DeadLetter.error_type)
+                .where(DeadLetter.id.in_(ids))
+                .distinct()
+            )
+            groups = result.all()
+
+        service = request.app.state.notification_service
+        results = []
+        for notification_id, error_type in groups:
+            redrive = await service.redrive_dead_letters(notification_id=notification_id, error_type=error_type)
+            results.append(f"<b>Уведомление {notification_id}, {error_type}</b><br>{DeadLetterActions._format_redrive(redrive)}")
+        return "<br><br>".join(results) or "Не выбрано ни одной записи."
@@ -2,15 +2,15 @@
 Действия для работы с уведомлениями в админ-панели.
 """
 
+import asyncio
+import time
+from html import escape
+
 from fastapi import Request
 from sqlalchemy.future import select
-from sqlalchemy import update
-from datetime import datetime
+from datetime import timedelta
 
 from app.models.sql.notification import Notification
-from app.models.sql.user import User
-from app.admin.utils import is_user_blocked_error
-from app.utils.logging import admin as logger
 
 
 class NotificationActions:
@@ -62,114 +62,167 @@ class NotificationActions:
     
     @staticmethod
     async def send_notification(request: Request, pks: list) -> str:
-        """Отправляет уведомление всем активным пользователям."""
+        """Запускает рассылку выбранных уведомлений всем активным пользователям.
+        
+        Рассылки выполняются одновременно через сервис уведомлений и делят
+        бюджет частоты ботов по весам уведомлений, поэтому небольшая срочная
+        рассылка не ждет окончания большой кампании.
+        """
         try:
-            notification_ids = []
-            for pk in pks:
-                try:
-                    notification_ids.append(int(pk))
-                except (ValueError, TypeError):
-                    return f"Неверный ID уведомления: {pk}"
-            
-            results = []
-            session_pool = request.app.state.session_pool
-            bot = request.app.state.bot
-            
-            async with session_pool() as session:
-                for pk in notification_ids:
-                    # Получаем уведомление из базы
-                    response = await session.execute(
-                        select(Notification).filter_by(id=pk)
-                    )
-                    notification = response.scalar_one_or_none()
-                    
-                    if not notification:
-                        results.append(f"❌ Уведомление {pk}: Уведомление не найдено")
-                        continue
-                    
-                    try:
-                        # Получаем всех активных пользователей
-                        users_response = await session.execute(
-                            select(User).filter(User.blocked_at.is_(None))
-                        )
-                        users = users_response.scalars().all()
-                        
-                        if not users:
-                            results.append(f"❌ Уведомление {pk}: Нет активных пользователей")
-                            continue
-                        
-                        # Отправляем уведомление каждому пользователю
-                        sent_count = 0
-                        error_count = 0
-                        blocked_users = []
-                        
-                        for user in users:
-                            try:
-                                await bot.send_message(
-                                    chat_id=user.id,
-                                    text=notification.text
-                                )
-                                sent_count += 1
-                            except Exception as e:
-                                error_count += 1
-                                error_message = str(e)
-                                
-                                # Проверяем, заблокировал ли пользователь бота
-                                if is_user_blocked_error(error_message):
-                                    # Блокируем пользователя
-                                    try:
-                                        await session.execute(
-                                            update(User)
-                                            .where(User.id == user.id)
-                                            .values(
-                                                blocked_at=datetime.utcnow(),
-                                                status="blocked"
-                                            )
-                                        )
-                                        blocked_users.append(user.id)
-                                        logger.info(f"Пользователь {user.id} заблокирован (заблокировал бота)")
-                                    except Exception as block_error:
-                                        logger.error(f"Ошибка блокировки пользователя {user.id}: {block_error}")
-                                else:
-                                    logger.error(f"Ошибка отправки уведомления {pk} пользователю {user.id}: {e}")
-                        
-                        # Обновляем статус уведомления
-                        error_info = []
-                        if error_count > 0:
-                            error_info.append(f"Ошибок: {error_count}")
-                        if blocked_users:
-                            error_info.append(f"Заблокировано пользователей: {len(blocked_users)}")
-                        
-                        await session.execute(
-                            update(Notification)
-                            .where(Notification.id == pk)
-                            .values(
-                                status="sent",
-                                sent_at=datetime.utcnow(),
-                                error="; ".join(error_info) if error_info else None
-                            )
-                        )
-                        await session.commit()
-                        
-                        result_message = f"✅ Уведомление {pk}: {sent_count} отправлено, {error_count} ошибок"
-                        if blocked_users:
-                            result_message += f", {len(blocked_users)} пользователей заблокировано"
-                        results.append(result_message)
-                        
-                    except Exception as e:
-                        # Обновляем статус уведомления с ошибкой
-                        await session.execute(
-                            update(Notification)
-                            .where(Notification.id == pk)
-                            .values(
-                                status="error",
-                                error=str(e)
-                            )
-                        )
-                        await session.commit()
-                        
-                        results.append(f"❌ Уведомление {pk}: Ошибка отправки - {str(e)}")
-            
-            return "<br>".join(results)
-        except Exception as e:
-            return f"Ошибка при отправке: {str(e)}" 
\ No newline at end of file
+            notification_ids = NotificationActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID уведомления: {pks}"
+        
+        service = request.app.state.notification_service
+        if service.config.outbox_enabled:
+            # Рассылки выполнят воркеры очереди исходящих
+            jobs = await asyncio.gather(*(service.enqueue_broadcast(pk) for pk in notification_ids))
+            return "<br>".join(
+                f"📤 Уведомление {pk}: {job['message']}" if job.get("success") else f"❌ Уведомление {pk}: {job.get('error')}"
+                for pk, job in zip(notification_ids, jobs)
+            )
+        
+        sends = await asyncio.gather(
+            *(service.send_bulk_notification(pk) for pk in notification_ids),
+            return_exceptions=True,
+        )
+        results = []
+        for pk, result in zip(notification_ids, sends):
+            if isinstance(result, Exception):
+                results.append(f"❌ Уведомление {pk}: Ошибка отправки - {result}")
+                continue
+            if not result.get("success"):
+                results.append(f"❌ Уведомление {pk}: {result.get('error')}")
+                continue
+            message = f"✅ Уведомление {pk}: {result['sent']} из {result['total']} отправлено, {result['failed']} ошибок"
+            if result.get("cancelled"):
+                message += " (отменено)"
+            results.append(message)
+        return "<br>".join(results)
+    
+    @staticmethod
+    def _parse_ids(pks: list) -> list[int]:
+        """Преобразует выбранные ключи в ID уведомлений."""
+        return [int(pk) for pk in pks]
+
+    @staticmethod
+    async def edit_everywhere(request: Request, pks: list) -> str:
+        """Заменяет текст уже отправленных сообщений текущим текстом уведомления."""
+        try:
+            notification_ids = NotificationActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID уведомления: {pks}"
+
+        service = request.app.state.notification_service
+        results = []
+        for pk in notification_ids:
+            result = await service.edit_bulk_notification(pk)
+            if not result.get("success"):
+                results.append(f"❌ Уведомление {pk}: {result.get('error')}")
+                continue
+            message = f"✅ Уведомление {pk}: {result['done']} из {result['total']} отредактировано, {result['failed']} ошибок"
+            if result.get("skipped_digests"):
+                message += f", {result['skipped_digests']} сообщений дайджестов не изменены"
+            if result.get("cancelled"):
+                message += " (отменено)"
+            results.append(message)
+        return "<br>".join(results)
+
+    @staticmethod
+    async def delete_everywhere(request: Request, pks: list) -> str:
+        """Удаляет уже отправленные сообщения уведомления у всех получателей."""
+        try:
+            notification_ids = NotificationActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID уведомления: {pks}"
+
+        service = request.app.state.notification_service
+        results = []
+        for pk in notification_ids:
+            result = await service.delete_bulk_notification(pk)
+            if not result.get("success"):
+                results.append(f"❌ Уведомление {pk}: {result.get('error')}")
+                continue
+            message = f"✅ Уведомление {pk}: {result['done']} из {result['total']} удалено, {result['failed']} ошибок"
+            if result.get("skipped_digests"):
+                message += f", {result['skipped_digests']} сообщений дайджестов не удалены"
+            if result.get("cancelled"):
+                message += " (отменено)"
+            results.append(message)
+        return "<br>".join(results)
+
+    @staticmethod
+    async def estimate_audience(request: Request, pks: list) -> str:
+        """Показывает, скольким пользователям уйдет рассылка, по колоночному снимку аудитории."""
+        columns = request.app.state.notification_service.columns
+        if columns is None:
+            return "Снимок аудитории еще не построен, попробуйте позже."
+        
+        count = columns.count(status="active")
+        languages = columns.histogram("language", status="active")
+        age = int(time.time() - columns.built_at)
+        rows = "".join(
+            f"<li>{escape(language) if language else '—'}: {users}</li>"
+            for language, users in sorted(languages.items(), key=lambda item: -item[1])
+        )
+        return f"""
+            <div style="font-family: Arial, sans-serif; padding: 20px;">
+                <h3>Рассылка уйдет {count} из {columns.size} пользователей</h3>
+                <strong>По языкам:</strong>
+                <ul>{rows}</ul>
+                <small>Снимок аудитории обновлен {age} с назад</small>
+            </div>
+            """
+    
+    @staticmethod
+    async def dry_run_notification(request: Request, pks: list) -> str:
+        """Пробный запуск: прогноз длительности, стоимости и нагрузки на базу без отправки."""
+        try:
+            notification_ids = NotificationActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID уведомления: {pks}"
+        
+        service = request.app.state.notification_service
+        results = []
+        for pk in notification_ids:
+            result = await service.send_bulk_notification(pk, dry_run=True)
+            if not result.get("success"):
+                results.append(f"❌ Уведомление {pk}: {result.get('error')}")
+                continue
+            db = ", ".join(
+                f"{table}: {load['rows']} строк / {load['queries']} запросов"
+                for table, load in result["db"].items()
+            )
+            message = (
+                f"🧪 Уведомление {pk}: {result['total']} получателей, "
+                f"доставлено бы {result['sent']}, ошибок {result['failed']}<br>"
+                f"Длительность ≈ {timedelta(seconds=round(result['duration']))} "
+                f"({result['rate']} запросов/с, профиль {result['profile']}), "
+                f"запросов к Telegram {result['requests']}, повторов {result['retried']}<br>"
+                f"Пик памяти {result['peak_memory'] / 2 ** 20:.1f} МБ, снимок {result['snapshot_bytes']} байт<br>"
+                f"База: {db}"
+            )
+            if result["stars"]:
+                message += f"<br>Стоимость ≈ {result['stars']} ⭐"
+            if result["preflight"]:
+                message += f"<br>⚠️ Рассылка не будет запущена: {escape('; '.join(result['preflight']))}"
+            results.append(message)
+        return "<br><br>".join(results)
+    
+    @staticmethod
+    async def cancel_operation(request: Request, pks: list) -> str:
+        """Отменяет выполняемые рассылки, редактирование или удаление."""
+        try:
+            notification_ids = NotificationActions._parse_ids(pks)
+        except (ValueError, TypeError):
+            return f"Неверный ID уведомления: {pks}"
+
+        service = request.app.state.notification_service
+        results = []
+        for pk in notification_ids:
+            progress = service.get_progress(pk)
+            if progress and service.cancel(pk):
+                results.append(f"⏹ Уведомление {pk}: операция остановлена на {progress['done']} из {progress['total']}")
+            else:
+                results.append(f"Уведомление {pk}: нет выполняемой операции")
+        return "<br>".join(results)
@@ -4,6 +4,7 @@
 Создает и настраивает FastAPI приложение с админ-панелью.
 """
 
+import asyncio
 import os
 import time
 from contextlib import asynccontextmanager
@@ -12,7 +13,8 @@ from fastapi.staticfiles import StaticFiles
 from starlette_admin.contrib.sqla import Admin
 
 from env_loader import auto_env_patch
-from app.factory.telegram.bot import create_bot
+from app.factory.redis import create_redis
+from app.factory.telegram.bot import create_bots
 from app.factory.telegram.dispatcher import create_dispatcher
 from app.factory.app_config import create_app_config
 from app.factory.session_pool import create_session_pool
@@ -20,9 +22,14 @@ from app.endpoints.notifications import router as notifications_router
 from app.admin.config import setup_admin_logging, create_database_engine, ADMIN_TITLE, ADMIN_BASE_URL
 from app.admin.utils import run_alembic_upgrade
 from app.admin.middleware import performance_middleware
-from app.admin.views import NotificationView, UserView
+from app.admin.views import CampaignStepView, CampaignView, DeadLetterView, NotificationView, UserView
+from app.models.sql.campaign import Campaign, CampaignStep
+from app.models.sql.dead_letter import DeadLetter
 from app.models.sql.notification import Notification
 from app.models.sql.user import User
+from app.services.crud import UserService
+from app.services.notification_service import NotificationService
+from app.services.redis import AudienceIndex
 from app.utils.logging import admin as logger
 
 
@@ -43,9 +50,31 @@ def create_admin_app() -> FastAPI:
     
     # Инициализация компонентов
     config = create_app_config()
-    bot = create_bot(config)
+    bots = create_bots(config)
+    bot = bots[0]
     dispatcher = create_dispatcher(config)
     session_pool = create_session_pool(config=config)
+    redis = create_redis(config)
+    user_service = UserService(session_pool=session_pool, redis=redis, config=config)
+    notification_service = NotificationService(
+        bot,
+        session_pool,
+        config=config.broadcast,
+        bots=bots,
+        audience=AudienceIndex(redis),
+        redis=redis,
+        preflight_chat_id=config.common.admin_chat_id or None,
+    )
+    
+    async def rebuild_audience_index() -> None:
+        """Заполняет индекс аудитории, если он еще не был построен."""
+        try:
+            if await user_service.audience.is_ready():
+                return
+            indexed = await user_service.rebuild_audience_index()
+            logger.info(f"Индекс аудитории построен: {indexed} пользователей")
+        except Exception as e:
+            logger.error(f"Ошибка построения индекса аудитории: {e}")
     
     @asynccontextmanager
     async def lifespan(app: FastAPI):
@@ -59,9 +88,28 @@ def create_admin_app() -> FastAPI:
             logger.error(f"Ошибка инициализации базы данных: {e}")
             raise
         
+        rebuild_task = None
+        if config.broadcast.use_audience_index:
+            rebuild_task = asyncio.create_task(rebuild_audience_index())
+        columns_task = None
+        if config.broadcast.audience_columns_enabled:
+            columns_task = asyncio.create_task(notification_service.run_audience_columns())
+        liveness_task = None
+        if config.broadcast.liveness_enabled:
+            liveness_task = asyncio.create_task(notification_service.run_liveness_probe())
+        
         yield
         
         logger.info("Завершение работы админ-панели...")
+        if rebuild_task is not None:
+            rebuild_task.cancel()
+        if columns_task is not None:
+            columns_task.cancel()
+        if liveness_task is not None:
+            liveness_task.cancel()
+        await notification_service.cleanup()
+        await user_service.close()
+        await redis.aclose()
         await engine.dispose()
     
     # Создание FastAPI приложения
@@ -69,9 +117,14 @@ def create_admin_app() -> FastAPI:
     
     # Состояние приложения
     app.state.bot = bot
+    app.state.bots = bots
     app.state.dispatcher = dispatcher
     app.state.session_pool = session_pool
+    app.state.redis = redis
+    app.state.user_service = user_service
     app.state.engine = engine
+    app.state.config = config
+    app.state.notification_service = notification_service
     
     # Middleware
     app.middleware("http")(performance_middleware)
@@ -100,6 +153,9 @@ def create_admin_app() -> FastAPI:
     # Добавление представлений
     admin.add_view(NotificationView(Notification))
     admin.add_view(UserView(User))
+    admin.add_view(DeadLetterView(DeadLetter))
+    admin.add_view(CampaignView(Campaign))
+    admin.add_view(CampaignStepView(CampaignStep))
     
     # Монтирование админ-панели
     admin.mount_to(app)
@@ -4,7 +4,9 @@ Views для админ-панели.
 Содержит представления моделей для Starlette Admin.
 """
 
+from .campaign_view import CampaignStepView, CampaignView
+from .dead_letter_view import DeadLetterView
 from .notification_view import NotificationView
 from .user_view import UserView
 
-__all__ = ["NotificationView", "UserView"] 
\ No newline at end of file
+__all__ = ["CampaignStepView", "CampaignView", "DeadLetterView", "NotificationView", "UserView"] 
\ No newline at end of file
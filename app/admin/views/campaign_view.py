@@ -0,0 +1,55 @@
+"""
+Представления кампаний (цепочек сообщений) в админ-панели.
+"""
+
+from starlette_admin.contrib.sqla import ModelView
+
+
+class CampaignView(ModelView):
+    """Представление кампаний в админ-панели."""
+    
+    name = "Кампания"
+    name_plural = "Кампании"
+    icon = "fa fa-stream"
+    
+    can_export = False
+    page_size = 20
+    
+    column_list = ["id", "name", "trigger", "active", "created_at"]
+    column_searchable_list = ["name"]
+    column_sortable_list = ["id", "name", "created_at"]
+    
+    column_labels = {
+        "id": "ID",
+        "name": "Название",
+        "trigger": "Событие",
+        "active": "Активна",
+        "created_at": "Создана",
+    }
+    
+    form_include_pk = False
+    exclude_fields_from_create = ["id", "created_at", "updated_at"]
+    exclude_fields_from_edit = ["id", "created_at", "updated_at"]
+
+
+class CampaignStepView(ModelView):
+    """Представление шагов кампаний: уведомление и задержка от записи в кампанию (с)."""
+    
+    name = "Шаг кампании"
+    name_plural = "Шаги кампаний"
+    icon = "fa fa-list-ol"
+    
+    can_export = False
+    page_size = 50
+    
+    column_list = ["campaign_id", "position", "delay", "notification_id"]
+    column_sortable_list = ["campaign_id", "position", "delay"]
+    
+    column_labels = {
+        "campaign_id": "Кампания",
+        "position": "Позиция",
+        "delay": "Задержка, с",
+        "notification_id": "Уведомление",
+    }
+    
+    form_include_pk = True
@@ -0,0 +1,81 @@
+"""
+Представление очереди недоставленных уведомлений в админ-панели.
+"""
+
+from fastapi import Request
+from starlette_admin import action
+from starlette_admin.contrib.sqla import ModelView
+
+from app.admin.actions.dead_letter_actions import DeadLetterActions
+
+
+class DeadLetterView(ModelView):
+    """Представление очереди недоставленных уведомлений в админ-панели."""
+
+    name = "Недоставленное"
+    name_plural = "Недоставленные"
+    icon = "fa fa-inbox"
+
+    can_export = False
+    can_set_page_size = False
+    page_size = 50
+
+    def can_create(self, request):
+        return False
+
+    def can_edit(self, request):
+        return False
+
+    def can_delete(self, request):
+        return False
+
+    column_list = [
+        "id", "notification_id", "user_id", "bot_id",
+        "error_type", "error_message", "attempts", "updated_at",
+    ]
+    column_searchable_list = ["error_type", "error_message"]
+    column_sortable_list = ["id", "notification_id", "error_type", "attempts", "updated_at"]
+
+    column_labels = {
+        "id": "ID",
+        "notification_id": "Уведомление",
+        "user_id": "Пользователь",
+        "bot_id": "Бот",
+        "error_type": "Тип ошибки",
+        "error_message": "Ошибка",
+        "attempts": "Попыток",
+        "updated_at": "Последняя попытка",
+    }
+
+    @action(
+        name="summary",
+        text="Сводка по ошибкам",
+        confirmation=None,
+        submit_btn_text="Закрыть",
+        submit_btn_class="btn-secondary",
+    )
+    async def summary_action(self, request: Request, pks: list) -> str:
+        """Показывает количество недоставленных уведомлений по типам ошибок."""
+        return await DeadLetterActions.summary(request, pks)
+
+    @action(
+        name="redrive",
+        text="Отправить повторно",
+        confirmation="Повторно отправить выбранные уведомления?",
+        submit_btn_text="Да, отправить",
+        submit_btn_class="btn-primary",
+    )
+    async def redrive_action(self, request: Request, pks: list) -> str:
+        """Повторно отправляет выбранные записи."""
+        return await DeadLetterActions.redrive(request, pks)
+
+    @action(
+        name="redrive_error_type",
+        text="Отправить повторно все с этой ошибкой",
+        confirmation="Повторно отправить все записи с тем же уведомлением и типом ошибки?",
+        submit_btn_text="Да, отправить",
+        submit_btn_class="btn-warning",
+    )
+    async def redrive_error_type_action(self, request: Request, pks: list) -> str:
+        """Повторно отправляет все записи с тем же уведомлением и типом ошибки."""
+        return await DeadLetterActions.redrive_error_type(request, pks)
@@ -2,6 +2,8 @@
 Представление модели уведомлений в админ-панели.
 """
 
+from typing import Any, Dict
+
 from fastapi import Request
 from starlette_admin.contrib.sqla import ModelView
 from starlette_admin import action
@@ -15,55 +17,72 @@ from app.admin.actions.notification_actions import NotificationActions
 
 class NotificationView(ModelView):
     """Представление модели уведомлений в админ-панели."""
-    
+
     name = "Уведомление"
     name_plural = "Уведомления"
     icon = "fa fa-bell"
-    
+
     can_export = False
     can_set_page_size = False
     page_size = 20
-    
-    column_list = ["id", "text", "comment", "status", "error", "created_at", "sent_at"]
+
+    column_list = ["id", "text", "comment", "paid_broadcast", "status", "error", "failure_summary", "created_at", "sent_at"]
     column_searchable_list = ["text", "comment"]
     column_sortable_list = ["id", "status", "created_at", "sent_at"]
-    
+
     column_labels = {
         "id": "ID",
         "text": "Текст",
         "comment": "Комментарий",
+        "paid_broadcast": "Платная рассылка",
+        "weight": "Вес",
+        "max_rate": "Предел, сообщений/с",
         "status": "Статус",
         "error": "Ошибка",
+        "failure_summary": "Сводка ошибок",
         "created_at": "Создано",
         "sent_at": "Отправлено",
     }
-    
+
     form_labels = {
         "text": "Текст уведомления",
         "comment": "Комментарий (необязательно)",
+        "paid_broadcast": "Платная рассылка (до 1000 сообщений/с, оплачивается Stars)",
+        "weight": "Вес при одновременных рассылках (доля бюджета бота, по умолчанию 1)",
+        "max_rate": "Предел частоты, сообщений/с (необязательно)",
     }
-    
+
     form_include_pk = False
-    form_excluded_columns = ["id", "status", "error", "sent_at", "created_at", "updated_at"]
-    form_columns = ["text", "comment"]
-    
+    form_excluded_columns = ["id", "status", "error", "failure_summary", "sent_at", "created_at", "updated_at"]
+    form_columns = ["text", "comment", "paid_broadcast", "weight", "max_rate"]
+
     form_widget_args = {
         "text": {"rows": 5, "placeholder": "Введите текст уведомления..."},
         "comment": {"rows": 3, "placeholder": "Введите комментарий (необязательно)..."}
     }
-    
+
+    async def before_edit(self, request: Request, data: Dict[str, Any], obj: Notification) -> None:
+        """Увеличивает версию содержимого уведомления перед сохранением правки."""
+        obj.version = (obj.version or 1) + 1
+
+    async def after_edit(self, request: Request, obj: Notification) -> None:
+        """Переключает кэш содержимого на новую версию, чтобы рассылка взяла новый текст."""
+        service = getattr(request.app.state, "notification_service", None)
+        if service is not None:
+            await service.invalidate_payload(obj.id, obj.version)
+
     def get_form_fields(self, request: Request) -> list:
         """Возвращает поля для формы."""
-        return ["text", "comment"]
-    
+        return ["text", "comment", "paid_broadcast", "weight", "max_rate"]
+
     def get_create_form_fields(self, request: Request) -> list:
         """Возвращает поля для формы создания."""
-        return ["text", "comment"]
-    
+        return ["text", "comment", "paid_broadcast", "weight", "max_rate"]
+
     def get_edit_form_fields(self, request: Request) -> list:
         """Возвращает поля для формы редактирования."""
-        return ["text", "comment"]
-    
+        return ["text", "comment", "paid_broadcast", "weight", "max_rate"]
+
     @action(
         name="preview_notification",
         text="Предпросмотр",
@@ -74,7 +93,29 @@ class NotificationView(ModelView):
     async def preview_notification_action(self, request: Request, pks: list) -> str:
         """Показывает предпросмотр уведомления."""
         return await NotificationActions.preview_notification(request, pks)
-    
+
+    @action(
+        name="estimate_audience",
+        text="Оценить аудиторию",
+        confirmation=None,
+        submit_btn_text="Закрыть",
+        submit_btn_class="btn-secondary",
+    )
+    async def estimate_audience_action(self, request: Request, pks: list) -> str:
+        """Показывает размер аудитории рассылки до отправки."""
+        return await NotificationActions.estimate_audience(request, pks)
+
+    @action(
+        name="dry_run_notification",
+        text="Пробный запуск",
+        confirmation=None,
+        submit_btn_text="Закрыть",
+        submit_btn_class="btn-secondary",
+    )
+    async def dry_run_notification_action(self, request: Request, pks: list) -> str:
+        """Прогнозирует рассылку без отправки сообщений."""
+        return await NotificationActions.dry_run_notification(request, pks)
+
     @action(
         name="send_notification",
         text="Отправить уведомление",
@@ -84,4 +125,37 @@ class NotificationView(ModelView):
     )
     async def send_notification_action(self, request: Request, pks: list) -> str:
         """Отправляет уведомление всем активным пользователям."""
-        return await NotificationActions.send_notification(request, pks) 
\ No newline at end of file
+        return await NotificationActions.send_notification(request, pks)
+
+    @action(
+        name="edit_everywhere",
+        text="Отредактировать у всех",
+        confirmation="Заменить текст уже отправленных сообщений текущим текстом уведомления?",
+        submit_btn_text="Да, отредактировать",
+        submit_btn_class="btn-warning",
+    )
+    async def edit_everywhere_action(self, request: Request, pks: list) -> str:
+        """Редактирует уже отправленные сообщения у всех получателей."""
+        return await NotificationActions.edit_everywhere(request, pks)
+
+    @action(
+        name="delete_everywhere",
+        text="Удалить у всех",
+        confirmation="Удалить уже отправленные сообщения у всех получателей?",
+        submit_btn_text="Да, удалить",
+        submit_btn_class="btn-danger",
+    )
+    async def delete_everywhere_action(self, request: Request, pks: list) -> str:
+        """Удаляет уже отправленные сообщения у всех получателей."""
+        return await NotificationActions.delete_everywhere(request, pks)
+
+    @action(
+        name="cancel_operation",
+        text="Остановить",
+        confirmation="Остановить выполняемую операцию с уведомлением?",
+        submit_btn_text="Да, остановить",
+        submit_btn_class="btn-secondary",
+    )
+    async def cancel_operation_action(self, request: Request, pks: list) -> str:
+        """Останавливает выполняемую рассылку, редактирование или удаление."""
+        return await NotificationActions.cancel_operation(request, pks)
@@ -5,8 +5,9 @@ API endpoints для управления уведомлениями.
 """
 
 import asyncio
+import time
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Depends
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -15,6 +16,7 @@ from datetime import datetime, timedelta
 
 from app.models.sql.notification import Notification
 from app.models.sql.user import User
+from app.services.broadcast import metrics
 from app.services.notification_service import NotificationService
 
 
@@ -23,6 +25,19 @@ class SendNotificationRequest(BaseModel):
     notification_id: int
 
 
+class EditNotificationRequest(BaseModel):
+    """Запрос на редактирование отправленного уведомления."""
+    text: Optional[str] = None
+
+
+class RedriveDeadLettersRequest(BaseModel):
+    """Запрос на повторную отправку недоставленных уведомлений."""
+    notification_id: Optional[int] = None
+    error_type: Optional[str] = None
+    ids: Optional[List[int]] = None
+    limit: int = 10000
+
+
 class SendNotificationResponse(BaseModel):
     """Ответ на отправку уведомления."""
     success: bool
@@ -36,6 +51,19 @@ class SendNotificationResponse(BaseModel):
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
 
+def get_notification_service(req: Request) -> NotificationService:
+    """Возвращает общий сервис уведомлений приложения."""
+    service = getattr(req.app.state, "notification_service", None)
+    if service is None:
+        service = NotificationService(
+            req.app.state.bot,
+            req.app.state.session_pool,
+            redis=getattr(req.app.state, "redis", None)
+        )
+        req.app.state.notification_service = service
+    return service
+
+
 @router.post("/send")
 async def send_notification(
     data: SendNotificationRequest,
@@ -43,10 +71,18 @@ async def send_notification(
 ) -> Dict[str, Any]:
     """Отправляет уведомление всем активным пользователям."""
     try:
-        bot = req.app.state.bot
-        session_pool = req.app.state.session_pool
+        notification_service = get_notification_service(req)
+        if notification_service.config.outbox_enabled:
+            # Рассылку выполнит воркер очереди исходящих
+            result = await notification_service.enqueue_broadcast(data.notification_id)
+            if not result.get("success", False):
+                raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+            return {
+                "message": result["message"],
+                "notification_id": data.notification_id,
+                "job_id": result["job_id"]
+            }
         
-        notification_service = NotificationService(bot, session_pool)
         result = await notification_service.send_bulk_notification(data.notification_id)
         
         if not result.get("success", False):
@@ -57,7 +93,8 @@ async def send_notification(
             "notification_id": data.notification_id,
             "sent_count": result.get("sent", 0),
             "error_count": result.get("failed", 0),
-            "total_users": result.get("total", 0)
+            "total_users": result.get("total", 0),
+            "failures": result.get("failures")
         }
         
     except Exception as e:
@@ -87,6 +124,7 @@ async def get_notification_status(
                 "text": notification.text,
                 "status": notification.status,
                 "error": notification.error,
+                "failure_summary": notification.failure_summary,
                 "created_at": notification.created_at.isoformat() if notification.created_at else None,
                 "sent_at": notification.sent_at.isoformat() if notification.sent_at else None,
                 "updated_at": notification.updated_at.isoformat() if notification.updated_at else None
@@ -96,6 +134,92 @@ async def get_notification_status(
         raise HTTPException(status_code=500, detail=f"Ошибка получения статуса: {str(e)}")
 
 
+@router.get("/{notification_id}/progress")
+async def get_notification_progress(
+    notification_id: int,
+    req: Request
+) -> Dict[str, Any]:
+    """Получает прогресс выполняемой рассылки, редактирования или удаления."""
+    progress = get_notification_service(req).get_progress(notification_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Нет выполняемой операции для уведомления")
+    return progress
+
+
+@router.post("/{notification_id}/cancel")
+async def cancel_notification_operation(
+    notification_id: int,
+    req: Request
+) -> Dict[str, Any]:
+    """Отменяет выполняемую рассылку, редактирование или удаление."""
+    if not get_notification_service(req).cancel(notification_id):
+        raise HTTPException(status_code=404, detail="Нет выполняемой операции для уведомления")
+    return {"message": "Операция отменена", "notification_id": notification_id}
+
+
+@router.post("/{notification_id}/resume")
+async def resume_notification(
+    notification_id: int,
+    req: Request
+) -> Dict[str, Any]:
+    """Продолжает прерванную рассылку по зафиксированному снимку аудитории."""
+    result = await get_notification_service(req).send_bulk_notification(notification_id, resume=True)
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+    return {
+        "message": result.get("message"),
+        "notification_id": notification_id,
+        "sent_count": result.get("sent", 0),
+        "error_count": result.get("failed", 0),
+        "total_users": result.get("total", 0),
+        "remaining": result.get("remaining", 0),
+        "cancelled": result.get("cancelled", False)
+    }
+
+
+@router.post("/{notification_id}/edit")
+async def edit_notification(
+    notification_id: int,
+    data: EditNotificationRequest,
+    req: Request
+) -> Dict[str, Any]:
+    """Редактирует уведомление у всех пользователей, которым оно было доставлено."""
+    result = await get_notification_service(req).edit_bulk_notification(notification_id, data.text)
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+    return {
+        "message": result.get("message"),
+        "notification_id": notification_id,
+        "edited_count": result.get("done", 0),
+        "error_count": result.get("failed", 0),
+        "total": result.get("total", 0),
+        "skipped_digests": result.get("skipped_digests", 0),
+        "cancelled": result.get("cancelled", False),
+        "failures": result.get("failures")
+    }
+
+
+@router.post("/{notification_id}/delete")
+async def delete_notification_messages(
+    notification_id: int,
+    req: Request
+) -> Dict[str, Any]:
+    """Удаляет уведомление у всех пользователей, которым оно было доставлено."""
+    result = await get_notification_service(req).delete_bulk_notification(notification_id)
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+    return {
+        "message": result.get("message"),
+        "notification_id": notification_id,
+        "deleted_count": result.get("done", 0),
+        "error_count": result.get("failed", 0),
+        "total": result.get("total", 0),
+        "skipped_digests": result.get("skipped_digests", 0),
+        "cancelled": result.get("cancelled", False),
+        "failures": result.get("failures")
+    }
+
+
 @router.get("/recent")
 async def get_recent_notifications(
     req: Request,
@@ -129,46 +253,168 @@ async def get_recent_notifications(
         raise HTTPException(status_code=500, detail=f"Ошибка получения уведомлений: {str(e)}")
 
 
+@router.get("/metrics")
+async def get_broadcast_metrics() -> Dict[str, float]:
+    """Возвращает метрики движка рассылки."""
+    return metrics.snapshot()
+
+
+@router.get("/audience/count")
+async def get_audience_count(
+    req: Request,
+    status: str = "active",
+    language: Optional[str] = None,
+    bot_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Считает размер сегмента аудитории по индексу в Redis."""
+    audience = get_notification_service(req).audience
+    if audience is None:
+        raise HTTPException(status_code=503, detail="Индекс аудитории не настроен")
+    
+    filters: Dict[str, Any] = {"status": status}
+    if language is not None:
+        filters["language"] = language
+    if bot_id is not None:
+        filters["bot"] = bot_id
+    try:
+        return {"filters": filters, "count": await audience.count(**filters)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка подсчета аудитории: {str(e)}")
+
+
+def audience_filters(
+    status: Optional[List[str]] = Query(["active"]),
+    language: Optional[List[str]] = Query(None),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    blocked_from: Optional[datetime] = None,
+    blocked_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Фильтры оценки аудитории; незаданные фильтры не применяются."""
+    filters = {
+        "status": status,
+        "language": language,
+        "created_from": created_from,
+        "created_to": created_to,
+        "blocked_from": blocked_from,
+        "blocked_to": blocked_to,
+    }
+    return {name: value for name, value in filters.items() if value is not None}
+
+
+def get_audience_columns(req: Request):
+    """Возвращает колоночный снимок аудитории или 503, если он еще не построен."""
+    columns = get_notification_service(req).columns
+    if columns is None:
+        raise HTTPException(status_code=503, detail="Снимок аудитории еще не построен")
+    return columns
+
+
+@router.get("/audience/estimate")
+async def estimate_audience(
+    req: Request,
+    filters: Dict[str, Any] = Depends(audience_filters)
+) -> Dict[str, Any]:
+    """Оценивает размер сегмента аудитории по колоночному снимку пользователей."""
+    columns = get_audience_columns(req)
+    started = time.perf_counter()
+    count = columns.count(**filters)
+    return {
+        "filters": filters,
+        "count": count,
+        "total": columns.size,
+        "built_at": datetime.utcfromtimestamp(columns.built_at).isoformat(),
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.get("/audience/histogram")
+async def get_audience_histogram(
+    req: Request,
+    field: str = "language",
+    bucket: str = "day",
+    filters: Dict[str, Any] = Depends(audience_filters)
+) -> Dict[str, Any]:
+    """Распределение сегмента аудитории по языкам, статусам или датам регистрации и блокировки."""
+    columns = get_audience_columns(req)
+    started = time.perf_counter()
+    try:
+        histogram = columns.histogram(field, bucket=bucket, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "field": field,
+        "filters": filters,
+        "histogram": histogram,
+        "built_at": datetime.utcfromtimestamp(columns.built_at).isoformat(),
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.get("/dead-letters/summary")
+async def get_dead_letter_summary(
+    req: Request,
+    notification_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Количество недоставленных уведомлений по уведомлениям и типам ошибок."""
+    try:
+        return await get_notification_service(req).get_dead_letter_summary(notification_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка получения очереди недоставленных: {str(e)}")
+
+
+@router.get("/dead-letters")
+async def get_dead_letters(
+    req: Request,
+    notification_id: Optional[int] = None,
+    error_type: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Список недоставленных уведомлений с контекстом ошибки."""
+    try:
+        return await get_notification_service(req).get_dead_letters(notification_id, error_type, limit, offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка получения очереди недоставленных: {str(e)}")
+
+
+@router.post("/dead-letters/redrive")
+async def redrive_dead_letters(
+    data: RedriveDeadLettersRequest,
+    req: Request
+) -> Dict[str, Any]:
+    """Повторно отправляет недоставленные уведомления через общий движок рассылки."""
+    result = await get_notification_service(req).redrive_dead_letters(
+        notification_id=data.notification_id,
+        error_type=data.error_type,
+        ids=data.ids,
+        limit=data.limit
+    )
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+    return result
+
+
 @router.post("/retry/{notification_id}")
 async def retry_notification(
     notification_id: int,
     req: Request
 ) -> Dict[str, Any]:
-    """Повторно отправляет неудачное уведомление."""
-    try:
-        bot = req.app.state.bot
-        session_pool = req.app.state.session_pool
-        
-        async with session_pool() as session:
-            result = await session.execute(
-                select(Notification).where(Notification.id == notification_id)
-            )
-            notification = result.scalar_one_or_none()
-            
-            if not notification:
-                raise HTTPException(status_code=404, detail="Уведомление не найдено")
-            
-            if notification.status == "sent":
-                return {"message": "Уведомление уже отправлено", "status": "already_sent"}
-            
-            notification.status = "pending"
-            notification.error = None
-            notification.sent_at = None
-            await session.commit()
-        
-        notification_service = NotificationService(bot, session_pool)
-        result = await notification_service.send_bulk_notification(notification_id)
-        
-        if not result.get("success", False):
-            raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
-        
-        return {
-            "message": "Уведомление повторно отправлено",
-            "notification_id": notification_id,
-            "sent_count": result.get("sent", 0),
-            "error_count": result.get("failed", 0),
-            "total_users": result.get("total", 0)
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка повторной отправки: {str(e)}") 
\ No newline at end of file
+    """Повторно отправляет уведомление получателям, доставка которым не удалась из-за временной ошибки."""
+    notification_service = get_notification_service(req)
+    result = await notification_service.retry_failed_deliveries(notification_id)
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Неизвестная ошибка"))
+    
+    if not result.get("total"):
+        return {"message": "Нет неудачных доставок для повтора", "status": "nothing_to_retry"}
+    
+    return {
+        "message": "Уведомление повторно отправлено",
+        "notification_id": notification_id,
+        "sent_count": result.get("sent", 0),
+        "error_count": result.get("failed", 0),
+        "total_users": result.get("total", 0),
+        "failures": result.get("failures")
+    }
@@ -5,12 +5,22 @@ from typing import Annotated, Any, Optional
 from aiogram import Bot, Dispatcher
 from aiogram.methods import TelegramMethod
 from aiogram.types import Update
-from fastapi import APIRouter, Body, Header, HTTPException, status
+from fastapi import APIRouter, Body, Header, HTTPException, Path, status
+
+
+def build_webhook_path(path: str, bot: Bot, main_bot: Bot) -> str:
+    """
+    The main bot keeps the configured path, extra bots are routed by their id
+    """
+    if bot.id == main_bot.id:
+        return path
+    return f"{path.rstrip('/')}/{bot.id}"
 
 
 class TelegramRequestHandler:
     dispatcher: Dispatcher
     bot: Bot
+    bots: list[Bot]
     secret_token: Optional[str]
     _feed_update_tasks: set[asyncio.Task[Any]]
 
@@ -20,6 +30,7 @@ class TelegramRequestHandler:
         bot: Bot,
         path: str,
         secret_token: Optional[str] = None,
+        bots: Optional[list[Bot]] = None,
     ) -> None:
         """
         Base handler that helps to handle incoming request from aiohttp
@@ -27,6 +38,7 @@ class TelegramRequestHandler:
         """
         self.dispatcher = dispatcher
         self.bot = bot
+        self.bots = bots or [bot]
         self.secret_token = secret_token
         self.router: APIRouter = APIRouter(
             on_startup=(self.startup,),
@@ -34,12 +46,22 @@ class TelegramRequestHandler:
             include_in_schema=False,
         )
         self.router.add_api_route(path=path, endpoint=self.handle, methods=["POST"])
+        self._extra_bots: dict[int, Bot] = {
+            extra_bot.id: extra_bot for extra_bot in self.bots if extra_bot.id != bot.id
+        }
+        if self._extra_bots:
+            self.router.add_api_route(
+                path=f"{path.rstrip('/')}/{{bot_id}}",
+                endpoint=self.handle_extra,
+                methods=["POST"],
+            )
         self._feed_update_tasks = set()
 
     async def startup(self) -> None:
         await self.dispatcher.emit_startup(
             dispatcher=self.dispatcher,
             bot=self.bot,
+            bots=self.bots,
             **self.dispatcher.workflow_data,
         )
 
@@ -49,29 +71,33 @@ class TelegramRequestHandler:
         await self.dispatcher.emit_shutdown(
             dispatcher=self.dispatcher,
             bot=self.bot,
+            bots=self.bots,
             **self.dispatcher.workflow_data,
         )
         self.dispatcher["shutdown_completed"] = True
 
     async def close(self) -> None:
-        await self.bot.session.close()
+        for bot in self.bots:
+            await bot.session.close()
 
     def verify_secret(self, telegram_secret_token: str) -> bool:
         if self.secret_token:
             return secrets.compare_digest(telegram_secret_token, self.secret_token)
         return True
 
-    async def _feed_update(self, update: Update) -> None:
+    async def _feed_update(self, bot: Bot, update: Update) -> None:
         result = await self.dispatcher.feed_update(
-            bot=self.bot,
+            bot=bot,
             update=update,
             dispatcher=self.dispatcher,
         )
         if isinstance(result, TelegramMethod):
-            await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
 
-    async def _handle_request_background(self, update: Update) -> None:
-        feed_update_task: asyncio.Task[Any] = asyncio.create_task(self._feed_update(update=update))
+    async def _handle_request_background(self, bot: Bot, update: Update) -> None:
+        feed_update_task: asyncio.Task[Any] = asyncio.create_task(
+            self._feed_update(bot=bot, update=update)
+        )
         self._feed_update_tasks.add(feed_update_task)
         feed_update_task.add_done_callback(self._feed_update_tasks.discard)
 
@@ -85,4 +111,23 @@ class TelegramRequestHandler:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid secret token",
             )
-        await self._handle_request_background(update=update)
+        await self._handle_request_background(bot=self.bot, update=update)
+
+    async def handle_extra(
+        self,
+        bot_id: Annotated[int, Path()],
+        update: Annotated[Update, Body()],
+        x_telegram_bot_api_secret_token: Annotated[str, Header()],
+    ) -> None:
+        if not self.verify_secret(x_telegram_bot_api_secret_token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid secret token",
+            )
+        bot: Optional[Bot] = self._extra_bots.get(bot_id)
+        if bot is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Unknown bot",
+            )
+        await self._handle_request_background(bot=bot, update=update)
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 from app.models.config.env import (
     AppConfig,
+    BroadcastConfig,
     CommonConfig,
     PostgresConfig,
     RedisConfig,
@@ -26,4 +27,5 @@ def create_app_config() -> AppConfig:
         redis=RedisConfig(),
         server=ServerConfig(),
         common=CommonConfig(),
+        broadcast=BroadcastConfig(),
     )
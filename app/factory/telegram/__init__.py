@@ -1,10 +1,11 @@
-from .bot import create_bot
+from .bot import create_bot, create_bots
 from .dispatcher import create_dispatcher
 from .fastapi import setup_fastapi
 from .i18n import create_i18n_middleware
 
 __all__ = [
     "create_bot",
+    "create_bots",
     "create_dispatcher",
     "create_i18n_middleware",
     "setup_fastapi",
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.client.session.aiohttp import AiohttpSession
-from aiogram.contrib.middlewares import RetryRequestMiddleware
 from aiogram.enums import ParseMode
 from aiogram.types import LinkPreviewOptions
 
@@ -15,14 +14,22 @@ if TYPE_CHECKING:
     from app.models.config import AppConfig
 
 
-def create_bot(config: AppConfig) -> Bot:
+def create_bot(config: AppConfig, token: Optional[str] = None) -> Bot:
+    # Requests are not retried by the session: retries are owned by the broadcast engine,
+    # where they pass the rate limiter and the retry budget
     session: AiohttpSession = AiohttpSession(json_loads=mjson.decode, json_dumps=mjson.encode)
-    session.middleware(RetryRequestMiddleware())
     return Bot(
-        token=config.telegram.bot_token.get_secret_value(),
+        token=token or config.telegram.bot_token.get_secret_value(),
         session=session,
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML,
             link_preview=LinkPreviewOptions(is_disabled=True),
         ),
     )
+
+
+def create_bots(config: AppConfig) -> list[Bot]:
+    """
+    :return: Main bot followed by the additional bots from ``TELEGRAM_EXTRA_BOT_TOKENS``
+    """
+    return [create_bot(config=config, token=token) for token in config.telegram.get_bot_tokens()]
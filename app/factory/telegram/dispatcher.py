@@ -15,6 +15,9 @@ from app.factory.services import create_services
 from app.factory.session_pool import create_session_pool
 from app.factory.telegram.i18n import create_i18n_middleware
 from app.telegram.handlers import extra, main
+from app.services.broadcast.rate_limit import ChatRateLimiter
+from app.services.redis.interactive import InteractiveLatencyStore
+from app.telegram.middlewares.latency import InteractiveLatencyMiddleware
 from app.telegram.middlewares.message_helper import MessageHelperMiddleware
 from app.telegram.middlewares.user import UserMiddleware
 from app.utils import mjson
@@ -52,8 +55,17 @@ def create_dispatcher(config: AppConfig) -> Dispatcher:
 
     dispatcher.include_routers(main.router, extra.router)
     i18n_middleware.setup(dispatcher=dispatcher)
+    if config.broadcast.interactive_guard:
+        dispatcher.update.outer_middleware(
+            InteractiveLatencyMiddleware(
+                InteractiveLatencyStore(redis),
+                window=config.broadcast.interactive_window,
+                publish_interval=config.broadcast.interactive_refresh_interval,
+            )
+        )
     dispatcher.update.outer_middleware(UserMiddleware())
-    dispatcher.update.outer_middleware(MessageHelperMiddleware())
+    chat_limiter = ChatRateLimiter.from_config(config.broadcast) if config.broadcast.chat_rate_limit else None
+    dispatcher.update.outer_middleware(MessageHelperMiddleware(chat_limiter=chat_limiter))
     dispatcher.callback_query.middleware(CallbackAnswerMiddleware())
 
     return dispatcher
@@ -1,14 +1,22 @@
+from typing import Optional
+
 from aiogram import Bot, Dispatcher
 from fastapi import FastAPI
 
 from app.endpoints import healthcheck
 
 
-def setup_fastapi(app: FastAPI, dispatcher: Dispatcher, bot: Bot) -> FastAPI:
+def setup_fastapi(
+    app: FastAPI,
+    dispatcher: Dispatcher,
+    bot: Bot,
+    bots: Optional[list[Bot]] = None,
+) -> FastAPI:
     app.include_router(healthcheck.router)
     for key, value in dispatcher.workflow_data.items():
         setattr(app.state, key, value)
     app.state.dispatcher = dispatcher
     app.state.bot = bot
+    app.state.bots = bots or [bot]
     app.state.shutdown_completed = False
     return app
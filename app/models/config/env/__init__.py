@@ -1,4 +1,5 @@
 from .app import AppConfig
+from .broadcast import BroadcastConfig
 from .common import CommonConfig
 from .postgres import PostgresConfig
 from .redis import RedisConfig
@@ -8,6 +9,7 @@ from .telegram import TelegramConfig
 
 __all__ = [
     "AppConfig",
+    "BroadcastConfig",
     "CommonConfig",
     "PostgresConfig",
     "RedisConfig",
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 
+from .broadcast import BroadcastConfig
 from .common import CommonConfig
 from .postgres import PostgresConfig
 from .redis import RedisConfig
@@ -15,3 +16,4 @@ class AppConfig(BaseModel):
     redis: RedisConfig
     server: ServerConfig
     common: CommonConfig
+    broadcast: BroadcastConfig
@@ -0,0 +1,159 @@
+"""
+Конфигурация движка массовой рассылки.
+
+Лимит частоты на бота, границы и параметры адаптивного управления параллелизмом,
+выключатель при сбоях Telegram, профиль платной рассылки (allow_paid_broadcast)
+и хранение снимков аудитории.
+"""
+
+from pathlib import Path
+from typing import Literal, Optional
+
+from app.const import ROOT_DIR
+
+from .base import EnvSettings
+
+
+class BroadcastConfig(EnvSettings, env_prefix="BROADCAST_"):
+    """Конфигурация движка массовой рассылки."""
+
+    rate_limit: float = 30.0
+    initial_concurrency: int = 10
+    min_concurrency: int = 1
+    max_concurrency: int = 100
+    additive_increase: float = 1.0
+    multiplicative_decrease: float = 0.5
+    latency_threshold: float = 1.0
+    decrease_cooldown: float = 1.0
+    failure_sample_size: int = 10
+    failure_summary_interval: float = 30.0
+    connection_limit: int = 100
+    ledger_batch_size: int = 500
+    # Смена статусов пользователей после ошибок Telegram записывается пачками:
+    # размер пачки и максимальное ожидание ее заполнения (с)
+    status_batch_size: int = 500
+    status_batch_delay: float = 0.05
+    # Получателей в одном блоке очереди отправки
+    queue_block_size: int = 10000
+
+    # Общий бюджет частоты в Redis для всех процессов с одним токеном бота
+    # и число разрешений, которые процесс забирает за одно обращение к Redis
+    shared_rate_limit: bool = True
+    rate_limit_prefetch: int = 5
+    # Делить бюджет частоты бота между одновременными рассылками по весам уведомлений
+    fair_queuing: bool = True
+
+    # Частота сообщений в один чат: интервал (с) для личных чатов и для групп и каналов,
+    # сколько сообщений подряд допускается без паузы и сколько чатов помнить
+    chat_rate_limit: bool = True
+    chat_private_interval: float = 1.0
+    chat_group_interval: float = 3.0
+    chat_burst: int = 3
+    chat_max_tracked: int = 100000
+
+    # Доля лимита rate_limit, оставляемая ответам бота пользователям во время рассылки
+    interactive_reserve: float = 0.1
+    # Замедление рассылки, пока p95 задержки ответов бота (с) за окно (с) выше порога:
+    # темп снижается вдвое за период обновления, но не ниже min_share, и возвращается на recovery
+    interactive_guard: bool = True
+    interactive_p95_threshold: float = 2.0
+    interactive_window: float = 60.0
+    interactive_refresh_interval: float = 1.0
+    interactive_min_share: float = 0.2
+    interactive_recovery: float = 0.1
+
+    # Проверка разметки текста перед рассылкой и пробная отправка первым canary_size
+    # получателям: при доле ошибок сообщения выше порога рассылка останавливается
+    preflight_enabled: bool = True
+    canary_size: int = 50
+    canary_max_error_rate: float = 0.2
+
+    # Бюджет повторов временных ошибок: не больше ratio от первых попыток
+    # плюс min_per_second повторов в секунду за скользящее окно (с)
+    retry_budget_ratio: float = 0.1
+    retry_budget_min_per_second: float = 1.0
+    retry_budget_window: float = 60.0
+
+    # Выключатель: доля ошибок 5xx в скользящем окне, после которой рассылка приостанавливается
+    breaker_window: float = 30.0
+    breaker_min_requests: int = 20
+    breaker_error_threshold: float = 0.5
+    breaker_open_timeout: float = 5.0
+    breaker_max_open_timeout: float = 60.0
+
+    # Снимки аудитории: каталог, размер страницы выборки и период сохранения курсоров
+    snapshot_dir: Path = ROOT_DIR / "data" / "snapshots"
+    snapshot_page_size: int = 50000
+    snapshot_checkpoint_interval: float = 5.0
+    # Снимки прерванных рассылок хранятся для возобновления не дольше snapshot_ttl (с)
+    snapshot_ttl: int = 604800
+
+    # Очередь исходящих заданий в Postgres: API ставит рассылки в очередь,
+    # а выполняют их воркеры (python -m app.runners.outbox)
+    outbox_enabled: bool = False
+    outbox_batch_size: int = 10
+    outbox_concurrency: int = 4
+    outbox_lease: float = 300.0
+    outbox_max_attempts: int = 5
+    outbox_retry_delay: float = 30.0
+    outbox_poll_interval: float = 30.0
+
+    # Время жизни кэша содержимого уведомлений в Redis (с)
+    payload_cache_ttl: int = 3600
+
+    # Дайджест: рассылки, запущенные в пределах окна (с), уходят получателю одним сообщением
+    digest_enabled: bool = False
+    digest_window: float = 30.0
+    digest_max_notifications: int = 20
+
+    # Пробный запуск: задержка ответа Telegram (с) с разбросом, доля ошибок по типам
+    # и число повторов временных ошибок с паузой 2^n с
+    dry_run_latency: float = 0.05
+    dry_run_latency_jitter: float = 0.02
+    dry_run_error_rates: dict[str, float] = {
+        "user_blocked": 0.02,
+        "chat_not_found": 0.005,
+        "server_error": 0.001,
+    }
+    dry_run_max_retries: int = 3
+    # Стоимость одного сообщения платной рассылки в Telegram Stars
+    paid_message_stars: float = 0.1
+
+    # Колоночный снимок пользователей для оценки аудитории в API и админ-панели:
+    # период обновления (с) и размер страницы выборки
+    audience_columns_enabled: bool = True
+    audience_columns_refresh_interval: float = 300.0
+    audience_columns_page_size: int = 100000
+
+    # Проверка доступности чатов активных пользователей в фоне: метод проверки
+    # (send_chat_action на секунды показывает «печатает», get_chat не замечает блокировок),
+    # вес и предел частоты (запросов/с) потока проверки, параллельных проверок,
+    # размер страницы выборки и пауза между проходами (с)
+    liveness_enabled: bool = False
+    liveness_method: Literal["send_chat_action", "get_chat"] = "send_chat_action"
+    liveness_weight: float = 0.1
+    liveness_max_rate: Optional[float] = 5.0
+    liveness_concurrency: int = 5
+    liveness_page_size: int = 1000
+    liveness_interval: float = 86400.0
+
+    # Цепочки сообщений (кампании): запись новых пользователей в кампании,
+    # записей за одну выборку наступивших шагов, аренда выбранных записей (с),
+    # пауза опроса при пустой очереди (с), пауза перед повтором шага после
+    # временной ошибки (с) и число попыток шага до остановки записи
+    campaigns_enabled: bool = False
+    campaign_batch_size: int = 1000
+    campaign_lease: float = 600.0
+    campaign_poll_interval: float = 5.0
+    campaign_retry_delay: float = 600.0
+    campaign_max_attempts: int = 5
+
+    # Брать получателей из индекса аудитории в Redis вместо таблицы users
+    use_audience_index: bool = False
+
+    # Профиль платной рассылки: до 1000 сообщений в секунду за Telegram Stars
+    paid_rate_limit: float = 1000.0
+    paid_initial_concurrency: int = 100
+    paid_max_concurrency: int = 1000
+    paid_connection_limit: int = 1000
+    paid_ledger_batch_size: int = 5000
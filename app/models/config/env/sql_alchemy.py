@@ -8,3 +8,9 @@ class SQLAlchemyConfig(EnvSettings, env_prefix="ALCHEMY_"):
     max_overflow: int = 25
     pool_timeout: int = 10
     pool_recycle: int = 3600
+
+    # Объединение одиночных записей пользователей: размер пачки, ожидание (с)
+    # и число ожидающих записей, после которого новые записи ждут освобождения места
+    write_batch_size: int = 500
+    write_batch_delay: float = 0.01
+    write_max_pending: int = 10000
@@ -7,7 +7,7 @@
 from typing import Optional
 from pydantic import SecretStr
 
-from app.utils.custom_types import StringList
+from app.utils.custom_types import SecretStringList, StringList
 
 from .base import EnvSettings
 
@@ -16,9 +16,21 @@ class TelegramConfig(EnvSettings, env_prefix="TELEGRAM_"):
     """Конфигурация Telegram бота."""
     
     bot_token: Optional[SecretStr] = None
+    extra_bot_tokens: SecretStringList = []
     locales: StringList = ["en"]
     drop_pending_updates: bool = True
     use_webhook: bool = False
     reset_webhook: bool = False
     webhook_path: str = "/webhook"
     webhook_secret: SecretStr = SecretStr("")
+
+    def get_bot_tokens(self) -> list[str]:
+        """Возвращает токены всех ботов: основного и дополнительных."""
+        tokens: list[str] = []
+        for token in [self.bot_token, *self.extra_bot_tokens]:
+            if token is None:
+                continue
+            value = token.get_secret_value()
+            if value and value not in tokens:
+                tokens.append(value)
+        return tokens
@@ -15,6 +15,7 @@ class UserDto(ActiveRecordModel):
     bot_blocked: bool = False
     blocked_at: Optional[datetime] = None
     status: str = "active"
+    bot_id: Optional[int] = None
 
     @property
     def url(self) -> str:
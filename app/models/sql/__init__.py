@@ -1,4 +1,17 @@
 from .user import User
 from .notification import Notification
+from .delivery import NotificationDelivery
+from .dead_letter import DeadLetter
+from .outbox import OutboxJob
+from .campaign import Campaign, CampaignEnrollment, CampaignStep
 
-__all__ = ["User", "Notification"]
+__all__ = [
+    "User",
+    "Notification",
+    "NotificationDelivery",
+    "DeadLetter",
+    "OutboxJob",
+    "Campaign",
+    "CampaignEnrollment",
+    "CampaignStep",
+]
@@ -0,0 +1,77 @@
+"""
+Модели цепочек сообщений (drip-кампаний).
+
+Кампания — последовательность шагов, каждый из которых отправляет
+уведомление через заданное время после записи пользователя в кампанию.
+На одну запись пользователя приходится одна строка с номером следующего
+шага и временем его отправки, а не строка на каждый шаг. Частичный индекс
+по времени отправки активных записей позволяет воркеру выбирать наступившие
+шаги пачками, не просматривая всю таблицу.
+"""
+
+from datetime import datetime
+from enum import IntEnum, StrEnum
+from typing import Optional
+
+from sqlalchemy import BigInteger, Index, String, text, true
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.utils.custom_types import Int16, Int32, Int64
+
+from .base import Base
+from .mixins import TimestampMixin
+from .mixins.timestamp import NowFunc
+
+
+class CampaignTrigger(StrEnum):
+    """Событие, при котором пользователь записывается в кампанию."""
+    USER_CREATED = "user_created"
+
+
+class EnrollmentStatus(IntEnum):
+    """Состояние записи пользователя в кампанию."""
+    ACTIVE = 0
+    COMPLETED = 1
+    STOPPED = 2
+
+
+class Campaign(Base, TimestampMixin):
+    """Кампания: цепочка уведомлений, запускаемая событием."""
+
+    __tablename__ = "campaigns"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(length=128))
+    trigger: Mapped[str] = mapped_column(String(length=32), default=CampaignTrigger.USER_CREATED)
+    # Выключенная кампания не принимает новых пользователей и останавливает записанных
+    active: Mapped[bool] = mapped_column(default=True, server_default=true())
+
+
+class CampaignStep(Base):
+    """Шаг кампании: уведомление и задержка его отправки от записи в кампанию."""
+
+    __tablename__ = "campaign_steps"
+
+    campaign_id: Mapped[Int64] = mapped_column(primary_key=True)
+    position: Mapped[Int16] = mapped_column(primary_key=True)
+    delay: Mapped[Int32] = mapped_column()
+    notification_id: Mapped[Int64] = mapped_column()
+
+
+class CampaignEnrollment(Base):
+    """Запись пользователя в кампанию с позицией и временем следующего шага."""
+
+    __tablename__ = "campaign_enrollments"
+    # Воркер выбирает наступившие шаги только по активным записям
+    __table_args__ = (
+        Index("ix_campaign_enrollments_due", "next_run_at", postgresql_where=text("status = 0")),
+    )
+
+    campaign_id: Mapped[Int64] = mapped_column(primary_key=True)
+    user_id: Mapped[Int64] = mapped_column(primary_key=True)
+    step: Mapped[Int16] = mapped_column()
+    status: Mapped[Int16] = mapped_column(default=EnrollmentStatus.ACTIVE)
+    # Попытки отправки текущего шага
+    attempts: Mapped[Int16] = mapped_column(default=0)
+    enrolled_at: Mapped[datetime] = mapped_column(server_default=NowFunc)
+    next_run_at: Mapped[Optional[datetime]] = mapped_column()
@@ -0,0 +1,32 @@
+"""
+Модель очереди недоставленных уведомлений.
+
+Доставки, которые не удалось выполнить из-за временной ошибки или после
+исчерпания попыток, сохраняются с контекстом ошибки, чтобы их можно было
+разобрать и отправить повторно.
+"""
+
+from typing import Optional
+
+from sqlalchemy import BigInteger, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.utils.custom_types import Int64
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class DeadLetter(Base, TimestampMixin):
+    """Недоставленное уведомление пользователю."""
+
+    __tablename__ = "dead_letters"
+    __table_args__ = (UniqueConstraint("notification_id", "user_id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    notification_id: Mapped[Int64] = mapped_column(index=True)
+    user_id: Mapped[Int64] = mapped_column()
+    bot_id: Mapped[Optional[Int64]] = mapped_column()
+    error_type: Mapped[str] = mapped_column(String(length=32), index=True)
+    error_message: Mapped[Optional[str]] = mapped_column(String(length=512))
+    attempts: Mapped[int] = mapped_column(default=1)
@@ -0,0 +1,40 @@
+"""
+Модель журнала доставки уведомлений.
+
+Одна компактная строка на пару (уведомление, пользователь)
+с кодом результата последней попытки отправки и ID отправленного
+сообщения, по которому его можно отредактировать или удалить.
+Сообщение дайджеста содержит тексты нескольких уведомлений, поэтому
+его строки помечены ID уведомления, от имени которого оно отправлено.
+"""
+
+from typing import Optional
+
+from sqlalchemy import Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.utils.custom_types import Int16, Int32, Int64
+
+from .base import Base
+
+
+class NotificationDelivery(Base):
+    """Результат доставки уведомления пользователю."""
+
+    __tablename__ = "notification_deliveries"
+    # Частичный индекс по временным ошибкам (DeliveryStatus.RETRYABLE): повторная
+    # отправка читает только неудачные доставки, а не весь журнал уведомления
+    __table_args__ = (
+        Index(
+            "ix_notification_deliveries_retryable",
+            "notification_id",
+            postgresql_where=text("status = 2"),
+        ),
+    )
+
+    notification_id: Mapped[Int64] = mapped_column(primary_key=True)
+    user_id: Mapped[Int64] = mapped_column(primary_key=True)
+    status: Mapped[Int16] = mapped_column()
+    message_id: Mapped[Optional[Int32]] = mapped_column()
+    # Уведомление, от имени которого отправлен дайджест с этим уведомлением
+    digest_id: Mapped[Optional[Int64]] = mapped_column()
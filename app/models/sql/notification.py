@@ -7,9 +7,11 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, BigInteger
+from sqlalchemy import String, BigInteger, false
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.utils.custom_types import DictStrAny
+
 from .base import Base
 from .mixins import TimestampMixin
 
@@ -24,4 +26,11 @@ class Notification(Base, TimestampMixin):
     status: Mapped[str] = mapped_column(String(length=32), default="draft")
     error: Mapped[Optional[str]] = mapped_column(String(length=1024), nullable=True)
     sent_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
-    comment: Mapped[Optional[str]] = mapped_column(String(length=1024), nullable=True) 
\ No newline at end of file
+    comment: Mapped[Optional[str]] = mapped_column(String(length=1024), nullable=True)
+    failure_summary: Mapped[Optional[DictStrAny]] = mapped_column(nullable=True)
+    paid_broadcast: Mapped[bool] = mapped_column(default=False, server_default=false())
+    # Версия содержимого: увеличивается при каждой правке и входит в ключ кэша
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    # Доля в бюджете частоты бота при одновременных рассылках и собственный предел (сообщений/с)
+    weight: Mapped[float] = mapped_column(default=1.0, server_default="1")
+    max_rate: Mapped[Optional[float]] = mapped_column(nullable=True)
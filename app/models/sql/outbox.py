@@ -0,0 +1,57 @@
+"""
+Модель очереди исходящих заданий рассылки в Postgres.
+
+Задания рассылки и отправки одиночных сообщений записываются в той же
+транзакции, что и смена статуса уведомления, поэтому задание не теряется
+и не появляется без изменения статуса. Воркеры забирают задания пачками
+через SELECT ... FOR UPDATE SKIP LOCKED и не мешают друг другу.
+"""
+
+from datetime import datetime
+from enum import IntEnum, StrEnum
+from typing import Optional
+
+from sqlalchemy import BigInteger, Index, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.utils.custom_types import DictStrAny, Int16, Int64
+
+from .base import Base
+from .mixins import TimestampMixin
+from .mixins.timestamp import NowFunc
+
+
+class OutboxStatus(IntEnum):
+    """Состояние задания."""
+    PENDING = 0
+    PROCESSING = 1
+    DONE = 2
+    FAILED = 3
+
+
+class OutboxKind(StrEnum):
+    """Тип задания."""
+    BROADCAST = "broadcast"
+    MESSAGE = "message"
+
+
+class OutboxJob(Base, TimestampMixin):
+    """Задание очереди исходящих."""
+
+    __tablename__ = "notification_outbox"
+    # Воркеры выбирают только ожидающие задания и задания с истекшей арендой
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "available_at", postgresql_where=text("status = 0")),
+        Index("ix_notification_outbox_processing", "locked_at", postgresql_where=text("status = 1")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(length=32))
+    notification_id: Mapped[Optional[Int64]] = mapped_column(index=True)
+    payload: Mapped[Optional[DictStrAny]] = mapped_column()
+    status: Mapped[Int16] = mapped_column(default=OutboxStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(default=0)
+    available_at: Mapped[datetime] = mapped_column(server_default=NowFunc)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(length=64))
+    locked_at: Mapped[Optional[datetime]] = mapped_column()
+    error: Mapped[Optional[str]] = mapped_column(String(length=1024))
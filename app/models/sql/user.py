@@ -20,6 +20,7 @@ class User(Base, TimestampMixin):
     language_code: Mapped[Optional[str]] = mapped_column()
     blocked_at: Mapped[Optional[datetime]] = mapped_column()
     status: Mapped[str] = mapped_column(String(length=20), default="active")
+    bot_id: Mapped[Optional[Int64]] = mapped_column(nullable=True)
 
     def dto(self) -> UserDto:
         return UserDto.model_validate(self)
@@ -40,23 +40,24 @@ def run_app(app: FastAPI, config: AppConfig) -> None:
     )
 
 
-def run_polling(dispatcher: Dispatcher, bot: Bot, config: AppConfig) -> None:
+def run_polling(dispatcher: Dispatcher, bots: list[Bot], config: AppConfig) -> None:
     dispatcher.workflow_data.update(is_polling=True)
     app: FastAPI = FastAPI(lifespan=polling_lifespan)
-    setup_fastapi(app=app, bot=bot, dispatcher=dispatcher)
+    setup_fastapi(app=app, bot=bots[0], dispatcher=dispatcher, bots=bots)
     dispatcher.startup.register(polling_startup)
     return run_app(app=app, config=config)
 
 
-def run_webhook(dispatcher: Dispatcher, bot: Bot, config: AppConfig) -> None:
+def run_webhook(dispatcher: Dispatcher, bots: list[Bot], config: AppConfig) -> None:
     dispatcher.workflow_data.update(is_polling=False)
     app: FastAPI = FastAPI()
-    setup_fastapi(app=app, bot=bot, dispatcher=dispatcher)
+    setup_fastapi(app=app, bot=bots[0], dispatcher=dispatcher, bots=bots)
     handler: TelegramRequestHandler = TelegramRequestHandler(
         dispatcher=dispatcher,
-        bot=bot,
+        bot=bots[0],
         path=config.telegram.webhook_path,
         secret_token=config.telegram.webhook_secret.get_secret_value(),
+        bots=bots,
     )
     app.state.tg_webhook_handler = handler
     app.include_router(handler.router)
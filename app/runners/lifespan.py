@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import logging
-from typing import Final
+from typing import Final, Optional
 
 from aiogram import Bot
 from aiogram_i18n import I18nMiddleware
 from fastapi import FastAPI
 
 from app.endpoints.telegram import TelegramRequestHandler
+from app.services.crud import UserService
 from app.services.redis import RedisRepository
 
 logger: Final[logging.Logger] = logging.getLogger(name=__name__)
@@ -17,9 +18,14 @@ async def close_sessions(
     bot: Bot,
     i18n_middleware: I18nMiddleware,
     redis: RedisRepository,
+    bots: Optional[list[Bot]] = None,
+    user_service: Optional[UserService] = None,
 ) -> None:
     await i18n_middleware.core.shutdown()
-    await bot.session.close()
+    if user_service is not None:
+        await user_service.close()
+    for session_bot in bots or [bot]:
+        await session_bot.session.close()
     await redis.close()
     logger.info("Closed all existing connections")
 
@@ -0,0 +1,70 @@
+"""
+Воркер очереди исходящих заданий рассылки в Postgres.
+
+Работает без Redis: задания, статусы и результаты доставки хранятся
+в Postgres. Воркеров можно запускать сколько угодно, задания
+распределяются между ними через FOR UPDATE SKIP LOCKED. С включенными
+кампаниями воркер также отправляет наступившие шаги цепочек сообщений.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import signal
+
+from aiogram import Bot
+
+from app.factory import create_app_config, create_bots, create_session_pool
+from app.models.config import AppConfig
+from app.services.campaign_service import CampaignService
+from app.services.notification_service import NotificationService
+from app.services.postgres import OutboxWorker
+from app.utils.logging import setup_logger
+
+
+async def run_outbox_worker(config: AppConfig) -> None:
+    bots: list[Bot] = create_bots(config=config)
+    session_pool = create_session_pool(config=config)
+    service = NotificationService(
+        bots[0],
+        session_pool,
+        config=config.broadcast,
+        bots=bots,
+        preflight_chat_id=config.common.admin_chat_id or None,
+    )
+    worker = OutboxWorker(
+        session_pool,
+        service.outbox_handlers(),
+        batch_size=config.broadcast.outbox_batch_size,
+        concurrency=config.broadcast.outbox_concurrency,
+        lease=config.broadcast.outbox_lease,
+        max_attempts=config.broadcast.outbox_max_attempts,
+        retry_delay=config.broadcast.outbox_retry_delay,
+        poll_interval=config.broadcast.outbox_poll_interval,
+    )
+    campaigns = CampaignService(service, session_pool) if config.broadcast.campaigns_enabled else None
+
+    def stop() -> None:
+        worker.stop()
+        if campaigns is not None:
+            campaigns.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    try:
+        await asyncio.gather(worker.run(), *([campaigns.run()] if campaigns is not None else []))
+    finally:
+        await service.cleanup()
+        for bot in bots:
+            await bot.session.close()
+        await session_pool.kw["bind"].dispose()
+
+
+def main() -> None:
+    setup_logger()
+    asyncio.run(run_outbox_worker(create_app_config()))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,8 +22,8 @@ async def polling_startup(bots: list[Bot], config: AppConfig) -> None:
 @asynccontextmanager
 async def polling_lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     dispatcher: Dispatcher = app.state.dispatcher
-    bot: Bot = app.state.bot
-    asyncio.create_task(dispatcher.start_polling(bot, handle_signals=False))
+    bots: list[Bot] = app.state.bots
+    asyncio.create_task(dispatcher.start_polling(*bots, handle_signals=False))
     yield
     if dispatcher._running_lock.locked():
         await dispatcher.stop_polling()
@@ -8,7 +8,7 @@ from aiogram import Bot, Dispatcher, loggers
 from aiogram.methods import SetWebhook
 from fastapi import FastAPI
 
-from app.endpoints.telegram import TelegramRequestHandler
+from app.endpoints.telegram import TelegramRequestHandler, build_webhook_path
 from app.services.redis import RedisRepository
 from app.utils import mjson
 
@@ -19,10 +19,28 @@ if TYPE_CHECKING:
 async def webhook_startup(
     dispatcher: Dispatcher,
     bot: Bot,
+    bots: list[Bot],
     config: AppConfig,
     redis_repository: RedisRepository,
 ) -> None:
-    url: str = config.server.build_url(path=config.telegram.webhook_path)
+    for webhook_bot in bots:
+        await set_bot_webhook(
+            dispatcher=dispatcher,
+            bot=webhook_bot,
+            path=build_webhook_path(config.telegram.webhook_path, webhook_bot, bot),
+            config=config,
+            redis_repository=redis_repository,
+        )
+
+
+async def set_bot_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str,
+    config: AppConfig,
+    redis_repository: RedisRepository,
+) -> None:
+    url: str = config.server.build_url(path=path)
     method: SetWebhook = SetWebhook(
         url=url,
         allowed_updates=dispatcher.resolve_used_update_types(),
@@ -36,26 +54,27 @@ async def webhook_startup(
         return
 
     if not await bot(method):
-        raise RuntimeError(f"Failed to set main bot webhook on url '{url}'")
+        raise RuntimeError(f"Failed to set bot {bot.id} webhook on url '{url}'")
 
     await redis_repository.clear_webhooks(bot_id=bot.id)
     await redis_repository.set_webhook(bot_id=bot.id, webhook_hash=webhook_hash)
-    loggers.webhook.info("Main bot webhook successfully set on url '%s'", url)
+    loggers.webhook.info("Bot %s webhook successfully set on url '%s'", bot.id, url)
 
 
 async def webhook_shutdown(
-    bot: Bot,
+    bots: list[Bot],
     config: AppConfig,
     redis_repository: RedisRepository,
 ) -> None:
     if not config.telegram.reset_webhook:
         return
-    if await bot.delete_webhook():
-        await redis_repository.clear_webhooks(bot_id=bot.id)
-        loggers.webhook.info("Dropped main bot webhook.")
-    else:
-        loggers.webhook.error("Failed to drop main bot webhook.")
-    await bot.session.close()
+    for bot in bots:
+        if await bot.delete_webhook():
+            await redis_repository.clear_webhooks(bot_id=bot.id)
+            loggers.webhook.info("Dropped bot %s webhook.", bot.id)
+        else:
+            loggers.webhook.error("Failed to drop bot %s webhook.", bot.id)
+        await bot.session.close()
 
 
 @asynccontextmanager
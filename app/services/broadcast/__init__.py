@@ -0,0 +1,68 @@
+"""
+Движок массовой рассылки уведомлений.
+
+Содержит компоненты управления нагрузкой на Telegram Bot API.
+"""
+
+from .blocks import BlockTask, MessageBlock, RecipientBlock
+from .breaker import BreakerState, CircuitBreaker
+from .clock import VirtualClockLoop, run_virtual
+from .columns import AudienceColumns, ColumnsBuilder
+from .concurrency import AIMDController
+from .digest import MESSAGE_LIMIT, DigestPart, DigestWindow, pack_digest
+from .failures import FailureAggregator
+from .fair import FairScheduler, Flow, current_flow
+from .interactive import InteractiveGuard, LatencyWindow
+from .ledger import DeliveryLedger, DeliveryStatus, RowBuffer
+from .metrics import MetricsRegistry, metrics
+from .preflight import validate_html
+from .profile import RateProfile
+from .retry import RetryBudget
+from .rate_limit import ChatRateLimiter, RateLimiter, TokenBucket
+from .run import BroadcastRun
+from .shard import BotShard, clone_bot
+from .simulation import DbLoad, SimulatedBot, SimulatedShard
+from .snapshot import AudienceSnapshot, SegmentCursor, SnapshotBuilder
+
+__all__ = [
+    "AIMDController",
+    "AudienceColumns",
+    "AudienceSnapshot",
+    "BlockTask",
+    "BotShard",
+    "BreakerState",
+    "BroadcastRun",
+    "ChatRateLimiter",
+    "CircuitBreaker",
+    "ColumnsBuilder",
+    "DbLoad",
+    "DeliveryLedger",
+    "DeliveryStatus",
+    "DigestPart",
+    "DigestWindow",
+    "FailureAggregator",
+    "FairScheduler",
+    "Flow",
+    "InteractiveGuard",
+    "LatencyWindow",
+    "MESSAGE_LIMIT",
+    "MessageBlock",
+    "MetricsRegistry",
+    "RateLimiter",
+    "RateProfile",
+    "RecipientBlock",
+    "RetryBudget",
+    "RowBuffer",
+    "SegmentCursor",
+    "SimulatedBot",
+    "SimulatedShard",
+    "SnapshotBuilder",
+    "TokenBucket",
+    "VirtualClockLoop",
+    "clone_bot",
+    "current_flow",
+    "metrics",
+    "pack_digest",
+    "run_virtual",
+    "validate_html",
+]
@@ -0,0 +1,123 @@
+"""
+Компактные блоки получателей массовой операции.
+
+ID чатов хранятся в массиве int64 (или в отображенном в память сегменте
+снимка), а число попыток и код результата — в параллельных байтовых
+массивах. Получатель занимает 10 байт, получатель с ID сообщения — 14,
+вместо сотен байт на объект задачи с собственной датой и ссылками.
+"""
+
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Union
+
+from .ledger import DeliveryStatus
+
+UserIds = Union[array, memoryview]
+
+# Код результата получателя, которого еще не обрабатывали
+PENDING = 0
+MAX_RETRIES = 255
+
+
+def _zeros(size: int) -> array:
+    return array("B", bytes(size))
+
+
+class RecipientBlock:
+    """Получатели одного бота с попытками и результатами в параллельных массивах."""
+
+    __slots__ = ("bot_id", "user_ids", "retries", "statuses")
+
+    def __init__(self, bot_id: int, user_ids: Union[UserIds, Iterable[int]]) -> None:
+        self.bot_id = bot_id
+        self.user_ids: UserIds = user_ids if isinstance(user_ids, (array, memoryview)) else array("q", user_ids)
+        self.retries = _zeros(len(self.user_ids))
+        self.statuses = _zeros(len(self.user_ids))
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __getitem__(self, index: int):
+        return self.user_ids[index]
+
+    def __iter__(self):
+        return iter(self.user_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Размер данных блока в байтах."""
+        return len(self.user_ids) * self.user_ids.itemsize + len(self.retries) + len(self.statuses)
+
+    def mark(self, index: int, status: DeliveryStatus) -> None:
+        """Записывает результат обработки получателя; временная ошибка увеличивает счетчик попыток."""
+        self.statuses[index] = status
+        if status == DeliveryStatus.RETRYABLE and self.retries[index] < MAX_RETRIES:
+            self.retries[index] += 1
+
+    def count(self, status: int) -> int:
+        """Количество получателей с указанным результатом."""
+        return self.statuses.count(status)
+
+    def split(self, count: int) -> tuple["RecipientBlock", "RecipientBlock"]:
+        """Делит блок на первых count получателей и остальных, сохраняя счетчики попыток."""
+        head = RecipientBlock(self.bot_id, self.user_ids[:count])
+        tail = RecipientBlock(self.bot_id, self.user_ids[count:])
+        head.retries, tail.retries = self.retries[:count], self.retries[count:]
+        return head, tail
+
+    def select(self, status: int, max_retries: Optional[int] = None) -> "RecipientBlock":
+        """Новый блок из получателей с указанным результатом и не более max_retries попытками.
+
+        Счетчики попыток переносятся, результаты сбрасываются.
+        """
+        indexes = [
+            index
+            for index, value in enumerate(self.statuses)
+            if value == status and (max_retries is None or self.retries[index] <= max_retries)
+        ]
+        block = RecipientBlock(self.bot_id, array("q", (self.user_ids[index] for index in indexes)))
+        block.retries = array("B", (self.retries[index] for index in indexes))
+        return block
+
+
+class MessageBlock(RecipientBlock):
+    """Получатели с ID доставленных им сообщений для редактирования и удаления."""
+
+    __slots__ = ("message_ids",)
+
+    def __init__(self, bot_id: int) -> None:
+        super().__init__(bot_id, array("q"))
+        self.message_ids = array("i")
+
+    def append(self, user_id: int, message_id: int) -> None:
+        self.user_ids.append(user_id)
+        self.message_ids.append(message_id)
+        self.retries.append(0)
+        self.statuses.append(PENDING)
+
+    def __getitem__(self, index: int) -> tuple[int, int]:
+        return self.user_ids[index], self.message_ids[index]
+
+    def __iter__(self):
+        return zip(self.user_ids, self.message_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + len(self.message_ids) * self.message_ids.itemsize
+
+
+@dataclass
+class BlockTask:
+    """Задача очереди на отправку уведомления блоку получателей одного бота."""
+
+    notification_id: int
+    message: str
+    block: RecipientBlock
+    max_retries: int = 3
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def bot_id(self) -> int:
+        return self.block.bot_id
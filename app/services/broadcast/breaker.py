@@ -0,0 +1,177 @@
+"""
+Автоматический выключатель массовой рассылки при сбоях Telegram.
+
+Во время инцидентов Telegram каждый запрос завершается ошибкой 5xx.
+Выключатель считает долю таких ошибок в скользящем окне и при превышении
+порога размыкается: рассылка приостанавливается, а после паузы Telegram
+проверяется одиночным пробным запросом. Успешная проба замыкает
+выключатель, неудачная размыкает его снова с удвоенной паузой.
+"""
+
+import asyncio
+from collections import deque
+from enum import IntEnum
+from typing import Optional
+
+from app.models.config.env import BroadcastConfig
+from app.utils.logging import notifications as logger
+
+from .clock import monotonic
+from .metrics import metrics
+
+
+class BreakerState(IntEnum):
+    """Состояние выключателя. Значение экспортируется в метриках."""
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class CircuitBreaker:
+    """Выключатель по доле ошибок сервера в скользящем окне."""
+
+    def __init__(
+        self,
+        window: float = 30.0,
+        min_requests: int = 20,
+        error_threshold: float = 0.5,
+        open_timeout: float = 5.0,
+        max_open_timeout: float = 60.0,
+        name: str = "default",
+    ) -> None:
+        self.window = max(1, int(window))
+        self.min_requests = max(1, min_requests)
+        self.error_threshold = error_threshold
+        self.open_timeout = open_timeout
+        self.max_open_timeout = max(open_timeout, max_open_timeout)
+        self.name = name
+        self.state = BreakerState.CLOSED
+        # Посекундные корзины [секунда, запросов, ошибок]
+        self._buckets: deque[list[int]] = deque()
+        self._requests = 0
+        self._errors = 0
+        self._timeout = open_timeout
+        self._retry_at = 0.0
+        self._probing = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._publish()
+
+    @classmethod
+    def from_config(cls, config: BroadcastConfig, name: str = "default") -> "CircuitBreaker":
+        """Создает выключатель из конфигурации рассылки."""
+        return cls(
+            window=config.breaker_window,
+            min_requests=config.breaker_min_requests,
+            error_threshold=config.breaker_error_threshold,
+            open_timeout=config.breaker_open_timeout,
+            max_open_timeout=config.breaker_max_open_timeout,
+            name=name,
+        )
+
+    @property
+    def error_rate(self) -> float:
+        """Доля ошибок сервера в текущем окне."""
+        return self._errors / self._requests if self._requests else 0.0
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _publish(self) -> None:
+        metrics.set("broadcast_breaker_state", int(self.state), breaker=self.name)
+
+    async def _notify(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    def _transition(self, state: BreakerState) -> None:
+        previous, self.state = self.state, state
+        metrics.inc("broadcast_breaker_transitions_total", breaker=self.name, to=state.name.lower())
+        self._publish()
+        logger.warning(
+            f"Выключатель {self.name}: {previous.name} -> {state.name}, "
+            f"доля ошибок {self.error_rate:.0%} из {self._requests} запросов"
+        )
+
+    def _open(self, now: float) -> None:
+        self._retry_at = now + self._timeout
+        self._transition(BreakerState.OPEN)
+
+    def _reset_window(self) -> None:
+        self._buckets.clear()
+        self._requests = 0
+        self._errors = 0
+
+    def _observe(self, now: float, error: bool) -> None:
+        second = int(now)
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            _, requests, errors = self._buckets.popleft()
+            self._requests -= requests
+            self._errors -= errors
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        self._requests += 1
+        if error:
+            bucket[2] += 1
+            self._errors += 1
+
+    async def acquire(self) -> bool:
+        """Ожидает разрешения на запрос.
+
+        Возвращает True, если запрос пробный: его результат решает,
+        замкнуть выключатель или разомкнуть его снова.
+        """
+        condition = self._get_condition()
+        while True:
+            if self.state is BreakerState.CLOSED:
+                return False
+            now = monotonic()
+            if self.state is BreakerState.OPEN and now >= self._retry_at:
+                self._transition(BreakerState.HALF_OPEN)
+            if self.state is BreakerState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            # Пока выключатель разомкнут или идет проба, остальные запросы ждут
+            timeout = self._retry_at - now if self.state is BreakerState.OPEN else None
+            async with condition:
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def record(self, server_error: bool, probe: bool = False) -> None:
+        """Учитывает результат запроса."""
+        now = monotonic()
+        if self.state is BreakerState.CLOSED:
+            self._observe(now, server_error)
+            if (
+                server_error
+                and self._requests >= self.min_requests
+                and self.error_rate >= self.error_threshold
+            ):
+                self._open(now)
+            return
+
+        # Результаты запросов, начатых до размыкания, не влияют на пробу
+        if not probe:
+            return
+        self._probing = False
+        if server_error:
+            self._timeout = min(self._timeout * 2, self.max_open_timeout)
+            self._open(now)
+        else:
+            self._timeout = self.open_timeout
+            self._transition(BreakerState.CLOSED)
+            self._reset_window()
+        await self._notify()
+
+    async def abandon(self) -> None:
+        """Отказывается от пробного запроса, например при отмене рассылки."""
+        self._probing = False
+        await self._notify()
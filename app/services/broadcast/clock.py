@@ -0,0 +1,76 @@
+"""
+Часы движка рассылки.
+
+Ограничители частоты, контроллер параллелизма и выключатель берут время
+у работающего цикла событий. В обычном цикле оно совпадает с
+time.monotonic(), а в пробном запуске цикл с виртуальными часами
+перескакивает через ожидания, поэтому рассылка на час моделируется
+за время, нужное процессору на обработку получателей.
+"""
+
+import asyncio
+import selectors
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def monotonic() -> float:
+    """Текущее время цикла событий или time.monotonic() вне цикла."""
+    try:
+        return asyncio.get_running_loop().time()
+    except RuntimeError:
+        return time.monotonic()
+
+
+class _VirtualSelector:
+    """Селектор, который вместо ожидания переводит виртуальные часы к ближайшему таймеру."""
+
+    def __init__(self, loop: "VirtualClockLoop") -> None:
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._selector, name)
+
+    def select(self, timeout: Optional[float] = None) -> list:
+        events = self._selector.select(0)
+        if not events and timeout is None:
+            # Таймеров нет: ждать можно только событий из других потоков
+            return self._selector.select(None)
+        # Итерация цикла занимает не меньше разрешения часов, иначе таймер,
+        # сработавший раньше срока в пределах разрешения, перезапускался бы
+        # без движения времени
+        self._loop.advance(max(0.0 if events else timeout, self._loop._clock_resolution))
+        return events
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Цикл событий с виртуальным временем.
+
+    Когда готовых задач нет, время сразу переводится к ближайшему таймеру
+    (asyncio.sleep, wait_for), а не ожидается. Отсчет начинается с нуля:
+    у малых значений шаг float мельче разрешения часов. Поэтому
+    ограничители и прочие объекты движка нужно создавать внутри цикла.
+    """
+
+    def __init__(self) -> None:
+        self._now = 0.0
+        super().__init__(selector=_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        """Переводит часы вперед."""
+        self._now += max(0.0, seconds)
+
+
+def run_virtual(main: Callable[[], Awaitable[T]]) -> T:
+    """Выполняет корутину в новом цикле с виртуальными часами в текущем потоке."""
+    loop = VirtualClockLoop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
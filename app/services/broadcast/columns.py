@@ -0,0 +1,197 @@
+"""
+Колоночный снимок пользователей для оценки аудитории.
+
+Атрибуты, по которым фильтруется аудитория (ID, язык, статус, даты
+регистрации и блокировки), хранятся параллельными массивами NumPy:
+около 27 байт на пользователя. Размер сегмента и гистограммы считаются
+векторными масками за миллисекунды без запросов к Postgres. Снимок
+периодически перестраивается, поэтому оценка может отставать от базы
+на период обновления.
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Final, Iterable, Optional, Union
+
+import numpy as np
+
+# Значение int64, которое NumPy читает как NaT (дата не задана)
+NAT: Final[int] = int(np.iinfo(np.int64).min)
+
+BLOCKED: Final[str] = "blocked"
+CATEGORY_FIELDS: Final[tuple[str, ...]] = ("language", "status")
+DATE_FIELDS: Final[tuple[str, ...]] = ("created_at", "blocked_at")
+# Единицы datetime64, по которым группируются даты в гистограммах
+BUCKETS: Final[dict[str, str]] = {"day": "D", "month": "M", "year": "Y"}
+
+# Строка выборки: (id, language, status, created_at, blocked_at)
+ColumnRow = tuple[int, Optional[str], str, Optional[datetime], Optional[datetime]]
+Values = Union[str, Iterable[str]]
+
+
+def _seconds(value: Optional[datetime]) -> int:
+    """Секунды от начала эпохи; даты без часового пояса считаются UTC."""
+    if value is None:
+        return NAT
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _datetime64(value: datetime) -> np.datetime64:
+    return np.datetime64(_seconds(value), "s")
+
+
+class ColumnsBuilder:
+    """Собирает строки пользователей в компактные массивы."""
+
+    def __init__(self) -> None:
+        self._ids = array("q")
+        self._languages = array("H")
+        self._statuses = array("B")
+        self._created_at = array("q")
+        self._blocked_at = array("q")
+        self._codes: dict[str, dict[str, int]] = {field: {} for field in CATEGORY_FIELDS}
+
+    def _code(self, field: str, value: str) -> int:
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(
+        self,
+        user_id: int,
+        language: Optional[str],
+        status: str,
+        created_at: Optional[datetime],
+        blocked_at: Optional[datetime],
+    ) -> None:
+        """Добавляет пользователя.
+
+        Заблокировавшие бота считаются заблокированными, как в индексе аудитории.
+        """
+        self._ids.append(user_id)
+        self._languages.append(self._code("language", language or ""))
+        self._statuses.append(self._code("status", BLOCKED if blocked_at is not None else status))
+        self._created_at.append(_seconds(created_at))
+        self._blocked_at.append(_seconds(blocked_at))
+
+    def extend(self, rows: Iterable[ColumnRow]) -> None:
+        """Добавляет строки (id, language, status, created_at, blocked_at)."""
+        for row in rows:
+            self.add(*row)
+
+    def build(self) -> AudienceColumns:
+        """Копирует накопленные массивы в снимок."""
+        return AudienceColumns(
+            ids=np.frombuffer(self._ids, dtype=np.int64).copy(),
+            languages=np.frombuffer(self._languages, dtype=np.uint16).copy(),
+            statuses=np.frombuffer(self._statuses, dtype=np.uint8).copy(),
+            created_at=np.frombuffer(self._created_at, dtype=np.int64).view("datetime64[s]").copy(),
+            blocked_at=np.frombuffer(self._blocked_at, dtype=np.int64).view("datetime64[s]").copy(),
+            names={field: list(codes) for field, codes in self._codes.items()},
+        )
+
+
+class AudienceColumns:
+    """Неизменяемый колоночный снимок атрибутов пользователей."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        languages: np.ndarray,
+        statuses: np.ndarray,
+        created_at: np.ndarray,
+        blocked_at: np.ndarray,
+        names: dict[str, list[str]],
+        built_at: Optional[float] = None,
+    ) -> None:
+        self.ids = ids
+        self.columns: dict[str, np.ndarray] = {
+            "language": languages,
+            "status": statuses,
+            "created_at": created_at,
+            "blocked_at": blocked_at,
+        }
+        # Значения категориальных столбцов по кодам
+        self.names = names
+        self.built_at = built_at or time.time()
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    def _match(self, field: str, values: Values) -> np.ndarray:
+        if isinstance(values, str):
+            values = (values,)
+        names = self.names[field]
+        codes = [names.index(value) for value in values if value in names]
+        return np.isin(self.columns[field], codes)
+
+    def _between(self, field: str, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+        # Сравнение с NaT ложно, поэтому пользователи без даты в диапазон не попадают
+        column = self.columns[field]
+        mask = ~np.isnat(column)
+        if start is not None:
+            mask &= column >= _datetime64(start)
+        if end is not None:
+            mask &= column < _datetime64(end)
+        return mask
+
+    def mask(
+        self,
+        status: Optional[Values] = None,
+        language: Optional[Values] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        blocked_from: Optional[datetime] = None,
+        blocked_to: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Булева маска пользователей, подходящих под все фильтры.
+
+        Фильтры status и language принимают одно значение или несколько,
+        диапазоны дат включают начало и не включают конец.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if status is not None:
+            mask &= self._match("status", status)
+        if language is not None:
+            mask &= self._match("language", language)
+        if created_from is not None or created_to is not None:
+            mask &= self._between("created_at", created_from, created_to)
+        if blocked_from is not None or blocked_to is not None:
+            mask &= self._between("blocked_at", blocked_from, blocked_to)
+        return mask
+
+    def count(self, **filters: Any) -> int:
+        """Количество пользователей, подходящих под фильтры mask()."""
+        return int(np.count_nonzero(self.mask(**filters)))
+
+    def histogram(self, field: str, bucket: str = "day", **filters: Any) -> dict[str, int]:
+        """Распределение подходящих пользователей по значениям столбца.
+
+        Даты группируются по дням, месяцам или годам (bucket), пользователи
+        без даты не учитываются.
+        """
+        mask = self.mask(**filters)
+        if field in CATEGORY_FIELDS:
+            names = self.names[field]
+            counts = np.bincount(self.columns[field][mask], minlength=len(names))
+            return {name: int(count) for name, count in zip(names, counts) if count}
+        if field in DATE_FIELDS:
+            if bucket not in BUCKETS:
+                raise ValueError(f"Неизвестный интервал гистограммы: {bucket}")
+            values = self.columns[field][mask]
+            values = values[~np.isnat(values)].astype(f"datetime64[{BUCKETS[bucket]}]")
+            keys, counts = np.unique(values, return_counts=True)
+            return {str(key): int(count) for key, count in zip(keys, counts)}
+        raise ValueError(f"Неизвестный столбец гистограммы: {field}")
@@ -0,0 +1,115 @@
+"""
+Адаптивное управление параллелизмом рассылки (AIMD).
+
+Окно одновременных запросов растет аддитивно, пока задержка и ошибки
+в норме, и уменьшается мультипликативно при 429 и 5xx от Telegram.
+"""
+
+import asyncio
+from typing import Optional
+
+from app.models.config.env import BroadcastConfig
+from app.utils.logging import notifications as logger
+
+from .clock import monotonic
+from .metrics import metrics
+
+
+class AIMDController:
+    """Ограничитель одновременных отправок с адаптивным окном."""
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: float = 1.0,
+        cooldown: float = 1.0,
+        name: str = "default",
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self.name = name
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._publish()
+
+    @classmethod
+    def from_config(cls, config: BroadcastConfig, name: str = "default") -> "AIMDController":
+        """Создает контроллер из конфигурации рассылки."""
+        return cls(
+            initial=config.initial_concurrency,
+            min_limit=config.min_concurrency,
+            max_limit=config.max_concurrency,
+            increase=config.additive_increase,
+            decrease_factor=config.multiplicative_decrease,
+            latency_threshold=config.latency_threshold,
+            cooldown=config.decrease_cooldown,
+            name=name,
+        )
+
+    @property
+    def window(self) -> int:
+        """Текущее окно одновременных отправок."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Количество отправок в процессе выполнения."""
+        return self._in_flight
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _publish(self) -> None:
+        metrics.set("broadcast_concurrency_window", self.window, controller=self.name)
+
+    async def _notify(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    async def acquire(self) -> None:
+        """Ожидает свободное место в окне."""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.window)
+            self._in_flight += 1
+
+    async def release(self) -> None:
+        """Освобождает место в окне."""
+        self._in_flight = max(0, self._in_flight - 1)
+        await self._notify()
+
+    async def on_success(self, latency: float) -> None:
+        """Учитывает успешный запрос: при нормальной задержке окно растет."""
+        if latency > self.latency_threshold:
+            return
+        previous = self.window
+        # Рост примерно на increase за одно полное окно подтверждений
+        self._limit = min(self.max_limit, self._limit + self.increase / max(self._limit, 1.0))
+        if self.window != previous:
+            self._publish()
+            await self._notify()
+
+    async def on_overload(self) -> None:
+        """Учитывает перегрузку (429/5xx): окно сокращается мультипликативно."""
+        now = monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        previous = self.window
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        metrics.inc("broadcast_concurrency_decreases_total", controller=self.name)
+        self._publish()
+        logger.info(f"Окно параллелизма {self.name} сокращено: {previous} -> {self.window}")
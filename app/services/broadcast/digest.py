@@ -0,0 +1,134 @@
+"""
+Объединение уведомлений в дайджест.
+
+Когда администраторы запускают несколько рассылок подряд, каждый получатель
+получает отдельное сообщение на каждое уведомление, и каждое сообщение
+расходует бюджет частоты бота. В режиме дайджеста рассылки, запущенные
+в пределах окна, выполняются общим проходом по аудитории: тексты склеиваются
+в сообщения до лимита Telegram, а доставка сообщения засчитывается всем
+вошедшим в него уведомлениям.
+
+Окно дайджеста (DigestWindow) передает собранные рассылки на отправку
+отдельной задачей и сразу открывает следующее окно, поэтому дайджесты
+разных окон выполняются одновременно.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Final, Iterable, Optional, Sequence
+
+from app.utils.logging import notifications as logger
+
+# Рассылает уведомления окна и возвращает результаты в порядке notification_id
+DigestSender = Callable[[list[int]], Awaitable[Sequence[dict[str, Any]]]]
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT: Final[int] = 4096
+DIGEST_SEPARATOR: Final[str] = "\n\n"
+
+
+@dataclass(frozen=True, slots=True)
+class DigestPart:
+    """Сообщение дайджеста и уведомления, вошедшие в него."""
+
+    notification_ids: tuple[int, ...]
+    text: str
+
+
+def pack_digest(
+    items: Iterable[tuple[int, str]],
+    limit: int = MESSAGE_LIMIT,
+    separator: str = DIGEST_SEPARATOR,
+) -> list[DigestPart]:
+    """Раскладывает тексты (notification_id, text) по сообщениям не длиннее limit символов.
+
+    Порядок уведомлений сохраняется. Длина считается вместе с HTML-разметкой,
+    поэтому оценка консервативна. Текст длиннее лимита уходит отдельным
+    сообщением без изменений.
+    """
+    parts: list[DigestPart] = []
+    ids: list[int] = []
+    texts: list[str] = []
+    length = 0
+    for notification_id, text in items:
+        added = len(text) + (len(separator) if texts else 0)
+        if texts and length + added > limit:
+            parts.append(DigestPart(tuple(ids), separator.join(texts)))
+            ids, texts, length = [], [], 0
+            added = len(text)
+        ids.append(notification_id)
+        texts.append(text)
+        length += added
+    if texts:
+        parts.append(DigestPart(tuple(ids), separator.join(texts)))
+    return parts
+
+
+class DigestWindow:
+    """Окно дайджеста: собирает рассылки, запущенные в пределах окна.
+
+    Окно открывается первой рассылкой и закрывается через window секунд
+    или на max_items рассылках. Закрытое окно рассылается отдельной задачей,
+    вызывающий ждет только дайджест своего окна.
+    """
+
+    def __init__(self, sender: DigestSender, window: float, max_items: int) -> None:
+        self.window = window
+        self.max_items = max(1, max_items)
+        self._sender = sender
+        self._pending: list[tuple[int, asyncio.Future[dict[str, Any]]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closed = False
+
+    @property
+    def running(self) -> int:
+        """Количество дайджестов, рассылаемых в данный момент."""
+        return len(self._tasks)
+
+    async def submit(self, notification_id: int) -> dict[str, Any]:
+        """Добавляет рассылку в текущее окно и ожидает результат его дайджеста."""
+        if self._closed:
+            raise RuntimeError("Окно дайджеста закрыто")
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[dict[str, Any]] = loop.create_future()
+        self._pending.append((notification_id, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[int, asyncio.Future[dict[str, Any]]]]) -> None:
+        notification_ids = [notification_id for notification_id, _ in batch]
+        try:
+            results = await self._sender(notification_ids)
+            if len(results) != len(batch):
+                raise ValueError(f"Получено {len(results)} результатов для {len(batch)} рассылок")
+        except Exception as e:
+            logger.error(f"Ошибка рассылки дайджеста {notification_ids}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Рассылает открытое окно, дожидается всех дайджестов и перестает принимать новые."""
+        self._closed = True
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,77 @@
+"""
+Ограниченная по памяти сводка ошибок рассылки.
+
+Вместо списка всех неудачных отправок хранит счетчики по типам ошибок
+и резервуарную выборку примеров пользователей для каждого типа.
+"""
+
+import random
+from collections import Counter
+from typing import Optional
+
+from app.utils.custom_types import DictStrAny
+
+from .clock import monotonic
+
+# Максимальная длина сохраняемого текста ошибки
+MAX_ERROR_MESSAGE_LENGTH = 200
+
+
+class FailureAggregator:
+    """Сводка ошибок рассылки: счетчики и резервуарная выборка примеров."""
+
+    def __init__(
+        self,
+        sample_size: int = 10,
+        summary_interval: float = 30.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.sample_size = sample_size
+        self.summary_interval = summary_interval
+        self.counts: Counter[str] = Counter()
+        self.samples: dict[str, list[int]] = {}
+        self.messages: dict[str, str] = {}
+        self._rng = rng or random.Random()
+        self._last_summary = monotonic()
+
+    @property
+    def total(self) -> int:
+        """Общее количество ошибок."""
+        return sum(self.counts.values())
+
+    def add(self, user_id: int, error_type: str, message: Optional[str] = None) -> None:
+        """Учитывает неудачную отправку (алгоритм R для выборки примеров)."""
+        self.counts[error_type] += 1
+        seen = self.counts[error_type]
+        sample = self.samples.setdefault(error_type, [])
+        if len(sample) < self.sample_size:
+            sample.append(user_id)
+        else:
+            index = self._rng.randrange(seen)
+            if index < self.sample_size:
+                sample[index] = user_id
+        if message:
+            self.messages[error_type] = message[:MAX_ERROR_MESSAGE_LENGTH]
+
+    def summary_due(self) -> bool:
+        """Проверяет, пора ли выводить периодическую сводку."""
+        now = monotonic()
+        if now - self._last_summary < self.summary_interval:
+            return False
+        self._last_summary = now
+        return True
+
+    def summary(self) -> str:
+        """Возвращает сводку ошибок одной строкой."""
+        if not self.counts:
+            return "ошибок нет"
+        return ", ".join(f"{error_type}={count}" for error_type, count in self.counts.most_common())
+
+    def to_dict(self) -> DictStrAny:
+        """Компактное представление для хранения в уведомлении."""
+        return {
+            "total": self.total,
+            "counts": dict(self.counts),
+            "samples": {error_type: list(sample) for error_type, sample in self.samples.items()},
+            "messages": dict(self.messages),
+        }
@@ -0,0 +1,107 @@
+"""
+Справедливое разделение бюджета частоты между одновременными рассылками.
+
+Все рассылки через бота берут разрешения на запросы из одного
+ограничителя частоты. Без планировщика их доля зависит от числа
+ожидающих обработчиков, и небольшая срочная рассылка делит бюджет
+с кампанией на миллион получателей как придется. Планировщик
+выдает разрешения по алгоритму взвешенной справедливой очереди
+(self-clocked fair queuing): каждый поток получает долю бюджета,
+пропорциональную весу, а новая рассылка начинает получать разрешения
+сразу, не дожидаясь уже стоящих в очереди запросов кампании.
+
+Поток запроса берется из контекста задачи (current_flow), поэтому
+путь отправки до ограничителя не меняется. Запросы вне рассылок
+(отдельные отправки, очередь) составляют общий поток с весом 1.
+"""
+
+import asyncio
+import heapq
+import itertools
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .rate_limit import RateLimiter, TokenBucket
+
+
+@dataclass(eq=False)
+class Flow:
+    """Поток запросов одного запуска рассылки."""
+
+    name: str
+    weight: float = 1.0
+    # Собственный предел частоты потока, запросов в секунду, по всем ботам
+    max_rate: Optional[float] = None
+    limiter: Optional[TokenBucket] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.weight <= 0:
+            raise ValueError(f"Вес потока должен быть положительным: {self.weight}")
+        if self.max_rate is not None:
+            self.limiter = TokenBucket(rate=self.max_rate)
+
+
+# Поток, от имени которого задача выполняет запросы
+current_flow: ContextVar[Optional[Flow]] = ContextVar("broadcast_flow", default=None)
+
+DEFAULT_FLOW = Flow("default")
+
+
+class FairScheduler:
+    """Ограничитель частоты, разделяющий бюджет между потоками по весам."""
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+        self._queue: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        # Метка завершения последнего запроса потока
+        self._finish: dict[Flow, float] = {}
+        self._virtual_time = 0.0
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self) -> None:
+        """Ожидает очереди потока текущей задачи и разрешения ограничителя."""
+        flow = current_flow.get() or DEFAULT_FLOW
+        if flow.limiter is not None:
+            await flow.limiter.acquire()
+
+        tag = max(self._virtual_time, self._finish.get(flow, 0.0)) + 1.0 / flow.weight
+        self._finish[flow] = tag
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (tag, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        """Выдает разрешения ограничителя ожидающим в порядке меток."""
+        while self._queue:
+            error: Optional[Exception] = None
+            try:
+                await self.limiter.acquire()
+            except Exception as e:
+                error = e
+            future = self._pop()
+            if future is None:
+                # Все ожидающие отменены, разрешение пропадает
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+        # Очередь пуста: все потоки начинают заново с текущего виртуального времени
+        self._finish.clear()
+
+    def _pop(self) -> Optional[asyncio.Future[None]]:
+        """Снимает с очереди первого неотмененного ожидающего."""
+        while self._queue:
+            tag, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self._virtual_time = tag
+                return future
+        return None
@@ -0,0 +1,117 @@
+"""
+Защита задержки ответов бота во время рассылки.
+
+Ответы на /start и нажатия кнопок идут через тот же токен бота, что
+и рассылка, и расходуют тот же лимит Telegram. Поэтому профили рассылки
+оставляют часть лимита на ответы (interactive_reserve), а процесс бота
+измеряет задержку ответов: время от отправки сообщения пользователем
+до начала обработки плюс время обработчика. Выключатель нагрузки
+(InteractiveGuard) читает p95 этой задержки и, пока он выше порога,
+мультипликативно снижает темп рассылки, а затем аддитивно возвращает его.
+"""
+
+import math
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from app.utils.logging import notifications as logger
+
+from .clock import monotonic
+from .metrics import metrics
+from .rate_limit import RateLimiter, TokenBucket
+
+# Источник p95 задержки ответов бота (с), None — измерений нет
+LatencySource = Callable[[], Awaitable[Optional[float]]]
+
+
+class LatencyWindow:
+    """Задержки за последние window секунд."""
+
+    def __init__(self, window: float = 60.0, max_samples: int = 10000) -> None:
+        self.window = window
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def _trim(self, now: float) -> None:
+        while self._samples and self._samples[0][0] <= now - self.window:
+            self._samples.popleft()
+
+    def add(self, value: float, now: Optional[float] = None) -> None:
+        """Добавляет измерение."""
+        now = monotonic() if now is None else now
+        self._trim(now)
+        self._samples.append((now, value))
+
+    def percentile(self, q: float, now: Optional[float] = None) -> Optional[float]:
+        """Перцентиль задержек окна (q от 0 до 1) или None, если измерений нет."""
+        self._trim(monotonic() if now is None else now)
+        if not self._samples:
+            return None
+        values = sorted(value for _, value in self._samples)
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+class InteractiveGuard:
+    """Ограничитель, замедляющий рассылку, пока ответы бота пользователям запаздывают."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        rate: float,
+        source: LatencySource,
+        threshold: float = 2.0,
+        min_share: float = 0.2,
+        decrease: float = 0.5,
+        increase: float = 0.1,
+        refresh_interval: float = 1.0,
+        name: str = "",
+    ) -> None:
+        self.limiter = limiter
+        self.rate = rate
+        self.source = source
+        self.threshold = threshold
+        self.min_share = min_share
+        self.decrease = decrease
+        self.increase = increase
+        self.refresh_interval = refresh_interval
+        self.name = name
+        # Доля лимита профиля, доступная рассылке
+        self.share = 1.0
+        self.p95: Optional[float] = None
+        self._pacer = TokenBucket(rate=rate, capacity=1.0)
+        self._refreshed_at = -math.inf
+
+    async def acquire(self) -> None:
+        """Выдает разрешение ограничителя в темпе, допустимом при текущей задержке ответов."""
+        await self.limiter.acquire()
+        await self._refresh()
+        if self.share < 1.0:
+            await self._pacer.acquire()
+
+    async def _refresh(self) -> None:
+        now = monotonic()
+        if now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        try:
+            self.p95 = await self.source()
+        except Exception as e:
+            logger.warning(f"Не удалось получить задержку ответов бота для {self.name}: {e}")
+            self.p95 = None
+
+        previous = self.share
+        if self.p95 is not None and self.p95 > self.threshold:
+            self.share = max(self.min_share, self.share * self.decrease)
+        else:
+            self.share = min(1.0, self.share + self.increase)
+        if self.share == previous:
+            return
+        self._pacer.rate = self.rate * self.share
+        metrics.set("broadcast_interactive_share", self.share, shard=self.name)
+        if self.share < previous:
+            logger.info(
+                f"Рассылка {self.name} замедлена до {self.share:.0%}: "
+                f"p95 задержки ответов бота {self.p95:.2f}с"
+            )
@@ -0,0 +1,92 @@
+"""
+Журнал доставки уведомлений.
+
+Результаты отправки копятся в памяти и записываются в базу пачками,
+чтобы не выполнять отдельный запрос на каждое сообщение.
+"""
+
+import asyncio
+from enum import IntEnum
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from app.utils.logging import notifications as logger
+
+Row = TypeVar("Row")
+DeliveryRow = tuple[int, int, Optional[int]]
+DeliveryWriter = Callable[[int, list[DeliveryRow]], Awaitable[None]]
+
+
+class DeliveryStatus(IntEnum):
+    """Компактные коды результата доставки."""
+    SENT = 1
+    RETRYABLE = 2
+    FAILED = 3
+    DELETED = 4
+
+
+class RowBuffer(Generic[Row]):
+    """Буфер строк уведомления с пакетной записью в фоне."""
+
+    # Название буфера в сообщениях об ошибках записи
+    description = "буфера"
+
+    def __init__(
+        self,
+        notification_id: int,
+        writer: Callable[[int, list[Row]], Awaitable[None]],
+        batch_size: int = 500,
+        description: Optional[str] = None,
+    ) -> None:
+        self.notification_id = notification_id
+        if description is not None:
+            self.description = description
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.flushes = 0
+        self._writer = writer
+        self._buffer: list[Row] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def push(self, row: Row) -> None:
+        """Добавляет строку и при заполнении пачки запускает запись."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        rows, self._buffer = self._buffer, []
+        task = asyncio.create_task(self._write(rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, rows: list[Row]) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                await self._writer(self.notification_id, rows)
+                self.written += len(rows)
+                self.flushes += 1
+            except Exception as e:
+                logger.error(
+                    f"Ошибка записи {self.description} уведомления {self.notification_id} "
+                    f"({len(rows)} записей): {e}"
+                )
+
+    async def close(self) -> None:
+        """Записывает остаток буфера и дожидается всех записей."""
+        if self._buffer:
+            self._schedule_flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+class DeliveryLedger(RowBuffer[DeliveryRow]):
+    """Буфер результатов доставки с пакетной записью."""
+
+    description = "журнала доставки"
+
+    def add(self, user_id: int, status: DeliveryStatus, message_id: Optional[int] = None) -> None:
+        """Добавляет результат доставки и при заполнении пачки запускает запись."""
+        self.push((user_id, int(status), message_id))
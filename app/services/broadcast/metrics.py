@@ -0,0 +1,46 @@
+"""
+Метрики движка массовой рассылки.
+
+Простой реестр счетчиков и датчиков в памяти процесса,
+отдаваемый через API уведомлений.
+"""
+
+from typing import Any, Final
+
+
+class MetricsRegistry:
+    """Реестр метрик в памяти процесса."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, Any]) -> str:
+        if not labels:
+            return name
+        packed = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+        return f"{name}{{{packed}}}"
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """Устанавливает значение датчика."""
+        self._values[self._key(name, labels)] = float(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Увеличивает значение счетчика."""
+        key = self._key(name, labels)
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def get(self, name: str, **labels: Any) -> float:
+        """Возвращает текущее значение метрики."""
+        return self._values.get(self._key(name, labels), 0.0)
+
+    def snapshot(self) -> dict[str, float]:
+        """Возвращает копию всех метрик."""
+        return dict(sorted(self._values.items()))
+
+    def clear(self) -> None:
+        """Сбрасывает все метрики."""
+        self._values.clear()
+
+
+metrics: Final[MetricsRegistry] = MetricsRegistry()
@@ -0,0 +1,97 @@
+"""
+Проверка HTML-разметки уведомления перед рассылкой.
+
+Telegram разбирает разметку сообщения при каждой отправке, и ошибка
+в тексте (незакрытый или неподдерживаемый тег, неэкранированный символ <)
+дает ответ 400 для каждого получателя. Текст проверяется один раз
+до построения снимка аудитории по правилам разбора HTML в Bot API:
+поддерживаемые теги и атрибуты, вложенность, именованные сущности
+и длина текста после разбора.
+"""
+
+from html.parser import HTMLParser
+from typing import Final, Optional
+
+from .digest import MESSAGE_LIMIT
+
+# Теги HTML-разметки Bot API и их обязательные атрибуты
+ALLOWED_TAGS: Final[dict[str, tuple[str, ...]]] = {
+    "b": (),
+    "strong": (),
+    "i": (),
+    "em": (),
+    "u": (),
+    "ins": (),
+    "s": (),
+    "strike": (),
+    "del": (),
+    "span": ("class",),
+    "tg-spoiler": (),
+    "a": ("href",),
+    "tg-emoji": ("emoji-id",),
+    "code": (),
+    "pre": (),
+    "blockquote": (),
+}
+
+# Именованные сущности, которые понимает Bot API
+ALLOWED_ENTITIES: Final[frozenset[str]] = frozenset({"lt", "gt", "amp", "quot"})
+
+
+class _TelegramHTMLParser(HTMLParser):
+    """Разбор текста с учетом ограничений HTML-разметки Bot API."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.stack: list[str] = []
+        self.errors: list[str] = []
+        # Длина текста после разбора в кодовых единицах UTF-16, как ее считает Telegram
+        self.length = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        required = ALLOWED_TAGS.get(tag)
+        if required is None:
+            self.errors.append(f"неподдерживаемый тег <{tag}>")
+        else:
+            values = dict(attrs)
+            for name in required:
+                if not values.get(name):
+                    self.errors.append(f"у тега <{tag}> нет атрибута {name}")
+        self.stack.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        self.errors.append(f"неподдерживаемый тег <{tag}/>")
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self.stack or self.stack[-1] != tag:
+            expected = f", ожидался </{self.stack[-1]}>" if self.stack else ""
+            self.errors.append(f"лишний закрывающий тег </{tag}>{expected}")
+            return
+        self.stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        if "<" in data:
+            self.errors.append("символ < вне тега, его нужно заменить на &lt;")
+        self.length += len(data.encode("utf-16-le")) // 2
+
+    def handle_entityref(self, name: str) -> None:
+        if name not in ALLOWED_ENTITIES:
+            self.errors.append(f"неподдерживаемая сущность &{name};")
+        self.length += 1
+
+    def handle_charref(self, name: str) -> None:
+        self.length += 1
+
+
+def validate_html(text: str) -> list[str]:
+    """Возвращает ошибки разметки текста, которые Telegram отклонит; пустой список — текст корректен."""
+    parser = _TelegramHTMLParser()
+    parser.feed(text)
+    parser.close()
+    errors = parser.errors
+    errors.extend(f"незакрытый тег <{tag}>" for tag in reversed(parser.stack))
+    if not text.strip():
+        errors.append("пустой текст")
+    elif parser.length > MESSAGE_LIMIT:
+        errors.append(f"текст длиннее {MESSAGE_LIMIT} символов: {parser.length}")
+    return errors
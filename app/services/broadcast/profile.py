@@ -0,0 +1,55 @@
+"""
+Профили нагрузки массовой рассылки.
+
+Обычная рассылка ограничена примерно 30 сообщениями в секунду на бота,
+платная (allow_paid_broadcast) — примерно 1000 сообщениями в секунду.
+Часть лимита (interactive_reserve от обычного) в обоих профилях остается
+ответам бота пользователям.
+"""
+
+from dataclasses import dataclass
+
+from app.models.config.env import BroadcastConfig
+
+
+@dataclass(frozen=True, kw_only=True)
+class RateProfile:
+    """Параметры движка рассылки для тарифа Telegram."""
+
+    name: str
+    rate_limit: float
+    initial_concurrency: int
+    max_concurrency: int
+    connection_limit: int
+    ledger_batch_size: int
+    allow_paid_broadcast: bool = False
+
+    @staticmethod
+    def reserved_rate(config: BroadcastConfig) -> float:
+        """Сообщений в секунду, оставляемых ответам бота пользователям."""
+        return config.rate_limit * config.interactive_reserve
+
+    @classmethod
+    def standard(cls, config: BroadcastConfig) -> "RateProfile":
+        """Профиль обычной рассылки."""
+        return cls(
+            name="standard",
+            rate_limit=config.rate_limit - cls.reserved_rate(config),
+            initial_concurrency=config.initial_concurrency,
+            max_concurrency=config.max_concurrency,
+            connection_limit=config.connection_limit,
+            ledger_batch_size=config.ledger_batch_size,
+        )
+
+    @classmethod
+    def paid(cls, config: BroadcastConfig) -> "RateProfile":
+        """Профиль платной рассылки с повышенным лимитом."""
+        return cls(
+            name="paid",
+            rate_limit=config.paid_rate_limit - cls.reserved_rate(config),
+            initial_concurrency=config.paid_initial_concurrency,
+            max_concurrency=config.paid_max_concurrency,
+            connection_limit=config.paid_connection_limit,
+            ledger_batch_size=config.paid_ledger_batch_size,
+            allow_paid_broadcast=True,
+        )
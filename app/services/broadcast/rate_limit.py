@@ -0,0 +1,122 @@
+"""
+Ограничение частоты запросов к Telegram Bot API.
+
+Каждый токен бота имеет собственный лимит массовой рассылки,
+поэтому ограничитель создается отдельно для каждого бота.
+Отдельно ограничивается частота сообщений в один чат.
+"""
+
+import asyncio
+from typing import Optional, Protocol
+
+from app.models.config.env import BroadcastConfig
+
+from .clock import monotonic
+from .metrics import metrics
+
+
+class RateLimiter(Protocol):
+    """Ограничитель частоты, из которого шард берет разрешения на запросы."""
+
+    async def acquire(self) -> None: ...
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Ожидает, пока в ведре появится нужное количество токенов."""
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# Классы частоты по типу чата: ID личных чатов положительные, групп и каналов отрицательные
+PRIVATE_CHAT = "private"
+GROUP_CHAT = "group"
+
+
+class ChatRateLimiter:
+    """Ограничитель частоты сообщений в отдельный чат.
+
+    Кроме общего лимита бота Telegram допускает около одного сообщения
+    в секунду в личный чат и 20 сообщений в минуту в группу. Состояние
+    чата — одно число: время, до которого израсходован его бюджет (GCRA).
+    Чаты, бюджет которых восстановился, вытесняются, так что словарь
+    хранит только недавно получавшие сообщения чаты в порядке последней
+    отправки и не больше max_chats записей. Ждет только отправка в горячий
+    чат, общий лимит бота и другие чаты это ожидание не задерживает.
+    """
+
+    def __init__(
+        self,
+        private_interval: float = 1.0,
+        group_interval: float = 3.0,
+        burst: int = 3,
+        max_chats: int = 100000,
+    ) -> None:
+        self.intervals = {PRIVATE_CHAT: private_interval, GROUP_CHAT: group_interval}
+        self.burst = burst
+        self.max_chats = max_chats
+        self._tat: dict[int, float] = {}
+
+    @classmethod
+    def from_config(cls, config: BroadcastConfig) -> "ChatRateLimiter":
+        return cls(
+            private_interval=config.chat_private_interval,
+            group_interval=config.chat_group_interval,
+            burst=config.chat_burst,
+            max_chats=config.chat_max_tracked,
+        )
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    @staticmethod
+    def chat_type(chat_id: int) -> str:
+        return PRIVATE_CHAT if chat_id > 0 else GROUP_CHAT
+
+    def _evict(self, now: float) -> None:
+        # Первыми в словаре идут чаты, в которые дольше всего не отправляли
+        while self._tat:
+            chat_id = next(iter(self._tat))
+            if self._tat[chat_id] > now and len(self._tat) < self.max_chats:
+                return
+            del self._tat[chat_id]
+
+    def reserve(self, chat_id: int) -> float:
+        """Резервирует отправку в чат и возвращает, сколько секунд нужно ждать."""
+        now = monotonic()
+        self._evict(now)
+        interval = self.intervals[self.chat_type(chat_id)]
+        tat = max(self._tat.pop(chat_id, now), now)
+        self._tat[chat_id] = tat + interval
+        return max(0.0, tat - (self.burst - 1) * interval - now)
+
+    async def acquire(self, chat_id: int) -> None:
+        """Ожидает очереди отправки в чат."""
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            metrics.inc("chat_rate_delayed_total", chat_type=self.chat_type(chat_id))
+            await asyncio.sleep(delay)
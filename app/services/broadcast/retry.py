@@ -0,0 +1,88 @@
+"""
+Общий бюджет повторов запросов к Telegram.
+
+Повторы временных ошибок выполняет только движок рассылки: они проходят
+через ограничитель частоты, выключатель и очередь недоставленных. Чтобы
+во время сбоя Telegram повторы не умножали нагрузку, их число за скользящее
+окно ограничено долей ratio от первых попыток за то же окно плюс небольшим
+запасом min_per_second на случай малого трафика. Получатели, которым
+бюджет отказал в повторе, сразу попадают в очередь недоставленных.
+
+Усиление нагрузки повторами (все запросы / первые попытки за окно)
+публикуется в метрике broadcast_retry_amplification.
+"""
+
+import math
+from collections import deque
+
+from .clock import monotonic
+from .metrics import metrics
+
+
+class RetryBudget:
+    """Доля повторов от первых попыток за скользящее окно."""
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_second: float = 1.0,
+        window: float = 60.0,
+        name: str = "telegram",
+    ) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self.name = name
+        # [начало секунды, первых попыток, разрешенных повторов]
+        self._buckets: deque[list[float]] = deque()
+        self._first = 0.0
+        self._retries = 0.0
+        # Разрешенные, но еще не выполненные повторы: очередные запросы считаются ими
+        self._pending = 0.0
+
+    def _bucket(self) -> list[float]:
+        now = monotonic()
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            _, first, retries = self._buckets.popleft()
+            self._first -= first
+            self._retries -= retries
+        # Повторы, так и не выполненные за окно (отмена рассылки), не копятся
+        self._pending = min(self._pending, self._retries)
+        second = math.floor(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0.0, 0.0])
+        return self._buckets[-1]
+
+    @property
+    def amplification(self) -> float:
+        """Запросов на одну первую попытку за окно."""
+        return (self._first + self._retries) / self._first if self._first else 1.0
+
+    @property
+    def available(self) -> int:
+        """Сколько повторов бюджет разрешит сейчас."""
+        self._bucket()
+        allowed = self.min_per_second * self.window + self.ratio * self._first
+        return max(0, math.floor(allowed - self._retries))
+
+    def record_request(self, count: int = 1) -> None:
+        """Учитывает запросы к Telegram; сверх разрешенных повторов они считаются первыми попытками."""
+        bucket = self._bucket()
+        retries = min(count, self._pending)
+        self._pending -= retries
+        bucket[1] += count - retries
+        self._first += count - retries
+        metrics.inc("broadcast_requests_total", count, budget=self.name)
+        metrics.set("broadcast_retry_amplification", self.amplification, budget=self.name)
+
+    def try_retry(self, count: int = 1) -> int:
+        """Резервирует до count повторов и возвращает, сколько разрешено."""
+        allowed = min(count, self.available)
+        if allowed:
+            self._bucket()[2] += allowed
+            self._retries += allowed
+            self._pending += allowed
+            metrics.inc("broadcast_retries_total", allowed, budget=self.name)
+        if allowed < count:
+            metrics.inc("broadcast_retries_denied_total", count - allowed, budget=self.name)
+        return allowed
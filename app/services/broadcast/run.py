@@ -0,0 +1,90 @@
+"""
+Состояние одного запуска массовой операции.
+
+Запуск описывает рассылку, массовое редактирование или массовое удаление
+уведомления: хранит счетчики прогресса и флаг отмены, который проверяют
+обработчики перед каждым запросом к Telegram.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .clock import monotonic
+from .fair import Flow
+from .failures import FailureAggregator
+from .ledger import DeliveryLedger, RowBuffer
+from .profile import RateProfile
+from .snapshot import AudienceSnapshot
+
+
+@dataclass(kw_only=True)
+class BroadcastRun:
+    """Параметры и счетчики одного запуска рассылки."""
+
+    notification_id: int
+    message: str
+    profile: RateProfile
+    failures: FailureAggregator
+    ledger: DeliveryLedger
+    bot_stats: dict[int, dict[str, int]] = field(default_factory=dict)
+    operation: str = "send"
+    total: int = 0
+    started_at: float = field(default_factory=monotonic)
+    cancelled: bool = False
+    # Причина остановки запуска после пробной отправки
+    aborted: Optional[str] = None
+    snapshot: Optional[AudienceSnapshot] = None
+    # Временные ошибки доставки для очереди недоставленных: (user_id, bot_id, error_type, message)
+    dead_letters: Optional[RowBuffer[tuple[int, Optional[int], str, Optional[str]]]] = None
+    # Получатели, записи которых можно убрать из очереди недоставленных
+    resolved: Optional[RowBuffer[int]] = None
+    # Журналы уведомлений, объединенных в дайджест с уведомлением запуска
+    credits: list[DeliveryLedger] = field(default_factory=list)
+    # Очереди недоставленных этих уведомлений: повторная отправка идет их текстом
+    credit_dead_letters: list[RowBuffer[tuple[int, Optional[int], str, Optional[str]]]] = field(
+        default_factory=list
+    )
+    # Доля запуска в бюджете частоты ботов при одновременных рассылках
+    flow: Flow = field(default_factory=lambda: Flow("run"))
+
+    @property
+    def sent(self) -> int:
+        return sum(stats["sent"] for stats in self.bot_stats.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(stats["failed"] for stats in self.bot_stats.values())
+
+    def record(self, bot_id: int, success: bool) -> None:
+        """Учитывает результат отправки в счетчиках бота."""
+        stats = self.bot_stats.setdefault(bot_id, {"sent": 0, "failed": 0})
+        stats["sent" if success else "failed"] += 1
+
+    async def close(self) -> None:
+        """Дописывает все буферы запуска."""
+        for buffer in (
+            self.ledger, self.dead_letters, self.resolved, *self.credits, *self.credit_dead_letters
+        ):
+            if buffer is not None:
+                await buffer.close()
+
+    def cancel(self) -> None:
+        """Останавливает запуск: обработчики не берут новых получателей."""
+        self.cancelled = True
+
+    def progress(self, now: Optional[float] = None) -> dict[str, Any]:
+        """Текущий прогресс запуска."""
+        elapsed = (now or monotonic()) - self.started_at
+        done = self.sent + self.failed
+        return {
+            "notification_id": self.notification_id,
+            "operation": self.operation,
+            "profile": self.profile.name,
+            "total": self.total,
+            "done": done,
+            "sent": self.sent,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "elapsed": round(elapsed, 3),
+            "rate": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,140 @@
+"""
+Шард рассылки: бот со своим бюджетом запросов.
+
+Лимиты Telegram действуют на токен бота, поэтому у каждого бота
+собственное окно параллелизма и собственный ограничитель частоты.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from app.models.config.env import BroadcastConfig
+
+from .breaker import CircuitBreaker
+from .concurrency import AIMDController
+from .fair import FairScheduler
+from .interactive import InteractiveGuard, LatencySource
+from .metrics import metrics
+from .profile import RateProfile
+from .rate_limit import RateLimiter, TokenBucket
+
+
+# Разрешение ограничителя, полученное обработчиком рассылки заранее (BotShard.prepay)
+_prepaid: ContextVar[bool] = ContextVar("broadcast_prepaid", default=False)
+
+
+def clone_bot(bot: Bot, connection_limit: int) -> Bot:
+    """Создает копию бота с собственным пулом соединений заданного размера."""
+    session = AiohttpSession(
+        api=bot.session.api,
+        limit=connection_limit,
+        json_loads=bot.session.json_loads,
+        json_dumps=bot.session.json_dumps,
+    )
+    for middleware in bot.session.middleware:
+        session.middleware(middleware)
+    return Bot(token=bot.token, session=session, default=bot.default)
+
+
+@dataclass(kw_only=True)
+class BotShard:
+    """Бот и его бюджет запросов для массовой рассылки."""
+
+    bot: Bot
+    concurrency: AIMDController
+    limiter: RateLimiter
+    breaker: CircuitBreaker
+    profile: Optional[RateProfile] = None
+    # Замедление рассылки, пока ответы бота пользователям запаздывают
+    guard: Optional[InteractiveGuard] = None
+    # Очередь к ограничителю частоты, делящая бюджет между одновременными рассылками
+    scheduler: Optional[FairScheduler] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        bot: Bot,
+        config: BroadcastConfig,
+        profile: Optional[RateProfile] = None,
+        limiter: Optional[RateLimiter] = None,
+        latency: Optional[LatencySource] = None,
+    ) -> "BotShard":
+        """Создает шард с настройками из конфигурации и профиля рассылки.
+        
+        Без внешнего ограничителя частоты лимит профиля соблюдается только в этом процессе.
+        С источником задержки ответов бота (latency) рассылка замедляется, пока
+        ответы запаздывают. С fair_queuing ограничитель делится между
+        одновременными рассылками по весам.
+        """
+        profile = profile or RateProfile.standard(config)
+        name = f"bot-{bot.id}-{profile.name}"
+        limiter = limiter or TokenBucket(rate=profile.rate_limit)
+        guard = None
+        if latency is not None and config.interactive_guard:
+            guard = InteractiveGuard(
+                limiter,
+                rate=profile.rate_limit,
+                source=latency,
+                threshold=config.interactive_p95_threshold,
+                min_share=config.interactive_min_share,
+                decrease=config.multiplicative_decrease,
+                increase=config.interactive_recovery,
+                refresh_interval=config.interactive_refresh_interval,
+                name=name,
+            )
+        return cls(
+            bot=bot,
+            concurrency=AIMDController(
+                initial=profile.initial_concurrency,
+                min_limit=config.min_concurrency,
+                max_limit=profile.max_concurrency,
+                increase=config.additive_increase,
+                decrease_factor=config.multiplicative_decrease,
+                latency_threshold=config.latency_threshold,
+                cooldown=config.decrease_cooldown,
+                name=name,
+            ),
+            limiter=limiter,
+            guard=guard,
+            scheduler=FairScheduler(guard or limiter) if config.fair_queuing else None,
+            breaker=CircuitBreaker.from_config(config, name=name),
+            profile=profile,
+        )
+
+    @property
+    def bot_id(self) -> int:
+        return self.bot.id
+
+    @property
+    def _permits(self) -> RateLimiter:
+        return self.scheduler or self.guard or self.limiter
+
+    async def acquire(self) -> None:
+        """Ожидает разрешения на запрос к Telegram в очереди потока текущей задачи.
+
+        Разрешение, полученное задачей заранее, расходуется без ожидания.
+        """
+        if _prepaid.get():
+            _prepaid.set(False)
+            return
+        await self._permits.acquire()
+
+    async def prepay(self) -> None:
+        """Получает разрешение на следующий запрос задачи до ожидания окна параллелизма.
+
+        Тогда окно занимают запросы в порядке справедливой очереди, а не
+        обработчики крупной рассылки, пришедшие к окну первыми.
+        """
+        await self._permits.acquire()
+        _prepaid.set(True)
+
+    def record(self, success: bool) -> None:
+        """Учитывает результат отправки в метриках бота."""
+        if success:
+            metrics.inc("broadcast_sent_total", bot=self.bot_id)
+        else:
+            metrics.inc("broadcast_failed_total", bot=self.bot_id)
@@ -0,0 +1,99 @@
+"""
+Транспорт и счетчики пробного запуска рассылки.
+
+Пробный запуск проходит весь путь рассылки (снимок аудитории, шарды,
+ограничители частоты, окно параллелизма, повторы, журнал доставки),
+но запросы к Telegram выполняет симулированный бот с заданной задержкой
+и долей ошибок, а записи в базу только подсчитываются.
+"""
+
+import asyncio
+import random
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Callable, Final, Mapping, Optional
+
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import SendMessage
+
+from .shard import BotShard
+
+# Ошибки, которые может вернуть симулированный бот, по типам классификатора ошибок сервиса
+SIMULATED_ERRORS: Final[dict[str, Callable[[SendMessage], TelegramAPIError]]] = {
+    "user_blocked": lambda method: TelegramForbiddenError(method, "Forbidden: bot was blocked by the user"),
+    "chat_not_found": lambda method: TelegramBadRequest(method, "Bad Request: chat not found"),
+    "user_deactivated": lambda method: TelegramForbiddenError(method, "Forbidden: user is deactivated"),
+    "rate_limit": lambda method: TelegramRetryAfter(method, "Too Many Requests", retry_after=1),
+    "server_error": lambda method: TelegramServerError(method, "Internal Server Error"),
+}
+
+
+class SimulatedBot:
+    """Бот, который отвечает как Telegram, ничего не отправляя."""
+
+    def __init__(
+        self,
+        bot_id: int,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rates: Optional[Mapping[str, float]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        unknown = set(error_rates or {}) - set(SIMULATED_ERRORS)
+        if unknown:
+            raise ValueError(f"Неизвестные типы ошибок симуляции: {sorted(unknown)}")
+        self.id = bot_id
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates or {})
+        self.requests = 0
+        self.errors: Counter[str] = Counter()
+        self._rng = rng or random.Random()
+        self._message_id = 0
+
+    def _roll(self) -> Optional[str]:
+        value = self._rng.random()
+        for error_type, rate in self.error_rates.items():
+            if value < rate:
+                return error_type
+            value -= rate
+        return None
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> SimpleNamespace:
+        """Ждет задержку сети и возвращает сообщение или ошибку с заданной вероятностью."""
+        self.requests += 1
+        await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        error_type = self._roll()
+        if error_type is not None:
+            self.errors[error_type] += 1
+            raise SIMULATED_ERRORS[error_type](SendMessage(chat_id=chat_id, text=text))
+        self._message_id += 1
+        return SimpleNamespace(message_id=self._message_id)
+
+
+class SimulatedShard(BotShard):
+    """Шард пробного запуска: результаты не попадают в счетчики рассылки."""
+
+    def record(self, success: bool) -> None:
+        pass
+
+
+class DbLoad:
+    """Запросы к базе, которые выполнил бы запуск, по таблицам."""
+
+    def __init__(self) -> None:
+        self.queries: Counter[str] = Counter()
+        self.rows: Counter[str] = Counter()
+
+    def add(self, table: str, rows: int, queries: int = 1) -> None:
+        self.queries[table] += queries
+        self.rows[table] += rows
+
+    def to_dict(self) -> dict[str, dict[str, int]]:
+        return {table: {"queries": self.queries[table], "rows": self.rows[table]} for table in self.queries}
@@ -0,0 +1,188 @@
+"""
+Отправка шагов цепочек сообщений (drip-кампаний).
+
+Пользователи записываются в активные кампании при создании
+(UserService.create), одна строка на запись хранит позицию следующего шага
+и время его отправки. Воркер забирает пачку наступивших шагов по частичному
+индексу времени отправки, группирует записи по шагу и отправляет уведомление
+шага через движок рассылки: с общим лимитом частоты ботов, паузами по чатам,
+выключателем и журналом доставки. Результаты пачки записываются одной
+транзакцией, поэтому число запросов к Postgres зависит от числа пачек,
+а не от числа записей в кампаниях.
+"""
+
+import asyncio
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.config.env import BroadcastConfig
+from app.models.sql.campaign import EnrollmentStatus
+from app.services.broadcast import DeliveryStatus, metrics, validate_html
+from app.services.notification_service import NotificationService, UserStatus
+from app.services.postgres.context import SQLSessionContext
+from app.utils.logging import notifications as logger
+
+# Шаг кампании: (позиция, задержка от записи в кампанию в секундах, notification_id)
+Step = Tuple[int, int, int]
+
+
+class CampaignService:
+    """Воркер, отправляющий наступившие шаги кампаний."""
+
+    def __init__(
+        self,
+        notifications: NotificationService,
+        session_pool: async_sessionmaker[AsyncSession],
+        config: Optional[BroadcastConfig] = None,
+    ) -> None:
+        self.notifications = notifications
+        self.session_pool = session_pool
+        self.config = config or notifications.config
+        self._stopped = asyncio.Event()
+
+    def stop(self) -> None:
+        """Прекращает выборку шагов; отправляемая пачка завершается."""
+        self._stopped.set()
+
+    async def run(self) -> None:
+        """Отправляет наступившие шаги, пока воркер не остановлен.
+
+        Пока шаги наступают быстрее, чем отправляются, пачки выбираются
+        без пауз; при неполной пачке воркер ждет campaign_poll_interval.
+        """
+        logger.info("Воркер кампаний запущен")
+        while not self._stopped.is_set():
+            try:
+                claimed = (await self.dispatch_due())["claimed"]
+            except Exception as e:
+                logger.error(f"Ошибка отправки шагов кампаний: {e}")
+                claimed = 0
+            if claimed < self.config.campaign_batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._stopped.wait(), timeout=self.config.campaign_poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Воркер кампаний остановлен")
+
+    async def dispatch_due(self) -> Dict[str, int]:
+        """Отправляет одну пачку наступивших шагов и записывает следующие шаги.
+
+        Возвращает число выбранных записей (claimed) и результаты: sent,
+        retried, completed, stopped.
+        """
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            due = await repository.campaigns.claim_due(
+                self.config.campaign_batch_size, self.config.campaign_lease
+            )
+            if not due:
+                return {"claimed": 0}
+            steps = await repository.campaigns.get_steps()
+            rows = await repository.campaigns.get_users([row[1] for row in due])
+            users = {row[0]: row for row in rows}
+
+        advanced: List[Tuple[int, int, int, int]] = []
+        retried: List[Tuple[int, int]] = []
+        finished: List[Tuple[int, int, int]] = []
+        # Записи одного шага: (campaign_id, индекс шага) -> {user_id: (bot_id, попытка)}
+        groups: Dict[Tuple[int, int], Dict[int, Tuple[Optional[int], int]]] = {}
+        for campaign_id, user_id, position, attempt in due:
+            campaign_steps = steps.get(campaign_id)
+            user = users.get(user_id)
+            if (
+                campaign_steps is None
+                or user is None
+                or user[2] != UserStatus.ACTIVE.value
+                or user[3] is not None
+            ):
+                # Кампания выключена, пользователь удален или недоступен
+                finished.append((campaign_id, user_id, EnrollmentStatus.STOPPED))
+                continue
+            # Удаленный шаг пропускается: запись переходит к следующей позиции
+            index = bisect_left(campaign_steps, position, key=lambda step: step[0])
+            if index == len(campaign_steps):
+                finished.append((campaign_id, user_id, EnrollmentStatus.COMPLETED))
+                continue
+            groups.setdefault((campaign_id, index), {})[user_id] = (user[1], attempt)
+
+        sent = await asyncio.gather(*(
+            self._send_step(
+                campaign_id, steps[campaign_id], index, recipients, advanced, retried, finished
+            )
+            for (campaign_id, index), recipients in groups.items()
+        ))
+        completed = sum(1 for _, _, status in finished if status == EnrollmentStatus.COMPLETED)
+        counts = {
+            "claimed": len(due),
+            "sent": sum(sent),
+            "retried": len(retried),
+            "completed": completed,
+            "stopped": len(finished) - completed,
+        }
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            await repository.campaigns.save_results(
+                advanced, retried, finished, self.config.campaign_retry_delay
+            )
+        for result in ("sent", "retried", "completed", "stopped"):
+            if counts[result]:
+                metrics.inc("campaign_steps_total", counts[result], result=result)
+        logger.debug(f"Шаги кампаний: {counts}")
+        return counts
+
+    async def _send_step(
+        self,
+        campaign_id: int,
+        steps: List[Step],
+        index: int,
+        recipients: Dict[int, Tuple[Optional[int], int]],
+        advanced: List[Tuple[int, int, int, int]],
+        retried: List[Tuple[int, int]],
+        finished: List[Tuple[int, int, int]],
+    ) -> int:
+        """Отправляет уведомление шага записям и раскладывает их по результатам.
+
+        Возвращает число доставленных сообщений.
+        """
+        _, _, notification_id = steps[index]
+        payload = await self.notifications.get_payload(notification_id)
+        if payload is None:
+            logger.error(
+                f"Уведомление {notification_id} шага кампании {campaign_id} не найдено"
+            )
+            finished.extend(
+                (campaign_id, user_id, EnrollmentStatus.STOPPED) for user_id in recipients
+            )
+            return 0
+        if self.config.preflight_enabled:
+            errors = validate_html(payload.text)
+            if errors:
+                # Ошибку в тексте исправят, записи не теряются, а ждут повтора
+                logger.error(
+                    f"Шаг кампании {campaign_id} отложен: "
+                    f"ошибка разметки уведомления {notification_id}: {'; '.join(errors)}"
+                )
+                retried.extend((campaign_id, user_id) for user_id in recipients)
+                return 0
+
+        statuses = await self.notifications.send_to_recipients(
+            payload,
+            ((user_id, bot_id) for user_id, (bot_id, _) in recipients.items()),
+        )
+        following = steps[index + 1] if index + 1 < len(steps) else None
+        sent = 0
+        for user_id, (_, attempt) in recipients.items():
+            status = statuses.get(user_id)
+            if status == DeliveryStatus.SENT:
+                sent += 1
+                if following is None:
+                    finished.append((campaign_id, user_id, EnrollmentStatus.COMPLETED))
+                else:
+                    advanced.append((campaign_id, user_id, following[0], following[1]))
+            elif status == DeliveryStatus.FAILED or attempt >= self.config.campaign_max_attempts:
+                finished.append((campaign_id, user_id, EnrollmentStatus.STOPPED))
+            else:
+                retried.append((campaign_id, user_id))
+        return sent
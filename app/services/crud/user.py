@@ -1,47 +1,122 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 from aiogram.types import User as AiogramUser
 from aiogram_i18n.cores import BaseCore
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.models.config import AppConfig
 from app.models.dto.user import UserDto
 from app.models.sql import User
+from app.models.sql.campaign import CampaignTrigger
 from app.services.crud.base import CrudService
-from app.services.postgres import SQLSessionContext
+from app.services.postgres import SQLSessionContext, WriteCoalescer
+from app.services.redis.audience import AudienceIndex
 from app.services.redis.cache_wrapper import redis_cache
 from app.utils.key_builder import build_key
 
 class UserService(CrudService):
     """
     Сервис для работы с пользователями Telegram-бота.
+
+    Создание и обновление пользователей из обработчиков объединяются
+    в пакетные записи: всплеск /start или блокировок бота выполняется
+    несколькими многострочными запросами вместо транзакции на пользователя.
     """
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        config: AppConfig,
+    ) -> None:
+        super().__init__(session_pool=session_pool, redis=redis, config=config)
+        self.creates: WriteCoalescer[dict[str, Any], User] = self._create_coalescer(
+            self._write_created, name="user_create"
+        )
+        self.updates: WriteCoalescer[tuple[int, dict[str, Any]], Optional[User]] = self._create_coalescer(
+            self._write_updates, name="user_update"
+        )
+
+    def _create_coalescer(self, writer: Any, name: str) -> WriteCoalescer[Any, Any]:
+        config = self.config.sql_alchemy
+        return WriteCoalescer(
+            writer,
+            max_items=config.write_batch_size,
+            max_delay=config.write_batch_delay,
+            max_pending=config.write_max_pending,
+            name=name,
+        )
+
+    async def _write_created(self, rows: list[dict[str, Any]]) -> Sequence[User]:
+        """
+        Записать пачку новых пользователей. Повторные /start одного пользователя схлопываются.
+        Новые пользователи записываются в активные кампании события USER_CREATED.
+        """
+        unique = list({row["id"]: row for row in reversed(rows)}.values())
+        async with SQLSessionContext(session_pool=self.session_pool) as (repository, uow):
+            created = await repository.users.insert_many(unique)
+            # Запись в кампании фиксируется вместе с созданием пользователей
+            if created and self.config.broadcast.campaigns_enabled:
+                await repository.campaigns.enroll_many(created, CampaignTrigger.USER_CREATED)
+            users = await repository.users.get_many([row["id"] for row in unique])
+            await uow.commit()
+        return [users[row["id"]] for row in rows]
+
+    async def _write_updates(self, updates: list[tuple[int, dict[str, Any]]]) -> Sequence[Optional[User]]:
+        """Записать пачку обновлений. Изменения одного пользователя объединяются по порядку."""
+        merged: dict[int, dict[str, Any]] = {}
+        for user_id, data in updates:
+            merged.setdefault(user_id, {}).update(data)
+        async with SQLSessionContext(session_pool=self.session_pool) as (repository, uow):
+            users = await repository.users.update_many(list(merged.items()))
+            await uow.commit()
+        return [users.get(user_id) for user_id, _ in updates]
+
+    async def close(self) -> None:
+        """Дописать накопленные записи пользователей."""
+        await self.creates.close()
+        await self.updates.close()
+
+    @property
+    def audience(self) -> AudienceIndex:
+        """Индекс аудитории, который обновляется при каждом изменении пользователя."""
+        return AudienceIndex(self.redis)
+
     async def clear_cache(self, user_id: int) -> None:
         """Очистить кэш пользователя по user_id."""
         cache_key: str = build_key("cache", "get_user", user_id=user_id)
         await self.redis.delete(cache_key)
 
-    async def create(self, aiogram_user: AiogramUser, i18n_core: BaseCore[Any]) -> UserDto:
+    async def create(
+        self,
+        aiogram_user: AiogramUser,
+        i18n_core: BaseCore[Any],
+        bot_id: Optional[int] = None,
+    ) -> UserDto:
         """
         Создать пользователя в базе данных, если его ещё нет.
         :param aiogram_user: Объект пользователя Telegram
         :param i18n_core: Ядро локализации
+        :param bot_id: ID бота, через которого пользователь начал диалог
         :return: DTO пользователя
         """
-        db_user: User = User(
-            id=aiogram_user.id,
-            name=aiogram_user.full_name,
-            language=(
-                aiogram_user.language_code
-                if aiogram_user.language_code in i18n_core.available_locales
-                else "en" # Changed from DEFAULT_LOCALE to "en"
-            ),
-            language_code=aiogram_user.language_code,
+        db_user: User = await self.creates.submit(
+            {
+                "id": aiogram_user.id,
+                "name": aiogram_user.full_name,
+                "language": (
+                    aiogram_user.language_code
+                    if aiogram_user.language_code in i18n_core.available_locales
+                    else "en" # Changed from DEFAULT_LOCALE to "en"
+                ),
+                "language_code": aiogram_user.language_code,
+                "bot_id": bot_id,
+            }
         )
-        async with SQLSessionContext(session_pool=self.session_pool) as (repository, uow):
-            repository.session.add(db_user)
-            await repository.session.commit()
         await self.clear_cache(user_id=aiogram_user.id)
+        await self.audience.index_user(db_user)
         return db_user.dto()
 
     @redis_cache(prefix="get_user", ttl=60)
@@ -69,27 +144,54 @@ class UserService(CrudService):
         :param data: Данные для обновления
         :return: Обновленный DTO пользователя или None
         """
-        async with SQLSessionContext(session_pool=self.session_pool) as (repository, uow):
-            for key, value in data.items():
-                setattr(user, key, value)
-            await self.clear_cache(user_id=user.id)
-            user_db = await repository.users.update(user_id=user.id, **user.model_state)
-            if user_db is None:
-                return None
-            return user_db.dto()
+        for key, value in data.items():
+            setattr(user, key, value)
+        await self.clear_cache(user_id=user.id)
+        user_db = await self.updates.submit((user.id, dict(user.model_state)))
+        if user_db is None:
+            return None
+        await self.audience.index_user(user_db)
+        return user_db.dto()
 
-    async def get_or_create(self, aiogram_user: AiogramUser, i18n_core: BaseCore[Any]) -> tuple[UserDto, bool]:
+    async def get_or_create(
+        self,
+        aiogram_user: AiogramUser,
+        i18n_core: BaseCore[Any],
+        bot_id: Optional[int] = None,
+    ) -> tuple[UserDto, bool]:
         """
         Получить пользователя из базы данных или создать нового.
         :param aiogram_user: Объект пользователя Telegram
         :param i18n_core: Ядро локализации
+        :param bot_id: ID бота, через которого пришло обновление
         :return: Кортеж (DTO пользователя, был_ли_создан)
         """
         # Сначала пытаемся получить существующего пользователя
         existing_user = await self.get(user_id=aiogram_user.id)
         if existing_user is not None:
+            # Пользователи, созданные до поддержки нескольких ботов, привязываются при первом обращении
+            if existing_user.bot_id is None and bot_id is not None:
+                existing_user = await self.update(user=existing_user, bot_id=bot_id) or existing_user
             return existing_user, False
         
         # Если пользователя нет, создаем нового
-        new_user = await self.create(aiogram_user=aiogram_user, i18n_core=i18n_core)
+        new_user = await self.create(aiogram_user=aiogram_user, i18n_core=i18n_core, bot_id=bot_id)
         return new_user, True
+
+    async def rebuild_audience_index(self, page_size: int = 10000) -> int:
+        """
+        Заполнить индекс аудитории всеми пользователями из базы.
+        :param page_size: Количество пользователей в одной выборке
+        :return: Количество проиндексированных пользователей
+        """
+        indexed = 0
+        after_id = 0
+        while True:
+            async with SQLSessionContext(session_pool=self.session_pool) as (repository, uow):
+                users = await repository.users.get_page(after_id=after_id, limit=page_size)
+            if not users:
+                await self.audience.mark_ready()
+                return indexed
+            await self.audience.rebuild(users)
+            indexed += len(users)
+            after_id = users[-1].id
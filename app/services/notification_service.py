@@ -5,28 +5,88 @@
 """
 
 import asyncio
-import logging
-from typing import Optional, Dict, Any, List
+import random
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Final, Iterable, List, Optional, Sequence, Union
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from functools import partial
 from enum import Enum
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from aiogram.enums import ChatAction
+from aiohttp import ClientError
+from redis.asyncio import Redis
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
 
+from app.models.config.env import BroadcastConfig
 from app.models.sql.notification import Notification
+from app.models.sql.outbox import OutboxJob, OutboxKind
 from app.models.sql.user import User
+from app.services.postgres.repositories.dead_letters import DeadLetterRow
+from app.services.broadcast import (
+    AIMDController,
+    AudienceColumns,
+    AudienceSnapshot,
+    BlockTask,
+    BotShard,
+    BroadcastRun,
+    ChatRateLimiter,
+    ColumnsBuilder,
+    DbLoad,
+    DeliveryLedger,
+    DeliveryStatus,
+    DigestWindow,
+    FailureAggregator,
+    Flow,
+    MessageBlock,
+    RateProfile,
+    RecipientBlock,
+    RetryBudget,
+    RowBuffer,
+    SegmentCursor,
+    SimulatedBot,
+    SimulatedShard,
+    SnapshotBuilder,
+    clone_bot,
+    current_flow,
+    metrics,
+    pack_digest,
+    run_virtual,
+    validate_html,
+)
+from app.services.broadcast.clock import monotonic
+from app.services.postgres.coalescer import WriteCoalescer
 from app.services.postgres.context import SQLSessionContext
+from app.services.redis.audience import BOT, NO_BOT, AudienceIndex
+from app.services.redis.interactive import InteractiveLatencyStore
+from app.services.redis.notification_cache import NotificationCache, NotificationPayload
+from app.services.redis.rate_limit import SharedRateLimiter
 from app.utils.logging import notifications as logger
 
 
 class NotificationStatus(Enum):
     """Статусы уведомлений."""
     PENDING = "pending"
+    QUEUED = "queued"
     SENDING = "sending"
     SENT = "sent"
     FAILED = "failed"
     RETRY = "retry"
+    CANCELLED = "cancelled"
+    DELETED = "deleted"
 
 
 class UserStatus(Enum):
@@ -37,15 +97,66 @@ class UserStatus(Enum):
     DELETED = "deleted"
 
 
-@dataclass
+# Типы ошибок, означающие перегрузку Telegram и сокращающие окно параллелизма
+OVERLOAD_ERROR_TYPES: Final[frozenset[str]] = frozenset({"rate_limit", "server_error"})
+
+# Типы ошибок, вызванных получателем, а не текстом уведомления
+AUDIENCE_ERROR_TYPES: Final[frozenset[str]] = frozenset({"user_blocked", "chat_not_found", "user_deactivated"})
+
+# Типы ошибок, которые учитывает выключатель рассылки
+BREAKER_ERROR_TYPES: Final[frozenset[str]] = frozenset({"server_error"})
+
+# Сбои соединения с Telegram: запрос мог не дойти, поэтому его повторяют
+NETWORK_ERRORS: Final[tuple[type[BaseException], ...]] = (
+    TelegramNetworkError,
+    ClientError,
+    asyncio.TimeoutError,
+    OSError,
+)
+
+# Ответы Telegram, означающие, что сообщение уже в нужном состоянии
+MESSAGE_NOT_MODIFIED_ERRORS: Final[tuple[str, ...]] = ("message is not modified",)
+MESSAGE_ALREADY_DELETED_ERRORS: Final[tuple[str, ...]] = ("message to delete not found",)
+
+# Ответы Telegram на текст, который не будет принят ни для одного получателя
+INVALID_MESSAGE_ERRORS: Final[tuple[str, ...]] = (
+    "can't parse entities",
+    "message is too long",
+    "message text is empty",
+)
+
+OPERATION_LABELS: Final[Dict[str, str]] = {
+    "send": "Рассылка",
+    "edit": "Редактирование",
+    "delete": "Удаление",
+    "redrive": "Повторная отправка",
+    "retry": "Повтор неудачных доставок",
+    "campaign": "Шаг кампании",
+}
+
+# Обработчик одного получателя массовой операции
+RecipientHandler = Callable[[BotShard, Any, BroadcastRun], Awaitable[Dict[str, Any]]]
+
+# Чат, очередь в который обработчик массовой операции уже дождался (_run_shard)
+_paced_chat: ContextVar[Optional[int]] = ContextVar("broadcast_paced_chat", default=None)
+
+
+@dataclass(slots=True)
 class NotificationTask:
-    """Задача отправки уведомления."""
+    """Задача отправки уведомления одному пользователю.
+    
+    Массовые отправки ставятся в очередь блоками (BlockTask), а не задачей на получателя.
+    """
     notification_id: int
     user_id: int
     message: str
+    bot_id: Optional[int] = None
     retry_count: int = 0
     max_retries: int = 3
     created_at: Optional[datetime] = None
+    # Последняя ошибка доставки, сохраняется в очереди недоставленных
+    error_type: Optional[str] = None
+    error_message: Optional[str] = None
     
     def __post_init__(self):
         if self.created_at is None:
@@ -55,15 +166,21 @@ class NotificationTask:
 class NotificationQueue:
     """Очередь для асинхронной отправки уведомлений."""
     
-    def __init__(self, max_concurrent: int = 10, batch_size: int = 50):
-        self.max_concurrent = max_concurrent
-        self.batch_size = batch_size
+    def __init__(
+        self,
+        concurrency: AIMDController,
+        dead_letter: Optional[Callable[[NotificationTask], Awaitable[None]]] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.concurrency = concurrency
+        self.dead_letter = dead_letter
+        self.retry_budget = retry_budget
+        self.max_concurrent = concurrency.max_limit
         self.queue: asyncio.Queue = asyncio.Queue()
-        self.semaphore = asyncio.Semaphore(max_concurrent)
         self.is_running = False
         self.workers: List[asyncio.Task] = []
         
-    async def start(self, send_notification_func):
+    async def start(self, send_notification_func, send_block_func=None):
         """Запускает обработчики очереди."""
         if self.is_running:
             return
@@ -72,7 +189,7 @@ class NotificationQueue:
         logger.info(f"Запуск очереди уведомлений с {self.max_concurrent} обработчиками")
         
         for i in range(self.max_concurrent):
-            worker = asyncio.create_task(self._worker(f"worker-{i}", send_notification_func))
+            worker = asyncio.create_task(self._worker(f"worker-{i}", send_notification_func, send_block_func))
             self.workers.append(worker)
     
     async def stop(self):
@@ -96,7 +213,15 @@ class NotificationQueue:
         await self.queue.put(task)
         logger.debug(f"Добавлена задача отправки уведомления {task.notification_id} пользователю {task.user_id}")
     
-    async def _worker(self, worker_name: str, send_notification_func):
+    async def add_block(self, task: BlockTask):
+        """Добавляет в очередь блок получателей."""
+        await self.queue.put(task)
+        logger.debug(
+            f"Добавлен блок отправки уведомления {task.notification_id}: "
+            f"{len(task.block)} получателей бота {task.bot_id}"
+        )
+    
+    async def _worker(self, worker_name: str, send_notification_func, send_block_func=None):
         """Обработчик задач."""
         logger.info(f"Запущен обработчик {worker_name}")
         
@@ -104,8 +229,16 @@ class NotificationQueue:
             try:
                 task = await asyncio.wait_for(self.queue.get(), timeout=1.0)
                 
-                async with self.semaphore:
+                # Блок сам занимает окно параллелизма на каждого получателя
+                if isinstance(task, BlockTask):
+                    await self._process_block(task, worker_name, send_block_func)
+                    continue
+                
+                await self.concurrency.acquire()
+                try:
                     await self._process_task(task, worker_name, send_notification_func)
+                finally:
+                    await self.concurrency.release()
                     
             except asyncio.TimeoutError:
                 continue
@@ -114,6 +247,19 @@ class NotificationQueue:
         
         logger.info(f"Остановлен обработчик {worker_name}")
     
+    async def _process_block(self, task: BlockTask, worker_name: str, send_block_func):
+        """Обрабатывает блок получателей."""
+        try:
+            await send_block_func(task)
+        except Exception as e:
+            logger.error(f"{worker_name}: Ошибка обработки блока уведомления {task.notification_id}: {e}")
+        finally:
+            self.queue.task_done()
+    
+    def _can_retry(self) -> bool:
+        """Разрешает ли бюджет повторов еще одну попытку."""
+        return self.retry_budget is None or self.retry_budget.try_retry() > 0
+
     async def _process_task(self, task: NotificationTask, worker_name: str, send_notification_func):
         """Обрабатывает одну задачу."""
         try:
@@ -126,13 +272,15 @@ class NotificationQueue:
             else:
                 logger.warning(f"{worker_name}: Не удалось отправить уведомление {task.notification_id} пользователю {task.user_id}")
                 
-                if task.retry_count < task.max_retries:
+                if task.retry_count < task.max_retries and self._can_retry():
                     task.retry_count += 1
                     await asyncio.sleep(2 ** task.retry_count)
                     await self.add_task(task)
                     logger.info(f"{worker_name}: Повторная попытка {task.retry_count} для уведомления {task.notification_id}")
                 else:
                     logger.error(f"{worker_name}: Исчерпаны попытки для уведомления {task.notification_id}")
+                    if self.dead_letter is not None:
+                        await self.dead_letter(task)
                     
         except Exception as e:
             logger.error(f"{worker_name}: Ошибка обработки задачи {task.notification_id}: {e}")
@@ -143,20 +291,120 @@ class NotificationQueue:
 class NotificationService:
     """Сервис для асинхронной рассылки уведомлений через Telegram-бота."""
     
-    def __init__(self, bot: Bot, session_pool):
+    def __init__(
+        self,
+        bot: Bot,
+        session_pool,
+        config: Optional[BroadcastConfig] = None,
+        bots: Optional[Sequence[Bot]] = None,
+        audience: Optional[AudienceIndex] = None,
+        redis: Optional[Redis] = None,
+        preflight_chat_id: Optional[int] = None,
+    ):
         self.bot = bot
         self.session_pool = session_pool
-        self.queue = NotificationQueue(max_concurrent=10, batch_size=50)
+        self.config = config or BroadcastConfig()
+        self.audience = audience
+        self.redis = redis
+        # Чат, в который уведомление отправляется для проверки перед рассылкой
+        self.preflight_chat_id = preflight_chat_id
+        # Паузы между сообщениями в один чат, общий лимит бота они не задерживают
+        self.chats: Optional[ChatRateLimiter] = None
+        if self.config.chat_rate_limit:
+            self.chats = ChatRateLimiter.from_config(self.config)
+        # Задержка ответов бота пользователям, которую публикует процесс бота
+        self.interactive: Optional[InteractiveLatencyStore] = None
+        if redis is not None and self.config.interactive_guard:
+            self.interactive = InteractiveLatencyStore(redis)
+        self.standard_profile = RateProfile.standard(self.config)
+        self.paid_profile = RateProfile.paid(self.config)
+        # Основной бот всегда первый: ему достаются пользователи без привязки к боту
+        self.shards: Dict[int, BotShard] = {}
+        for shard_bot in [bot, *(bots or [])]:
+            if shard_bot.id not in self.shards:
+                self.shards[shard_bot.id] = self._create_shard(shard_bot, self.standard_profile)
+        self.primary_shard = self.shards[bot.id]
+        self.concurrency = self.primary_shard.concurrency
+        # Шарды платной рассылки создаются при первой платной рассылке
+        self.paid_shards: Dict[int, BotShard] = {}
+        # Выполняемые массовые операции по ID уведомления
+        self.runs: Dict[int, BroadcastRun] = {}
+        # Уведомления, занятые операцией с ее проверки до завершения, в том числе до запуска
+        self.reserved: set[int] = set()
+        # Повторы временных ошибок всех операций расходуют общий бюджет
+        self.retries = RetryBudget(
+            ratio=self.config.retry_budget_ratio,
+            min_per_second=self.config.retry_budget_min_per_second,
+            window=self.config.retry_budget_window,
+        )
+        self.queue = NotificationQueue(self.concurrency, dead_letter=self._dead_letter_task, retry_budget=self.retries)
         self._queue_started = False
+        # Содержимое уведомлений кэшируется в Redis для всех процессов рассылки
+        self.payloads: Optional[NotificationCache] = None
+        if redis is not None:
+            self.payloads = NotificationCache(redis, self._load_payload, ttl=self.config.payload_cache_ttl)
+        # Блокировки и удаления аккаунтов во время рассылки идут всплесками
+        self.status_writes: WriteCoalescer[tuple[int, str], Optional[User]] = WriteCoalescer(
+            self._write_user_statuses,
+            max_items=self.config.status_batch_size,
+            max_delay=self.config.status_batch_delay,
+            name="user_status",
+        )
+        # Колоночный снимок пользователей для оценки аудитории, строится run_audience_columns()
+        self.columns: Optional[AudienceColumns] = None
+        # Рассылки, запущенные в пределах окна, объединяются в дайджест;
+        # дайджесты разных окон рассылаются одновременно
+        self.digests: Optional[DigestWindow] = None
+        if self.config.digest_enabled:
+            self.digests = DigestWindow(
+                self._send_digest,
+                window=self.config.digest_window,
+                max_items=self.config.digest_max_notifications,
+            )
+
+    def _create_shard(self, bot: Bot, profile: RateProfile) -> BotShard:
+        """Создает шард бота. При наличии Redis бюджет частоты делится со всеми процессами."""
+        limiter = None
+        if self.redis is not None and self.config.shared_rate_limit:
+            limiter = SharedRateLimiter(
+                self.redis,
+                bot_id=bot.id,
+                profile=profile.name,
+                rate=profile.rate_limit,
+                prefetch=self.config.rate_limit_prefetch,
+            )
+        latency = partial(self.interactive.read, bot.id) if self.interactive is not None else None
+        return BotShard.from_config(bot, self.config, profile=profile, limiter=limiter, latency=latency)
+
+    def _get_shard(self, bot_id: Optional[int], paid: bool = False) -> BotShard:
+        """Возвращает шард бота, к которому привязан пользователь."""
+        shard = self.shards.get(bot_id, self.primary_shard) if bot_id is not None else self.primary_shard
+        if not paid:
+            return shard
+        paid_shard = self.paid_shards.get(shard.bot_id)
+        if paid_shard is None:
+            paid_bot = clone_bot(shard.bot, connection_limit=self.paid_profile.connection_limit)
+            paid_shard = self._create_shard(paid_bot, self.paid_profile)
+            self.paid_shards[shard.bot_id] = paid_shard
+        return paid_shard
 
     async def _handle_telegram_error(self, error: TelegramAPIError, user_id: int) -> Dict[str, Any]:
         """Обрабатывает ошибки Telegram API и возвращает информацию о типе ошибки."""
         error_code = getattr(error, 'code', None)
         error_description = str(error)
         
+        # Исключения aiogram не содержат HTTP-кода, восстанавливаем его по типу
+        if error_code is None:
+            if isinstance(error, TelegramRetryAfter):
+                error_code = 429
+            elif isinstance(error, TelegramServerError):
+                error_code = 500
+            elif isinstance(error, TelegramBadRequest):
+                error_code = 400
+        
         # Ошибки блокировки бота
         if isinstance(error, TelegramForbiddenError) or error_code == 403:
-            logger.warning(f"Пользователь {user_id} заблокировал бота")
+            logger.debug(f"Пользователь {user_id} заблокировал бота")
             return {
                 "type": "user_blocked",
                 "should_retry": False,
@@ -166,7 +414,7 @@ class NotificationService:
         
         # Ошибки несуществующего чата
         elif error_code == 400 and "chat not found" in error_description.lower():
-            logger.warning(f"Чат с пользователем {user_id} не найден")
+            logger.debug(f"Чат с пользователем {user_id} не найден")
             return {
                 "type": "chat_not_found",
                 "should_retry": False,
@@ -174,9 +422,19 @@ class NotificationService:
                 "message": "Чат не найден"
             }
         
+        # Ошибки текста уведомления: повтор даст тот же ответ
+        elif error_code == 400 and any(error in error_description.lower() for error in INVALID_MESSAGE_ERRORS):
+            logger.debug(f"Telegram отклонил текст уведомления для пользователя {user_id}: {error_description}")
+            return {
+                "type": "invalid_message",
+                "should_retry": False,
+                "update_user_status": None,
+                "message": f"Некорректный текст уведомления: {error_description}"
+            }
+        
         # Ошибки удаленного пользователя
         elif error_code == 400 and "user is deactivated" in error_description.lower():
-            logger.warning(f"Пользователь {user_id} деактивирован")
+            logger.debug(f"Пользователь {user_id} деактивирован")
             return {
                 "type": "user_deactivated",
                 "should_retry": False,
@@ -186,7 +444,7 @@ class NotificationService:
         
         # Ошибки ограничений (спам, флуд)
         elif error_code == 429:
-            logger.warning(f"Превышен лимит отправки для пользователя {user_id}")
+            logger.debug(f"Превышен лимит отправки для пользователя {user_id}")
             return {
                 "type": "rate_limit",
                 "should_retry": True,
@@ -195,8 +453,8 @@ class NotificationService:
             }
         
         # Ошибки сервера Telegram
-        elif error_code in [500, 502, 503, 504]:
-            logger.warning(f"Ошибка сервера Telegram для пользователя {user_id}: {error_code}")
+        elif error_code is not None and 500 <= error_code < 600:
+            logger.debug(f"Ошибка сервера Telegram для пользователя {user_id}: {error_code}")
             return {
                 "type": "server_error",
                 "should_retry": True,
@@ -204,42 +462,96 @@ class NotificationService:
                 "message": f"Ошибка сервера Telegram: {error_code}"
             }
         
-        # Другие ошибки
+        # Сбои соединения: ответа Telegram не было
+        elif isinstance(error, TelegramNetworkError):
+            logger.debug(f"Сбой соединения с Telegram для пользователя {user_id}: {error}")
+            return {
+                "type": "network_error",
+                "should_retry": True,
+                "update_user_status": None,
+                "message": f"Сбой соединения с Telegram: {error_description}"
+            }
+        
+        # Другие ошибки: Telegram ответил отказом, повтор получит тот же ответ
         else:
-            logger.error(f"Неизвестная ошибка Telegram для пользователя {user_id}: {error_code} - {error_description}")
+            logger.debug(f"Неизвестная ошибка Telegram для пользователя {user_id}: {error_code} - {error_description}")
             return {
                 "type": "unknown_error",
-                "should_retry": True,
+                "should_retry": False,
                 "update_user_status": None,
                 "message": f"Неизвестная ошибка: {error_description}"
             }
 
+    async def _load_payload(self, notification_id: int) -> Optional[NotificationPayload]:
+        """Загружает содержимое уведомления из базы данных."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            notification = await repository._get(Notification, Notification.id == notification_id)
+        return NotificationPayload.from_model(notification) if notification else None
+
+    async def get_payload(self, notification_id: int) -> Optional[NotificationPayload]:
+        """Возвращает содержимое уведомления для отправки, по возможности из кэша."""
+        if self.payloads is None:
+            return await self._load_payload(notification_id)
+        return await self.payloads.get(notification_id)
+
+    async def invalidate_payload(self, notification_id: int, version: int) -> None:
+        """Сбрасывает кэш содержимого после правки уведомления."""
+        if self.payloads is not None:
+            await self.payloads.invalidate(notification_id, version)
+
     async def _update_user_status(self, user_id: int, status: str) -> None:
         """Обновляет статус пользователя в базе данных."""
         try:
-            async with SQLSessionContext(self.session_pool) as (repository, uow):
-                # Обновляем статус пользователя через репозиторий
-                updated_user = await repository.users.update_user_status(user_id, status)
-                if updated_user:
-                    logger.info(f"Обновлен статус пользователя {user_id} на {status}")
-                else:
-                    logger.warning(f"Пользователь {user_id} не найден для обновления статуса")
+            updated_user = await self.status_writes.submit((user_id, status))
+            if updated_user:
+                logger.info(f"Обновлен статус пользователя {user_id} на {status}")
+                if self.audience is not None:
+                    await self.audience.index_user(updated_user)
+            else:
+                logger.warning(f"Пользователь {user_id} не найден для обновления статуса")
         except Exception as e:
             logger.error(f"Ошибка обновления статуса пользователя {user_id}: {e}")
 
+    async def _write_user_statuses(self, updates: List[tuple[int, str]]) -> List[Optional[User]]:
+        """Записывает пачку статусов пользователей в одной транзакции."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            users = await repository.users.update_many(
+                [(user_id, {"status": status}) for user_id, status in updates]
+            )
+            await uow.commit()
+        return [users.get(user_id) for user_id, _ in updates]
+
+    async def _observe(self, shard: BotShard, error_type: Optional[str], latency: float) -> None:
+        """Передает результат запроса контроллеру параллелизма бота."""
+        if error_type is None:
+            await shard.concurrency.on_success(latency)
+        elif error_type in OVERLOAD_ERROR_TYPES:
+            await shard.concurrency.on_overload()
+
     async def _send_notification(self, task: NotificationTask) -> bool:
-        """Отправляет уведомление через бота."""
+        """Отправляет уведомление через бота.
+
+        Возвращает True, если задача завершена: уведомление доставлено или
+        ошибка не требует повтора. False означает, что задачу нужно повторить.
+        """
+        shard = self._get_shard(task.bot_id)
+        await self._pace_chat(task.user_id)
+        await shard.acquire()
+        self.retries.record_request()
+        started = monotonic()
         try:
-            await self.bot.send_message(
+            await shard.bot.send_message(
                 chat_id=task.user_id,
                 text=task.message,
                 parse_mode="HTML"
             )
-            logger.info(f"Уведомление отправлено пользователю {task.user_id}")
+            await self._observe(shard, None, monotonic() - started)
+            logger.debug(f"Уведомление отправлено пользователю {task.user_id}")
             return True
             
         except TelegramAPIError as e:
             error_info = await self._handle_telegram_error(e, task.user_id)
+            await self._observe(shard, error_info["type"], monotonic() - started)
             
             # Обновляем статус пользователя если нужно
             if error_info["update_user_status"]:
@@ -251,37 +563,163 @@ class NotificationService:
                 f"{error_info['type']} - {error_info['message']}"
             )
             
-            # Возвращаем False для ошибок, которые не нужно повторять
-            return error_info["should_retry"]
+            task.error_type = error_info["type"]
+            task.error_message = error_info["message"]
+            # Ошибки, которые не нужно повторять, завершают задачу
+            return not error_info["should_retry"]
             
         except Exception as e:
             logger.error(f"Неожиданная ошибка при отправке уведомления пользователю {task.user_id}: {e}")
-            return False
+            network = isinstance(e, NETWORK_ERRORS)
+            task.error_type = "network_error" if network else "unexpected_error"
+            task.error_message = str(e)
+            # Повторяются только сбои соединения
+            return not network
+
+    async def _dead_letter_task(self, task: NotificationTask) -> None:
+        """Сохраняет задачу с исчерпанными попытками в очереди недоставленных."""
+        row = (task.user_id, task.bot_id, task.error_type or "unknown_error", task.error_message)
+        try:
+            await self._write_dead_letters(task.notification_id, [row])
+        except Exception as e:
+            logger.error(
+                f"Ошибка записи в очередь недоставленных уведомления {task.notification_id} "
+                f"пользователю {task.user_id}: {e}"
+            )
     
     async def _ensure_queue_running(self):
         """Убеждается, что очередь запущена."""
         if not self._queue_started:
-            await self.queue.start(self._send_notification)
+            await self.queue.start(self._send_notification, self._send_block)
             self._queue_started = True
     
-    async def send_notification_to_user(self, user_id: int, message: str) -> Dict[str, Any]:
-        """Отправляет уведомление одному пользователю с детальной обработкой ошибок."""
+    async def enqueue_notification(
+        self,
+        notification_id: int,
+        message: str,
+        recipients: Iterable[tuple[int, Optional[int]]],
+        max_retries: int = 3,
+    ) -> int:
+        """Ставит отправку уведомления получателям (user_id, bot_id) в очередь блоками по ботам.
+        
+        Возвращает количество поставленных блоков.
+        """
+        await self._ensure_queue_running()
+        size = self.config.queue_block_size
+        blocks = 0
+        for bot_id, block in self._group_recipients(recipients).items():
+            for start in range(0, len(block), size):
+                part = RecipientBlock(bot_id, block.user_ids[start:start + size])
+                await self.queue.add_block(BlockTask(notification_id, message, part, max_retries=max_retries))
+                blocks += 1
+        return blocks
+
+    async def _send_block(self, task: BlockTask) -> None:
+        """Отправляет блок получателей из очереди, повторяя временные ошибки с паузой.
+        
+        Попытки и результаты хранятся в массивах блока; в очередь
+        недоставленных попадают только получатели, исчерпавшие попытки.
+        """
+        shard = self._get_shard(task.bot_id)
+        run = self._create_run(task.notification_id, task.message, self.standard_profile, "send")
+        run.total = len(task.block)
+        dead_letters, run.dead_letters = run.dead_letters, None
+        block = task.block
+        sent = 0
+        attempt = 0
         try:
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML"
+            while len(block):
+                if attempt == task.max_retries:
+                    run.dead_letters = dead_letters
+                await self._run_shard(shard, block, run, self._send_to_recipient)
+                sent += block.count(DeliveryStatus.SENT)
+                block = block.select(DeliveryStatus.RETRYABLE, max_retries=task.max_retries)
+                block, denied = self._spend_retry_budget(block)
+                for row in denied:
+                    dead_letters.push(row)
+                if len(block):
+                    attempt += 1
+                    await asyncio.sleep(2 ** attempt)
+        finally:
+            await run.close()
+            await dead_letters.close()
+        
+        logger.info(
+            f"Блок уведомления {task.notification_id} для бота {task.bot_id}: "
+            f"{sent} из {run.total} отправлено, попыток {attempt + 1}"
+        )
+
+    def _spend_retry_budget(self, block: RecipientBlock) -> tuple[RecipientBlock, List[DeadLetterRow]]:
+        """Оставляет в блоке повторов столько получателей, сколько разрешает бюджет повторов.
+        
+        Остальные получатели возвращаются строками очереди недоставленных.
+        """
+        if not len(block):
+            return block, []
+        block, denied = block.split(self.retries.try_retry(len(block)))
+        if len(denied):
+            logger.warning(
+                f"Бюджет повторов исчерпан: {len(denied)} получателей бота {block.bot_id} "
+                f"переданы в очередь недоставленных, усиление {self.retries.amplification:.2f}"
             )
-            logger.info(f"Уведомление отправлено пользователю {user_id}")
+        return block, [
+            (user_id, denied.bot_id, "retry_budget", "Бюджет повторов исчерпан") for user_id in denied
+        ]
+
+    async def _pace_chat(self, chat_id: int) -> None:
+        """Ожидает очереди сообщения в чат до получения разрешения общего лимита бота.
+
+        Очередь, которую обработчик рассылки дождался заранее, не ждется повторно.
+        """
+        if _paced_chat.get() is not None:
+            paced = _paced_chat.get() == chat_id
+            _paced_chat.set(None)
+            if paced:
+                return
+        if self.chats is not None:
+            await self.chats.acquire(chat_id)
+
+    async def _call_telegram(
+        self,
+        shard: BotShard,
+        user_id: int,
+        request: Callable[[], Awaitable[Any]],
+        ignore_errors: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """Выполняет запрос к Telegram от имени бота шарда и классифицирует ошибки.
+
+        Запрос расходует бюджет частоты бота, общий для массовых операций
+        и отдельных отправок, и ждет паузы между сообщениями в чат пользователя.
+        Ошибки, описание которых содержит одну из строк ignore_errors, считаются
+        успешным результатом (например, сообщение уже удалено).
+        """
+        await self._pace_chat(user_id)
+        await shard.acquire()
+        self.retries.record_request()
+        started = monotonic()
+        try:
+            response = await request()
+            await self._observe(shard, None, monotonic() - started)
             return {
                 "success": True,
                 "user_id": user_id,
                 "error_type": None,
-                "message": "Уведомление отправлено"
+                "response": response
             }
             
         except TelegramAPIError as e:
+            description = str(e).lower()
+            if any(error in description for error in ignore_errors):
+                await self._observe(shard, None, monotonic() - started)
+                return {
+                    "success": True,
+                    "user_id": user_id,
+                    "error_type": None,
+                    "response": None
+                }
+
             error_info = await self._handle_telegram_error(e, user_id)
+            await self._observe(shard, error_info["type"], monotonic() - started)
             
             # Обновляем статус пользователя если нужно
             if error_info["update_user_status"]:
@@ -296,135 +734,1505 @@ class NotificationService:
             }
             
         except Exception as e:
-            logger.error(f"Неожиданная ошибка при отправке уведомления пользователю {user_id}: {e}")
+            logger.error(f"Неожиданная ошибка запроса к Telegram для пользователя {user_id}: {e}")
+            network = isinstance(e, NETWORK_ERRORS)
             return {
                 "success": False,
                 "user_id": user_id,
-                "error_type": "unexpected_error",
+                "error_type": "network_error" if network else "unexpected_error",
                 "message": str(e),
-                "should_retry": True
+                # Повторяются только сбои соединения, остальное не исправится повтором
+                "should_retry": network
             }
 
-    async def send_bulk_notification(self, notification_id: int) -> Dict[str, Any]:
-        """Массовая рассылка уведомления всем активным пользователям."""
-        start_time = datetime.utcnow()
+    async def send_notification_to_user(
+        self,
+        user_id: int,
+        message: str,
+        bot_id: Optional[int] = None,
+        allow_paid_broadcast: bool = False,
+    ) -> Dict[str, Any]:
+        """Отправляет уведомление одному пользователю с детальной обработкой ошибок."""
+        shard = self._get_shard(bot_id, paid=allow_paid_broadcast)
+        extra: Dict[str, Any] = {"allow_paid_broadcast": True} if allow_paid_broadcast else {}
+        result = await self._call_telegram(
+            shard,
+            user_id,
+            lambda: shard.bot.send_message(
+                chat_id=user_id,
+                text=message,
+                parse_mode="HTML",
+                **extra
+            ),
+        )
+        if not result["success"]:
+            return result
+
+        logger.debug(f"Уведомление отправлено пользователю {user_id}")
+        message_id = getattr(result.pop("response"), "message_id", None)
+        return {
+            **result,
+            "message": "Уведомление отправлено",
+            "message_id": message_id if isinstance(message_id, int) else None
+        }
+
+    async def edit_message_for_user(
+        self,
+        user_id: int,
+        message_id: int,
+        message: str,
+        bot_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Заменяет текст ранее отправленного пользователю уведомления."""
+        shard = self._get_shard(bot_id)
+        result = await self._call_telegram(
+            shard,
+            user_id,
+            lambda: shard.bot.edit_message_text(
+                chat_id=user_id,
+                message_id=message_id,
+                text=message,
+                parse_mode="HTML"
+            ),
+            ignore_errors=MESSAGE_NOT_MODIFIED_ERRORS,
+        )
+        result.pop("response", None)
+        if result["success"]:
+            result["message"] = "Уведомление отредактировано"
+        return result
+
+    async def delete_message_for_user(
+        self,
+        user_id: int,
+        message_id: int,
+        bot_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Удаляет ранее отправленное пользователю уведомление."""
+        shard = self._get_shard(bot_id)
+        result = await self._call_telegram(
+            shard,
+            user_id,
+            lambda: shard.bot.delete_message(chat_id=user_id, message_id=message_id),
+            ignore_errors=MESSAGE_ALREADY_DELETED_ERRORS,
+        )
+        result.pop("response", None)
+        if result["success"]:
+            result["message"] = "Уведомление удалено"
+        return result
+
+    async def _write_deliveries(
+        self,
+        notification_id: int,
+        rows: List[tuple[int, int, Optional[int]]],
+        digest_id: Optional[int] = None,
+    ) -> None:
+        """Записывает пачку результатов доставки в журнал."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            await repository.deliveries.upsert_many(notification_id, rows, digest_id=digest_id)
+
+    async def _write_dead_letters(self, notification_id: int, rows: List[DeadLetterRow]) -> None:
+        """Записывает пачку временных ошибок доставки в очередь недоставленных."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            await repository.dead_letters.upsert_many(notification_id, rows)
+
+    async def _resolve_dead_letters(self, notification_id: int, user_ids: List[int]) -> None:
+        """Убирает из очереди недоставленных получателей, повторная отправка которым завершена."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            await repository.dead_letters.delete_many(notification_id, user_ids)
+
+    async def _send_to_recipient(self, shard: BotShard, user_id: int, run: BroadcastRun) -> Dict[str, Any]:
+        """Отправляет уведомление получателю рассылки и записывает результат в журнал.
+
+        Результат сообщения дайджеста записывается в журналы всех вошедших в него
+        уведомлений. Временные ошибки дополнительно попадают в очереди недоставленных
+        этих уведомлений.
+        """
+        result = await self.send_notification_to_user(
+            user_id,
+            run.message,
+            bot_id=shard.bot_id,
+            allow_paid_broadcast=run.profile.allow_paid_broadcast,
+        )
+        for ledger in (run.ledger, *run.credits):
+            if result["success"]:
+                ledger.add(user_id, DeliveryStatus.SENT, result.get("message_id"))
+            else:
+                ledger.add(
+                    user_id,
+                    DeliveryStatus.RETRYABLE if result.get("should_retry") else DeliveryStatus.FAILED,
+                )
+        if not result["success"] and result.get("should_retry"):
+            row = (user_id, shard.bot_id, result["error_type"], result.get("message"))
+            for dead_letters in (run.dead_letters, *run.credit_dead_letters):
+                if dead_letters is not None:
+                    dead_letters.push(row)
+        return result
+
+    async def _redrive_recipient(self, shard: BotShard, user_id: int, run: BroadcastRun) -> Dict[str, Any]:
+        """Повторно отправляет уведомление получателю из очереди недоставленных.
+
+        Запись убирается из очереди после доставки или окончательной ошибки,
+        при новой временной ошибке увеличивается счетчик попыток.
+        """
+        result = await self._send_to_recipient(shard, user_id, run)
+        if result["success"] or not result.get("should_retry"):
+            run.resolved.push(user_id)
+        return result
+
+    async def _edit_recipient(
+        self,
+        shard: BotShard,
+        recipient: tuple[int, int],
+        run: BroadcastRun,
+    ) -> Dict[str, Any]:
+        """Редактирует уведомление, доставленное получателю рассылки."""
+        user_id, message_id = recipient
+        return await self.edit_message_for_user(user_id, message_id, run.message, bot_id=shard.bot_id)
+
+    async def _delete_recipient(
+        self,
+        shard: BotShard,
+        recipient: tuple[int, int],
+        run: BroadcastRun,
+    ) -> Dict[str, Any]:
+        """Удаляет уведомление у получателя рассылки и отмечает это в журнале."""
+        user_id, message_id = recipient
+        result = await self.delete_message_for_user(user_id, message_id, bot_id=shard.bot_id)
+        if result["success"]:
+            run.ledger.add(user_id, DeliveryStatus.DELETED)
+        return result
+
+    async def _run_shard(
+        self,
+        shard: BotShard,
+        recipients: Sequence[Any],
+        run: BroadcastRun,
+        handle: RecipientHandler,
+    ) -> None:
+        """Обрабатывает получателей одного бота в пределах его лимита частоты и окна параллелизма."""
+        pending = enumerate(recipients)
+        cursor = None
+        if run.snapshot is not None:
+            cursor = SegmentCursor(run.snapshot, shard.bot_id, self.config.snapshot_checkpoint_interval)
         
+        async def worker() -> None:
+            # Запросы обработчика идут в очередь потока запуска у ограничителя бота
+            current_flow.set(run.flow)
+            for index, recipient in pending:
+                if run.cancelled:
+                    return
+
+                # Очередь в горячий чат ждется до разрешения лимита бота и окна
+                # параллелизма: ожидающий обработчик не занимает общих ресурсов
+                if self.chats is not None:
+                    chat_id = recipient if isinstance(recipient, int) else recipient[0]
+                    await self._pace_chat(chat_id)
+                    _paced_chat.set(chat_id)
+                    if run.cancelled:
+                        return
+
+                # Во время сбоя Telegram выключатель пропускает только пробные запросы
+                probe = await shard.breaker.acquire()
+                if run.cancelled:
+                    if probe:
+                        await shard.breaker.abandon()
+                    return
+                
+                await shard.prepay()
+                await shard.concurrency.acquire()
+                if run.cancelled:
+                    await shard.concurrency.release()
+                    if probe:
+                        await shard.breaker.abandon()
+                    return
+                try:
+                    result = await handle(shard, recipient, run)
+                finally:
+                    await shard.concurrency.release()
+                await shard.breaker.record(result["error_type"] in BREAKER_ERROR_TYPES, probe=probe)
+
+                if cursor is not None:
+                    cursor.complete(index)
+                if isinstance(recipients, RecipientBlock):
+                    recipients.mark(index, self._delivery_status(result))
+                shard.record(result["success"])
+                run.record(shard.bot_id, result["success"])
+                if result["success"]:
+                    continue
+                
+                run.failures.add(result["user_id"], result["error_type"], result["message"])
+                if run.failures.summary_due():
+                    logger.info(
+                        f"{OPERATION_LABELS[run.operation]} уведомления {run.notification_id}: "
+                        f"{run.sent} из {run.total} выполнено, ошибки: {run.failures.summary()}"
+                    )
+        
+        workers = min(shard.concurrency.max_limit, len(recipients))
+        try:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            if cursor is not None:
+                cursor.save()
+
+    @staticmethod
+    def _delivery_status(result: Dict[str, Any]) -> DeliveryStatus:
+        """Код результата обработки получателя."""
+        if result["success"]:
+            return DeliveryStatus.SENT
+        return DeliveryStatus.RETRYABLE if result.get("should_retry") else DeliveryStatus.FAILED
+
+    def _group_recipients(self, rows: Iterable[tuple[int, Optional[int]]]) -> Dict[int, RecipientBlock]:
+        """Раскладывает пары (user_id, bot_id) по блокам ботов, через которых идет отправка."""
+        user_ids: Dict[int, array] = {}
+        for user_id, bot_id in rows:
+            shard_id = self._get_shard(bot_id).bot_id
+            segment = user_ids.get(shard_id)
+            if segment is None:
+                segment = user_ids[shard_id] = array("q")
+            segment.append(user_id)
+        return {bot_id: RecipientBlock(bot_id, segment) for bot_id, segment in user_ids.items()}
+
+    def _create_run(
+        self,
+        notification_id: int,
+        message: str,
+        profile: RateProfile,
+        operation: str,
+        weight: float = 1.0,
+        max_rate: Optional[float] = None,
+    ) -> BroadcastRun:
+        """Создает запуск массовой операции над уведомлением.
+        
+        Вес и предел частоты задают долю запуска в бюджете ботов,
+        когда одновременно выполняется несколько рассылок.
+        """
+        return BroadcastRun(
+            notification_id=notification_id,
+            message=message,
+            profile=profile,
+            operation=operation,
+            flow=Flow(f"{operation}-{notification_id}", weight=weight, max_rate=max_rate),
+            failures=FailureAggregator(
+                sample_size=self.config.failure_sample_size,
+                summary_interval=self.config.failure_summary_interval,
+            ),
+            ledger=DeliveryLedger(
+                notification_id,
+                writer=self._write_deliveries,
+                batch_size=profile.ledger_batch_size,
+            ),
+            dead_letters=RowBuffer(
+                notification_id,
+                writer=self._write_dead_letters,
+                batch_size=profile.ledger_batch_size,
+                description="очереди недоставленных",
+            ),
+        )
+
+    async def _execute(
+        self,
+        run: BroadcastRun,
+        recipients: Dict[int, Sequence[Any]],
+        handle: RecipientHandler,
+        paid: bool = False,
+        canary: int = 0,
+    ) -> None:
+        """Выполняет запуск через всех ботов одновременно.
+        
+        С canary сначала обрабатываются первые canary получателей, поделенные
+        между ботами по размеру их аудитории. Если доля ошибок среди них выше
+        порога, остальные получатели не обрабатываются, а причина остановки
+        записывается в run.aborted.
+        """
+        run.total = sum(len(items) for items in recipients.values())
+        run.bot_stats = {bot_id: {"sent": 0, "failed": 0} for bot_id in recipients}
+        self.runs[run.notification_id] = run
+        try:
+            if 0 < canary < run.total:
+                heads: Dict[int, Sequence[Any]] = {}
+                for bot_id, items in recipients.items():
+                    heads[bot_id], recipients[bot_id] = items.split(-(-canary * len(items) // run.total))
+                await asyncio.gather(*(
+                    self._run_shard(self._get_shard(bot_id, paid=paid), items, run, handle)
+                    for bot_id, items in heads.items()
+                ))
+                run.aborted = self._canary_verdict(run)
+                if run.aborted is not None:
+                    logger.warning(f"Рассылка уведомления {run.notification_id} остановлена: {run.aborted}")
+                    return
+            await asyncio.gather(*(
+                self._run_shard(self._get_shard(bot_id, paid=paid), items, run, handle)
+                for bot_id, items in recipients.items()
+            ))
+        finally:
+            await run.close()
+            self.runs.pop(run.notification_id, None)
+
+    def _canary_verdict(self, run: BroadcastRun) -> Optional[str]:
+        """Причина остановки запуска по итогам пробной отправки или None.
+        
+        Блокировки, удаленные чаты и перегрузка Telegram не говорят
+        о проблеме в тексте и не учитываются.
+        """
+        done = run.sent + run.failed
+        errors = sum(
+            count
+            for error_type, count in run.failures.counts.items()
+            if error_type not in AUDIENCE_ERROR_TYPES and error_type not in OVERLOAD_ERROR_TYPES
+        )
+        if not done or errors / done <= self.config.canary_max_error_rate:
+            return None
+        return f"ошибки у {errors} из {done} получателей пробной отправки ({run.failures.summary()})"
+
+    async def _preflight(self, payload: NotificationPayload) -> Optional[str]:
+        """Проверяет текст уведомления перед рассылкой и возвращает причину отказа или None.
+        
+        Разметка проверяется локально, затем, если задан чат проверки,
+        уведомление отправляется в него без звука. Недоступный чат проверки
+        и временные ошибки Telegram рассылку не останавливают.
+        """
+        if not self.config.preflight_enabled:
+            return None
+        errors = validate_html(payload.text)
+        if errors:
+            return f"Ошибка разметки текста: {'; '.join(errors)}"
+        if not self.preflight_chat_id:
+            return None
+        
+        shard = self.primary_shard
+        await self._pace_chat(self.preflight_chat_id)
+        await shard.acquire()
+        self.retries.record_request()
+        try:
+            await shard.bot.send_message(
+                chat_id=self.preflight_chat_id,
+                text=payload.text,
+                parse_mode="HTML",
+                disable_notification=True,
+            )
+        except TelegramAPIError as e:
+            if any(error in str(e).lower() for error in INVALID_MESSAGE_ERRORS):
+                return f"Telegram отклонил текст: {e}"
+            logger.warning(f"Не удалось проверить уведомление {payload.id} в чате {self.preflight_chat_id}: {e}")
+        return None
+
+    def get_progress(self, notification_id: int) -> Optional[Dict[str, Any]]:
+        """Возвращает прогресс выполняемой операции над уведомлением."""
+        run = self.runs.get(notification_id)
+        return run.progress() if run else None
+
+    def cancel(self, notification_id: int) -> bool:
+        """Отменяет выполняемую операцию над уведомлением."""
+        run = self.runs.get(notification_id)
+        if run is None:
+            return False
+        run.cancel()
+        logger.info(f"{OPERATION_LABELS[run.operation]} уведомления {notification_id} отменено")
+        return True
+
+    def _reserve(self, notification_id: int) -> bool:
+        """Занимает уведомление под операцию, если над ним не выполняется другая.
+        
+        Проверка и занятие не прерываются ожиданием, поэтому из одновременных
+        вызовов операцию начинает только первый. Занятое уведомление
+        освобождается _release.
+        """
+        if notification_id in self.reserved or notification_id in self.runs:
+            return False
+        self.reserved.add(notification_id)
+        return True
+
+    def _release(self, notification_id: int) -> None:
+        """Освобождает уведомление, занятое _reserve."""
+        self.reserved.discard(notification_id)
+
+    def _snapshot_path(self, notification_id: int) -> Path:
+        """Путь к снимку аудитории уведомления."""
+        return self.config.snapshot_dir / f"notification-{notification_id}.bin"
+
+    async def refresh_audience_columns(self) -> AudienceColumns:
+        """Перестраивает колоночный снимок пользователей постраничной выборкой по ключу."""
+        started = time.monotonic()
+        builder = ColumnsBuilder()
+        after_id = 0
+        while True:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                page = await repository.users.get_columns(after_id, self.config.audience_columns_page_size)
+            if not page:
+                break
+            builder.extend(page)
+            after_id = page[-1][0]
+        
+        self.columns = builder.build()
+        logger.info(
+            f"Колоночный снимок аудитории обновлен: {self.columns.size} пользователей, "
+            f"{self.columns.nbytes / 2 ** 20:.1f} МБ за {time.monotonic() - started:.2f}с"
+        )
+        return self.columns
+
+    async def run_audience_columns(self) -> None:
+        """Периодически обновляет колоночный снимок аудитории, пока задача не отменена."""
+        while True:
+            try:
+                await self.refresh_audience_columns()
+            except Exception as e:
+                logger.error(f"Ошибка обновления колоночного снимка аудитории: {e}")
+            await asyncio.sleep(self.config.audience_columns_refresh_interval)
+
+    def _probe_request(self, shard: BotShard, user_id: int) -> Callable[[], Awaitable[Any]]:
+        """Дешевый запрос к чату пользователя, отвечающий ошибкой для недоступных чатов."""
+        if self.config.liveness_method == "get_chat":
+            return partial(shard.bot.get_chat, chat_id=user_id)
+        return partial(shard.bot.send_chat_action, chat_id=user_id, action=ChatAction.TYPING)
+
+    async def probe_chats(self) -> Dict[str, Any]:
+        """Проверяет доступность чатов активных пользователей и помечает недоступные.
+
+        Проверки идут отдельным потоком с малым весом в очереди к лимиту бота,
+        поэтому уступают рассылкам. Статусы заблокировавших бота и удаленных
+        пользователей записываются пачками, как при ошибках рассылки.
+        """
+        flow = Flow("liveness", weight=self.config.liveness_weight, max_rate=self.config.liveness_max_rate)
+        token = current_flow.set(flow)
+        semaphore = asyncio.Semaphore(self.config.liveness_concurrency)
+        counts: Counter[str] = Counter()
+        started = time.monotonic()
+
+        async def probe(shard: BotShard, user_id: int) -> None:
+            async with semaphore:
+                result = await self._call_telegram(shard, user_id, self._probe_request(shard, user_id))
+            metrics.inc("liveness_probed_total", bot=shard.bot_id)
+            if result["success"]:
+                counts["alive"] += 1
+            elif result["should_retry"]:
+                counts["errors"] += 1
+            else:
+                counts[result["error_type"]] += 1
+                metrics.inc("liveness_pruned_total", bot=shard.bot_id, reason=result["error_type"])
+
+        try:
+            after_id = 0
+            while True:
+                async with SQLSessionContext(self.session_pool) as (repository, uow):
+                    page = await repository.users.get_active_recipients(after_id, self.config.liveness_page_size)
+                if not page:
+                    break
+                await asyncio.gather(*(probe(self._get_shard(bot_id), user_id) for user_id, bot_id in page))
+                after_id = page[-1][0]
+        finally:
+            current_flow.reset(token)
+
+        probed = sum(counts.values())
+        pruned = probed - counts["alive"] - counts["errors"]
+        logger.info(
+            f"Проверка доступности чатов: {probed} проверено, {pruned} недоступно, "
+            f"{counts['errors']} без ответа за {time.monotonic() - started:.1f}с"
+        )
+        return {"probed": probed, "pruned": pruned, **counts}
+
+    async def run_liveness_probe(self) -> None:
+        """Периодически проверяет доступность чатов, пока задача не отменена."""
+        while True:
+            try:
+                await self.probe_chats()
+            except Exception as e:
+                logger.error(f"Ошибка проверки доступности чатов: {e}")
+            await asyncio.sleep(self.config.liveness_interval)
+
+    async def send_to_recipients(
+        self,
+        payload: NotificationPayload,
+        recipients: Iterable[tuple[int, Optional[int]]],
+        operation: str = "campaign",
+    ) -> Dict[int, int]:
+        """Отправляет уведомление получателям (user_id, bot_id) через движок рассылки.
+        
+        Отправка идет с весом и пределом частоты уведомления в общем бюджете ботов,
+        результаты записываются в журнал доставки. Временные ошибки не попадают
+        в очередь недоставленных: повтор планирует вызывающий. Возвращает код
+        результата (DeliveryStatus) по получателям, 0 — получатель не обработан.
+        """
+        paid = payload.paid_broadcast
+        run = self._create_run(
+            payload.id,
+            payload.text,
+            self.paid_profile if paid else self.standard_profile,
+            operation,
+            weight=payload.weight,
+            max_rate=payload.max_rate,
+        )
+        run.dead_letters = None
+        blocks = self._group_recipients(recipients)
+        run.total = sum(len(block) for block in blocks.values())
+        try:
+            await asyncio.gather(*(
+                self._run_shard(self._get_shard(bot_id, paid=paid), block, run, self._send_to_recipient)
+                for bot_id, block in blocks.items()
+            ))
+        finally:
+            await run.close()
+        return {
+            user_id: status
+            for block in blocks.values()
+            for user_id, status in zip(block.user_ids, block.statuses)
+        }
+
+    async def _build_snapshot(
+        self,
+        repository,
+        notification_id: int,
+        path: Optional[Path] = None,
+    ) -> AudienceSnapshot:
+        """Фиксирует активных пользователей в снимке, сгруппировав их по ботам."""
+        path = path or self._snapshot_path(notification_id)
+        expired = AudienceSnapshot.remove_expired(path.parent, self.config.snapshot_ttl)
+        if expired:
+            logger.info(f"Удалено устаревших снимков аудитории: {expired}")
+        if self.audience is not None and self.config.use_audience_index:
+            return await self._build_snapshot_from_index(notification_id, path)
+        
+        builder = SnapshotBuilder()
+        after_id = 0
+        while True:
+            page = await repository.users.get_active_recipients(after_id, self.config.snapshot_page_size)
+            if not page:
+                break
+            for user_id, bot_id in page:
+                builder.add(self._get_shard(bot_id).bot_id, user_id)
+            after_id = page[-1][0]
+        return builder.write(path, notification_id)
+
+    async def _build_snapshot_from_index(self, notification_id: int, path: Path) -> AudienceSnapshot:
+        """Фиксирует активных пользователей по индексу аудитории в Redis, без запросов к Postgres."""
+        builder = SnapshotBuilder()
+        for value in await self.audience.values(BOT):
+            bot_id = self._get_shard(int(value) if value != NO_BOT else None).bot_id
+            async for user_ids in self.audience.iter_members(status=UserStatus.ACTIVE.value, bot=value):
+                for user_id in user_ids:
+                    builder.add(bot_id, user_id)
+        return builder.write(path, notification_id)
+
+    async def enqueue_broadcast(self, notification_id: int) -> Dict[str, Any]:
+        """Ставит рассылку в очередь исходящих заданий Postgres.
+        
+        Задание и статус уведомления фиксируются одной транзакцией,
+        рассылку выполняет воркер очереди исходящих.
+        """
         try:
-            await self._ensure_queue_running()
-            
             async with SQLSessionContext(self.session_pool) as (repository, uow):
                 notification = await repository._get(Notification, Notification.id == notification_id)
                 if not notification:
                     return {
-                        "success": False, 
+                        "success": False,
                         "error": f"Уведомление с ID {notification_id} не найдено"
                     }
-                
+                job = await repository.outbox.add(OutboxKind.BROADCAST, notification_id=notification_id)
+                # _update фиксирует транзакцию вместе с добавленным заданием
+                await repository._update(
+                    Notification,
+                    [Notification.id == notification_id],
+                    load_result=False,
+                    status=NotificationStatus.QUEUED.value
+                )
+        except Exception as e:
+            logger.error(f"Ошибка постановки рассылки уведомления {notification_id} в очередь: {e}")
+            return {
+                "success": False,
+                "error": f"Ошибка постановки в очередь: {str(e)}"
+            }
+        
+        logger.info(f"Рассылка уведомления {notification_id} поставлена в очередь, задание {job.id}")
+        return {
+            "success": True,
+            "message": "Рассылка поставлена в очередь",
+            "job_id": job.id
+        }
+
+    async def enqueue_message(
+        self,
+        user_id: int,
+        message: str,
+        bot_id: Optional[int] = None,
+        notification_id: Optional[int] = None,
+    ) -> int:
+        """Ставит отправку одного сообщения в очередь исходящих заданий и возвращает ID задания."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            job = await repository.outbox.add(
+                OutboxKind.MESSAGE,
+                notification_id=notification_id,
+                payload={"user_id": user_id, "message": message, "bot_id": bot_id},
+            )
+            await repository.session.commit()
+        return job.id
+
+    def outbox_handlers(self) -> Dict[str, Callable[[OutboxJob], Awaitable[None]]]:
+        """Обработчики заданий очереди исходящих для OutboxWorker."""
+        return {
+            OutboxKind.BROADCAST: self._run_outbox_broadcast,
+            OutboxKind.MESSAGE: self._run_outbox_message,
+        }
+
+    async def _run_outbox_broadcast(self, job: OutboxJob) -> None:
+        """Выполняет рассылку из очереди. Повторная попытка продолжает рассылку по снимку."""
+        result = await self.send_bulk_notification(job.notification_id, resume=job.attempts > 1)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "Неизвестная ошибка"))
+
+    async def _run_outbox_message(self, job: OutboxJob) -> None:
+        """Отправляет сообщение из очереди. Повторяются только временные ошибки."""
+        payload = job.payload or {}
+        result = await self.send_notification_to_user(
+            payload["user_id"],
+            payload["message"],
+            bot_id=payload.get("bot_id"),
+        )
+        if not result["success"] and result.get("should_retry"):
+            raise RuntimeError(result.get("message") or result.get("error_type") or "Неизвестная ошибка")
+
+    async def send_bulk_notification(
+        self,
+        notification_id: int,
+        resume: bool = False,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """Массовая рассылка уведомления всем активным пользователям.
+        
+        Аудитория фиксируется в снимке при запуске. С resume=True рассылка
+        продолжается по ранее созданному снимку с сохраненного курсора.
+        В режиме дайджеста новая рассылка ждет окно дайджеста и выполняется
+        вместе с рассылками, запущенными за это время. С dry_run=True ничего
+        не отправляется, возвращается прогноз пробного запуска (simulate_broadcast).
+        """
+        if dry_run:
+            return await self.simulate_broadcast(notification_id)
+        if self.digests is not None and not resume:
+            return await self.digests.submit(notification_id)
+        return await self._send_bulk(notification_id, resume=resume)
+
+    async def _send_bulk(self, notification_id: int, resume: bool = False, preflight: bool = True) -> Dict[str, Any]:
+        """Выполняет рассылку одного уведомления по снимку аудитории.
+        
+        Текст проверяется перед построением снимка, если его еще не проверил дайджест.
+        """
+        start_time = datetime.utcnow()
+        
+        if not self._reserve(notification_id):
+            return {
+                "success": False,
+                "error": f"Для уведомления {notification_id} уже выполняется операция"
+            }
+
+        snapshot: Optional[AudienceSnapshot] = None
+        # Снимок завершенной рассылки удаляется, прерванной — хранится для возобновления
+        completed = False
+        try:
+            await self._ensure_queue_running()
+            
+            payload = await self.get_payload(notification_id)
+            if payload is None:
+                return {
+                    "success": False, 
+                    "error": f"Уведомление с ID {notification_id} не найдено"
+                }
+            
+            # Текст, который Telegram не примет, не должен стоить запроса на каждого получателя
+            rejection = await self._preflight(payload) if preflight else None
+            if rejection is not None:
+                logger.warning(f"Рассылка уведомления {notification_id} не запущена: {rejection}")
+                await self._fail_send([notification_id], rejection)
+                return {"success": False, "error": rejection}
+            
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
                 await repository._update(
                     Notification, 
                     [Notification.id == notification_id], 
                     status=NotificationStatus.SENDING.value
                 )
                 
-                users = await repository.users.get_active_users()
-                if not users:
+                if resume:
+                    snapshot = AudienceSnapshot.open(self._snapshot_path(notification_id))
+                if snapshot is None:
+                    snapshot = await self._build_snapshot(repository, notification_id)
+                
+                if not snapshot.total:
                     await repository._update(
                         Notification, 
                         [Notification.id == notification_id], 
                         status=NotificationStatus.SENT.value,
                         sent_at=datetime.utcnow()
                     )
-                    return {
-                        "success": True, 
-                        "message": "Нет активных пользователей для рассылки", 
-                        "total": 0, 
-                        "sent": 0, 
-                        "failed": 0
-                    }
-                
-                # Отправляем уведомления напрямую для получения реальных результатов
-                sent_count = 0
-                failed_count = 0
-                failed_users = []
+                    completed = True
+                    return self._empty_audience_result()
                 
-                for user in users:
-                    result = await self.send_notification_to_user(user.id, notification.text)
-                    
-                    if result["success"]:
-                        sent_count += 1
-                    else:
-                        failed_count += 1
-                        failed_users.append({
-                            "user_id": user.id,
-                            "error_type": result["error_type"],
-                            "message": result["message"]
-                        })
-                        
-                        # Логируем детали ошибки
-                        logger.warning(
-                            f"Не удалось отправить уведомление {notification_id} пользователю {user.id}: "
-                            f"{result['error_type']} - {result['message']}"
-                        )
-                
-                end_time = datetime.utcnow()
-                duration = (end_time - start_time).total_seconds()
+                # Профиль нагрузки зависит от тарифа рассылки
+                paid = payload.paid_broadcast
+                profile = self.paid_profile if paid else self.standard_profile
+                message = payload.text
+            
+            # Получатели читаются из снимка, соединение с базой на время рассылки не удерживается
+            run = self._create_run(
+                notification_id, message, profile, "send", weight=payload.weight, max_rate=payload.max_rate
+            )
+            run.snapshot = snapshot
+            await self._execute(
+                run,
+                self._snapshot_recipients(snapshot),
+                self._send_to_recipient,
+                paid=paid,
+                canary=self.config.canary_size,
+            )
+            result = await self._finish_send([notification_id], run, snapshot, start_time)
+            completed = not run.cancelled and run.aborted is None
+            return result
                 
-                # Определяем финальный статус уведомления
-                if failed_count == 0:
-                    status = NotificationStatus.SENT.value
-                    error_msg = None
-                elif sent_count == 0:
-                    status = NotificationStatus.FAILED.value
-                    error_msg = f"Не удалось отправить ни одному пользователю из {len(users)}"
-                else:
-                    status = NotificationStatus.SENT.value  # Частично успешно
-                    error_msg = f"Отправлено {sent_count} из {len(users)}, не удалось отправить {failed_count}"
+        except Exception as e:
+            logger.error(f"Ошибка при массовой рассылке уведомления {notification_id}: {e}")
+            await self._fail_send([notification_id], e)
+            return {
+                "success": False, 
+                "error": f"Ошибка при рассылке: {str(e)}"
+            }
+        
+        finally:
+            if snapshot is not None and completed:
+                snapshot.delete()
+            elif snapshot is not None:
+                snapshot.close()
+            self._release(notification_id)
+
+    async def _send_digest(self, notification_ids: List[int]) -> List[Dict[str, Any]]:
+        """Выполняет рассылки, запущенные в пределах окна дайджеста.
+        
+        Уведомления одного тарифа рассылаются общим проходом по аудитории,
+        одиночное уведомление рассылается как обычно.
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        groups: Dict[bool, List[NotificationPayload]] = {}
+        for notification_id in dict.fromkeys(notification_ids):
+            if notification_id in self.reserved or notification_id in self.runs:
+                results[notification_id] = {
+                    "success": False,
+                    "error": f"Для уведомления {notification_id} уже выполняется операция"
+                }
+                continue
+            try:
+                payload = await self.get_payload(notification_id)
+            except Exception as e:
+                logger.error(f"Ошибка чтения уведомления {notification_id} для дайджеста: {e}")
+                results[notification_id] = {"success": False, "error": f"Ошибка при рассылке: {str(e)}"}
+                continue
+            if payload is None:
+                results[notification_id] = {
+                    "success": False,
+                    "error": f"Уведомление с ID {notification_id} не найдено"
+                }
+                continue
+            rejection = await self._preflight(payload)
+            if rejection is not None:
+                logger.warning(f"Уведомление {notification_id} исключено из дайджеста: {rejection}")
+                await self._fail_send([notification_id], rejection)
+                results[notification_id] = {"success": False, "error": rejection}
+                continue
+            groups.setdefault(payload.paid_broadcast, []).append(payload)
+        
+        # Обычные и платные рассылки окна идут разными профилями и не ждут друг друга
+        for group_results in await asyncio.gather(*(
+            self._send_digest_group(payloads, paid) for paid, payloads in groups.items()
+        )):
+            results.update(group_results)
+        return [results[notification_id] for notification_id in notification_ids]
+
+    async def _send_digest_group(
+        self,
+        payloads: Sequence[NotificationPayload],
+        paid: bool,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Рассылает уведомления одного тарифа из окна дайджеста."""
+        if len(payloads) == 1:
+            return {payloads[0].id: await self._send_bulk(payloads[0].id, preflight=False)}
+        return await self._send_combined(payloads, paid)
+
+    async def _send_combined(self, payloads: Sequence[NotificationPayload], paid: bool) -> Dict[int, Dict[str, Any]]:
+        """Рассылает несколько уведомлений одним проходом по общему снимку аудитории.
+        
+        Все уведомления дайджеста заняты до конца рассылки, в том числе пока
+        идут сообщения с другими уведомлениями. Уведомления, над которыми уже
+        выполняется операция, в дайджест не входят.
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        reserved: List[NotificationPayload] = []
+        for payload in payloads:
+            if self._reserve(payload.id):
+                reserved.append(payload)
+            else:
+                results[payload.id] = {
+                    "success": False,
+                    "error": f"Для уведомления {payload.id} уже выполняется операция"
+                }
+        if not reserved:
+            return results
+        try:
+            results.update(await self._send_digest_parts(reserved, paid))
+        finally:
+            for payload in reserved:
+                self._release(payload.id)
+        return results
+
+    async def _send_digest_parts(
+        self,
+        payloads: Sequence[NotificationPayload],
+        paid: bool,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Рассылает сообщения дайджеста по общему снимку аудитории.
+        
+        Тексты склеиваются в сообщения до лимита Telegram; каждое сообщение
+        рассылается отдельным запуском, доставка засчитывается всем вошедшим
+        в него уведомлениям. Снимок строится от первого уведомления, поэтому
+        повторная попытка после сбоя рассылает уведомления по отдельности.
+        """
+        start_time = datetime.utcnow()
+        notification_ids = [payload.id for payload in payloads]
+        snapshot: Optional[AudienceSnapshot] = None
+        completed = False
+        try:
+            await self._ensure_queue_running()
+            
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                await repository._update(
+                    Notification,
+                    [Notification.id.in_(notification_ids)],
+                    status=NotificationStatus.SENDING.value
+                )
+                snapshot = await self._build_snapshot(repository, notification_ids[0])
                 
+                if not snapshot.total:
+                    await repository._update(
+                        Notification,
+                        [Notification.id.in_(notification_ids)],
+                        status=NotificationStatus.SENT.value,
+                        sent_at=datetime.utcnow()
+                    )
+                    completed = True
+                    return {notification_id: self._empty_audience_result() for notification_id in notification_ids}
+            
+            profile = self.paid_profile if paid else self.standard_profile
+            parts = pack_digest((payload.id, payload.text) for payload in payloads)
+            # Дайджест получает наибольший вес и самый строгий предел частоты из объединенных рассылок
+            weight = max(payload.weight for payload in payloads)
+            max_rate = min((payload.max_rate for payload in payloads if payload.max_rate), default=None)
+            logger.info(
+                f"Дайджест уведомлений {notification_ids}: {len(parts)} сообщений "
+                f"вместо {len(notification_ids)} на получателя"
+            )
+            
+            results: Dict[int, Dict[str, Any]] = {}
+            interrupted = False
+            for part in parts:
+                leader, *credited = part.notification_ids
+                run = self._create_run(leader, part.text, profile, "send", weight=weight, max_rate=max_rate)
+                # Строки журнала помечаются дайджестом: правка или удаление сообщения
+                # одного уведомления затронули бы тексты остальных
+                writer = self._write_deliveries
+                if credited:
+                    writer = partial(self._write_deliveries, digest_id=leader)
+                run.ledger, *run.credits = [
+                    DeliveryLedger(
+                        notification_id,
+                        writer=writer,
+                        batch_size=profile.ledger_batch_size,
+                    )
+                    for notification_id in part.notification_ids
+                ]
+                # Каждое уведомление дайджеста повторно отправляется из очереди недоставленных
+                # своим текстом, отдельным сообщением
+                run.credit_dead_letters = [
+                    RowBuffer(
+                        notification_id,
+                        writer=self._write_dead_letters,
+                        batch_size=profile.ledger_batch_size,
+                        description="очереди недоставленных",
+                    )
+                    for notification_id in credited
+                ]
+                # Прогресс и отмена доступны по любому уведомлению дайджеста
+                for notification_id in credited:
+                    self.runs[notification_id] = run
+                try:
+                    await self._execute(
+                        run,
+                        self._snapshot_recipients(snapshot),
+                        self._send_to_recipient,
+                        paid=paid,
+                        canary=self.config.canary_size,
+                    )
+                finally:
+                    for notification_id in credited:
+                        self.runs.pop(notification_id, None)
+                result = await self._finish_send(part.notification_ids, run, snapshot, start_time)
+                interrupted = interrupted or run.cancelled or run.aborted is not None
+                for notification_id in part.notification_ids:
+                    results[notification_id] = {**result, "digest": list(part.notification_ids)}
+            completed = not interrupted
+            return results
+        
+        except Exception as e:
+            logger.error(f"Ошибка при рассылке дайджеста уведомлений {notification_ids}: {e}")
+            await self._fail_send(notification_ids, e)
+            return {
+                notification_id: {"success": False, "error": f"Ошибка при рассылке: {str(e)}"}
+                for notification_id in notification_ids
+            }
+        
+        finally:
+            if snapshot is not None and completed:
+                snapshot.delete()
+            elif snapshot is not None:
+                snapshot.close()
+
+    def _snapshot_recipients(self, snapshot: AudienceSnapshot) -> Dict[int, RecipientBlock]:
+        """Блоки получателей снимка по настроенным ботам."""
+        recipients = {}
+        for bot_id in snapshot.segments:
+            if bot_id not in self.shards:
+                logger.warning(
+                    f"Бот {bot_id} из снимка уведомления {snapshot.notification_id} не настроен, "
+                    f"его получатели пропущены"
+                )
+                continue
+            recipients[bot_id] = RecipientBlock(bot_id, snapshot.segment(bot_id))
+        return recipients
+
+    @staticmethod
+    def _empty_audience_result() -> Dict[str, Any]:
+        return {
+            "success": True, 
+            "message": "Нет активных пользователей для рассылки", 
+            "total": 0, 
+            "sent": 0, 
+            "failed": 0
+        }
+
+    async def _finish_send(
+        self,
+        notification_ids: Sequence[int],
+        run: BroadcastRun,
+        snapshot: AudienceSnapshot,
+        start_time: datetime,
+    ) -> Dict[str, Any]:
+        """Записывает итог рассылки в уведомления и возвращает результат запуска."""
+        failures = run.failures
+        bot_stats = run.bot_stats
+        sent_count = run.sent
+        total = snapshot.total
+        
+        end_time = datetime.utcnow()
+        duration = (end_time - start_time).total_seconds()
+        failed_count = failures.total
+        
+        # Определяем финальный статус уведомления
+        if run.aborted is not None:
+            status = NotificationStatus.FAILED.value
+            error_msg = f"Рассылка остановлена после пробной отправки: {run.aborted}"
+        elif run.cancelled:
+            status = NotificationStatus.CANCELLED.value
+            error_msg = f"Рассылка отменена: отправлено {sent_count} из {total}"
+        elif failed_count == 0:
+            status = NotificationStatus.SENT.value
+            error_msg = None
+        elif sent_count == 0:
+            status = NotificationStatus.FAILED.value
+            error_msg = f"Не удалось отправить ни одному пользователю из {total}"
+        else:
+            status = NotificationStatus.SENT.value  # Частично успешно
+            error_msg = f"Отправлено {sent_count} из {total}, не удалось отправить {failed_count}"
+        
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            for notification_id in notification_ids:
                 await repository._update(
                     Notification, 
                     [Notification.id == notification_id], 
                     status=status,
                     error=error_msg,
-                    sent_at=end_time
+                    sent_at=end_time,
+                    failure_summary=failures.to_dict() if failed_count else None
                 )
-                
-                logger.info(
-                    f"Рассылка уведомления {notification_id} завершена: "
-                    f"{sent_count} отправлено, {failed_count} ошибок за {duration:.2f}s"
+        
+        label = ", ".join(str(notification_id) for notification_id in notification_ids)
+        logger.info(
+            f"Рассылка уведомления {label} завершена: "
+            f"{sent_count} отправлено, {failed_count} ошибок за {duration:.2f}s, "
+            f"профиль {run.profile.name}, по ботам: {bot_stats}"
+        )
+        
+        if failed_count:
+            logger.info(f"Ошибки рассылки уведомления {label}: {failures.summary()}")
+        
+        return {
+            "success": run.aborted is None,
+            "message": f"Рассылка завершена за {duration:.2f} секунд",
+            "total": total,
+            "sent": sent_count,
+            "failed": failed_count,
+            "duration": duration,
+            "failures": failures.to_dict(),
+            "bots": bot_stats,
+            "profile": run.profile.name,
+            "cancelled": run.cancelled,
+            "aborted": run.aborted,
+            "remaining": snapshot.remaining
+        }
+
+    async def _fail_send(self, notification_ids: Sequence[int], error: Union[Exception, str]) -> None:
+        """Отмечает уведомления неотправленными после ошибки рассылки."""
+        try:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                await repository._update(
+                    Notification, 
+                    [Notification.id.in_(notification_ids)], 
+                    status=NotificationStatus.FAILED.value,
+                    error=str(error)
                 )
-                
-                if failed_users:
-                    logger.info(f"Детали ошибок для уведомления {notification_id}: {failed_users}")
-                
+        except Exception as update_error:
+            logger.error(f"Ошибка обновления статуса уведомления {notification_ids}: {update_error}")
+
+    async def simulate_broadcast(self, notification_id: int) -> Dict[str, Any]:
+        """Пробный запуск рассылки: прогноз длительности, стоимости и нагрузки без отправки.
+        
+        Аудитория фиксируется в отдельном снимке так же, как при рассылке.
+        Затем запуск с повторами временных ошибок выполняется в отдельном
+        потоке, в цикле с виртуальными часами. Запросы к Telegram выполняют
+        симулированные боты с настроенными задержкой и долей ошибок, записи
+        в базу только подсчитываются.
+        """
+        payload = await self.get_payload(notification_id)
+        if payload is None:
+            return {
+                "success": False,
+                "error": f"Уведомление с ID {notification_id} не найдено"
+            }
+        
+        path = self._snapshot_path(notification_id).with_name(f"notification-{notification_id}-dry-run.bin")
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            snapshot = await self._build_snapshot(repository, notification_id, path=path)
+        try:
+            report = await asyncio.to_thread(run_virtual, lambda: self._simulate(snapshot, payload))
+        finally:
+            snapshot.delete()
+        
+        if not self.config.use_audience_index or self.audience is None:
+            # Постраничная выборка аудитории, включая последнюю пустую страницу
+            pages = -(-snapshot.total // self.config.snapshot_page_size) + 1
+            report["db"]["audience"] = {"queries": pages, "rows": snapshot.total}
+        logger.info(
+            f"Пробный запуск уведомления {notification_id}: {report['total']} получателей "
+            f"за {report['duration']:.0f}с, {report['requests']} запросов, "
+            f"пик памяти {report['peak_memory'] / 2 ** 20:.1f} МБ"
+        )
+        return report
+
+    async def _simulate(self, snapshot: AudienceSnapshot, payload: NotificationPayload) -> Dict[str, Any]:
+        """Выполняет запуск по снимку на симулированных ботах в цикле с виртуальными часами."""
+        started_at = time.perf_counter()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        
+        loop = asyncio.get_running_loop()
+        rng = random.Random(payload.id)
+        bots = [
+            SimulatedBot(
+                bot_id,
+                latency=self.config.dry_run_latency,
+                jitter=self.config.dry_run_latency_jitter,
+                error_rates=self.config.dry_run_error_rates,
+                rng=rng,
+            )
+            for bot_id in self.shards
+        ]
+        service = DryRunNotificationService(bots, self.config)
+        paid = payload.paid_broadcast
+        profile = service.paid_profile if paid else service.standard_profile
+        blocks = service._snapshot_recipients(snapshot)
+        total = sum(len(block) for block in blocks.values())
+        start = loop.time()
+        
+        sent = retried = denied = attempt = 0
+        while blocks:
+            run = service._create_run(
+                payload.id, payload.text, profile, "send", weight=payload.weight, max_rate=payload.max_rate
+            )
+            last_attempt = attempt == self.config.dry_run_max_retries
+            if not last_attempt:
+                # Как и в очереди, в недоставленные попадают только исчерпавшие попытки
+                run.dead_letters = None
+            await service._execute(run, blocks, service._send_to_recipient, paid=paid)
+            sent += run.sent
+            if last_attempt:
+                break
+            retries: Dict[int, RecipientBlock] = {}
+            for bot_id, block in blocks.items():
+                retry = block.select(DeliveryStatus.RETRYABLE, max_retries=self.config.dry_run_max_retries)
+                retry, rows = service._spend_retry_budget(retry)
+                if rows:
+                    denied += len(rows)
+                    await service._write_dead_letters(payload.id, rows)
+                if len(retry):
+                    retries[bot_id] = retry
+            blocks = retries
+            if blocks:
+                attempt += 1
+                retried += sum(len(block) for block in blocks.values())
+                await asyncio.sleep(2 ** attempt)
+        await service.status_writes.close()
+        
+        duration = loop.time() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        
+        requests = sum(bot.requests for bot in bots)
+        errors: Counter[str] = Counter()
+        for bot in bots:
+            errors.update(bot.errors)
+        service.db.add("notifications", rows=2, queries=2)
+        return {
+            "success": True,
+            "dry_run": True,
+            "total": total,
+            "sent": sent,
+            "failed": total - sent,
+            "retried": retried,
+            "retries_denied": denied,
+            "retry_rounds": attempt,
+            "requests": requests,
+            "errors": dict(errors),
+            "duration": round(duration, 3),
+            "rate": round(requests / duration, 2) if duration > 0 else 0.0,
+            "profile": profile.name,
+            # Ошибки разметки, из-за которых настоящая рассылка не будет запущена
+            "preflight": validate_html(payload.text),
+            "stars": round(requests * self.config.paid_message_stars, 2) if paid else 0.0,
+            "peak_memory": peak_memory,
+            "snapshot_bytes": snapshot.size,
+            "db": service.db.to_dict(),
+            "wall_time": round(time.perf_counter() - started_at, 3),
+        }
+
+    async def retry_failed_deliveries(self, notification_id: int) -> Dict[str, Any]:
+        """Повторно отправляет уведомление только получателям с временной ошибкой доставки.
+        
+        Получатели берутся из журнала доставки, поэтому стоимость повтора
+        пропорциональна числу ошибок, а не размеру аудитории. Успешная
+        отправка переводит запись журнала в SENT, так что повторный вызов
+        не приводит к дублям.
+        """
+        start_time = datetime.utcnow()
+        
+        if not self._reserve(notification_id):
+            return {
+                "success": False,
+                "error": f"Для уведомления {notification_id} уже выполняется операция"
+            }
+        
+        try:
+            payload = await self.get_payload(notification_id)
+            if payload is None:
                 return {
-                    "success": True,
-                    "message": f"Рассылка завершена за {duration:.2f} секунд",
-                    "total": len(users),
-                    "sent": sent_count,
-                    "failed": failed_count,
-                    "duration": duration,
-                    "failed_users": failed_users
+                    "success": False, 
+                    "error": f"Уведомление с ID {notification_id} не найдено"
                 }
-                
-        except Exception as e:
-            logger.error(f"Ошибка при массовой рассылке уведомления {notification_id}: {e}")
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                failed = await repository.deliveries.get_recipients(notification_id, DeliveryStatus.RETRYABLE)
             
-            try:
+            recipients = self._group_recipients(failed)
+            
+            paid = payload.paid_broadcast
+            profile = self.paid_profile if paid else self.standard_profile
+            run = self._create_run(
+                notification_id, payload.text, profile, "retry", weight=payload.weight, max_rate=payload.max_rate
+            )
+            # Доставленные повторно получатели убираются и из очереди недоставленных
+            run.resolved = RowBuffer(
+                notification_id,
+                writer=self._resolve_dead_letters,
+                batch_size=profile.ledger_batch_size,
+                description="очереди недоставленных",
+            )
+            await self._execute(run, recipients, self._redrive_recipient, paid=paid)
+            
+            duration = (datetime.utcnow() - start_time).total_seconds()
+            if run.total and not run.cancelled:
+                error_msg = None
+                if run.failed:
+                    error_msg = f"Повтор: отправлено {run.sent} из {run.total}, не удалось отправить {run.failed}"
                 async with SQLSessionContext(self.session_pool) as (repository, uow):
                     await repository._update(
-                        Notification, 
-                        [Notification.id == notification_id], 
-                        status=NotificationStatus.FAILED.value,
-                        error=str(e)
+                        Notification,
+                        [Notification.id == notification_id],
+                        status=NotificationStatus.SENT.value if run.sent else NotificationStatus.FAILED.value,
+                        error=error_msg,
+                        sent_at=datetime.utcnow()
                     )
-            except Exception as update_error:
-                logger.error(f"Ошибка обновления статуса уведомления {notification_id}: {update_error}")
+            
+            logger.info(
+                f"Повтор неудачных доставок уведомления {notification_id} завершен: "
+                f"{run.sent} из {run.total} отправлено, {run.failed} ошибок за {duration:.2f}s"
+            )
             
             return {
-                "success": False, 
-                "error": f"Ошибка при рассылке: {str(e)}"
+                "success": True,
+                "message": f"Повтор завершен за {duration:.2f} секунд",
+                "total": run.total,
+                "sent": run.sent,
+                "failed": run.failed,
+                "duration": duration,
+                "failures": run.failures.to_dict(),
+                "cancelled": run.cancelled
+            }
+        
+        except Exception as e:
+            logger.error(f"Ошибка повтора неудачных доставок уведомления {notification_id}: {e}")
+            return {
+                "success": False,
+                "error": f"Ошибка повтора: {str(e)}"
+            }
+        
+        finally:
+            self._release(notification_id)
+
+    async def edit_bulk_notification(self, notification_id: int, text: Optional[str] = None) -> Dict[str, Any]:
+        """Редактирует уведомление у всех пользователей, которым оно было доставлено.
+
+        Если передан новый текст, он сохраняется в уведомлении, иначе
+        используется текущий текст уведомления.
+        """
+        return await self._run_message_operation(notification_id, "edit", text)
+
+    async def delete_bulk_notification(self, notification_id: int) -> Dict[str, Any]:
+        """Удаляет уведомление у всех пользователей, которым оно было доставлено."""
+        return await self._run_message_operation(notification_id, "delete")
+
+    async def _run_message_operation(
+        self,
+        notification_id: int,
+        operation: str,
+        text: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Выполняет массовое редактирование или удаление доставленных сообщений."""
+        start_time = datetime.utcnow()
+        label = OPERATION_LABELS[operation]
+
+        if not self._reserve(notification_id):
+            return {
+                "success": False,
+                "error": f"Для уведомления {notification_id} уже выполняется операция"
+            }
+
+        try:
+            payload = await self.get_payload(notification_id)
+            if payload is None:
+                return {
+                    "success": False, 
+                    "error": f"Уведомление с ID {notification_id} не найдено"
+                }
+            
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                if text is not None:
+                    updated = await repository._update(
+                        Notification,
+                        [Notification.id == notification_id],
+                        text=text,
+                        version=Notification.version + 1,
+                    )
+                    if updated is not None:
+                        await self.invalidate_payload(notification_id, updated.version)
+                message = text if text is not None else payload.text
+                messages = await repository.deliveries.get_messages(notification_id, DeliveryStatus.SENT)
+                # Сообщения дайджестов содержат тексты других уведомлений и не изменяются
+                in_digests = await repository.deliveries.count_digest_messages(
+                    notification_id, DeliveryStatus.SENT
+                )
+            if in_digests:
+                logger.warning(
+                    f"{label} уведомления {notification_id}: {in_digests} сообщений "
+                    f"отправлены дайджестом и пропущены"
+                )
+
+            # Сообщение редактируется и удаляется тем ботом, который его отправил
+            recipients: Dict[int, MessageBlock] = {}
+            for user_id, message_id, bot_id in messages:
+                shard_id = self._get_shard(bot_id).bot_id
+                block = recipients.get(shard_id)
+                if block is None:
+                    block = recipients[shard_id] = MessageBlock(shard_id)
+                block.append(user_id, message_id)
+
+            run = self._create_run(
+                notification_id, message, self.standard_profile, operation,
+                weight=payload.weight, max_rate=payload.max_rate,
+            )
+            handle = self._edit_recipient if operation == "edit" else self._delete_recipient
+            await self._execute(run, recipients, handle)
+
+            duration = (datetime.utcnow() - start_time).total_seconds()
+            if operation == "delete" and not run.cancelled and run.sent:
+                async with SQLSessionContext(self.session_pool) as (repository, uow):
+                    await repository._update(
+                        Notification,
+                        [Notification.id == notification_id],
+                        status=NotificationStatus.DELETED.value
+                    )
+
+            logger.info(
+                f"{label} уведомления {notification_id} завершено: "
+                f"{run.sent} из {run.total} выполнено, {run.failed} ошибок за {duration:.2f}s"
+            )
+            if run.failed:
+                logger.info(f"Ошибки операции над уведомлением {notification_id}: {run.failures.summary()}")
+
+            return {
+                "success": True,
+                "message": f"{label} завершено за {duration:.2f} секунд",
+                "operation": operation,
+                "total": run.total,
+                "done": run.sent,
+                "failed": run.failed,
+                "skipped_digests": in_digests,
+                "duration": duration,
+                "failures": run.failures.to_dict(),
+                "cancelled": run.cancelled
             }
 
+        except Exception as e:
+            logger.error(f"Ошибка операции {operation} над уведомлением {notification_id}: {e}")
+            return {
+                "success": False,
+                "error": f"Ошибка операции: {str(e)}"
+            }
+
+        finally:
+            self._release(notification_id)
+
+    async def get_dead_letter_summary(self, notification_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Количество недоставленных уведомлений, сгруппированное по уведомлению и типу ошибки."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            rows = await repository.dead_letters.summary(notification_id)
+        return [
+            {"notification_id": notification_id, "error_type": error_type, "count": count}
+            for notification_id, error_type, count in rows
+        ]
+
+    async def get_dead_letters(
+        self,
+        notification_id: Optional[int] = None,
+        error_type: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Список недоставленных уведомлений с контекстом ошибки."""
+        async with SQLSessionContext(self.session_pool) as (repository, uow):
+            letters = await repository.dead_letters.get_many(notification_id, error_type, limit=limit, offset=offset)
+        return [
+            {
+                "id": letter.id,
+                "notification_id": letter.notification_id,
+                "user_id": letter.user_id,
+                "bot_id": letter.bot_id,
+                "error_type": letter.error_type,
+                "error_message": letter.error_message,
+                "attempts": letter.attempts,
+                "created_at": letter.created_at,
+                "updated_at": letter.updated_at
+            }
+            for letter in letters
+        ]
+
+    async def redrive_dead_letters(
+        self,
+        notification_id: Optional[int] = None,
+        error_type: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        limit: int = 10000,
+    ) -> Dict[str, Any]:
+        """Повторно отправляет недоставленные уведомления, выбранные по фильтрам.
+
+        Отправка идет через те же шарды, лимиты частоты и окна параллелизма,
+        что и обычная рассылка. Уведомления обрабатываются по очереди.
+        """
+        start_time = datetime.utcnow()
+        try:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                letters = await repository.dead_letters.get_many(notification_id, error_type, ids, limit=limit)
+                # Получатели группируются по уведомлению и боту, через которого шла доставка
+                rows: Dict[int, List[tuple[int, Optional[int]]]] = {}
+                for letter in letters:
+                    rows.setdefault(letter.notification_id, []).append((letter.user_id, letter.bot_id))
+                groups = {current_id: self._group_recipients(items) for current_id, items in rows.items()}
+                notifications = {
+                    notification.id: notification
+                    for notification in await repository._get_many(Notification, Notification.id.in_(groups))
+                } if groups else {}
+        except Exception as e:
+            logger.error(f"Ошибка выборки очереди недоставленных: {e}")
+            return {
+                "success": False,
+                "error": f"Ошибка выборки очереди недоставленных: {str(e)}"
+            }
+
+        results: Dict[int, Dict[str, Any]] = {}
+        for current_id, recipients in groups.items():
+            notification = notifications.get(current_id)
+            if notification is None:
+                results[current_id] = {"success": False, "error": f"Уведомление с ID {current_id} не найдено"}
+                continue
+            if not self._reserve(current_id):
+                results[current_id] = {
+                    "success": False,
+                    "error": f"Для уведомления {current_id} уже выполняется операция"
+                }
+                continue
+
+            paid = bool(notification.paid_broadcast)
+            profile = self.paid_profile if paid else self.standard_profile
+            run = self._create_run(
+                current_id, notification.text, profile, "redrive",
+                weight=notification.weight or 1.0, max_rate=notification.max_rate,
+            )
+            run.resolved = RowBuffer(
+                current_id,
+                writer=self._resolve_dead_letters,
+                batch_size=profile.ledger_batch_size,
+                description="очереди недоставленных",
+            )
+            try:
+                await self._execute(run, recipients, self._redrive_recipient, paid=paid)
+            finally:
+                self._release(current_id)
+            results[current_id] = {
+                "success": True,
+                "total": run.total,
+                "sent": run.sent,
+                "failed": run.failed,
+                "failures": run.failures.to_dict(),
+                "cancelled": run.cancelled
+            }
+            logger.info(
+                f"Повторная отправка уведомления {current_id} из очереди недоставленных: "
+                f"{run.sent} из {run.total} доставлено, {run.failed} ошибок"
+            )
+
+        duration = (datetime.utcnow() - start_time).total_seconds()
+        return {
+            "success": True,
+            "message": f"Повторная отправка завершена за {duration:.2f} секунд",
+            "total": len(letters),
+            "sent": sum(result.get("sent", 0) for result in results.values()),
+            "failed": sum(result.get("failed", 0) for result in results.values()),
+            "duration": duration,
+            "notifications": results
+        }
+
     async def get_notification_stats(self, notification_id: int) -> Optional[Dict[str, Any]]:
         """Получить статистику по уведомлению."""
         try:
@@ -438,6 +2246,7 @@ class NotificationService:
                     "text": notification.text,
                     "status": notification.status,
                     "error": notification.error,
+                    "failure_summary": notification.failure_summary,
                     "created_at": notification.created_at,
                     "sent_at": notification.sent_at,
                     "updated_at": notification.updated_at
@@ -448,6 +2257,41 @@ class NotificationService:
     
     async def cleanup(self):
         """Очистка ресурсов."""
+        if self.digests is not None:
+            await self.digests.close()
         if self._queue_started:
             await self.queue.stop()
-            self._queue_started = False 
\ No newline at end of file
+            self._queue_started = False
+        await self.status_writes.close()
+        for shard in self.paid_shards.values():
+            await shard.bot.session.close()
+        self.paid_shards.clear() 
+
+
+class DryRunNotificationService(NotificationService):
+    """Сервис пробного запуска: боты симулированы, записи в базу только подсчитываются."""
+
+    def __init__(self, bots: Sequence[SimulatedBot], config: BroadcastConfig) -> None:
+        super().__init__(bots[0], session_pool=None, config=config, bots=bots[1:])
+        self.db = DbLoad()
+        # Платные шарды создаются сразу: сессию симулированного бота не нужно клонировать
+        for bot_id, shard in self.shards.items():
+            self.paid_shards[bot_id] = self._create_shard(shard.bot, self.paid_profile)
+
+    def _create_shard(self, bot: Bot, profile: RateProfile) -> BotShard:
+        """Шард с отдельными именами метрик, чтобы не затирать датчики рабочих шардов."""
+        return SimulatedShard.from_config(bot, self.config, profile=replace(profile, name=f"dry-run-{profile.name}"))
+
+    async def _write_deliveries(
+        self,
+        notification_id: int,
+        rows: List[tuple[int, int, Optional[int]]],
+    ) -> None:
+        self.db.add("notification_deliveries", len(rows))
+
+    async def _write_dead_letters(self, notification_id: int, rows: List[DeadLetterRow]) -> None:
+        self.db.add("dead_letters", len(rows))
+
+    async def _write_user_statuses(self, updates: List[tuple[int, str]]) -> List[Optional[User]]:
+        self.db.add("users", len({user_id for user_id, _ in updates}))
+        return [None] * len(updates)
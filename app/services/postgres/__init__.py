@@ -1,5 +1,7 @@
+from .coalescer import WriteCoalescer
 from .context import SQLSessionContext
+from .outbox import OutboxWorker
 from .repositories import Repository
 from .uow import UoW
 
-__all__ = ["Repository", "UoW", "SQLSessionContext"]
+__all__ = ["OutboxWorker", "Repository", "UoW", "SQLSessionContext", "WriteCoalescer"]
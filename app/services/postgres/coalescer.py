@@ -0,0 +1,123 @@
+"""
+Объединение одиночных записей в пакетные.
+
+Горячие пути (смена статуса пользователя во время рассылки, блокировка
+и разблокировка бота, регистрация при всплеске /start) пишут в базу по
+одной строке. Объединитель собирает такие записи в пачку до max_items
+элементов или max_delay секунд и передает ее функции записи, которая
+выполняет пачку многострочными запросами в одной транзакции. Каждый
+вызывающий получает свой результат, а если запись не успевает за потоком,
+новые вызовы ждут освобождения места.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Optional, Sequence, TypeVar
+
+from app.utils.logging import database as logger
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+# Записывает пачку в одной транзакции и возвращает результаты в порядке элементов
+BatchWriter = Callable[[list[Item]], Awaitable[Sequence[Result]]]
+
+
+class WriteCoalescer(Generic[Item, Result]):
+    """Буфер одиночных записей с пакетной записью в одной транзакции."""
+
+    def __init__(
+        self,
+        writer: BatchWriter[Item, Result],
+        max_items: int = 500,
+        max_delay: float = 0.01,
+        max_pending: int = 10000,
+        name: str = "default",
+    ) -> None:
+        self.max_items = max(1, max_items)
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_items, max_pending)
+        self.name = name
+        self.written = 0
+        self.flushes = 0
+        self._writer = writer
+        self._pending: list[tuple[Item, asyncio.Future[Result]]] = []
+        self._task: Optional[asyncio.Task[None]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._closed = False
+
+    def _get_wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def _get_space(self) -> asyncio.Condition:
+        if self._space is None:
+            self._space = asyncio.Condition()
+        return self._space
+
+    @property
+    def pending(self) -> int:
+        """Количество записей, ожидающих отправки в базу."""
+        return len(self._pending)
+
+    async def submit(self, item: Item) -> Result:
+        """Ставит запись в пачку и ожидает результат ее выполнения."""
+        if self._closed:
+            raise RuntimeError(f"Объединитель записей {self.name} закрыт")
+        if len(self._pending) >= self.max_pending:
+            space = self._get_space()
+            async with space:
+                await space.wait_for(lambda: len(self._pending) < self.max_pending)
+
+        future: asyncio.Future[Result] = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.max_items:
+            self._get_wakeup().set()
+        return await future
+
+    async def _run(self) -> None:
+        wakeup = self._get_wakeup()
+        while self._pending:
+            # Пачка копится до max_items элементов или max_delay секунд
+            if len(self._pending) < self.max_items and not self._closed:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            wakeup.clear()
+            batch, self._pending = self._pending[:self.max_items], self._pending[self.max_items:]
+            space = self._get_space()
+            async with space:
+                space.notify_all()
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[Item, asyncio.Future[Result]]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self._writer(items)
+            if len(results) != len(items):
+                raise ValueError(f"Получено {len(results)} результатов для {len(items)} записей")
+        except Exception as e:
+            logger.error(f"Ошибка пакетной записи {self.name} ({len(items)} записей): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.written += len(items)
+        self.flushes += 1
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Дописывает накопленные записи и перестает принимать новые."""
+        self._closed = True
+        self._get_wakeup().set()
+        if self._task is not None:
+            await self._task
@@ -0,0 +1,188 @@
+"""
+Воркер очереди исходящих заданий в Postgres.
+
+Воркер забирает задания пачками через SELECT ... FOR UPDATE SKIP LOCKED,
+поэтому несколько процессов делят очередь без блокировок друг друга
+и пропускная способность растет с числом воркеров. Новые задания будят
+воркер через LISTEN/NOTIFY; редкий опрос нужен только для отложенных
+повторов и заданий, аренда которых истекла после падения воркера.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from app.models.sql import OutboxJob
+from app.utils.logging import database as logger
+
+from .context import SQLSessionContext
+from .repositories.outbox import OUTBOX_CHANNEL
+
+# Обработчик задания: исключение означает неудачную попытку
+OutboxHandler = Callable[[OutboxJob], Awaitable[None]]
+
+
+class OutboxWorker:
+    """Воркер, выполняющий задания очереди исходящих с арендой и повторами."""
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        handlers: Mapping[str, OutboxHandler],
+        name: Optional[str] = None,
+        batch_size: int = 10,
+        concurrency: int = 4,
+        lease: float = 300.0,
+        max_attempts: int = 5,
+        retry_delay: float = 30.0,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.session_pool = session_pool
+        self.handlers = dict(handlers)
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.lease = lease
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._listener: Optional[AsyncConnection] = None
+
+    def _get_wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def wake(self, *_: Any) -> None:
+        """Будит воркер; вызывается обработчиком NOTIFY."""
+        self._get_wakeup().set()
+
+    def stop(self) -> None:
+        """Прекращает выборку новых заданий; выполняемые задания завершаются."""
+        self._stopping = True
+        self.wake()
+
+    async def run(self) -> None:
+        """Выполняет задания, пока воркер не остановлен."""
+        await self._listen()
+        logger.info(f"Воркер очереди исходящих {self.name} запущен")
+        try:
+            while not self._stopping:
+                if len(self._tasks) >= self.concurrency:
+                    await asyncio.wait(self._tasks.values(), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                requested = min(self.batch_size, self.concurrency - len(self._tasks))
+                # Сброс до выборки: NOTIFY, пришедший во время выборки, не теряется
+                self._get_wakeup().clear()
+                claimed = await self._claim(requested)
+                if len(claimed) < requested and not self._stopping:
+                    try:
+                        await asyncio.wait_for(self._get_wakeup().wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            await self._unlisten()
+            logger.info(f"Воркер очереди исходящих {self.name} остановлен")
+
+    async def run_once(self) -> int:
+        """Забирает одну пачку заданий и дожидается их выполнения. Возвращает число заданий."""
+        claimed = await self._claim(self.batch_size)
+        await asyncio.gather(*(self._tasks[job.id] for job in claimed if job.id in self._tasks))
+        return len(claimed)
+
+    async def _claim(self, limit: int) -> list[OutboxJob]:
+        try:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                jobs = await repository.outbox.claim(self.name, limit, self.lease)
+        except Exception as e:
+            logger.error(f"Ошибка выборки заданий очереди исходящих: {e}")
+            return []
+        for job in jobs:
+            task = asyncio.create_task(self._process(job))
+            self._tasks[job.id] = task
+            task.add_done_callback(lambda _, job_id=job.id: self._tasks.pop(job_id, None))
+        return jobs
+
+    async def _process(self, job: OutboxJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"Нет обработчика заданий {job.kind}")
+            await handler(job)
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            self.completed += 1
+            await self._finish(job.id)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int) -> None:
+        """Продлевает аренду, чтобы долгую рассылку не забрал другой воркер."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                async with SQLSessionContext(self.session_pool) as (repository, uow):
+                    await repository.outbox.extend([job_id], self.name)
+            except Exception as e:
+                logger.warning(f"Ошибка продления аренды задания {job_id}: {e}")
+
+    async def _finish(self, job_id: int) -> None:
+        try:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                await repository.outbox.complete(job_id)
+        except Exception as e:
+            logger.error(f"Ошибка завершения задания {job_id}: {e}")
+
+    async def _fail(self, job: OutboxJob, error: Exception) -> None:
+        retry_in: Optional[float] = None
+        if not isinstance(error, LookupError) and job.attempts < self.max_attempts:
+            retry_in = self.retry_delay * 2 ** (job.attempts - 1)
+        if retry_in is None:
+            self.failed += 1
+            logger.error(f"Задание {job.id} ({job.kind}) не выполнено после {job.attempts} попыток: {error}")
+        else:
+            logger.warning(f"Задание {job.id} ({job.kind}) будет повторено через {retry_in:.0f}с: {error}")
+        try:
+            async with SQLSessionContext(self.session_pool) as (repository, uow):
+                await repository.outbox.fail(job.id, str(error), retry_in=retry_in)
+        except Exception as e:
+            logger.error(f"Ошибка записи результата задания {job.id}: {e}")
+
+    async def _listen(self) -> None:
+        """Подписывается на NOTIFY отдельным соединением из пула движка.
+
+        Если подписаться не удалось, воркер работает опросом.
+        """
+        try:
+            engine = self.session_pool.kw["bind"]
+            self._listener = await engine.connect()
+            raw = await self._listener.get_raw_connection()
+            await raw.driver_connection.add_listener(OUTBOX_CHANNEL, self.wake)
+        except Exception as e:
+            logger.warning(f"Подписка на {OUTBOX_CHANNEL} недоступна, задания выбираются опросом: {e}")
+            await self._unlisten()
+
+    async def _unlisten(self) -> None:
+        if self._listener is None:
+            return
+        listener, self._listener = self._listener, None
+        try:
+            raw = await listener.get_raw_connection()
+            await raw.driver_connection.remove_listener(OUTBOX_CHANNEL, self.wake)
+            await listener.close()
+        except Exception as e:
+            logger.debug(f"Ошибка закрытия подписки на {OUTBOX_CHANNEL}: {e}")
@@ -0,0 +1,176 @@
+from datetime import timedelta
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import Interval, bindparam, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.sql import Campaign, CampaignEnrollment, CampaignStep, User
+from app.models.sql.campaign import EnrollmentStatus
+from app.models.sql.mixins.timestamp import NowFunc
+from app.services.postgres.repositories.base import BaseRepository
+
+# Наступивший шаг записи: (campaign_id, user_id, позиция шага, попытка)
+DueEnrollment = tuple[int, int, int, int]
+# Получатель шага: (id, bot_id, статус, время блокировки бота)
+EnrollmentUser = tuple[int, Optional[int], str, Any]
+
+
+# noinspection PyTypeChecker
+class CampaignsRepository(BaseRepository):
+    async def get_steps(
+        self,
+        trigger: Optional[str] = None,
+    ) -> dict[int, List[tuple[int, int, int]]]:
+        """Шаги (позиция, задержка, notification_id) активных кампаний в порядке позиций.
+
+        Шаги сгруппированы по ID кампании.
+        """
+        query = (
+            select(
+                CampaignStep.campaign_id,
+                CampaignStep.position,
+                CampaignStep.delay,
+                CampaignStep.notification_id,
+            )
+            .join(Campaign, Campaign.id == CampaignStep.campaign_id)
+            .where(Campaign.active.is_(True))
+            .order_by(CampaignStep.campaign_id, CampaignStep.position)
+        )
+        if trigger is not None:
+            query = query.where(Campaign.trigger == trigger)
+        steps: dict[int, List[tuple[int, int, int]]] = {}
+        rows = (await self.session.execute(query)).all()
+        for campaign_id, position, delay, notification_id in rows:
+            steps.setdefault(campaign_id, []).append((position, delay, notification_id))
+        return steps
+
+    async def enroll_many(self, user_ids: Sequence[int], trigger: str) -> int:
+        """Записывает пользователей в активные кампании события в текущей транзакции без фиксации.
+
+        Первый шаг планируется через его задержку от текущего момента. Повторная
+        запись в ту же кампанию игнорируется. Возвращает число новых записей.
+        """
+        if not user_ids:
+            return 0
+        rows = [
+            {
+                "campaign_id": campaign_id,
+                "user_id": user_id,
+                "step": steps[0][0],
+                "status": EnrollmentStatus.ACTIVE,
+                "attempts": 0,
+                "next_run_at": NowFunc + timedelta(seconds=steps[0][1]),
+            }
+            for campaign_id, steps in (await self.get_steps(trigger)).items()
+            for user_id in user_ids
+        ]
+        if not rows:
+            return 0
+        query = insert(CampaignEnrollment).values(rows).on_conflict_do_nothing(
+            index_elements=[CampaignEnrollment.campaign_id, CampaignEnrollment.user_id]
+        )
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def claim_due(self, limit: int, lease: float) -> List[DueEnrollment]:
+        """Забирает пачку записей, чей шаг наступил, в порядке времени отправки.
+
+        Выборка идет по частичному индексу ix_campaign_enrollments_due, строки,
+        заблокированные другими воркерами, пропускаются (SKIP LOCKED). Время
+        отправки забранных записей сдвигается на lease: если воркер упадет
+        до записи результата, шаг снова наступит после аренды.
+        """
+        key = tuple_(CampaignEnrollment.campaign_id, CampaignEnrollment.user_id)
+        candidates = (
+            select(CampaignEnrollment.campaign_id, CampaignEnrollment.user_id)
+            .where(
+                CampaignEnrollment.status == EnrollmentStatus.ACTIVE,
+                CampaignEnrollment.next_run_at <= NowFunc,
+            )
+            .order_by(CampaignEnrollment.next_run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(CampaignEnrollment)
+            .where(key.in_(candidates))
+            .values(
+                next_run_at=NowFunc + timedelta(seconds=lease),
+                attempts=CampaignEnrollment.attempts + 1,
+            )
+            .returning(
+                CampaignEnrollment.campaign_id,
+                CampaignEnrollment.user_id,
+                CampaignEnrollment.step,
+                CampaignEnrollment.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = [tuple(row) for row in (await self.session.execute(query)).all()]
+        await self.session.commit()
+        return rows
+
+    async def get_users(self, user_ids: Sequence[int]) -> List[EnrollmentUser]:
+        """Бот и статус получателей наступивших шагов."""
+        if not user_ids:
+            return []
+        result = await self.session.execute(
+            select(User.id, User.bot_id, User.status, User.blocked_at).where(User.id.in_(user_ids))
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def save_results(
+        self,
+        advanced: Sequence[tuple[int, int, int, int]],
+        retried: Sequence[tuple[int, int]],
+        finished: Sequence[tuple[int, int, int]],
+        retry_delay: float,
+    ) -> None:
+        """Записывает результаты шагов одной транзакцией.
+
+        advanced — (campaign_id, user_id, позиция, задержка) следующего шага: он
+        планируется от времени записи в кампанию, поэтому опоздание шага
+        не сдвигает следующие. retried — записи, шаг которых повторяется через
+        retry_delay. finished — (campaign_id, user_id, статус) завершенных записей.
+        """
+        table = CampaignEnrollment.__table__
+        key = (
+            (table.c.campaign_id == bindparam("b_campaign_id"))
+            & (table.c.user_id == bindparam("b_user_id"))
+        )
+        if advanced:
+            await self.session.execute(
+                update(table).where(key).values(
+                    step=bindparam("b_step"),
+                    attempts=0,
+                    next_run_at=table.c.enrolled_at + bindparam("b_delay", type_=Interval()),
+                ),
+                [
+                    {
+                        "b_campaign_id": campaign_id,
+                        "b_user_id": user_id,
+                        "b_step": step,
+                        "b_delay": timedelta(seconds=delay),
+                    }
+                    for campaign_id, user_id, step, delay in advanced
+                ],
+            )
+        if retried:
+            await self.session.execute(
+                update(table).where(key).values(
+                    next_run_at=NowFunc + timedelta(seconds=retry_delay),
+                ),
+                [
+                    {"b_campaign_id": campaign_id, "b_user_id": user_id}
+                    for campaign_id, user_id in retried
+                ],
+            )
+        if finished:
+            await self.session.execute(
+                update(table).where(key).values(status=bindparam("b_status"), next_run_at=None),
+                [
+                    {"b_campaign_id": campaign_id, "b_user_id": user_id, "b_status": status}
+                    for campaign_id, user_id, status in finished
+                ],
+            )
+        await self.session.commit()
@@ -0,0 +1,96 @@
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.sql import DeadLetter
+from app.models.sql.mixins.timestamp import NowFunc
+from app.services.postgres.repositories.base import BaseRepository
+
+DeadLetterRow = tuple[int, Optional[int], str, Optional[str]]
+
+
+# noinspection PyTypeChecker
+class DeadLettersRepository(BaseRepository):
+    async def upsert_many(self, notification_id: int, rows: Sequence[DeadLetterRow]) -> None:
+        """Записывает пачку недоставленных уведомлений (user_id, bot_id, error_type, error_message)."""
+        if not rows:
+            return
+        query = insert(DeadLetter).values(
+            [
+                {
+                    "notification_id": notification_id,
+                    "user_id": user_id,
+                    "bot_id": bot_id,
+                    "error_type": error_type,
+                    "error_message": error_message[:512] if error_message else None,
+                }
+                for user_id, bot_id, error_type, error_message in rows
+            ]
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[DeadLetter.notification_id, DeadLetter.user_id],
+            set_={
+                "bot_id": query.excluded.bot_id,
+                "error_type": query.excluded.error_type,
+                "error_message": query.excluded.error_message,
+                "attempts": DeadLetter.attempts + 1,
+                "updated_at": NowFunc,
+            },
+        )
+        await self.session.execute(query)
+        await self.session.commit()
+
+    @staticmethod
+    def _conditions(
+        notification_id: Optional[int] = None,
+        error_type: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+    ) -> List[Any]:
+        conditions: List[Any] = []
+        if notification_id is not None:
+            conditions.append(DeadLetter.notification_id == notification_id)
+        if error_type is not None:
+            conditions.append(DeadLetter.error_type == error_type)
+        if ids is not None:
+            conditions.append(DeadLetter.id.in_(ids))
+        return conditions
+
+    async def summary(self, notification_id: Optional[int] = None) -> List[tuple[int, str, int]]:
+        """Количество недоставленных уведомлений по (notification_id, error_type)."""
+        query = (
+            select(DeadLetter.notification_id, DeadLetter.error_type, func.count())
+            .where(*self._conditions(notification_id))
+            .group_by(DeadLetter.notification_id, DeadLetter.error_type)
+            .order_by(DeadLetter.notification_id, func.count().desc())
+        )
+        result = await self.session.execute(query)
+        return [(notification_id, error_type, count) for notification_id, error_type, count in result.all()]
+
+    async def get_many(
+        self,
+        notification_id: Optional[int] = None,
+        error_type: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[DeadLetter]:
+        """Получает недоставленные уведомления по фильтрам."""
+        query = (
+            select(DeadLetter)
+            .where(*self._conditions(notification_id, error_type, ids))
+            .order_by(DeadLetter.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return list(await self.session.scalars(query))
+
+    async def delete_many(self, notification_id: int, user_ids: Sequence[int]) -> None:
+        """Удаляет записи получателей, которым уведомление доставлено повторно."""
+        if not user_ids:
+            return
+        await self._delete(
+            DeadLetter,
+            DeadLetter.notification_id == notification_id,
+            DeadLetter.user_id.in_(user_ids),
+        )
@@ -0,0 +1,103 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.sql import NotificationDelivery, User
+from app.services.postgres.repositories.base import BaseRepository
+
+
+# noinspection PyTypeChecker
+class DeliveriesRepository(BaseRepository):
+    async def upsert_many(
+        self,
+        notification_id: int,
+        rows: Sequence[tuple[int, int, Optional[int]]],
+        digest_id: Optional[int] = None,
+    ) -> None:
+        """Записывает пачку результатов доставки одним запросом.
+
+        digest_id — уведомление, от имени которого отправлен дайджест, если
+        сообщения содержат тексты нескольких уведомлений.
+        """
+        if not rows:
+            return
+        query = insert(NotificationDelivery).values(
+            [
+                {
+                    "notification_id": notification_id,
+                    "user_id": user_id,
+                    "status": status,
+                    "message_id": message_id,
+                    "digest_id": digest_id,
+                }
+                for user_id, status, message_id in rows
+            ]
+        )
+        # Неудачная повторная попытка не должна затирать ID уже доставленного сообщения,
+        # пометка дайджеста меняется вместе с сообщением
+        delivered = query.excluded.message_id.is_not(None)
+        query = query.on_conflict_do_update(
+            index_elements=[NotificationDelivery.notification_id, NotificationDelivery.user_id],
+            set_={
+                "status": query.excluded.status,
+                "message_id": func.coalesce(
+                    query.excluded.message_id, NotificationDelivery.message_id
+                ),
+                "digest_id": case(
+                    (delivered, query.excluded.digest_id), else_=NotificationDelivery.digest_id
+                ),
+            },
+        )
+        await self.session.execute(query)
+        await self.session.commit()
+
+    async def get_messages(
+        self,
+        notification_id: int,
+        status: int,
+    ) -> Sequence[tuple[int, int, Optional[int]]]:
+        """Возвращает (user_id, message_id, bot_id) доставленных сообщений уведомления.
+
+        Сообщения дайджестов не возвращаются: в них есть тексты других уведомлений.
+        """
+        query = (
+            select(NotificationDelivery.user_id, NotificationDelivery.message_id, User.bot_id)
+            .outerjoin(User, User.id == NotificationDelivery.user_id)
+            .where(
+                NotificationDelivery.notification_id == notification_id,
+                NotificationDelivery.status == status,
+                NotificationDelivery.message_id.is_not(None),
+                NotificationDelivery.digest_id.is_(None),
+            )
+            .order_by(NotificationDelivery.user_id)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def count_digest_messages(self, notification_id: int, status: int) -> int:
+        """Количество сообщений дайджестов, в которых доставлено уведомление."""
+        query = select(func.count()).where(
+            NotificationDelivery.notification_id == notification_id,
+            NotificationDelivery.status == status,
+            NotificationDelivery.digest_id.is_not(None),
+        )
+        return int(await self.session.scalar(query) or 0)
+
+    async def get_recipients(
+        self,
+        notification_id: int,
+        status: int,
+    ) -> Sequence[tuple[int, Optional[int]]]:
+        """Возвращает (user_id, bot_id) получателей уведомления с указанным результатом доставки."""
+        query = (
+            select(NotificationDelivery.user_id, User.bot_id)
+            .outerjoin(User, User.id == NotificationDelivery.user_id)
+            .where(
+                NotificationDelivery.notification_id == notification_id,
+                NotificationDelivery.status == status,
+            )
+            .order_by(NotificationDelivery.user_id)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
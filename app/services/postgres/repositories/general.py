@@ -3,12 +3,24 @@ from __future__ import annotations
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .base import BaseRepository
+from .campaigns import CampaignsRepository
+from .dead_letters import DeadLettersRepository
+from .deliveries import DeliveriesRepository
+from .outbox import OutboxRepository
 from .users import UsersRepository
 
 
 class Repository(BaseRepository):
     users: UsersRepository
+    deliveries: DeliveriesRepository
+    dead_letters: DeadLettersRepository
+    outbox: OutboxRepository
+    campaigns: CampaignsRepository
 
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session=session)
         self.users = UsersRepository(session=session)
+        self.deliveries = DeliveriesRepository(session=session)
+        self.dead_letters = DeadLettersRepository(session=session)
+        self.outbox = OutboxRepository(session=session)
+        self.campaigns = CampaignsRepository(session=session)
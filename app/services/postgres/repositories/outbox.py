@@ -0,0 +1,106 @@
+from datetime import timedelta
+from typing import Any, Final, List, Optional, Sequence
+
+from sqlalchemy import func, or_, select, update
+
+from app.models.sql import OutboxJob
+from app.models.sql.mixins.timestamp import NowFunc
+from app.models.sql.outbox import OutboxStatus
+from app.services.postgres.repositories.base import BaseRepository
+
+# Канал LISTEN/NOTIFY, которым новые задания будят воркеров
+OUTBOX_CHANNEL: Final[str] = "notification_outbox"
+
+
+# noinspection PyTypeChecker
+class OutboxRepository(BaseRepository):
+    async def add(
+        self,
+        kind: str,
+        notification_id: Optional[int] = None,
+        payload: Optional[dict[str, Any]] = None,
+    ) -> OutboxJob:
+        """Добавляет задание в текущую транзакцию без фиксации.
+
+        Уведомление воркеров через NOTIFY доставляется только после фиксации,
+        которую выполняет вызывающий вместе со сменой статуса уведомления.
+        """
+        job = OutboxJob(
+            kind=kind,
+            notification_id=notification_id,
+            payload=payload,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+        )
+        self.session.add(job)
+        await self.session.flush()
+        await self.session.execute(select(func.pg_notify(OUTBOX_CHANNEL, kind)))
+        return job
+
+    async def claim(self, worker: str, limit: int, lease: float) -> List[OutboxJob]:
+        """Забирает пачку готовых заданий и задания с истекшей арендой.
+
+        Строки, заблокированные другими воркерами, пропускаются (SKIP LOCKED),
+        поэтому воркеры не ждут друг друга.
+        """
+        candidates = (
+            select(OutboxJob.id)
+            .where(
+                or_(
+                    (OutboxJob.status == OutboxStatus.PENDING) & (OutboxJob.available_at <= NowFunc),
+                    (OutboxJob.status == OutboxStatus.PROCESSING)
+                    & (OutboxJob.locked_at < NowFunc - timedelta(seconds=lease)),
+                )
+            )
+            .order_by(OutboxJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(OutboxJob)
+            .where(OutboxJob.id.in_(candidates.scalar_subquery()))
+            .values(
+                status=OutboxStatus.PROCESSING,
+                locked_by=worker,
+                locked_at=NowFunc,
+                attempts=OutboxJob.attempts + 1,
+            )
+            .returning(OutboxJob)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = list(await self.session.scalars(query))
+        await self.session.commit()
+        return sorted(jobs, key=lambda job: job.id)
+
+    async def extend(self, ids: Sequence[int], worker: str) -> None:
+        """Продлевает аренду выполняемых воркером заданий."""
+        await self._update(
+            OutboxJob,
+            [OutboxJob.id.in_(ids), OutboxJob.locked_by == worker, OutboxJob.status == OutboxStatus.PROCESSING],
+            load_result=False,
+            locked_at=NowFunc,
+        )
+
+    async def complete(self, job_id: int) -> None:
+        """Отмечает задание выполненным."""
+        await self._update(
+            OutboxJob,
+            [OutboxJob.id == job_id],
+            load_result=False,
+            status=OutboxStatus.DONE,
+            locked_by=None,
+            error=None,
+        )
+
+    async def fail(self, job_id: int, error: str, retry_in: Optional[float] = None) -> None:
+        """Записывает ошибку задания и возвращает его в очередь через retry_in секунд.
+
+        Без retry_in задание отмечается окончательно неудачным.
+        """
+        values: dict[str, Any] = {"locked_by": None, "error": error[:1024]}
+        if retry_in is None:
+            values["status"] = OutboxStatus.FAILED
+        else:
+            values["status"] = OutboxStatus.PENDING
+            values["available_at"] = NowFunc + timedelta(seconds=retry_in)
+        await self._update(OutboxJob, [OutboxJob.id == job_id], load_result=False, **values)
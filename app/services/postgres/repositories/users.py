@@ -1,6 +1,8 @@
-from typing import Any, Optional, cast, List
+from datetime import datetime
+from typing import Any, Optional, Sequence, cast, List
 
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.functions import count
 
 from app.models.sql import User
@@ -20,6 +22,38 @@ class UsersRepository(BaseRepository):
             **data,
         )
 
+    async def insert_many(self, rows: Sequence[dict[str, Any]]) -> List[int]:
+        """Добавляет пачку пользователей одним запросом в текущей транзакции без фиксации.
+
+        Уже существующие пользователи не перезаписываются. Возвращает ID созданных пользователей.
+        """
+        if not rows:
+            return []
+        query = (
+            insert(User)
+            .values(list(rows))
+            .on_conflict_do_nothing(index_elements=[User.id])
+            .returning(User.id)
+        )
+        return list(await self.session.scalars(query))
+
+    async def get_many(self, user_ids: Sequence[int]) -> dict[int, User]:
+        """Получает пользователей по ID."""
+        return {user.id: user for user in await self._get_many(User, User.id.in_(user_ids))}
+
+    async def update_many(self, updates: Sequence[tuple[int, dict[str, Any]]]) -> dict[int, User]:
+        """Обновляет пачку пользователей в текущей транзакции без фиксации и возвращает их по ID.
+
+        Изменения с одинаковым набором полей выполняются одним пакетным запросом.
+        """
+        if not updates:
+            return {}
+        params = [{"id": user_id, **data} for user_id, data in updates if data]
+        if params:
+            await self.session.execute(update(User), params)
+        users = await self._get_many(User, User.id.in_([user_id for user_id, _ in updates]))
+        return {user.id: user for user in users}
+
     async def count(self) -> int:
         return cast(int, await self.session.scalar(select(count(User.id))))
 
@@ -33,6 +67,48 @@ class UsersRepository(BaseRepository):
         )
         return list(result.scalars().all())
 
+    async def get_page(self, after_id: int, limit: int) -> List[User]:
+        """Получает страницу пользователей с ID больше after_id в порядке возрастания ID."""
+        result = await self.session.execute(
+            select(User).where(User.id > after_id).order_by(User.id).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_active_recipients(self, after_id: int, limit: int) -> List[tuple[int, Optional[int]]]:
+        """Получает страницу (id, bot_id) активных пользователей с ID больше after_id.
+
+        Постраничная выборка по ключу не держит курсор открытым
+        и возвращает получателей в порядке возрастания ID.
+        """
+        result = await self.session.execute(
+            select(User.id, User.bot_id)
+            .where(
+                User.id > after_id,
+                User.blocked_at.is_(None),
+                User.status == "active"
+            )
+            .order_by(User.id)
+            .limit(limit)
+        )
+        return [(user_id, bot_id) for user_id, bot_id in result.all()]
+
+    async def get_columns(
+        self,
+        after_id: int,
+        limit: int,
+    ) -> List[tuple[int, str, str, datetime, Optional[datetime]]]:
+        """Получает страницу атрибутов фильтрации пользователей с ID больше after_id.
+
+        Строки (id, language, status, created_at, blocked_at) идут в порядке возрастания ID.
+        """
+        result = await self.session.execute(
+            select(User.id, User.language, User.status, User.created_at, User.blocked_at)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
     async def get_users_by_status(self, status: str) -> List[User]:
         """Получает пользователей по статусу."""
         result = await self.session.execute(
@@ -1,4 +1,16 @@
+from .audience import AudienceIndex
 from .cache_wrapper import redis_cache
+from .interactive import InteractiveLatencyStore
+from .notification_cache import NotificationCache, NotificationPayload
+from .rate_limit import SharedRateLimiter
 from .repository import RedisRepository
 
-__all__ = ["RedisRepository", "redis_cache"]
+__all__ = [
+    "AudienceIndex",
+    "InteractiveLatencyStore",
+    "NotificationCache",
+    "NotificationPayload",
+    "RedisRepository",
+    "SharedRateLimiter",
+    "redis_cache",
+]
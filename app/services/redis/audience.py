@@ -0,0 +1,204 @@
+"""
+Индекс аудитории на битовых картах Redis.
+
+Для каждого значения атрибута пользователя (статус, язык, бот) хранится
+битовая карта, в которой бит с номером ID пользователя установлен, если
+пользователь обладает этим значением. ID пользователей Telegram больше 2^32,
+поэтому карта разбита на шарды по ID >> 20: каждый шард занимает не больше
+128 КБ. Размеры сегментов (BITCOUNT) и пересечения (BITOP) выполняются
+за O(размер/8) без обращения к Postgres.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Final, Mapping, Optional, Protocol
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.services.redis.keys import (
+    AudienceBitmapKey,
+    AudienceReadyKey,
+    AudienceShardsKey,
+    AudienceValuesKey,
+)
+from app.utils.logging import redis as logger
+
+SHARD_BITS: Final[int] = 20
+SHARD_MASK: Final[int] = (1 << SHARD_BITS) - 1
+
+STATUS: Final[str] = "status"
+LANGUAGE: Final[str] = "language"
+BOT: Final[str] = "bot"
+FAMILIES: Final[tuple[str, ...]] = (STATUS, LANGUAGE, BOT)
+
+# Пользователи без привязки к боту индексируются под этим значением
+NO_BOT: Final[str] = "0"
+
+# Номера установленных битов для каждого значения байта (старший бит — первый)
+BYTE_BITS: Final[tuple[tuple[int, ...], ...]] = tuple(
+    tuple(bit for bit in range(8) if value & (0x80 >> bit)) for value in range(256)
+)
+
+
+class IndexedUser(Protocol):
+    id: int
+    status: str
+    language: str
+    blocked_at: Optional[datetime]
+    bot_id: Optional[int]
+
+
+def split_user_id(user_id: int) -> tuple[int, int]:
+    """Возвращает шард и смещение бита пользователя."""
+    return user_id >> SHARD_BITS, user_id & SHARD_MASK
+
+
+def decode_bitmap(shard: int, bitmap: bytes) -> list[int]:
+    """Возвращает отсортированные ID пользователей, чьи биты установлены в карте шарда."""
+    base = shard << SHARD_BITS
+    user_ids: list[int] = []
+    for position, value in enumerate(bitmap):
+        if value:
+            offset = base + position * 8
+            user_ids.extend(offset + bit for bit in BYTE_BITS[value])
+    return user_ids
+
+
+def user_attributes(user: IndexedUser) -> dict[str, str]:
+    """Значения индексируемых атрибутов пользователя."""
+    return {
+        STATUS: "blocked" if user.blocked_at is not None else user.status,
+        LANGUAGE: user.language,
+        BOT: str(user.bot_id) if user.bot_id is not None else NO_BOT,
+    }
+
+
+class AudienceIndex:
+    """Инкрементально обновляемый индекс аудитории."""
+
+    def __init__(self, client: Redis) -> None:
+        self.client = client
+
+    async def _known_values(self, families: tuple[str, ...]) -> dict[str, set[str]]:
+        pipe = self.client.pipeline(transaction=False)
+        for family in families:
+            pipe.smembers(AudienceValuesKey(family=family).pack())
+        result = await pipe.execute()
+        return {
+            family: {value.decode() if isinstance(value, bytes) else value for value in values}
+            for family, values in zip(families, result)
+        }
+
+    async def set_attributes(self, user_id: int, attributes: Mapping[str, str]) -> None:
+        """Устанавливает пользователю значения атрибутов и снимает прежние значения тех же атрибутов."""
+        shard, offset = split_user_id(user_id)
+        families = tuple(attributes)
+        known = await self._known_values(families)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(AudienceShardsKey().pack(), shard)
+        for family, value in attributes.items():
+            pipe.sadd(AudienceValuesKey(family=family).pack(), value)
+            for other in known[family] - {value}:
+                pipe.setbit(AudienceBitmapKey(family=family, value=other, shard=shard).pack(), offset, 0)
+            pipe.setbit(AudienceBitmapKey(family=family, value=value, shard=shard).pack(), offset, 1)
+        await pipe.execute()
+
+    async def index_user(self, user: IndexedUser) -> None:
+        """Обновляет все атрибуты пользователя. Ошибки Redis не прерывают вызывающий код."""
+        try:
+            await self.set_attributes(user.id, user_attributes(user))
+        except Exception as e:
+            logger.error(f"Ошибка обновления индекса аудитории для пользователя {user.id}: {e}")
+
+    async def set_status(self, user_id: int, status: str) -> None:
+        """Обновляет только статус пользователя."""
+        try:
+            await self.set_attributes(user_id, {STATUS: status})
+        except Exception as e:
+            logger.error(f"Ошибка обновления статуса в индексе аудитории для пользователя {user_id}: {e}")
+
+    async def shards(self) -> list[int]:
+        """Номера непустых шардов в порядке возрастания."""
+        members = await self.client.smembers(AudienceShardsKey().pack())
+        return sorted(int(shard) for shard in members)
+
+    async def values(self, family: str) -> set[str]:
+        """Известные значения атрибута."""
+        return (await self._known_values((family,)))[family]
+
+    @staticmethod
+    def _keys(shard: int, filters: Mapping[str, Any]) -> list[str]:
+        return [
+            AudienceBitmapKey(family=family, value=str(value), shard=shard).pack()
+            for family, value in filters.items()
+        ]
+
+    async def count(self, **filters: Any) -> int:
+        """Количество пользователей, подходящих под все фильтры (status=..., language=..., bot=...)."""
+        if not filters:
+            raise ValueError("Нужен хотя бы один фильтр аудитории")
+        shards = await self.shards()
+        if not shards:
+            return 0
+
+        pipe = self.client.pipeline(transaction=False)
+        temp_key = f"audience:tmp:{uuid4().hex}"
+        for shard in shards:
+            keys = self._keys(shard, filters)
+            if len(keys) == 1:
+                pipe.bitcount(keys[0])
+            else:
+                pipe.bitop("AND", temp_key, *keys)
+                pipe.bitcount(temp_key)
+        pipe.delete(temp_key)
+        result = await pipe.execute()
+        counts = result[:-1] if len(filters) == 1 else result[1:-1:2]
+        return sum(counts)
+
+    async def iter_members(self, **filters: Any) -> AsyncIterator[list[int]]:
+        """Перебирает ID подходящих пользователей по шардам в порядке возрастания."""
+        if not filters:
+            raise ValueError("Нужен хотя бы один фильтр аудитории")
+        for shard in await self.shards():
+            keys = self._keys(shard, filters)
+            if len(keys) == 1:
+                bitmap = await self.client.get(keys[0])
+            else:
+                temp_key = f"audience:tmp:{uuid4().hex}"
+                pipe = self.client.pipeline(transaction=False)
+                pipe.bitop("AND", temp_key, *keys)
+                pipe.get(temp_key)
+                pipe.delete(temp_key)
+                _, bitmap, _ = await pipe.execute()
+            if bitmap:
+                yield decode_bitmap(shard, bitmap)
+
+    async def rebuild(self, users: list[IndexedUser]) -> None:
+        """Индексирует пачку пользователей одним запросом.
+
+        Используется для первичного заполнения пустого индекса: прежние
+        значения атрибутов не снимаются.
+        """
+        if not users:
+            return
+        known = await self._known_values(FAMILIES)
+        pipe = self.client.pipeline(transaction=False)
+        for user in users:
+            shard, offset = split_user_id(user.id)
+            pipe.sadd(AudienceShardsKey().pack(), shard)
+            for family, value in user_attributes(user).items():
+                if value not in known[family]:
+                    pipe.sadd(AudienceValuesKey(family=family).pack(), value)
+                    known[family].add(value)
+                pipe.setbit(AudienceBitmapKey(family=family, value=value, shard=shard).pack(), offset, 1)
+        await pipe.execute()
+
+    async def is_ready(self) -> bool:
+        """Был ли индекс полностью заполнен из базы."""
+        return bool(await self.client.exists(AudienceReadyKey().pack()))
+
+    async def mark_ready(self) -> None:
+        await self.client.set(AudienceReadyKey().pack(), 1)
@@ -0,0 +1,31 @@
+"""
+Задержка ответов бота в Redis.
+
+Процесс бота публикует p95 задержки ответов пользователям, а процессы
+рассылки с тем же токеном читают его и замедляются, пока ответы
+запаздывают. Значение живет ttl секунд: без свежих измерений (бот
+остановлен или не получает сообщений) рассылка идет в полном темпе.
+"""
+
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.services.redis.keys import InteractiveLatencyKey
+
+
+class InteractiveLatencyStore:
+    """p95 задержки ответов бота, общий для процессов."""
+
+    def __init__(self, client: Redis, ttl: int = 30) -> None:
+        self.client = client
+        self.ttl = ttl
+
+    async def publish(self, bot_id: int, p95: float) -> None:
+        """Сохраняет p95 задержки ответов бота."""
+        await self.client.set(InteractiveLatencyKey(bot_id=bot_id).pack(), f"{p95:.6f}", ex=self.ttl)
+
+    async def read(self, bot_id: int) -> Optional[float]:
+        """Возвращает p95 задержки ответов бота или None, если свежих измерений нет."""
+        value = await self.client.get(InteractiveLatencyKey(bot_id=bot_id).pack())
+        return float(value) if value is not None else None
@@ -4,3 +4,39 @@ from app.utils.key_builder import StorageKey
 class WebhookLockKey(StorageKey, prefix="webhook_lock"):
     bot_id: int
     webhook_hash: str
+
+
+class AudienceBitmapKey(StorageKey, prefix="audience"):
+    family: str
+    value: str
+    shard: int
+
+
+class AudienceValuesKey(StorageKey, prefix="audience_values"):
+    family: str
+
+
+class AudienceShardsKey(StorageKey, prefix="audience_shards"):
+    pass
+
+
+class AudienceReadyKey(StorageKey, prefix="audience_ready"):
+    pass
+
+
+class RateLimitKey(StorageKey, prefix="rate_limit"):
+    bot_id: int
+    profile: str
+
+
+class NotificationVersionKey(StorageKey, prefix="notification_version"):
+    notification_id: int
+
+
+class NotificationPayloadKey(StorageKey, prefix="notification_payload"):
+    notification_id: int
+    version: int
+
+
+class InteractiveLatencyKey(StorageKey, prefix="interactive_latency"):
+    bot_id: int
@@ -0,0 +1,123 @@
+"""
+Кэш содержимого уведомлений в Redis.
+
+Каждая рассылка, повтор и повторная отправка из очереди недоставленных
+начинаются с чтения уведомления. Неизменяемая для отправки часть
+(текст и профиль рассылки) кэшируется под ключом с номером версии,
+а отдельный ключ указывает на текущую версию. Редактирование увеличивает
+версию и переключает указатель, поэтому устаревшее содержимое больше
+не читается, даже если его допишет процесс, загрузивший строку до правки.
+Одновременные промахи в одном процессе выполняют одну загрузку из базы.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+
+from app.services.redis.keys import NotificationPayloadKey, NotificationVersionKey
+from app.utils import mjson
+from app.utils.logging import redis as logger
+
+
+@dataclass(frozen=True, slots=True)
+class NotificationPayload:
+    """Содержимое уведомления, необходимое для отправки."""
+
+    id: int
+    version: int
+    text: str
+    paid_broadcast: bool = False
+    weight: float = 1.0
+    max_rate: Optional[float] = None
+
+    @classmethod
+    def from_model(cls, notification: Any) -> "NotificationPayload":
+        """Создает содержимое из строки уведомления."""
+        return cls(
+            id=notification.id,
+            version=notification.version,
+            text=notification.text,
+            paid_broadcast=bool(notification.paid_broadcast),
+            weight=notification.weight or 1.0,
+            max_rate=notification.max_rate,
+        )
+
+
+PayloadLoader = Callable[[int], Awaitable[Optional[NotificationPayload]]]
+
+
+class NotificationCache:
+    """Сквозной кэш содержимого уведомлений с версионированием."""
+
+    def __init__(self, client: Redis, loader: PayloadLoader, ttl: int = 3600) -> None:
+        self.client = client
+        self.loader = loader
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._loading: dict[int, asyncio.Future[Optional[NotificationPayload]]] = {}
+
+    async def get(self, notification_id: int) -> Optional[NotificationPayload]:
+        """Возвращает содержимое уведомления из кэша или из базы."""
+        try:
+            payload = await self._read(notification_id)
+        except Exception as e:
+            logger.warning(f"Ошибка чтения кэша уведомления {notification_id}: {e}")
+            return await self.loader(notification_id)
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        self.misses += 1
+        loading = self._loading.get(notification_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[notification_id] = loading
+        try:
+            payload = await self.loader(notification_id)
+            if payload is not None:
+                await self._store(payload)
+            loading.set_result(payload)
+            return payload
+        except Exception as e:
+            loading.set_exception(e)
+            # Исключение передается ожидающим, а здесь помечается полученным
+            loading.exception()
+            raise
+        finally:
+            if not loading.done():
+                loading.cancel()
+            del self._loading[notification_id]
+
+    async def _read(self, notification_id: int) -> Optional[NotificationPayload]:
+        version = await self.client.get(NotificationVersionKey(notification_id=notification_id).pack())
+        if version is None:
+            return None
+        key = NotificationPayloadKey(notification_id=notification_id, version=int(version)).pack()
+        data = await self.client.get(key)
+        if data is None:
+            return None
+        return NotificationPayload(**mjson.decode(data))
+
+    async def _store(self, payload: NotificationPayload) -> None:
+        key = NotificationPayloadKey(notification_id=payload.id, version=payload.version).pack()
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, mjson.encode(asdict(payload)), ex=self.ttl)
+            # Указатель переключает только правка: загрузка ставит его, если его еще нет
+            pipe.set(NotificationVersionKey(notification_id=payload.id).pack(), payload.version, ex=self.ttl, nx=True)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Ошибка записи кэша уведомления {payload.id}: {e}")
+
+    async def invalidate(self, notification_id: int, version: int) -> None:
+        """Переключает указатель на новую версию после правки уведомления."""
+        try:
+            await self.client.set(NotificationVersionKey(notification_id=notification_id).pack(), version, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Ошибка сброса кэша уведомления {notification_id}: {e}")
@@ -0,0 +1,127 @@
+"""
+Общий для всех процессов ограничитель частоты запросов в Redis.
+
+Лимит Telegram действует на токен бота, а не на процесс: API, админ-панель
+и воркер рассылки с одним токеном должны делить один бюджет. Бюджет
+считается по алгоритму GCRA одним Lua-скриптом, который атомарно выдает
+пачку разрешений. Процесс забирает разрешения небольшими пачками и расходует
+их локально, поэтому Redis не опрашивается на каждое сообщение.
+"""
+
+import asyncio
+import time
+from typing import Final, Optional
+
+from redis.asyncio import Redis
+
+from app.services.broadcast.rate_limit import TokenBucket
+from app.services.redis.keys import RateLimitKey
+from app.utils.logging import redis as logger
+
+# KEYS[1] — теоретическое время прибытия следующего запроса (TAT), мкс.
+# ARGV: интервал между разрешениями (мкс), допустимый всплеск (мкс), запрошено разрешений.
+# Возвращает {выдано разрешений, сколько ждать (мкс)}. Если разрешений нет, ожидание
+# рассчитано до момента, когда накопится целая пачка, с запасом в полинтервала
+# (всплеск тоже включает полинтервала): часы Redis и процесса расходятся,
+# и повтор чуть раньше или позже срока все равно получает целую пачку.
+# Так на пачку приходится не больше двух обращений к Redis.
+GCRA_SCRIPT: Final[str] = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+if tat - now > burst then
+    return {0, math.ceil(tat + (requested - 1) * interval - now - burst + interval / 2)}
+end
+local granted = math.min(requested, math.floor((now + burst - tat) / interval) + 1)
+tat = tat + granted * interval
+redis.call('SET', KEYS[1], string.format('%d', tat), 'PX', math.ceil((tat - now) / 1000) + 1000)
+return {granted, 0}
+"""
+
+# Наименьшее время жизни пачки разрешений, с. Telegram считает лимит
+# за секунду, поэтому разрешение, использованное в пределах секунды
+# после выдачи, лимит не нарушает, а пауза цикла событий не сжигает пачку.
+PERMIT_LIFETIME: Final[float] = 1.0
+
+
+class SharedRateLimiter:
+    """Ограничитель частоты с бюджетом в Redis и локальной предвыборкой разрешений."""
+
+    def __init__(
+        self,
+        client: Redis,
+        bot_id: int,
+        profile: str,
+        rate: float,
+        prefetch: int = 5,
+    ) -> None:
+        self.client = client
+        self.key = RateLimitKey(bot_id=bot_id, profile=profile).pack()
+        self.rate = rate
+        self.prefetch = max(1, prefetch)
+        self.interval = max(1, round(1_000_000 / rate))
+        # Всплеск в пределах одной пачки (с запасом в полинтервала, см. GCRA_SCRIPT):
+        # разрешения пачки выдаются сразу
+        self.burst = self.interval * (self.prefetch - 1) + self.interval // 2
+        # Неизрасходованные разрешения устаревают через время одной пачки,
+        # но не раньше PERMIT_LIFETIME
+        self.lifetime = max(PERMIT_LIFETIME, self.interval * self.prefetch / 1_000_000)
+        # Разрешения, устаревшие неизрасходованными
+        self.wasted = 0
+        self._script = client.register_script(GCRA_SCRIPT)
+        self._permits = 0
+        self._granted_at = 0.0
+        self._fallback = TokenBucket(rate=rate)
+        self._degraded = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _take(self) -> bool:
+        if self._permits and time.monotonic() - self._granted_at <= self.lifetime:
+            self._permits -= 1
+            return True
+        self.wasted += self._permits
+        self._permits = 0
+        return False
+
+    async def acquire(self) -> None:
+        """Ожидает разрешение на один запрос.
+
+        Если Redis недоступен, используется локальный ограничитель
+        с тем же лимитом, чтобы рассылка не останавливалась.
+        """
+        if self._take():
+            return
+        async with self._get_lock():
+            while not self._take():
+                try:
+                    granted, wait = await self._script(
+                        keys=[self.key],
+                        args=[self.interval, self.burst, self.prefetch],
+                    )
+                except Exception as e:
+                    if not self._degraded:
+                        self._degraded = True
+                        logger.warning(
+                            f"Общий ограничитель {self.key} недоступен, используется локальный: {e}"
+                        )
+                    await self._fallback.acquire()
+                    return
+                if self._degraded:
+                    self._degraded = False
+                    logger.info(f"Общий ограничитель {self.key} снова доступен")
+                if granted:
+                    self._permits = int(granted)
+                    self._granted_at = time.monotonic()
+                else:
+                    await asyncio.sleep(int(wait) / 1_000_000)
@@ -15,6 +15,7 @@ from aiogram.types import (
     ReplyParameters,
 )
 
+from app.services.broadcast.rate_limit import ChatRateLimiter
 from app.utils.custom_types import AnyKeyboard
 from app.utils.time import datetime_now
 
@@ -28,6 +29,7 @@ class MessageHelper:
     message_id: Optional[int] = None
     bot: Bot
     fsm_context: Optional[FSMContext] = None
+    chat_limiter: Optional[ChatRateLimiter] = None
     last_updated: datetime = field(default_factory=datetime_now)
 
     @property
@@ -49,8 +51,16 @@ class MessageHelper:
             message_id=message_id or self.message_id,
             bot=self.bot,
             fsm_context=self.fsm_context,
+            chat_limiter=self.chat_limiter,
         )
 
+    async def pace(self, chat_id: int) -> None:
+        """
+        Waits for the chat's turn so that bursts to one chat do not hit the bot-wide 429
+        """
+        if self.chat_limiter is not None:
+            await self.chat_limiter.acquire(chat_id)
+
     def resolve_message_id(
         self,
         chat_id: Optional[int] = None,
@@ -129,6 +139,7 @@ class MessageHelper:
         )
         if delete:
             await self.delete(chat_id=chat_id, message_id=message_id)
+        await self.pace(chat_id)
         return await self.bot.send_message(
             chat_id=chat_id,
             text=text,
@@ -155,6 +166,7 @@ class MessageHelper:
         )
 
         if force_edit or (edit and can_be_edited and message_id):
+            await self.pace(chat_id)
             try:
                 return await self.bot.edit_message_text(
                     chat_id=chat_id,
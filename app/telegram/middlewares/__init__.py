@@ -1,4 +1,5 @@
+from .latency import InteractiveLatencyMiddleware
 from .message_helper import MessageHelperMiddleware
 from .user import UserMiddleware
 
-__all__ = ["MessageHelperMiddleware", "UserMiddleware"]
+__all__ = ["InteractiveLatencyMiddleware", "MessageHelperMiddleware", "UserMiddleware"]
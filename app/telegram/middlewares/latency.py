@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from aiogram.types import Message, TelegramObject, Update
+
+from app.services.broadcast.interactive import LatencyWindow
+from app.services.broadcast.metrics import metrics
+from app.services.redis.interactive import InteractiveLatencyStore
+from app.telegram.middlewares.event_typed import EventTypedMiddleware
+from app.utils.logging import bot as logger
+
+
+class InteractiveLatencyMiddleware(EventTypedMiddleware):
+    """
+    Measures how long users wait for the bot to answer (message lag plus handler time)
+    and publishes the p95 so that broadcasts slow down while answers are late.
+    """
+
+    def __init__(
+        self,
+        store: InteractiveLatencyStore,
+        window: float = 60.0,
+        publish_interval: float = 1.0,
+    ) -> None:
+        self.store = store
+        self.window = window
+        self.publish_interval = publish_interval
+        self.windows: dict[int, LatencyWindow] = {}
+        self._published_at: dict[int, float] = {}
+
+    @staticmethod
+    def get_lag(event: TelegramObject) -> float:
+        # Telegram dates have a one second resolution, callback queries carry no date
+        if isinstance(event, Update):
+            event = event.event
+        if not isinstance(event, Message):
+            return 0.0
+        return max(0.0, (datetime.now(timezone.utc) - event.date).total_seconds())
+
+    async def record(self, bot_id: int, latency: float) -> None:
+        window = self.windows.get(bot_id)
+        if window is None:
+            window = self.windows[bot_id] = LatencyWindow(self.window)
+        now = time.monotonic()
+        window.add(latency, now=now)
+        if now - self._published_at.get(bot_id, 0.0) < self.publish_interval:
+            return
+        self._published_at[bot_id] = now
+        p95 = window.percentile(0.95, now=now)
+        if p95 is None:
+            return
+        metrics.set("interactive_latency_p95", p95, bot=bot_id)
+        try:
+            await self.store.publish(bot_id, p95)
+        except Exception as e:
+            logger.warning("Failed to publish interactive latency: %s", e)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        lag = self.get_lag(event)
+        started = time.monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            await self.record(data["bot"].id, lag + time.monotonic() - started)
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Awaitable, Callable, cast
+from typing import Any, Awaitable, Callable, Optional, cast
 
 from aiogram.types import CallbackQuery, ErrorEvent, Message, TelegramObject, Update
 
+from app.services.broadcast.rate_limit import ChatRateLimiter
 from app.telegram.helpers import MessageHelper
 from app.telegram.middlewares.event_typed import EventTypedMiddleware
 
 
 class MessageHelperMiddleware(EventTypedMiddleware):
+    def __init__(self, chat_limiter: Optional[ChatRateLimiter] = None) -> None:
+        # Shared by all helpers, so pacing holds across updates from the same chat
+        self.chat_limiter = chat_limiter
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
@@ -24,5 +29,6 @@ class MessageHelperMiddleware(EventTypedMiddleware):
             update=cast(Message | CallbackQuery, update),
             bot=data["bot"],
             fsm_context=data.get("state"),
+            chat_limiter=self.chat_limiter,
         )
         return await handler(event, data)
@@ -29,7 +29,11 @@ class UserMiddleware(EventTypedMiddleware):
 
         user_service: UserService = data["user_service"]
         i18n: I18nMiddleware = data["i18n_middleware"]
-        user, was_created = await user_service.get_or_create(aiogram_user=aiogram_user, i18n_core=i18n.core)
+        user, was_created = await user_service.get_or_create(
+            aiogram_user=aiogram_user,
+            i18n_core=i18n.core,
+            bot_id=data["bot"].id,
+        )
         
         # Логируем только если пользователь был создан
         if was_created:
@@ -12,12 +12,14 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
     ReplyKeyboardRemove,
 )
-from pydantic import PlainValidator
+from pydantic import PlainValidator, SecretStr
 
 if TYPE_CHECKING:
     ListStr: TypeAlias = list[str]
+    ListSecretStr: TypeAlias = list[SecretStr]
 else:
     ListStr = NewType("ListStr", list[str])
+    ListSecretStr = NewType("ListSecretStr", list[SecretStr])
 
 
 AnyKeyboard: TypeAlias = Union[
@@ -37,6 +39,16 @@ AnyChatMember: TypeAlias = Union[
 ]
 
 StringList: TypeAlias = Annotated[ListStr, PlainValidator(func=lambda x: x.split(","))]
+SecretStringList: TypeAlias = Annotated[
+    ListSecretStr,
+    PlainValidator(
+        func=lambda x: [
+            SecretStr(str(item).strip())
+            for item in (x.split(",") if isinstance(x, str) else x)
+            if str(item).strip()
+        ]
+    ),
+]
 Int16: TypeAlias = Annotated[int, 16]
 Int32: TypeAlias = Annotated[int, 32]
 Int64: TypeAlias = Annotated[int, 64]
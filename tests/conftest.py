@@ -3,11 +3,13 @@
 """
 
 import os
-from unittest.mock import MagicMock
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
+from app.services.notification_service import NotificationService
 from tests.test_admin_app import test_app
 
 
@@ -69,4 +71,108 @@ def mock_bot():
 def mock_dispatcher():
     """Мок диспетчера для тестов."""
     dispatcher = MagicMock()
-    return dispatcher 
\ No newline at end of file
+    return dispatcher
+
+
+@pytest.fixture
+def make_bot():
+    """Фабрика моков бота с заданным ID.
+
+    Отправленное сообщение получает message_id, равный chat_id; для
+    получателей из failures send_message выбрасывает указанную ошибку.
+    """
+    def factory(bot_id: int, failures: Optional[dict] = None) -> MagicMock:
+        errors = failures or {}
+        bot = MagicMock()
+        bot.id = bot_id
+
+        async def send_message(**kwargs):
+            error = errors.get(kwargs["chat_id"])
+            if error is not None:
+                raise error
+            return MagicMock(message_id=kwargs["chat_id"])
+
+        bot.send_message = AsyncMock(side_effect=send_message)
+        bot.edit_message_text = AsyncMock()
+        bot.delete_message = AsyncMock(return_value=True)
+        return bot
+
+    return factory
+
+
+@pytest.fixture
+def make_repository():
+    """Фабрика моков репозитория с журналом доставки и очередью недоставленных."""
+    def factory(messages: Optional[list] = None) -> MagicMock:
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=MagicMock(
+            text="Test message", paid_broadcast=False, weight=1.0, max_rate=None
+        ))
+        repository._update = AsyncMock()
+        repository.deliveries.get_messages = AsyncMock(return_value=messages or [])
+        repository.deliveries.count_digest_messages = AsyncMock(return_value=0)
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+        repository.dead_letters.delete_many = AsyncMock()
+        return repository
+
+    return factory
+
+
+@pytest.fixture
+def written_rows():
+    """Функция, собирающая все строки, записанные в журнал доставки репозитория."""
+    def collect(repository: MagicMock) -> list:
+        calls = repository.deliveries.upsert_many.call_args_list
+        return [row for call in calls for row in call.args[1]]
+
+    return collect
+
+
+@pytest.fixture
+def make_service():
+    """Фабрика сервиса уведомлений.
+
+    Если бот не передан, создается бот с ID 1, отправляющий сообщения через send_message.
+    """
+    def factory(send_message, config=None, bot=None, **kwargs) -> NotificationService:
+        if bot is None:
+            bot = MagicMock()
+            bot.id = 1
+            bot.send_message = AsyncMock(side_effect=send_message)
+        return NotificationService(bot, MagicMock(), config=config, **kwargs)
+
+    return factory
+
+
+@pytest.fixture
+def session_context():
+    """Подменяет контекст сессии базы данных сервиса уведомлений.
+
+    Возвращает функцию, задающую репозиторий, который получит сервис.
+    """
+    with patch("app.services.notification_service.SQLSessionContext") as context:
+        def use(repository: MagicMock) -> MagicMock:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock(commit=AsyncMock()))
+            context.return_value = cm
+            return repository
+
+        yield use
+
+
+@pytest.fixture
+async def fake_bot_api():
+    """Локальный фейковый Bot API с лимитом 1000 сообщений в секунду."""
+    from tests.fake_bot_api import FakeBotAPI
+
+    api = await FakeBotAPI(rate_limit=1000, latency=0.005).start()
+    yield api
+    await api.stop()
+
+
+@pytest.fixture(autouse=True)
+def broadcast_snapshot_dir(tmp_path, monkeypatch):
+    """Снимки аудитории рассылки пишутся во временный каталог."""
+    monkeypatch.setenv("BROADCAST_SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    return tmp_path / "snapshots"
@@ -0,0 +1,92 @@
+"""
+Фейковый Bot API для нагрузочных тестов.
+
+Локальный aiohttp-сервер отвечает на запросы бота так же, как Telegram:
+возвращает корректные объекты сообщений, добавляет задержку сети
+и отвечает 429, если превышен лимит запросов в секунду
+(лимит считается по корзине токенов емкостью в одну секунду).
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class FakeBotAPI:
+    """Локальный сервер, имитирующий Telegram Bot API."""
+
+    def __init__(self, rate_limit: Optional[float] = 1000, latency: float = 0.0) -> None:
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.requests: List[Dict[str, Any]] = []
+        self.throttled = 0
+        self._tokens = rate_limit or 0.0
+        self._updated = time.monotonic()
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self) -> "FakeBotAPI":
+        """Запускает сервер на свободном порту."""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _throttle(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+        self._updated = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self._throttle():
+            self.throttled += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                },
+                status=429,
+            )
+
+        self.calls[method] += 1
+        self.requests.append({"method": method, **data})
+        self._message_id += 1
+        chat_id = int(data.get("chat_id", 0))
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
@@ -0,0 +1,127 @@
+"""
+Фейковый клиент Redis для тестов индекса аудитории.
+
+Поддерживает только команды, которые использует индекс: множества,
+битовые операции и конвейер без транзакции, а также строки для кэша
+уведомлений и скрипт GCRA общего ограничителя частоты, повторенный на Python.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Set
+
+
+class FakeRedis:
+    """Хранит строки и множества в памяти."""
+
+    def __init__(self) -> None:
+        self.strings: Dict[str, bytearray] = {}
+        self.sets: Dict[str, Set[bytes]] = {}
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def register_script(self, script: str) -> "FakeGCRAScript":
+        return FakeGCRAScript(self)
+
+    async def sadd(self, key: str, *values: Any) -> int:
+        members = self.sets.setdefault(key, set())
+        before = len(members)
+        members.update(self._encode(value) for value in values)
+        return len(members) - before
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        return set(self.sets.get(key, set()))
+
+    async def setbit(self, key: str, offset: int, value: int) -> int:
+        data = self.strings.setdefault(key, bytearray())
+        index, bit = divmod(offset, 8)
+        if len(data) <= index:
+            data.extend(b"\x00" * (index + 1 - len(data)))
+        mask = 0x80 >> bit
+        previous = int(bool(data[index] & mask))
+        data[index] = data[index] | mask if value else data[index] & ~mask
+        return previous
+
+    async def get(self, key: str) -> Any:
+        data = self.strings.get(key)
+        return bytes(data) if data is not None else None
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        # Время жизни не отслеживается: тесты не дожидаются истечения ключей
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = bytearray(self._encode(value))
+        return True
+
+    async def bitcount(self, key: str) -> int:
+        return sum(bin(byte).count("1") for byte in self.strings.get(key, b""))
+
+    async def bitop(self, operation: str, dest: str, *keys: str) -> int:
+        assert operation == "AND"
+        sources = [self.strings.get(key, bytearray()) for key in keys]
+        length = max(len(source) for source in sources)
+        result = bytearray(b"\xff" * length)
+        for source in sources:
+            padded = source + b"\x00" * (length - len(source))
+            result = bytearray(a & b for a, b in zip(result, padded))
+        self.strings[dest] = result
+        return length
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            removed += int(self.strings.pop(key, None) is not None)
+            removed += int(self.sets.pop(key, None) is not None)
+        return removed
+
+    async def exists(self, key: str) -> int:
+        return int(key in self.strings or key in self.sets)
+
+
+class FakePipeline:
+    """Откладывает команды до execute."""
+
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.commands: List[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.client, name)
+
+        def queue(*args: Any, **kwargs: Any) -> "FakePipeline":
+            self.commands.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self.commands = self.commands, []
+        return [await method(*args, **kwargs) for method, args, kwargs in commands]
+
+
+class FakeGCRAScript:
+    """Повторяет GCRA_SCRIPT общего ограничителя частоты и считает вызовы."""
+
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.calls = 0
+        self.error: Optional[Exception] = None
+
+    async def __call__(self, keys: List[str], args: List[Any]) -> List[int]:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        interval, burst, requested = (int(arg) for arg in args)
+        now = int(time.time() * 1_000_000)
+        stored = await self.client.get(keys[0])
+        tat = max(int(stored) if stored is not None else now, now)
+        if tat - now > burst:
+            return [0, math.ceil(tat + (requested - 1) * interval - now - burst + interval / 2)]
+        granted = min(requested, (now + burst - tat) // interval + 1)
+        await self.client.set(keys[0], tat + granted * interval)
+        return [granted, 0]
@@ -0,0 +1,191 @@
+"""
+Тесты колоночного снимка пользователей для оценки аудитории.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.admin.actions.notification_actions import NotificationActions
+from app.endpoints.notifications import router
+from app.services.broadcast import ColumnsBuilder
+from app.services.notification_service import NotificationService
+
+START = datetime(2024, 1, 1)
+
+
+def make_rows(size: int, seed: int = 1) -> list[tuple]:
+    """Пользователи со случайными языками, статусами и датами."""
+    rng = random.Random(seed)
+    rows = []
+    for user_id in range(1, size + 1):
+        blocked_at = START + timedelta(days=rng.randrange(365)) if rng.random() < 0.1 else None
+        rows.append((
+            user_id,
+            rng.choice(["ru", "en", "uk"]),
+            rng.choice(["active", "active", "active", "inactive", "deleted"]),
+            START + timedelta(days=rng.randrange(365), seconds=rng.randrange(86400)),
+            blocked_at,
+        ))
+    return rows
+
+
+def effective_status(row: tuple) -> str:
+    return "blocked" if row[4] is not None else row[2]
+
+
+class TestAudienceColumns:
+    """Тесты подсчета сегментов и гистограмм."""
+
+    def test_counts_match_row_filters(self):
+        """Счетчики по маскам совпадают с построчной фильтрацией."""
+        rows = make_rows(5000)
+        builder = ColumnsBuilder()
+        builder.extend(rows)
+        columns = builder.build()
+        created_from, created_to = datetime(2024, 3, 1), datetime(2024, 6, 1)
+
+        count = columns.count(
+            status="active", language=["ru", "uk"], created_from=created_from, created_to=created_to
+        )
+
+        expected = sum(
+            1 for row in rows
+            if effective_status(row) == "active"
+            and row[1] in ("ru", "uk")
+            and created_from <= row[3] < created_to
+        )
+        assert count == expected
+        assert columns.count(status="blocked") == sum(1 for row in rows if row[4] is not None)
+        assert columns.count(language="de") == 0
+        assert columns.size == 5000
+
+    def test_histograms(self):
+        """Гистограммы по языкам и месяцам регистрации; пользователи без даты пропускаются."""
+        rows = make_rows(2000)
+        builder = ColumnsBuilder()
+        builder.extend(rows)
+        columns = builder.build()
+
+        languages = columns.histogram("language", status="active")
+        months = columns.histogram("created_at", bucket="month")
+        blocked = columns.histogram("blocked_at", bucket="year")
+
+        for language in ("ru", "en", "uk"):
+            assert languages[language] == sum(
+                1 for row in rows if row[1] == language and effective_status(row) == "active"
+            )
+        assert sum(months.values()) == 2000
+        assert months["2024-02"] == sum(1 for row in rows if row[3].month == 2)
+        assert blocked == {"2024": sum(1 for row in rows if row[4] is not None)}
+        with pytest.raises(ValueError):
+            columns.histogram("name")
+
+    @pytest.mark.slow
+    def test_million_users_are_counted_faster_than_rows(self):
+        """Миллион пользователей считается быстрее построчного фильтра и с тем же результатом."""
+        rows = make_rows(1_000_000)
+        builder = ColumnsBuilder()
+        builder.extend(rows)
+        columns = builder.build()
+        created_from = datetime(2024, 6, 1)
+
+        started = time.perf_counter()
+        expected = sum(
+            1 for row in rows
+            if effective_status(row) == "active" and row[1] == "ru" and row[3] >= created_from
+        )
+        baseline = time.perf_counter() - started
+        durations = []
+        for _ in range(3):
+            started = time.perf_counter()
+            count = columns.count(status="active", language="ru", created_from=created_from)
+            durations.append(time.perf_counter() - started)
+
+        assert count == expected
+        # Граница относительная и с запасом: абсолютное время зависит от машины и ее загрузки
+        assert min(durations) < baseline
+        assert columns.nbytes == 27 * 1_000_000
+
+
+class TestAudienceEstimateApi:
+    """Тесты оценки аудитории через сервис и API."""
+
+    @pytest.mark.asyncio
+    async def test_refresh_reads_users_by_pages(self):
+        """Снимок строится постраничной выборкой по ключу."""
+        bot = MagicMock()
+        bot.id = 1
+        service = NotificationService(bot, MagicMock())
+        service.config.audience_columns_page_size = 300
+        rows = make_rows(1000)
+        repository = MagicMock()
+        repository.users.get_columns = AsyncMock(
+            side_effect=lambda after_id, limit: rows[after_id:after_id + limit]
+        )
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            columns = await service.refresh_audience_columns()
+
+        assert columns.size == 1000
+        assert service.columns is columns
+        assert repository.users.get_columns.await_count == 5
+
+    def test_estimate_and_histogram_endpoints(self):
+        """API возвращает размер сегмента и гистограмму, до построения снимка отвечает 503."""
+        rows = make_rows(1000)
+        builder = ColumnsBuilder()
+        builder.extend(rows)
+        app = FastAPI()
+        app.include_router(router)
+        app.state.notification_service = SimpleNamespace(columns=None)
+        client = TestClient(app)
+
+        assert client.get("/api/notifications/audience/estimate").status_code == 503
+
+        app.state.notification_service.columns = builder.build()
+        estimate = client.get(
+            "/api/notifications/audience/estimate", params={"language": ["ru", "en"]}
+        ).json()
+        histogram = client.get(
+            "/api/notifications/audience/histogram",
+            params={"field": "status", "status": ["active", "blocked"]},
+        ).json()
+
+        assert estimate["count"] == sum(
+            1 for row in rows if row[1] in ("ru", "en") and effective_status(row) == "active"
+        )
+        assert estimate["total"] == 1000
+        assert histogram["histogram"] == {
+            status: sum(1 for row in rows if effective_status(row) == status)
+            for status in ("active", "blocked")
+        }
+        assert client.get(
+            "/api/notifications/audience/histogram", params={"field": "name"}
+        ).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_admin_estimate_escapes_languages(self):
+        """Оценка в админке экранирует коды языков, пришедшие от пользователей."""
+        builder = ColumnsBuilder()
+        builder.extend([
+            (1, "<script>", "active", START, None),
+            (2, None, "active", START, None),
+        ])
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(
+            notification_service=SimpleNamespace(columns=builder.build())
+        )))
+
+        html = await NotificationActions.estimate_audience(request, [])
+
+        assert "<script>" not in html
+        assert "&lt;script&gt;: 1" in html
+        assert "—: 1" in html
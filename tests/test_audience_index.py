@@ -0,0 +1,123 @@
+"""
+Тесты индекса аудитории на битовых картах Redis.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.config.env import BroadcastConfig
+from app.services.redis.audience import AudienceIndex, decode_bitmap, split_user_id
+from app.services.notification_service import NotificationService
+from tests.fake_redis import FakeRedis
+
+
+def make_user(user_id: int, status: str = "active", language: str = "ru", bot_id=None, blocked_at=None):
+    """Пользователь с индексируемыми атрибутами."""
+    return SimpleNamespace(id=user_id, status=status, language=language, bot_id=bot_id, blocked_at=blocked_at)
+
+
+class TestAudienceIndex:
+    """Тесты инкрементального обновления индекса."""
+
+    def test_large_ids_are_sharded(self):
+        """ID больше 2^32 раскладываются по шардам и восстанавливаются из карты."""
+        user_id = 7_000_000_123
+        shard, offset = split_user_id(user_id)
+        bitmap = bytearray(offset // 8 + 1)
+        bitmap[offset // 8] |= 0x80 >> (offset % 8)
+
+        assert decode_bitmap(shard, bytes(bitmap)) == [user_id]
+
+    @pytest.mark.asyncio
+    async def test_status_change_moves_user_between_segments(self):
+        """Смена статуса снимает пользователя из прежнего сегмента."""
+        index = AudienceIndex(FakeRedis())
+        await index.index_user(make_user(1))
+        await index.index_user(make_user(2, language="en"))
+        await index.index_user(make_user(3_000_000_000))
+
+        await index.index_user(make_user(1, blocked_at=datetime(2025, 1, 1)))
+
+        assert await index.count(status="active") == 2
+        assert await index.count(status="blocked") == 1
+        assert await index.count(status="active", language="ru") == 1
+
+    @pytest.mark.asyncio
+    async def test_members_are_enumerated_in_order(self):
+        """Участники сегмента перечисляются по возрастанию ID."""
+        index = AudienceIndex(FakeRedis())
+        for user_id in (2 ** 33, 5, 2 ** 21 + 1, 7):
+            await index.index_user(make_user(user_id))
+        await index.set_status(7, "deleted")
+
+        members = [user_id async for page in index.iter_members(status="active") for user_id in page]
+
+        assert members == [5, 2 ** 21 + 1, 2 ** 33]
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_do_not_break_callers(self):
+        """Ошибка Redis логируется и не прерывает обновление пользователя."""
+        client = MagicMock()
+        client.pipeline.side_effect = ConnectionError("redis is down")
+        index = AudienceIndex(client)
+
+        await index.index_user(make_user(1))
+
+
+class TestIndexedBroadcast:
+    """Тесты рассылки по индексу аудитории."""
+
+    @pytest.mark.asyncio
+    async def test_recipients_come_from_index(self, broadcast_snapshot_dir):
+        """Получатели берутся из битовых карт, таблица users не запрашивается."""
+        index = AudienceIndex(FakeRedis())
+        for user in (make_user(10, bot_id=1), make_user(20, bot_id=2), make_user(30), make_user(40, status="blocked")):
+            await index.index_user(user)
+
+        main_bot, extra_bot = MagicMock(), MagicMock()
+        main_bot.id, extra_bot.id = 1, 2
+        main_bot.send_message = AsyncMock()
+        extra_bot.send_message = AsyncMock()
+        config = BroadcastConfig(use_audience_index=True, snapshot_dir=broadcast_snapshot_dir)
+        service = NotificationService(main_bot, MagicMock(), config=config, bots=[extra_bot], audience=index)
+
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=MagicMock(text="Test message", paid_broadcast=False, weight=1.0, max_rate=None))
+        repository._update = AsyncMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.users.get_active_recipients = AsyncMock()
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            result = await service.send_bulk_notification(1)
+
+        repository.users.get_active_recipients.assert_not_awaited()
+        assert result["sent"] == 3
+        assert {c.kwargs["chat_id"] for c in main_bot.send_message.call_args_list} == {10, 30}
+        assert {c.kwargs["chat_id"] for c in extra_bot.send_message.call_args_list} == {20}
+        # Снимок завершенной рассылки не нужен для возобновления и удален
+        assert not (broadcast_snapshot_dir / "notification-1.bin").exists()
+
+    @pytest.mark.asyncio
+    async def test_user_status_update_reindexes_user(self):
+        """Обновление статуса после ошибки Telegram отражается в индексе."""
+        index = AudienceIndex(FakeRedis())
+        await index.index_user(make_user(10))
+        bot = MagicMock()
+        bot.id = 1
+        service = NotificationService(bot, MagicMock(), audience=index)
+
+        repository = MagicMock()
+        repository.users.update_many = AsyncMock(return_value={10: make_user(10, status="blocked")})
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock(commit=AsyncMock()))
+            context.return_value = cm
+            await service._update_user_status(10, "blocked")
+
+        assert await index.count(status="active") == 0
+        assert await index.count(status="blocked") == 1
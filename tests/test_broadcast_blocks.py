@@ -0,0 +1,131 @@
+"""
+Тесты компактных блоков получателей.
+"""
+
+import asyncio
+import tracemalloc
+from array import array
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramServerError
+from aiogram.methods import SendMessage
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import BlockTask, DeliveryStatus, MessageBlock, RecipientBlock
+from app.services.notification_service import NotificationService, NotificationTask
+
+
+class TestRecipientBlock:
+    """Тесты параллельных массивов блока."""
+
+    def test_results_and_retries_are_tracked_per_recipient(self):
+        """Временная ошибка увеличивает счетчик попыток, выборка переносит счетчики."""
+        block = RecipientBlock(1, [10, 20, 30, 40])
+        block.mark(0, DeliveryStatus.SENT)
+        block.mark(1, DeliveryStatus.RETRYABLE)
+        block.mark(2, DeliveryStatus.FAILED)
+        block.mark(3, DeliveryStatus.RETRYABLE)
+
+        retry = block.select(DeliveryStatus.RETRYABLE)
+
+        assert block.count(DeliveryStatus.SENT) == 1
+        assert list(retry) == [20, 40]
+        assert list(retry.retries) == [1, 1]
+        assert retry.count(DeliveryStatus.RETRYABLE) == 0
+        assert len(block.select(DeliveryStatus.RETRYABLE, max_retries=0)) == 0
+
+    def test_message_block_is_compact(self):
+        """Получатель с ID сообщения занимает 14 байт."""
+        block = MessageBlock(1)
+        block.append(10, 100)
+        block.append(20, 200)
+
+        assert block[1] == (20, 200)
+        assert list(block) == [(10, 100), (20, 200)]
+        assert block.nbytes == 2 * 14
+
+    @pytest.mark.slow
+    def test_one_million_recipients_memory(self):
+        """Блок на 1 млн получателей занимает около 10 байт на получателя против сотен у задач."""
+        tracemalloc.start()
+        try:
+            block = RecipientBlock(1, array("q", range(1, 1_000_001)))
+            block_size, _ = tracemalloc.get_traced_memory()
+            baseline = block_size
+            tasks = [NotificationTask(notification_id=1, user_id=user_id, message="x") for user_id in range(10_000)]
+            task_size = (tracemalloc.get_traced_memory()[0] - baseline) / len(tasks)
+        finally:
+            tracemalloc.stop()
+
+        assert block.nbytes == 10_000_000
+        assert block_size / len(block) <= 16
+        assert task_size > 100
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_one_million_recipients_run(self):
+        """Движок проходит 1 млн получателей блока и отмечает результат каждого."""
+        bot = MagicMock()
+        bot.id = 1
+        config = BroadcastConfig(rate_limit=10 ** 9, initial_concurrency=100)
+        service = NotificationService(bot, MagicMock(), config=config)
+        block = RecipientBlock(1, array("q", range(1, 1_000_001)))
+        run = service._create_run(1, "x", service.standard_profile, "send")
+        run.ledger._writer = AsyncMock()
+
+        async def handle(shard, user_id, run):
+            return {"success": True, "user_id": user_id, "error_type": None}
+
+        await asyncio.wait_for(service._run_shard(service.primary_shard, block, run, handle), timeout=120)
+        await run.close()
+
+        assert block.count(DeliveryStatus.SENT) == 1_000_000
+
+
+class TestQueuedBlocks:
+    """Тесты очереди блоков."""
+
+    @pytest.mark.asyncio
+    async def test_block_retries_only_retryable_recipients(self):
+        """Повторяются только временные ошибки, исчерпавшие попытки попадают в очередь недоставленных."""
+        attempts = {}
+
+        async def send_message(**kwargs):
+            chat_id = kwargs["chat_id"]
+            attempts[chat_id] = attempts.get(chat_id, 0) + 1
+            if chat_id == 3 or (chat_id == 2 and attempts[chat_id] < 3):
+                raise TelegramServerError(method=SendMessage(chat_id=chat_id, text="x"), message="Bad Gateway")
+            return MagicMock(message_id=chat_id)
+
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(side_effect=send_message)
+        service = NotificationService(bot, MagicMock(), config=BroadcastConfig(breaker_min_requests=100))
+        repository = MagicMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+
+        with patch("app.services.notification_service.SQLSessionContext") as context, \
+                patch("app.services.notification_service.asyncio.sleep", AsyncMock()):
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            await service._send_block(BlockTask(1, "x", RecipientBlock(1, [1, 2, 3]), max_retries=3))
+
+        assert attempts == {1: 1, 2: 3, 3: 4}
+        dead_letters = [row for call in repository.dead_letters.upsert_many.call_args_list for row in call.args[1]]
+        assert [row[0] for row in dead_letters] == [3]
+
+    @pytest.mark.asyncio
+    async def test_recipients_are_enqueued_in_blocks(self):
+        """Получатели ставятся в очередь блоками по ботам заданного размера."""
+        main_bot, extra_bot = MagicMock(), MagicMock()
+        main_bot.id, extra_bot.id = 1, 2
+        service = NotificationService(main_bot, MagicMock(), config=BroadcastConfig(queue_block_size=2), bots=[extra_bot])
+        service._ensure_queue_running = AsyncMock()
+
+        blocks = await service.enqueue_notification(1, "x", [(10, 1), (20, None), (30, 2), (40, 1)])
+
+        queued = [service.queue.queue.get_nowait() for _ in range(blocks)]
+        assert [(task.bot_id, list(task.block)) for task in queued] == [(1, [10, 20]), (1, [40]), (2, [30])]
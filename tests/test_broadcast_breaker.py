@@ -0,0 +1,124 @@
+"""
+Тесты выключателя рассылки при сбоях Telegram.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramServerError
+from aiogram.methods import SendMessage
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import BreakerState, CircuitBreaker, metrics
+from app.services.notification_service import NotificationService
+
+
+class TestCircuitBreaker:
+    """Тесты переходов выключателя."""
+
+    @pytest.mark.asyncio
+    async def test_opens_after_error_threshold(self):
+        """Выключатель размыкается, когда доля ошибок в окне достигает порога."""
+        breaker = CircuitBreaker(min_requests=10, error_threshold=0.5, name="threshold-test")
+        for _ in range(5):
+            await breaker.record(False)
+        for _ in range(4):
+            await breaker.record(True)
+        assert breaker.state is BreakerState.CLOSED
+
+        await breaker.record(True)
+
+        assert breaker.state is BreakerState.OPEN
+        assert metrics.get("broadcast_breaker_state", breaker="threshold-test") == BreakerState.OPEN
+        assert metrics.get("broadcast_breaker_transitions_total", breaker="threshold-test", to="open") == 1
+
+    @pytest.mark.asyncio
+    async def test_single_probe_closes_breaker(self):
+        """После паузы проходит один пробный запрос, его успех замыкает выключатель."""
+        breaker = CircuitBreaker(min_requests=1, open_timeout=0.05)
+        await breaker.record(True)
+
+        probe = await breaker.acquire()
+        waiter = asyncio.create_task(breaker.acquire())
+        await asyncio.sleep(0.01)
+
+        assert probe is True
+        assert breaker.state is BreakerState.HALF_OPEN
+        assert not waiter.done()
+
+        await breaker.record(False, probe=True)
+
+        assert await waiter is False
+        assert breaker.state is BreakerState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_doubles_pause(self):
+        """Неудачная проба снова размыкает выключатель с удвоенной паузой."""
+        breaker = CircuitBreaker(min_requests=1, open_timeout=0.01, max_open_timeout=0.03)
+        await breaker.record(True)
+
+        for expected in (0.02, 0.03):
+            assert await breaker.acquire() is True
+            await breaker.record(True, probe=True)
+            assert breaker.state is BreakerState.OPEN
+            assert breaker._timeout == pytest.approx(expected)
+
+    @pytest.mark.asyncio
+    async def test_stale_results_do_not_affect_probe(self):
+        """Результаты запросов, начатых до размыкания, не замыкают выключатель."""
+        breaker = CircuitBreaker(min_requests=1, open_timeout=60)
+        await breaker.record(True)
+
+        await breaker.record(False)
+
+        assert breaker.state is BreakerState.OPEN
+
+
+class TestBreakerBroadcast:
+    """Тесты рассылки во время сбоя Telegram."""
+
+    @pytest.mark.asyncio
+    async def test_outage_pauses_broadcast_until_recovery(self):
+        """Во время сбоя запросы к Telegram сводятся к пробам, после восстановления рассылка продолжается."""
+        calls = []
+        outage = {"active": True}
+
+        async def send_message(**kwargs):
+            calls.append(kwargs["chat_id"])
+            if outage["active"]:
+                if len(calls) == 40:
+                    outage["active"] = False
+                raise TelegramServerError(method=SendMessage(chat_id=1, text="x"), message="Bad Gateway")
+            return MagicMock(message_id=1)
+
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(side_effect=send_message)
+        config = BroadcastConfig(
+            rate_limit=100000,
+            breaker_min_requests=10,
+            breaker_open_timeout=0.01,
+            breaker_max_open_timeout=0.02,
+        )
+        service = NotificationService(bot, MagicMock(), config=config)
+
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=MagicMock(text="Test message", paid_broadcast=False, weight=1.0, max_rate=None))
+        repository._update = AsyncMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 501)][:limit]
+        )
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            result = await service.send_bulk_notification(1)
+
+        breaker = service.primary_shard.breaker
+        assert breaker.state is BreakerState.CLOSED
+        assert result["failed"] == 40
+        assert result["sent"] == 460
+        assert metrics.get("broadcast_breaker_transitions_total", breaker=breaker.name, to="half_open") >= 1
@@ -0,0 +1,97 @@
+"""
+Тесты адаптивного управления параллелизмом рассылки (AIMD).
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.broadcast import AIMDController, metrics
+
+
+class TestAIMDController:
+    """Тесты контроллера параллелизма."""
+
+    @pytest.mark.asyncio
+    async def test_additive_increase(self):
+        """Окно растет примерно на единицу за полное окно успешных запросов."""
+        controller = AIMDController(initial=4, max_limit=10, cooldown=0)
+        for _ in range(5):
+            await controller.on_success(latency=0.1)
+        assert controller.window == 5
+
+    @pytest.mark.asyncio
+    async def test_slow_requests_do_not_grow_window(self):
+        """При высокой задержке окно не растет."""
+        controller = AIMDController(initial=4, latency_threshold=0.5)
+        for _ in range(20):
+            await controller.on_success(latency=2.0)
+        assert controller.window == 4
+
+    @pytest.mark.asyncio
+    async def test_multiplicative_decrease(self):
+        """Перегрузка сокращает окно вдвое, но не ниже минимума."""
+        controller = AIMDController(initial=16, min_limit=2, cooldown=0)
+        await controller.on_overload()
+        assert controller.window == 8
+        for _ in range(10):
+            await controller.on_overload()
+        assert controller.window == 2
+
+    @pytest.mark.asyncio
+    async def test_decrease_cooldown(self):
+        """Серия ошибок одного всплеска сокращает окно один раз."""
+        controller = AIMDController(initial=16, cooldown=60)
+        await controller.on_overload()
+        await controller.on_overload()
+        assert controller.window == 8
+
+    @pytest.mark.asyncio
+    async def test_window_metric(self):
+        """Текущее окно публикуется как метрика."""
+        controller = AIMDController(initial=7, name="metric-test")
+        assert metrics.get("broadcast_concurrency_window", controller="metric-test") == 7
+
+    @pytest.mark.asyncio
+    async def test_acquire_respects_window(self):
+        """Одновременно выполняется не больше запросов, чем окно."""
+        controller = AIMDController(initial=3, max_limit=3)
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            await controller.acquire()
+            try:
+                peak = max(peak, controller.in_flight)
+                await asyncio.sleep(0.01)
+            finally:
+                await controller.release()
+
+        await asyncio.gather(*(job() for _ in range(20)))
+        assert peak == 3
+        assert controller.in_flight == 0
+
+
+class TestOverloadClassification:
+    """Тесты распознавания перегрузки по исключениям aiogram."""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_shrinks_window(self):
+        """TelegramRetryAfter распознается как 429 и сокращает окно."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from aiogram.exceptions import TelegramRetryAfter
+
+        from app.services.notification_service import NotificationService
+
+        bot = AsyncMock()
+        bot.send_message.side_effect = TelegramRetryAfter(
+            method=MagicMock(), message="Too Many Requests", retry_after=1
+        )
+        service = NotificationService(bot, AsyncMock())
+        window = service.concurrency.window
+
+        result = await service.send_notification_to_user(1, "Test message")
+
+        assert result["error_type"] == "rate_limit"
+        assert service.concurrency.window < window
@@ -0,0 +1,281 @@
+"""
+Тесты объединения рассылок в дайджест.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramServerError
+from aiogram.methods import SendMessage
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import MESSAGE_LIMIT, DeliveryStatus, pack_digest
+from app.services.notification_service import NotificationService
+
+
+class TestPackDigest:
+    """Тесты раскладки текстов по сообщениям."""
+
+    def test_texts_are_joined_in_order(self):
+        """Короткие тексты склеиваются в одно сообщение в порядке уведомлений."""
+        parts = pack_digest([(1, "first"), (2, "second"), (3, "third")])
+
+        assert len(parts) == 1
+        assert parts[0].notification_ids == (1, 2, 3)
+        assert parts[0].text == "first\n\nsecond\n\nthird"
+
+    def test_messages_do_not_exceed_limit(self):
+        """Тексты, не помещающиеся в лимит Telegram, переносятся в следующее сообщение."""
+        texts = [(notification_id, "x" * 1500) for notification_id in range(1, 6)]
+
+        parts = pack_digest(texts)
+
+        assert [part.notification_ids for part in parts] == [(1, 2), (3, 4), (5,)]
+        assert all(len(part.text) <= MESSAGE_LIMIT for part in parts)
+
+    def test_long_text_is_sent_alone(self):
+        """Текст длиннее лимита уходит отдельным сообщением без изменений."""
+        parts = pack_digest([(1, "short"), (2, "y" * 5000), (3, "tail")])
+
+        assert [part.notification_ids for part in parts] == [(1,), (2,), (3,)]
+        assert parts[1].text == "y" * 5000
+
+
+class FakeDeliveries:
+    """Журнал доставки в памяти: (notification_id, user_id) -> (статус, message_id, digest_id)."""
+
+    def __init__(self) -> None:
+        self.rows: dict[tuple[int, int], tuple[int, Optional[int], Optional[int]]] = {}
+
+    async def upsert_many(self, notification_id, rows, digest_id=None) -> None:
+        for user_id, status, message_id in rows:
+            old = self.rows.get((notification_id, user_id))
+            if message_id is None and old is not None:
+                _, message_id, digest_id = old
+            self.rows[(notification_id, user_id)] = (status, message_id, digest_id)
+
+    async def get_messages(self, notification_id, status):
+        return [
+            (user_id, message_id, 1)
+            for (current_id, user_id), (row, message_id, digest_id) in sorted(self.rows.items())
+            if current_id == notification_id and row == status
+            and message_id is not None and digest_id is None
+        ]
+
+    async def count_digest_messages(self, notification_id, status) -> int:
+        return sum(
+            1 for (current_id, _), (row_status, _, digest_id) in self.rows.items()
+            if current_id == notification_id and row_status == status and digest_id is not None
+        )
+
+
+class TestDigestBroadcast:
+    """Тесты рассылки в режиме дайджеста."""
+
+    @staticmethod
+    def make_repository(texts):
+        repository = MagicMock()
+        # Условие выборки имеет вид Notification.id == notification_id
+        repository._get = AsyncMock(side_effect=lambda model, condition: SimpleNamespace(
+            id=condition.right.value, version=1, text=texts[condition.right.value],
+            paid_broadcast=False, weight=1.0, max_rate=None,
+        ))
+        repository._update = AsyncMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 51)][:limit]
+        )
+        return repository
+
+    @pytest.mark.asyncio
+    async def test_burst_is_sent_as_one_message(self, tmp_path):
+        """Рассылки из одного окна уходят одним сообщением, доставка засчитывается каждой."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(return_value=MagicMock(message_id=7))
+        config = BroadcastConfig(digest_enabled=True, digest_window=0.05, snapshot_dir=tmp_path)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = self.make_repository({1: "first", 2: "second", 3: "third"})
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            results = await asyncio.gather(*(service.send_bulk_notification(i) for i in (1, 2, 3)))
+            await service.cleanup()
+
+        assert bot.send_message.await_count == 50
+        assert bot.send_message.call_args.kwargs["text"] == "first\n\nsecond\n\nthird"
+        assert all(result["sent"] == 50 and result["digest"] == [1, 2, 3] for result in results)
+
+        credited = {}
+        for call in repository.deliveries.upsert_many.call_args_list:
+            notification_id, rows = call.args
+            credited.setdefault(notification_id, []).extend(rows)
+            # Строки помечены дайджестом, отправленным от имени первого уведомления
+            assert call.kwargs["digest_id"] == 1
+        assert sorted(credited) == [1, 2, 3]
+        for rows in credited.values():
+            assert len(rows) == 50
+            assert all(status == DeliveryStatus.SENT and message_id == 7 for _, status, message_id in rows)
+
+    @pytest.mark.asyncio
+    async def test_single_notification_is_sent_as_usual(self, tmp_path):
+        """Одиночная рассылка в окне отправляется своим текстом."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(return_value=MagicMock(message_id=7))
+        config = BroadcastConfig(digest_enabled=True, digest_window=0.01, snapshot_dir=tmp_path)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = self.make_repository({1: "only"})
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            result = await service.send_bulk_notification(1)
+            await service.cleanup()
+
+        assert result["sent"] == 50
+        assert "digest" not in result
+        assert {call.kwargs["text"] for call in bot.send_message.call_args_list} == {"only"}
+
+    @pytest.mark.asyncio
+    async def test_overlapping_windows_run_concurrently(self, tmp_path):
+        """Дайджест следующего окна рассылается, не дожидаясь дайджеста предыдущего."""
+        texts = []
+
+        async def send_message(**kwargs):
+            texts.append(kwargs["text"])
+            return MagicMock(message_id=7)
+
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(side_effect=send_message)
+        # При 30 сообщениях в секунду первый дайджест еще идет, когда закрывается второе окно
+        config = BroadcastConfig(
+            digest_enabled=True, digest_window=0.05, rate_limit=30, snapshot_dir=tmp_path
+        )
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = self.make_repository({1: "first", 2: "second", 3: "third", 4: "fourth"})
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            earlier = asyncio.gather(*(service.send_bulk_notification(i) for i in (1, 2)))
+            while not texts:
+                await asyncio.sleep(0.01)
+            later = await asyncio.gather(*(service.send_bulk_notification(i) for i in (3, 4)))
+            first = await earlier
+            await service.cleanup()
+
+        assert all(result["sent"] == 50 and result["digest"] == [1, 2] for result in first)
+        assert all(result["sent"] == 50 and result["digest"] == [3, 4] for result in later)
+        assert texts.count("first\n\nsecond") == 50
+        assert texts.count("third\n\nfourth") == 50
+        # Сообщения второго дайджеста уходят вперемешку с сообщениями первого
+        last_earlier = len(texts) - 1 - texts[::-1].index("first\n\nsecond")
+        assert texts.index("third\n\nfourth") < last_earlier
+
+    @pytest.mark.asyncio
+    async def test_digest_messages_are_not_edited_per_notification(self, tmp_path):
+        """Правка и удаление одного уведомления дайджеста не затрагивают общее сообщение."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(
+            side_effect=lambda **kwargs: MagicMock(message_id=kwargs["chat_id"])
+        )
+        bot.edit_message_text = AsyncMock()
+        bot.delete_message = AsyncMock(return_value=True)
+        config = BroadcastConfig(digest_enabled=True, digest_window=0.05, snapshot_dir=tmp_path)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = self.make_repository({1: "first", 2: "second", 3: "third"})
+        repository.deliveries = FakeDeliveries()
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            await asyncio.gather(*(service.send_bulk_notification(i) for i in (1, 2)))
+            single = await service.send_bulk_notification(3)
+            edited = await service.edit_bulk_notification(2, "changed")
+            deleted = await service.delete_bulk_notification(1)
+            edited_single = await service.edit_bulk_notification(3, "changed")
+            await service.cleanup()
+
+        assert single["sent"] == 50 and "digest" not in single
+        assert (edited["done"], edited["skipped_digests"]) == (0, 50)
+        assert (deleted["done"], deleted["skipped_digests"]) == (0, 50)
+        bot.delete_message.assert_not_awaited()
+        # Отредактированы только сообщения уведомления, отправленного отдельно
+        assert bot.edit_message_text.await_count == 50
+        assert edited_single["done"] == 50
+
+    @pytest.mark.asyncio
+    async def test_temporary_failures_are_dead_lettered_for_every_notification(self, tmp_path):
+        """Временная ошибка сообщения дайджеста попадает в очередь каждого его уведомления."""
+        async def send_message(**kwargs):
+            if kwargs["chat_id"] == 5:
+                raise TelegramServerError(
+                    method=SendMessage(chat_id=5, text="x"), message="Bad Gateway"
+                )
+            return MagicMock(message_id=7)
+
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(side_effect=send_message)
+        config = BroadcastConfig(digest_enabled=True, digest_window=0.05, snapshot_dir=tmp_path)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = self.make_repository({1: "first", 2: "second", 3: "third"})
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            await asyncio.gather(*(service.send_bulk_notification(i) for i in (1, 2, 3)))
+            await service.cleanup()
+
+        dead_letters = {}
+        for call in repository.dead_letters.upsert_many.call_args_list:
+            notification_id, rows = call.args
+            dead_letters.setdefault(notification_id, set()).update(row[0] for row in rows)
+        assert dead_letters == {1: {5}, 2: {5}, 3: {5}}
+
+    @pytest.mark.asyncio
+    async def test_later_parts_are_guarded_while_first_is_sent(self, tmp_path):
+        """Пока идет первое сообщение дайджеста, остальные его уведомления заняты."""
+        attempts = []
+
+        async def send_message(**kwargs):
+            if not attempts:
+                attempts.append(await service.edit_bulk_notification(3, "changed"))
+                attempts.append(await service.retry_failed_deliveries(2))
+            return MagicMock(message_id=7)
+
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(side_effect=send_message)
+        bot.edit_message_text = AsyncMock()
+        config = BroadcastConfig(digest_enabled=True, digest_window=0.05, snapshot_dir=tmp_path)
+        service = NotificationService(bot, MagicMock(), config=config)
+        # Тексты не помещаются в одно сообщение: дайджест уходит тремя запусками
+        repository = self.make_repository({1: "x" * 3000, 2: "y" * 3000, 3: "z" * 3000})
+        repository.deliveries = FakeDeliveries()
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            results = await asyncio.gather(*(service.send_bulk_notification(i) for i in (1, 2, 3)))
+            await service.cleanup()
+
+        assert all(result["sent"] == 50 for result in results)
+        assert [attempt["success"] for attempt in attempts] == [False, False]
+        assert all("уже выполняется операция" in attempt["error"] for attempt in attempts)
+        bot.edit_message_text.assert_not_awaited()
+        assert not service.reserved
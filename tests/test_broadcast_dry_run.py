@@ -0,0 +1,114 @@
+"""
+Тесты пробного запуска рассылки.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import SimulatedBot, metrics, run_virtual
+from app.services.notification_service import NotificationService
+
+
+class TestVirtualClock:
+    """Тесты цикла с виртуальными часами."""
+
+    def test_sleep_is_skipped(self):
+        """Час ожидания проходит мгновенно, а время цикла сдвигается на час."""
+        async def main():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(asyncio.sleep(3600), asyncio.sleep(1800))
+            return loop.time() - start
+
+        started = time.perf_counter()
+        elapsed = run_virtual(main)
+
+        assert elapsed == pytest.approx(3600)
+        assert time.perf_counter() - started < 1
+
+    def test_simulated_bot_errors(self):
+        """Симулированный бот возвращает ошибки с заданной долей и отклоняет неизвестные типы."""
+        bot = SimulatedBot(1, latency=0.1, error_rates={"user_blocked": 0.5})
+
+        async def main():
+            results = await asyncio.gather(
+                *(bot.send_message(chat_id, "text") for chat_id in range(1000)), return_exceptions=True
+            )
+            return sum(isinstance(result, Exception) for result in results)
+
+        failed = run_virtual(main)
+
+        assert bot.requests == 1000
+        assert bot.errors["user_blocked"] == failed
+        assert 400 < failed < 600
+        with pytest.raises(ValueError):
+            SimulatedBot(1, error_rates={"unknown": 0.1})
+
+
+class TestDryRun:
+    """Тесты прогноза рассылки."""
+
+    @staticmethod
+    def make_service(tmp_path, users, **settings):
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock()
+        config = BroadcastConfig(snapshot_dir=tmp_path, **settings)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=SimpleNamespace(
+            id=1, version=1, text="hello", paid_broadcast=False, weight=1.0, max_rate=None,
+        ))
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, users + 1)][:limit]
+        )
+        return service, bot, repository
+
+    @pytest.mark.asyncio
+    async def test_projection_without_sending(self, tmp_path):
+        """Прогноз длительности следует из лимита частоты, сообщения и записи в базу не выполняются."""
+        service, bot, repository = self.make_service(tmp_path, 1000, dry_run_error_rates={})
+        sent_before = metrics.get("broadcast_sent_total", bot=1)
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            report = await service.send_bulk_notification(1, dry_run=True)
+
+        assert report["success"] and report["dry_run"]
+        assert report["total"] == report["sent"] == report["requests"] == 1000
+        # 1000 сообщений при 30 в секунду
+        assert report["duration"] == pytest.approx(1000 / service.standard_profile.rate_limit, rel=0.1)
+        assert report["stars"] == 0.0
+        assert report["peak_memory"] > 0
+        assert report["db"]["notification_deliveries"]["rows"] == 1000
+        assert report["db"]["audience"] == {"queries": 2, "rows": 1000}
+        bot.send_message.assert_not_awaited()
+        assert metrics.get("broadcast_sent_total", bot=1) == sent_before
+        assert not list(tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_retry_rounds(self, tmp_path):
+        """Временные ошибки повторяются раундами, исчерпавшие попытки попадают в недоставленные."""
+        service, bot, repository = self.make_service(
+            tmp_path, 500, dry_run_error_rates={"server_error": 0.3}, dry_run_max_retries=2,
+            retry_budget_ratio=1.0, retry_budget_window=3600,
+        )
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            report = await service.simulate_broadcast(1)
+
+        assert report["retry_rounds"] == 2
+        assert report["requests"] == 500 + report["retried"]
+        assert report["errors"]["server_error"] == report["requests"] - report["sent"]
+        assert 0 < report["failed"] < 50
+        assert report["db"]["dead_letters"]["rows"] == report["failed"]
@@ -0,0 +1,175 @@
+"""
+Тесты массового редактирования, удаления и отмены рассылки.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from app.services.broadcast import DeliveryStatus
+from app.services.notification_service import NotificationService
+
+
+class TestEditEverywhere:
+    """Тесты массового редактирования отправленного уведомления."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_edited_by_their_bot(self, make_bot, make_repository, session_context):
+        """Каждое сообщение редактирует бот, который его отправил."""
+        main_bot, extra_bot = make_bot(1), make_bot(2)
+        service = NotificationService(main_bot, MagicMock(), bots=[extra_bot])
+        repository = make_repository([(10, 100, 1), (20, 200, 2), (30, 300, None)])
+
+        session_context(repository)
+        result = await service.edit_bulk_notification(1, "New text")
+
+        assert result["success"] is True
+        assert result["done"] == 3
+        main_edits = {(c.kwargs["chat_id"], c.kwargs["message_id"]) for c in main_bot.edit_message_text.call_args_list}
+        extra_edits = {(c.kwargs["chat_id"], c.kwargs["message_id"]) for c in extra_bot.edit_message_text.call_args_list}
+        assert main_edits == {(10, 100), (30, 300)}
+        assert extra_edits == {(20, 200)}
+        assert all(c.kwargs["text"] == "New text" for c in main_bot.edit_message_text.call_args_list)
+        # Правка текста увеличивает версию содержимого, от которой зависит кэш
+        assert repository._update.call_args.kwargs.keys() == {"text", "version"}
+        assert repository._update.call_args.kwargs["text"] == "New text"
+        repository.deliveries.get_messages.assert_awaited_once_with(1, DeliveryStatus.SENT)
+
+    @pytest.mark.asyncio
+    async def test_not_modified_message_is_not_an_error(self, make_bot, make_repository, session_context):
+        """Сообщение с тем же текстом считается успешно отредактированным."""
+        bot = make_bot(1)
+        bot.edit_message_text.side_effect = TelegramBadRequest(
+            method=EditMessageText(chat_id=10, message_id=100, text="x"),
+            message="Bad Request: message is not modified",
+        )
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository([(10, 100, 1)])
+
+        session_context(repository)
+        result = await service.edit_bulk_notification(1)
+
+        assert result["done"] == 1
+        assert result["failed"] == 0
+
+
+class TestDeleteEverywhere:
+    """Тесты массового удаления отправленного уведомления."""
+
+    @pytest.mark.asyncio
+    async def test_deleted_messages_are_marked_in_ledger(
+        self, make_bot, make_repository, session_context, written_rows
+    ):
+        """Удаленные сообщения отмечаются в журнале, уведомление получает статус deleted."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository([(10, 100, 1), (20, 200, 1)])
+
+        session_context(repository)
+        result = await service.delete_bulk_notification(1)
+
+        assert result["done"] == 2
+        assert {c.kwargs["message_id"] for c in bot.delete_message.call_args_list} == {100, 200}
+        assert sorted(written_rows(repository)) == [
+            (10, DeliveryStatus.DELETED, None),
+            (20, DeliveryStatus.DELETED, None),
+        ]
+        assert repository._update.call_args.kwargs == {"status": "deleted"}
+
+
+class TestCancellation:
+    """Тесты прогресса и отмены массовых операций."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_can_be_cancelled(
+        self, make_bot, make_repository, session_context, written_rows
+    ):
+        """После отмены рассылка не берет новых получателей."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        progress = []
+
+        async def send_message(**kwargs):
+            progress.append(service.get_progress(1))
+            if len(progress) == 5:
+                service.cancel(1)
+            return MagicMock(message_id=kwargs["chat_id"])
+
+        bot.send_message.side_effect = send_message
+        repository = make_repository([])
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 101)][:limit]
+        )
+
+        session_context(repository)
+        result = await service.send_bulk_notification(1)
+
+        assert result["cancelled"] is True
+        assert result["sent"] < 100
+        assert progress[0]["operation"] == "send"
+        assert progress[0]["total"] == 100
+        assert repository._update.call_args.kwargs["status"] == "cancelled"
+        assert service.get_progress(1) is None
+        assert all(status == DeliveryStatus.SENT for _, status, _ in written_rows(repository))
+
+    @pytest.mark.asyncio
+    async def test_cancel_without_running_operation(self, make_bot):
+        """Отмена без выполняемой операции ничего не делает."""
+        service = NotificationService(make_bot(1), MagicMock())
+
+        assert service.cancel(1) is False
+        assert service.get_progress(1) is None
+
+
+class TestConcurrentOperations:
+    """Тесты одновременных операций над одним уведомлением."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sends_deliver_once(self, make_bot, make_repository, session_context):
+        """Из двух одновременных рассылок одного уведомления выполняется одна."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository()
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 51)][:limit]
+        )
+
+        session_context(repository)
+        first, second = await asyncio.gather(
+            service.send_bulk_notification(1), service.send_bulk_notification(1)
+        )
+
+        assert first["success"] is True
+        assert second == {"success": False, "error": "Для уведомления 1 уже выполняется операция"}
+        chat_ids = sorted(c.kwargs["chat_id"] for c in bot.send_message.call_args_list)
+        assert chat_ids == list(range(1, 51))
+        assert not service.reserved
+
+    @pytest.mark.asyncio
+    async def test_concurrent_edit_and_delete(self, make_bot, make_repository, session_context):
+        """Удаление, запущенное во время правки, отклоняется; после правки уведомление свободно."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository([(10, 100, 1)])
+        notification = repository._get.return_value
+
+        async def get_notification(*args, **kwargs):
+            # Чтение из базы уступает цикл событий второй операции
+            await asyncio.sleep(0)
+            return notification
+
+        repository._get.side_effect = get_notification
+
+        session_context(repository)
+        edited, deleted = await asyncio.gather(
+            service.edit_bulk_notification(1, "New text"), service.delete_bulk_notification(1)
+        )
+        retried = await service.delete_bulk_notification(1)
+
+        assert edited["done"] == 1
+        assert deleted["success"] is False
+        bot.edit_message_text.assert_awaited_once()
+        assert retried["done"] == 1
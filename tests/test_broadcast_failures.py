@@ -0,0 +1,53 @@
+"""
+Тесты ограниченной по памяти сводки ошибок рассылки.
+"""
+
+import random
+
+from app.services.broadcast import FailureAggregator
+
+
+class TestFailureAggregator:
+    """Тесты сводки ошибок."""
+
+    def test_counts_per_error_type(self):
+        """Ошибки считаются по типам."""
+        failures = FailureAggregator()
+        for user_id in range(5):
+            failures.add(user_id, "user_blocked")
+        failures.add(100, "rate_limit", "Превышен лимит отправки")
+
+        assert failures.total == 6
+        assert failures.counts == {"user_blocked": 5, "rate_limit": 1}
+        assert failures.summary() == "user_blocked=5, rate_limit=1"
+
+    def test_sample_is_bounded(self):
+        """Выборка примеров не превышает заданный размер."""
+        failures = FailureAggregator(sample_size=10, rng=random.Random(42))
+        for user_id in range(100_000):
+            failures.add(user_id, "chat_not_found")
+
+        sample = failures.samples["chat_not_found"]
+        assert len(sample) == 10
+        assert len(set(sample)) == 10
+        assert all(0 <= user_id < 100_000 for user_id in sample)
+
+    def test_to_dict_is_compact(self):
+        """Сериализованная сводка содержит только счетчики и примеры."""
+        failures = FailureAggregator(sample_size=3)
+        for user_id in range(1000):
+            failures.add(user_id, "unknown_error", "x" * 1000)
+
+        data = failures.to_dict()
+        assert data["total"] == 1000
+        assert data["counts"] == {"unknown_error": 1000}
+        assert len(data["samples"]["unknown_error"]) == 3
+        assert len(data["messages"]["unknown_error"]) == 200
+
+    def test_summary_due_respects_interval(self):
+        """Периодическая сводка выводится не чаще заданного интервала."""
+        failures = FailureAggregator(summary_interval=0)
+        assert failures.summary_due() is True
+
+        failures = FailureAggregator(summary_interval=3600)
+        assert failures.summary_due() is False
@@ -0,0 +1,172 @@
+"""
+Тесты платной рассылки и журнала доставки.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import DeliveryLedger, DeliveryStatus, RateProfile, SimulatedBot, run_virtual
+from app.services.notification_service import NotificationService
+
+
+async def run_broadcast(service: NotificationService, users: list, paid: bool) -> tuple[dict, MagicMock]:
+    """Запускает рассылку с замоканной базой данных и возвращает репозиторий."""
+    repository = MagicMock()
+    repository._get = AsyncMock(return_value=MagicMock(text="Test message", paid_broadcast=paid, weight=1.0, max_rate=None))
+    repository._update = AsyncMock()
+    rows = [(user.id, user.bot_id) for user in users]
+    repository.users.get_active_recipients = AsyncMock(
+        side_effect=lambda after_id, limit: [row for row in rows if row[0] > after_id][:limit]
+    )
+    repository.deliveries.upsert_many = AsyncMock()
+
+    with patch("app.services.notification_service.SQLSessionContext") as context:
+        cm = AsyncMock()
+        cm.__aenter__.return_value = (repository, MagicMock())
+        context.return_value = cm
+        result = await service.send_bulk_notification(1)
+    return result, repository
+
+
+class TestDeliveryLedger:
+    """Тесты пакетной записи журнала доставки."""
+
+    @pytest.mark.asyncio
+    async def test_rows_are_written_in_batches(self):
+        """Записи уходят в базу пачками заданного размера."""
+        writer = AsyncMock()
+        ledger = DeliveryLedger(7, writer=writer, batch_size=3)
+
+        for user_id in range(7):
+            ledger.add(user_id, DeliveryStatus.SENT)
+        await ledger.close()
+
+        sizes = [len(call.args[1]) for call in writer.call_args_list]
+        assert sizes == [3, 3, 1]
+        assert ledger.written == 7
+        assert all(call.args[0] == 7 for call in writer.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_write_error_does_not_break_broadcast(self):
+        """Ошибка записи журнала логируется и не прерывает рассылку."""
+        writer = AsyncMock(side_effect=RuntimeError("db is down"))
+        ledger = DeliveryLedger(1, writer=writer, batch_size=2)
+
+        ledger.add(1, DeliveryStatus.SENT)
+        ledger.add(2, DeliveryStatus.FAILED)
+        await ledger.close()
+
+        assert ledger.written == 0
+
+
+class TestPaidBroadcast:
+    """Тесты профиля платной рассылки."""
+
+    @pytest.mark.asyncio
+    async def test_paid_flag_is_passed_to_telegram(self, written_rows):
+        """Платная рассылка отправляет сообщения с allow_paid_broadcast."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock()
+        service = NotificationService(bot, MagicMock())
+        paid_bot = MagicMock()
+        paid_bot.id = 1
+        paid_bot.send_message = AsyncMock(return_value=MagicMock(message_id=555))
+
+        with patch("app.services.notification_service.clone_bot", return_value=paid_bot):
+            result, repository = await run_broadcast(service, [MagicMock(id=10, bot_id=1)], paid=True)
+
+        assert result["profile"] == "paid"
+        bot.send_message.assert_not_called()
+        assert paid_bot.send_message.call_args.kwargs["allow_paid_broadcast"] is True
+        assert written_rows(repository) == [(10, DeliveryStatus.SENT, 555)]
+
+    @pytest.mark.asyncio
+    async def test_standard_broadcast_does_not_request_paid_limits(self):
+        """Обычная рассылка не передает allow_paid_broadcast."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock()
+        service = NotificationService(bot, MagicMock())
+
+        result, _ = await run_broadcast(service, [MagicMock(id=10, bot_id=1)], paid=False)
+
+        assert result["profile"] == "standard"
+        assert "allow_paid_broadcast" not in bot.send_message.call_args.kwargs
+        assert service.paid_shards == {}
+
+    def test_profiles_keep_their_rate(self):
+        """Платная рассылка идет со скоростью платного лимита, обычная — не быстрее своего.
+
+        Время виртуальное: скорость задает только движок, а не процессор машины.
+        Сверх начального запаса корзины (секунда лимита) сообщения уходят
+        не быстрее лимита профиля.
+        """
+        config = BroadcastConfig(rate_limit=30, paid_rate_limit=900, paid_ledger_batch_size=500)
+        users = [MagicMock(id=user_id, bot_id=42) for user_id in range(1, 3601)]
+        standard_users = users[:120]
+
+        async def measure(service: NotificationService, recipients: list, paid: bool) -> tuple[dict, float]:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result, _ = await run_broadcast(service, recipients, paid=paid)
+            return result, loop.time() - started
+
+        async def main():
+            bot = SimulatedBot(42, latency=0.005)
+            paid_bot = SimulatedBot(42, latency=0.005)
+            paid_bot.session = MagicMock(close=AsyncMock())
+            service = NotificationService(bot, MagicMock(), config=config)
+            with patch("app.services.notification_service.clone_bot", return_value=paid_bot):
+                paid = await measure(service, users, paid=True)
+            standard = await measure(service, standard_users, paid=False)
+            await service.cleanup()
+            return paid, standard, paid_bot.requests, bot.requests
+
+        (paid, duration), (standard, standard_duration), paid_requests, requests = run_virtual(main)
+
+        assert paid["sent"] == paid_requests == len(users)
+        assert len(users) / duration > 0.8 * config.paid_rate_limit
+        assert len(users) - config.paid_rate_limit <= config.paid_rate_limit * duration
+
+        assert standard["profile"] == "standard"
+        assert standard["sent"] == requests == len(standard_users)
+        assert len(standard_users) - config.rate_limit <= config.rate_limit * standard_duration
+        assert len(standard_users) / standard_duration > 0.8 * RateProfile.standard(config).rate_limit
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_paid_broadcast_through_bot_api(self, fake_bot_api, written_rows):
+        """Платная рассылка через фейковый Bot API не упирается в лимит 1000 сообщений в секунду.
+
+        Скорость профилей проверяет test_profiles_keep_their_rate: здесь сервер
+        и бот делят один процессор, и потолок скорости задает машина.
+        """
+        config = BroadcastConfig(paid_rate_limit=900, paid_ledger_batch_size=500)
+        bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(fake_bot_api.url)))
+        service = NotificationService(bot, MagicMock(), config=config)
+        users = [MagicMock(id=user_id, bot_id=42) for user_id in range(1, 1801)]
+
+        try:
+            started = time.monotonic()
+            result, repository = await run_broadcast(service, users, paid=True)
+            duration = time.monotonic() - started
+        finally:
+            await service.cleanup()
+            await bot.session.close()
+
+        assert result["sent"] == len(users)
+        assert result["failed"] == 0
+        assert fake_bot_api.throttled == 0
+        assert fake_bot_api.calls["sendMessage"] == len(users)
+        assert all(request["allow_paid_broadcast"] == "true" for request in fake_bot_api.requests)
+        # Стандартный профиль (30 сообщений в секунду) потратил бы на это минуту
+        assert duration < len(users) / config.rate_limit / 10
+        assert len(written_rows(repository)) == len(users)
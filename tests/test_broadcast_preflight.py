@@ -0,0 +1,163 @@
+"""
+Тесты проверки текста и пробной отправки перед рассылкой.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import validate_html
+from app.services.notification_service import NotificationService
+
+SEND_METHOD = SendMessage(chat_id=1, text="x")
+
+
+def preflight_config(tmp_path) -> BroadcastConfig:
+    """Настройки рассылки без ограничения частоты и с пробной отправкой 50 получателям."""
+    return BroadcastConfig(snapshot_dir=tmp_path, rate_limit=10 ** 6, canary_size=50)
+
+
+def make_audience(users: int, text: str = "<b>Новости</b>") -> MagicMock:
+    """Репозиторий с уведомлением text и users активными пользователями."""
+    repository = MagicMock()
+    repository._get = AsyncMock(return_value=SimpleNamespace(
+        id=1, version=1, text=text, paid_broadcast=False, weight=1.0, max_rate=None,
+    ))
+    repository._update = AsyncMock()
+    repository.deliveries.upsert_many = AsyncMock()
+    repository.dead_letters.upsert_many = AsyncMock()
+    repository.users.update_many = AsyncMock(return_value={})
+    repository.users.get_active_recipients = AsyncMock(
+        side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, users + 1)][:limit]
+    )
+    return repository
+
+
+async def send_bulk(service: NotificationService, repository: MagicMock) -> dict:
+    with patch("app.services.notification_service.SQLSessionContext") as context:
+        cm = AsyncMock()
+        cm.__aenter__.return_value = (repository, MagicMock(commit=AsyncMock()))
+        context.return_value = cm
+        result = await service.send_bulk_notification(1)
+        await service.cleanup()
+    return result
+
+
+def final_status(repository: MagicMock) -> dict:
+    """Поля последнего обновления уведомления."""
+    return repository._update.await_args_list[-1].kwargs
+
+
+class TestValidateHtml:
+    """Тесты локальной проверки разметки."""
+
+    def test_valid_markup(self):
+        """Поддерживаемые теги, ссылки и сущности проходят проверку."""
+        text = '<b>Скидки</b> &amp; <a href="https://example.com">акции</a> <span class="tg-spoiler">!</span> 1 &lt; 2'
+
+        assert validate_html(text) == []
+
+    @pytest.mark.parametrize(
+        "text, error",
+        [
+            ("<b>Скидки", "незакрытый тег <b>"),
+            ("<b>Скидки</i></b>", "лишний закрывающий тег </i>, ожидался </b>"),
+            ("Скидки<br>", "неподдерживаемый тег <br>"),
+            ("1 < 2", "символ < вне тега, его нужно заменить на &lt;"),
+            ("<a>ссылка</a>", "у тега <a> нет атрибута href"),
+            ("&nbsp;", "неподдерживаемая сущность &nbsp;"),
+            ("x" * 4097, "текст длиннее 4096 символов: 4097"),
+        ],
+    )
+    def test_invalid_markup(self, text, error):
+        """Ошибки, на которые Telegram ответит 400, находятся без запросов."""
+        assert error in validate_html(text)
+
+
+class TestPreflight:
+    """Тесты проверки перед рассылкой."""
+
+    @pytest.mark.asyncio
+    async def test_invalid_markup_costs_no_requests(self, tmp_path, make_service):
+        """Рассылка с некорректной разметкой не строит снимок и не отправляет сообщений."""
+        service = make_service(None, preflight_config(tmp_path))
+        bot, repository = service.bot, make_audience(1000, text="<b>Скидки")
+
+        result = await send_bulk(service, repository)
+
+        assert result["success"] is False
+        assert "незакрытый тег <b>" in result["error"]
+        bot.send_message.assert_not_awaited()
+        repository.users.get_active_recipients.assert_not_awaited()
+        assert final_status(repository)["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_text_is_checked_in_admin_chat(self, tmp_path, make_service):
+        """Текст, отклоненный Telegram в чате проверки, не рассылается."""
+        async def send_message(**kwargs):
+            raise TelegramBadRequest(method=SEND_METHOD, message="Bad Request: can't parse entities: unclosed tag")
+
+        service = make_service(send_message, preflight_config(tmp_path), preflight_chat_id=-100)
+        bot, repository = service.bot, make_audience(1000)
+
+        result = await send_bulk(service, repository)
+
+        assert result["success"] is False
+        assert bot.send_message.await_count == 1
+        assert bot.send_message.await_args.kwargs["chat_id"] == -100
+        assert bot.send_message.await_args.kwargs["disable_notification"] is True
+
+    @pytest.mark.asyncio
+    async def test_invalid_message_is_not_retried(self):
+        """Ответ Telegram о некорректном тексте не повторяется."""
+        service = NotificationService(MagicMock(id=1), MagicMock())
+        error = TelegramBadRequest(method=SEND_METHOD, message="Bad Request: can't parse entities")
+
+        info = await service._handle_telegram_error(error, 1)
+
+        assert info["type"] == "invalid_message"
+        assert info["should_retry"] is False
+
+
+class TestCanary:
+    """Тесты пробной отправки первым получателям."""
+
+    @pytest.mark.asyncio
+    async def test_broken_message_stops_after_canary(self, tmp_path, make_service):
+        """Если у пробной отправки ошибки, остальная аудитория не получает запросов."""
+        async def send_message(**kwargs):
+            raise TelegramBadRequest(method=SEND_METHOD, message="Bad Request: BUTTON_DATA_INVALID")
+
+        service = make_service(send_message, preflight_config(tmp_path))
+        bot, repository = service.bot, make_audience(1000)
+
+        result = await send_bulk(service, repository)
+
+        assert bot.send_message.await_count == 50
+        assert result["success"] is False
+        assert result["aborted"] and "50 из 50" in result["aborted"]
+        assert final_status(repository)["status"] == "failed"
+        assert result["remaining"] == 950
+
+    @pytest.mark.asyncio
+    async def test_blocked_users_do_not_stop_broadcast(self, tmp_path, make_service):
+        """Блокировки бота не считаются ошибками текста."""
+        async def send_message(**kwargs):
+            if kwargs["chat_id"] % 2:
+                raise TelegramForbiddenError(method=SEND_METHOD, message="Forbidden: bot was blocked by the user")
+            return MagicMock(message_id=1)
+
+        service = make_service(send_message, preflight_config(tmp_path))
+        bot, repository = service.bot, make_audience(1000)
+
+        result = await send_bulk(service, repository)
+
+        assert bot.send_message.await_count == 1000
+        assert result["aborted"] is None
+        assert result["sent"] == 500
+        assert result["remaining"] == 0
+
@@ -0,0 +1,68 @@
+"""
+Тесты рассылки через несколько ботов.
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.config.env import BroadcastConfig
+from app.services.notification_service import NotificationService
+
+
+async def run_broadcast(service: NotificationService, users: list) -> dict:
+    """Запускает рассылку с замоканной базой данных."""
+    repository = MagicMock()
+    repository._get = AsyncMock(return_value=MagicMock(text="Test message", paid_broadcast=False, weight=1.0, max_rate=None))
+    repository._update = AsyncMock()
+    rows = [(user.id, user.bot_id) for user in users]
+    repository.users.get_active_recipients = AsyncMock(
+        side_effect=lambda after_id, limit: [row for row in rows if row[0] > after_id][:limit]
+    )
+
+    with patch("app.services.notification_service.SQLSessionContext") as context:
+        cm = AsyncMock()
+        cm.__aenter__.return_value = (repository, MagicMock())
+        context.return_value = cm
+        return await service.send_bulk_notification(1)
+
+
+class TestShardedBroadcast:
+    """Тесты распределения рассылки по ботам."""
+
+    @pytest.mark.asyncio
+    async def test_users_are_sent_through_their_bot(self, make_bot):
+        """Каждый пользователь получает сообщение от бота, с которым начал диалог."""
+        main_bot, extra_bot = make_bot(1), make_bot(2)
+        service = NotificationService(main_bot, MagicMock(), bots=[main_bot, extra_bot])
+        users = [MagicMock(id=10, bot_id=1), MagicMock(id=20, bot_id=2), MagicMock(id=30, bot_id=None)]
+
+        result = await run_broadcast(service, users)
+
+        main_chats = {call.kwargs["chat_id"] for call in main_bot.send_message.call_args_list}
+        extra_chats = {call.kwargs["chat_id"] for call in extra_bot.send_message.call_args_list}
+        assert main_chats == {10, 30}
+        assert extra_chats == {20}
+        assert result["bots"] == {1: {"sent": 2, "failed": 0}, 2: {"sent": 1, "failed": 0}}
+
+    @pytest.mark.asyncio
+    async def test_throughput_grows_with_bots(self, make_bot):
+        """Лимит частоты действует на бота, поэтому два бота рассылают вдвое быстрее."""
+        config = BroadcastConfig(rate_limit=200)
+        users_per_bot = 150
+
+        single = make_bot(1)
+        service = NotificationService(single, MagicMock(), config=config)
+        started = time.monotonic()
+        await run_broadcast(service, [MagicMock(id=i, bot_id=1) for i in range(1, 2 * users_per_bot + 1)])
+        single_duration = time.monotonic() - started
+
+        first, second = make_bot(1), make_bot(2)
+        service = NotificationService(first, MagicMock(), config=config, bots=[second])
+        users = [MagicMock(id=i, bot_id=1 + i % 2) for i in range(1, 2 * users_per_bot + 1)]
+        started = time.monotonic()
+        await run_broadcast(service, users)
+        sharded_duration = time.monotonic() - started
+
+        assert sharded_duration < single_duration * 0.75
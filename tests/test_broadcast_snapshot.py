@@ -0,0 +1,145 @@
+"""
+Тесты снимка аудитории рассылки.
+"""
+
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.broadcast import AudienceSnapshot, SegmentCursor, SnapshotBuilder
+from app.services.notification_service import NotificationService
+
+
+class TestAudienceSnapshot:
+    """Тесты записи и чтения снимка."""
+
+    def test_segments_are_sorted_int64_arrays(self, tmp_path):
+        """Каждый бот получает отсортированный сегмент, файл занимает 8 байт на получателя."""
+        builder = SnapshotBuilder()
+        builder.extend([(1, 30), (2, 20), (1, 10), (2, 2 ** 40), (1, 50)])
+
+        snapshot = builder.write(tmp_path / "n.bin", notification_id=7)
+
+        assert list(snapshot.segment(1)) == [10, 30, 50]
+        assert list(snapshot.segment(2)) == [20, 2 ** 40]
+        assert (tmp_path / "n.bin").stat().st_size == 5 * 8
+        snapshot.close()
+
+    def test_snapshot_is_reopened_with_cursors(self, tmp_path):
+        """Курсоры сохраняются в метаданных и учитываются при повторном открытии."""
+        builder = SnapshotBuilder()
+        builder.extend((1, user_id) for user_id in range(1, 11))
+        snapshot = builder.write(tmp_path / "n.bin", notification_id=7)
+        snapshot.checkpoint(1, 4)
+        snapshot.save()
+        snapshot.close()
+
+        reopened = AudienceSnapshot.open(tmp_path / "n.bin")
+
+        assert reopened.notification_id == 7
+        assert reopened.total == 10
+        assert reopened.remaining == 6
+        assert list(reopened.segment(1)) == [5, 6, 7, 8, 9, 10]
+        reopened.close()
+
+    def test_cursor_waits_for_unfinished_recipients(self, tmp_path):
+        """Курсор не перескакивает через получателя, обработка которого не завершена."""
+        builder = SnapshotBuilder()
+        builder.extend((1, user_id) for user_id in range(1, 11))
+        snapshot = builder.write(tmp_path / "n.bin", notification_id=7)
+        cursor = SegmentCursor(snapshot, 1, checkpoint_interval=3600)
+
+        for index in (1, 2, 0, 4):
+            cursor.complete(index)
+        cursor.save()
+
+        assert cursor.position == 3
+        assert snapshot.cursors[1] == 3
+        snapshot.close()
+
+    def test_abandoned_snapshots_expire(self, tmp_path):
+        """Снимки без сохранений дольше срока хранения удаляются, свежие остаются."""
+        for name in ("old", "fresh"):
+            builder = SnapshotBuilder()
+            builder.extend([(1, 10), (1, 20)])
+            snapshot = builder.write(tmp_path / f"{name}.bin", notification_id=1)
+            snapshot.save()
+            snapshot.close()
+        (tmp_path / "partial.tmp").write_bytes(b"")
+        stale = time.time() - 7200
+        for path in (tmp_path / "old.bin", tmp_path / "old.json", tmp_path / "partial.tmp"):
+            os.utime(path, (stale, stale))
+
+        removed = AudienceSnapshot.remove_expired(tmp_path, ttl=3600)
+
+        assert removed == 1
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["fresh.bin", "fresh.json"]
+
+    @pytest.mark.slow
+    def test_ten_million_recipients(self, tmp_path):
+        """Снимок 10 млн получателей занимает 80 МБ и строится за секунды."""
+        started = time.monotonic()
+        builder = SnapshotBuilder()
+        add = builder.add
+        for user_id in range(1, 10_000_001):
+            add(1, user_id)
+        snapshot = builder.write(tmp_path / "n.bin", notification_id=1)
+        duration = time.monotonic() - started
+
+        assert (tmp_path / "n.bin").stat().st_size == 80_000_000
+        assert snapshot.segment(1)[-1] == 10_000_000
+        assert duration < 30
+        snapshot.close()
+
+
+class TestSnapshotBroadcast:
+    """Тесты рассылки по снимку аудитории."""
+
+    @pytest.mark.asyncio
+    async def test_resumed_broadcast_does_not_query_users(self, broadcast_snapshot_dir):
+        """Возобновленная рассылка читает получателей из снимка и продолжает с курсора."""
+        bot = MagicMock()
+        bot.id = 1
+        service = NotificationService(bot, MagicMock())
+        delivered = []
+
+        async def send_message(**kwargs):
+            delivered.append(kwargs["chat_id"])
+            if len(delivered) == 20:
+                service.cancel(1)
+            return MagicMock(message_id=1)
+
+        bot.send_message = AsyncMock(side_effect=send_message)
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=MagicMock(text="Test message", paid_broadcast=False, weight=1.0, max_rate=None))
+        repository._update = AsyncMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 201)][:limit]
+        )
+
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+
+            first = await service.send_bulk_notification(1)
+            first_delivered = set(delivered)
+            # Снимок отмененной рассылки хранится для возобновления
+            kept = (broadcast_snapshot_dir / "notification-1.bin").exists()
+            repository.users.get_active_recipients.reset_mock()
+            second = await service.send_bulk_notification(1, resume=True)
+
+        repository.users.get_active_recipients.assert_not_awaited()
+        assert first["cancelled"] is True
+        assert first["remaining"] > 0
+        assert second["remaining"] == 0
+        assert set(delivered) == set(range(1, 201))
+        # Повторно отправлены не более чем получатели одного окна параллелизма
+        assert len(delivered) - 200 <= service.concurrency.max_limit
+        assert len(first_delivered) < 200
+        assert kept
+        assert not (broadcast_snapshot_dir / "notification-1.bin").exists()
+        assert not (broadcast_snapshot_dir / "notification-1.json").exists()
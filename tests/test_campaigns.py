@@ -0,0 +1,358 @@
+"""
+Тесты цепочек сообщений (drip-кампаний).
+"""
+
+import heapq
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramServerError
+from aiogram.methods import SendMessage
+from sqlalchemy.dialects import postgresql
+
+from app.models.config.env import BroadcastConfig, SQLAlchemyConfig
+from app.models.sql.campaign import CampaignEnrollment, CampaignTrigger, EnrollmentStatus
+from app.services.campaign_service import CampaignService
+from app.services.crud.user import UserService
+from app.services.notification_service import NotificationService
+from app.services.postgres.repositories.campaigns import CampaignsRepository
+from app.services.redis.notification_cache import NotificationPayload
+
+DAY = 86400
+
+
+class FakeCampaigns:
+    """Записи кампаний в памяти с индексом времени отправки на куче."""
+
+    def __init__(self, steps: Dict[int, List[Tuple[int, int, int]]]) -> None:
+        self.steps = steps
+        self.now = 0.0
+        # (campaign_id, user_id) -> [позиция, статус, попытки, время записи, время шага]
+        self.rows: Dict[Tuple[int, int], list] = {}
+        self.index: List[Tuple[float, int, int]] = []
+        self.users: Dict[int, Tuple[int, Optional[int], str, None]] = {}
+
+    def enroll(self, campaign_id: int, user_id: int, status: str = "active") -> None:
+        position, delay, _ = self.steps[campaign_id][0]
+        self.users[user_id] = (user_id, None, status, None)
+        row = [position, EnrollmentStatus.ACTIVE, 0, self.now, self.now + delay]
+        self._schedule(campaign_id, user_id, row)
+
+    def _schedule(self, campaign_id: int, user_id: int, row: list) -> None:
+        self.rows[(campaign_id, user_id)] = row
+        heapq.heappush(self.index, (row[4], campaign_id, user_id))
+
+    async def claim_due(self, limit: int, lease: float) -> List[Tuple[int, int, int, int]]:
+        claimed = []
+        while self.index and self.index[0][0] <= self.now and len(claimed) < limit:
+            run_at, campaign_id, user_id = heapq.heappop(self.index)
+            row = self.rows[(campaign_id, user_id)]
+            # Устаревшие элементы кучи после переноса шага пропускаются
+            if row[1] != EnrollmentStatus.ACTIVE or row[4] != run_at:
+                continue
+            row[2] += 1
+            claimed.append((campaign_id, user_id, row[0], row[2]))
+        for campaign_id, user_id, _, _ in claimed:
+            row = self.rows[(campaign_id, user_id)]
+            row[4] = self.now + lease
+            heapq.heappush(self.index, (row[4], campaign_id, user_id))
+        return claimed
+
+    async def get_steps(self, trigger: Optional[str] = None) -> Dict[int, List[Tuple[int, ...]]]:
+        return self.steps
+
+    async def get_users(self, user_ids):
+        return [self.users[user_id] for user_id in user_ids if user_id in self.users]
+
+    async def save_results(self, advanced, retried, finished, retry_delay: float) -> None:
+        for campaign_id, user_id, position, delay in advanced:
+            row = self.rows[(campaign_id, user_id)]
+            row[0], row[2], row[4] = position, 0, row[3] + delay
+            heapq.heappush(self.index, (row[4], campaign_id, user_id))
+        for campaign_id, user_id in retried:
+            row = self.rows[(campaign_id, user_id)]
+            row[4] = self.now + retry_delay
+            heapq.heappush(self.index, (row[4], campaign_id, user_id))
+        for campaign_id, user_id, status in finished:
+            self.rows[(campaign_id, user_id)][1] = status
+
+
+class CountingBot:
+    """Бот без накладных расходов моков для замера пропускной способности."""
+
+    id = 1
+
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_message(self, **kwargs):
+        self.sent += 1
+        return SimpleNamespace(message_id=self.sent)
+
+
+def serve_steps(service: NotificationService) -> NotificationService:
+    """Подменяет содержимое уведомлений: шаг с уведомлением N отправляет текст "step N"."""
+    service.get_payload = AsyncMock(
+        side_effect=lambda notification_id: NotificationPayload(
+            id=notification_id, version=1, text=f"step {notification_id}"
+        )
+    )
+    return service
+
+
+def patch_sessions(campaigns: FakeCampaigns):
+    """Подменяет контексты сессий кампаний и журнала доставки."""
+    ledger = MagicMock()
+    ledger.deliveries.upsert_many = AsyncMock()
+    ledger.users.update_many = AsyncMock(return_value={})
+    patches = []
+    for target, repository in (
+        ("app.services.campaign_service.SQLSessionContext", SimpleNamespace(campaigns=campaigns)),
+        ("app.services.notification_service.SQLSessionContext", ledger),
+    ):
+        context = patch(target)
+        cm = AsyncMock()
+        cm.__aenter__.return_value = (repository, MagicMock(commit=AsyncMock()))
+        context.start().return_value = cm
+        patches.append(context)
+    return patches
+
+
+async def sent_message(**kwargs):
+    return MagicMock(message_id=1)
+
+
+class TestCampaignService:
+    """Тесты отправки шагов кампаний."""
+
+    @pytest.fixture
+    def campaigns(self):
+        campaigns = FakeCampaigns({1: [(0, 0, 10), (1, 3 * DAY, 11), (2, 7 * DAY, 12)]})
+        patches = patch_sessions(campaigns)
+        yield campaigns
+        for context in patches:
+            context.stop()
+
+    async def test_steps_follow_enrollment_time(self, campaigns, make_service):
+        """Шаги уходят в свое время от записи в кампанию, после последнего запись завершается."""
+        service = serve_steps(make_service(sent_message, BroadcastConfig(chat_rate_limit=False)))
+        engine = CampaignService(service, MagicMock())
+        for user_id in (1, 2):
+            campaigns.enroll(1, user_id)
+
+        first = await engine.dispatch_due()
+        idle = await engine.dispatch_due()
+        campaigns.now = 3 * DAY
+        second = await engine.dispatch_due()
+        campaigns.now = 7 * DAY + 60
+        third = await engine.dispatch_due()
+
+        assert first == {"claimed": 2, "sent": 2, "retried": 0, "completed": 0, "stopped": 0}
+        assert idle == {"claimed": 0}
+        assert second["sent"] == 2 and third["completed"] == 2
+        texts = [call.kwargs["text"] for call in service.bot.send_message.await_args_list]
+        assert texts == ["step 10"] * 2 + ["step 11"] * 2 + ["step 12"] * 2
+        assert all(row[1] == EnrollmentStatus.COMPLETED for row in campaigns.rows.values())
+
+    async def test_failures_retry_then_stop(self, campaigns, make_service):
+        """Временная ошибка откладывает шаг, блокировка и конец попыток останавливают запись."""
+        async def send_message(**kwargs):
+            if kwargs["chat_id"] == 2:
+                raise TelegramForbiddenError(
+                    method=SendMessage(chat_id=2, text="x"), message="bot was blocked by the user"
+                )
+            if kwargs["chat_id"] == 3:
+                raise TelegramServerError(
+                    method=SendMessage(chat_id=3, text="x"), message="Bad Gateway"
+                )
+            return MagicMock(message_id=1)
+
+        config = BroadcastConfig(
+            chat_rate_limit=False, campaign_max_attempts=2, campaign_retry_delay=60
+        )
+        service = serve_steps(make_service(send_message, config))
+        engine = CampaignService(service, MagicMock())
+        for user_id in (1, 2, 3):
+            campaigns.enroll(1, user_id)
+        campaigns.enroll(1, 4, status="blocked")
+
+        first = await engine.dispatch_due()
+        campaigns.now = 60
+        second = await engine.dispatch_due()
+
+        assert first == {"claimed": 4, "sent": 1, "retried": 1, "completed": 0, "stopped": 2}
+        assert second == {"claimed": 1, "sent": 0, "retried": 0, "completed": 0, "stopped": 1}
+        assert [campaigns.rows[(1, user_id)][1] for user_id in (1, 2, 3, 4)] == [
+            EnrollmentStatus.ACTIVE,
+            EnrollmentStatus.STOPPED,
+            EnrollmentStatus.STOPPED,
+            EnrollmentStatus.STOPPED,
+        ]
+        chat_ids = [call.kwargs["chat_id"] for call in service.bot.send_message.await_args_list]
+        assert 4 not in chat_ids
+
+    async def test_invalid_markup_postpones_step(self, campaigns, make_service):
+        """Шаг с ошибкой разметки не отправляется и ждет исправления уведомления."""
+        service = make_service(sent_message, BroadcastConfig(chat_rate_limit=False))
+        service.get_payload = AsyncMock(
+            return_value=NotificationPayload(id=10, version=1, text="<b>oops")
+        )
+        engine = CampaignService(service, MagicMock())
+        campaigns.enroll(1, 1)
+
+        result = await engine.dispatch_due()
+
+        assert result["retried"] == 1
+        service.bot.send_message.assert_not_awaited()
+        assert campaigns.rows[(1, 1)][1] == EnrollmentStatus.ACTIVE
+
+    @pytest.mark.slow
+    async def test_one_million_enrollments_throughput(self, campaigns, make_service):
+        """Миллион наступивших записей проходит через движок рассылки пачками.
+
+        Записи хранятся в памяти (FakeCampaigns): замер показывает пропускную
+        способность движка, а не частичного индекса Postgres. Запросы к индексу
+        проверяет TestCampaignsRepository.
+        """
+        campaigns.steps = {1: [(0, 0, 10)]}
+        for user_id in range(1, 1_000_001):
+            campaigns.rows[(1, user_id)] = [0, EnrollmentStatus.ACTIVE, 0, 0.0, 0.0]
+            campaigns.users[user_id] = (user_id, None, "active", None)
+        campaigns.index = [(0.0, 1, user_id) for user_id in range(1, 1_000_001)]
+        config = BroadcastConfig(
+            rate_limit=10 ** 9, initial_concurrency=100, campaign_batch_size=10000
+        )
+        bot = CountingBot()
+        service = serve_steps(make_service(sent_message, config, bot=bot))
+        engine = CampaignService(service, MagicMock())
+
+        started = time.perf_counter()
+        sent = batches = 0
+        while (result := await engine.dispatch_due())["claimed"]:
+            sent += result["sent"]
+            batches += 1
+        throughput = sent / (time.perf_counter() - started)
+
+        assert sent == bot.sent == 1_000_000
+        assert batches == 100
+        assert all(row[1] == EnrollmentStatus.COMPLETED for row in campaigns.rows.values())
+        # Движок не должен быть узким местом: Telegram пропускает 30–1000 сообщений в секунду
+        assert throughput > 5000
+
+
+class TestCampaignsRepository:
+    """Тесты запросов кампаний."""
+
+    async def test_claim_uses_due_index_and_skips_locked_rows(self):
+        """Выборка совпадает с частичным индексом, пропускает занятые строки и берет аренду."""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[])))
+        session.commit = AsyncMock()
+
+        await CampaignsRepository(session).claim_due(1000, lease=600)
+
+        query = str(session.execute.call_args.args[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        ))
+        index = next(
+            index for index in CampaignEnrollment.__table__.indexes
+            if index.name == "ix_campaign_enrollments_due"
+        )
+        predicate = str(index.dialect_options["postgresql"]["where"])
+        # Условие выборки повторяет предикат индекса, иначе Postgres не применит его
+        assert predicate == "status = 0"
+        assert [column.name for column in index.columns] == ["next_run_at"]
+        assert (
+            f"WHERE campaign_enrollments.{predicate} "
+            "AND campaign_enrollments.next_run_at <= timezone('UTC', now()) "
+            "ORDER BY campaign_enrollments.next_run_at"
+        ) in " ".join(query.split())
+        assert "LIMIT 1000 FOR UPDATE SKIP LOCKED" in " ".join(query.split())
+        assert "attempts=(campaign_enrollments.attempts + 1)" in query
+        assert "next_run_at=(timezone('UTC', now()) + make_interval(secs=>600.0))" in query
+        session.commit.assert_awaited_once()
+
+    async def test_results_are_saved_in_one_transaction(self):
+        """Следующий шаг планируется от времени записи, повтор — от текущего момента."""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+
+        await CampaignsRepository(session).save_results(
+            advanced=[(1, 7, 2, DAY)],
+            retried=[(1, 8)],
+            finished=[(1, 9, EnrollmentStatus.STOPPED)],
+            retry_delay=60,
+        )
+
+        (advance, advance_rows), (retry, retry_rows), (finish, finish_rows) = [
+            call.args for call in session.execute.await_args_list
+        ]
+        advance = advance.compile(dialect=postgresql.dialect())
+        retry = retry.compile(dialect=postgresql.dialect())
+        finish = str(finish.compile(dialect=postgresql.dialect()))
+        assert "next_run_at=(campaign_enrollments.enrolled_at + %(b_delay)s)" in str(advance)
+        assert advance.params["attempts"] == 0
+        assert advance_rows == [
+            {"b_campaign_id": 1, "b_user_id": 7, "b_step": 2, "b_delay": timedelta(days=1)}
+        ]
+        assert "next_run_at=(timezone(%(timezone_1)s, now()) + %(timezone_2)s)" in str(retry)
+        assert retry.params["timezone_2"] == timedelta(seconds=60)
+        assert retry_rows == [{"b_campaign_id": 1, "b_user_id": 8}]
+        assert "status=%(b_status)s" in finish
+        assert finish_rows == [
+            {"b_campaign_id": 1, "b_user_id": 9, "b_status": EnrollmentStatus.STOPPED}
+        ]
+        session.commit.assert_awaited_once()
+
+    async def test_enrollment_is_idempotent_and_uncommitted(self):
+        """Запись во все кампании события идет одним запросом без фиксации, повтор игнорируется."""
+        repository = CampaignsRepository(MagicMock())
+        repository.get_steps = AsyncMock(return_value={1: [(0, 0, 10)], 2: [(5, DAY, 20)]})
+        repository.session.execute = AsyncMock(return_value=MagicMock(rowcount=4))
+        repository.session.commit = AsyncMock()
+
+        assert await repository.enroll_many([7, 8], CampaignTrigger.USER_CREATED) == 4
+
+        query = repository.session.execute.call_args.args[0]
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (campaign_id, user_id) DO NOTHING" in sql
+        repository.get_steps.assert_awaited_once_with(CampaignTrigger.USER_CREATED)
+        repository.session.commit.assert_not_awaited()
+
+
+class TestUserEnrollment:
+    """Тесты записи новых пользователей в кампании."""
+
+    async def test_only_created_users_are_enrolled_in_same_transaction(self):
+        """В кампании записываются только созданные пользователи, в транзакции их создания."""
+        calls: List[str] = []
+        repository = MagicMock()
+        repository.users.insert_many = AsyncMock(
+            side_effect=lambda rows: calls.append("insert") or [2]
+        )
+        repository.campaigns.enroll_many = AsyncMock(
+            side_effect=lambda *args: calls.append("enroll")
+        )
+        repository.users.get_many = AsyncMock(return_value={1: "old", 2: "new"})
+        uow = MagicMock()
+        uow.commit = AsyncMock(side_effect=lambda: calls.append("commit"))
+        config = SimpleNamespace(
+            sql_alchemy=SQLAlchemyConfig(), broadcast=BroadcastConfig(campaigns_enabled=True)
+        )
+        service = UserService(session_pool=MagicMock(), redis=MagicMock(), config=config)
+        with patch("app.services.crud.user.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, uow)
+            context.return_value = cm
+            users = await service._write_created([{"id": 1}, {"id": 2}])
+
+        assert users == ["old", "new"]
+        assert calls == ["insert", "enroll", "commit"]
+        repository.campaigns.enroll_many.assert_awaited_once_with(
+            [2], CampaignTrigger.USER_CREATED
+        )
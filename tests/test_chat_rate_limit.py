@@ -0,0 +1,124 @@
+"""
+Тесты ограничения частоты сообщений в отдельный чат.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import ChatRateLimiter, run_virtual
+from app.services.notification_service import NotificationService
+
+
+async def send_times(limiter: ChatRateLimiter, chat_id: int, count: int) -> list[float]:
+    """Моменты, в которые ограничитель разрешил count сообщений в чат."""
+    loop = asyncio.get_running_loop()
+    times = []
+    for _ in range(count):
+        await limiter.acquire(chat_id)
+        times.append(loop.time())
+    return times
+
+
+class TestChatRateLimiter:
+    """Тесты ограничителя частоты по чатам."""
+
+    def test_only_hot_chat_waits(self):
+        """Серия в один чат идет с паузами, отправка в другой чат не ждет."""
+        async def main():
+            limiter = ChatRateLimiter(private_interval=1.0, burst=3)
+            return await asyncio.gather(send_times(limiter, 1, 5), send_times(limiter, 2, 1))
+
+        hot, cold = run_virtual(main)
+
+        assert hot == pytest.approx([0, 0, 0, 1, 2], abs=0.01)
+        assert cold == pytest.approx([0], abs=0.01)
+
+    def test_group_rate_class(self):
+        """Группы и каналы получают не больше 20 сообщений в минуту."""
+        async def main():
+            limiter = ChatRateLimiter(group_interval=3.0, burst=1)
+            return await send_times(limiter, -1001234567890, 21)
+
+        times = run_virtual(main)
+
+        assert times[-1] == pytest.approx(60, abs=0.01)
+
+    def test_cold_chats_are_evicted(self):
+        """Чаты с восстановленным бюджетом не занимают память, число чатов ограничено."""
+        async def main():
+            limiter = ChatRateLimiter(private_interval=1.0, burst=1, max_chats=1000)
+            for chat_id in range(1, 5001):
+                limiter.reserve(chat_id)
+            capped = len(limiter)
+            await asyncio.sleep(2)
+            limiter.reserve(1)
+            return capped, len(limiter)
+
+        capped, after = run_virtual(main)
+
+        assert capped == 1000
+        assert after == 1
+
+
+class TestServicePacing:
+    """Тесты паузы между сообщениями в один чат при отправке через сервис."""
+
+    def test_burst_to_one_user_does_not_delay_others(self):
+        """Серия уведомлений одному пользователю не задерживает отправку другим."""
+        async def main():
+            loop = asyncio.get_running_loop()
+            bot = MagicMock()
+            bot.id = 1
+            bot.send_message = AsyncMock(return_value=MagicMock(message_id=1))
+            service = NotificationService(bot, MagicMock(), config=BroadcastConfig(chat_burst=1))
+            finished = {}
+
+            async def send(user_id):
+                await service.send_notification_to_user(user_id, "x")
+                finished.setdefault(user_id, []).append(loop.time())
+
+            await asyncio.gather(*(send(1) for _ in range(4)), send(2), send(3))
+            return finished
+
+        finished = run_virtual(main)
+
+        assert max(finished[1]) == pytest.approx(3, abs=0.1)
+        assert finished[2][0] < 0.1 and finished[3][0] < 0.1
+
+    def test_hot_chat_in_broadcast_does_not_hold_bot_budget(self):
+        """Получатели в горячем чате ждут очереди, не занимая лимит бота и окно параллелизма."""
+        def broadcast(hot: int) -> tuple[float, float]:
+            async def main():
+                loop = asyncio.get_running_loop()
+                bot = MagicMock()
+                bot.id = 1
+                bot.send_message = AsyncMock(return_value=MagicMock(message_id=1))
+                config = BroadcastConfig(rate_limit=50, chat_burst=1, chat_private_interval=1.0)
+                service = NotificationService(bot, MagicMock(), config=config)
+                run = service._create_run(1, "x", service.standard_profile, "send")
+                finished = {}
+
+                async def handle(shard, user_id, run):
+                    result = await service.send_notification_to_user(
+                        user_id, run.message, bot_id=shard.bot_id
+                    )
+                    finished.setdefault(user_id == 1, []).append(loop.time())
+                    return result
+
+                recipients = [1] * hot + list(range(2, 202))
+                await service._run_shard(service.primary_shard, recipients, run, handle)
+                return max(finished[False]), max(finished.get(True, [0.0]))
+
+            return run_virtual(main)
+
+        baseline, _ = broadcast(hot=0)
+        others, hot = broadcast(hot=20)
+
+        # Остальные 200 получателей идут со скоростью лимита бота, как без горячего чата
+        assert baseline > 2
+        assert others == pytest.approx(baseline, abs=0.5)
+        # В горячий чат по-прежнему уходит не больше сообщения в секунду
+        assert hot == pytest.approx(19, abs=0.1)
@@ -0,0 +1,176 @@
+"""
+Тесты очереди недоставленных уведомлений и повтора неудачных доставок.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramServerError
+from aiogram.methods import SendMessage
+
+from app.services.broadcast import DeliveryStatus
+from app.services.notification_service import NotificationQueue, NotificationService, NotificationTask
+
+SEND_METHOD = SendMessage(chat_id=1, text="x")
+
+
+def make_letter(letter_id: int, notification_id: int, user_id: int, bot_id=None, error_type="server_error"):
+    """Запись очереди недоставленных."""
+    return SimpleNamespace(
+        id=letter_id,
+        notification_id=notification_id,
+        user_id=user_id,
+        bot_id=bot_id,
+        error_type=error_type,
+    )
+
+
+def dead_letter_rows(repository: MagicMock) -> list:
+    """Собирает все строки, записанные в очередь недоставленных."""
+    return [row for call in repository.dead_letters.upsert_many.call_args_list for row in call.args[1]]
+
+
+class TestBroadcastDeadLetters:
+    """Тесты записи временных ошибок рассылки в очередь."""
+
+    @pytest.mark.asyncio
+    async def test_only_retryable_failures_are_queued(self, make_bot, make_repository, session_context):
+        """Временные ошибки попадают в очередь с контекстом, окончательные — нет."""
+        bot = make_bot(1, {
+            2: TelegramServerError(method=SEND_METHOD, message="Bad Gateway"),
+            3: TelegramForbiddenError(method=SEND_METHOD, message="Forbidden: bot was blocked by the user"),
+        })
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository()
+        repository.users.get_active_recipients = AsyncMock(
+            side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, 5)][:limit]
+        )
+
+        session_context(repository)
+        result = await service.send_bulk_notification(1)
+
+        assert result["sent"] == 2
+        assert dead_letter_rows(repository) == [(2, 1, "server_error", "Ошибка сервера Telegram: 500")]
+
+
+class TestRedrive:
+    """Тесты повторной отправки из очереди."""
+
+    @pytest.mark.asyncio
+    async def test_redrive_resolves_delivered_and_keeps_failed(self, make_bot, make_repository, session_context):
+        """Доставленные записи удаляются из очереди, снова упавшие остаются с новой попыткой."""
+        main_bot = make_bot(1, {20: TelegramServerError(method=SEND_METHOD, message="Bad Gateway")})
+        extra_bot = make_bot(2)
+        service = NotificationService(main_bot, MagicMock(), bots=[extra_bot])
+        repository = make_repository()
+        repository.dead_letters.get_many = AsyncMock(return_value=[
+            make_letter(1, 7, 10, bot_id=1),
+            make_letter(2, 7, 20, bot_id=1),
+            make_letter(3, 7, 30, bot_id=2),
+        ])
+        repository._get_many = AsyncMock(return_value=[SimpleNamespace(id=7, text="Retry", paid_broadcast=False, weight=1.0, max_rate=None)])
+
+        session_context(repository)
+        result = await service.redrive_dead_letters(error_type="server_error")
+
+        assert result["success"] is True
+        assert result["total"] == 3
+        assert result["sent"] == 2
+        assert result["failed"] == 1
+        repository.dead_letters.get_many.assert_awaited_once_with(None, "server_error", None, limit=10000)
+        assert {c.kwargs["chat_id"] for c in extra_bot.send_message.call_args_list} == {30}
+        resolved = [user_id for call in repository.dead_letters.delete_many.call_args_list for user_id in call.args[1]]
+        assert sorted(resolved) == [10, 30]
+        assert dead_letter_rows(repository) == [(20, 1, "server_error", "Ошибка сервера Telegram: 500")]
+
+    @pytest.mark.asyncio
+    async def test_missing_notification_is_reported(self, make_bot, make_repository, session_context):
+        """Записи удаленного уведомления не отправляются."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository()
+        repository.dead_letters.get_many = AsyncMock(return_value=[make_letter(1, 7, 10)])
+        repository._get_many = AsyncMock(return_value=[])
+
+        session_context(repository)
+        result = await service.redrive_dead_letters(notification_id=7)
+
+        assert result["notifications"][7]["success"] is False
+        bot.send_message.assert_not_awaited()
+
+
+class TestRetryFailed:
+    """Тесты повтора только неудачных доставок."""
+
+    @pytest.mark.asyncio
+    async def test_only_retryable_recipients_are_resent(self, make_bot, make_repository, session_context):
+        """Повтор читает получателей с временной ошибкой из журнала и не трогает остальную аудиторию."""
+        main_bot, extra_bot = make_bot(1), make_bot(2)
+        service = NotificationService(main_bot, MagicMock(), bots=[extra_bot])
+        repository = make_repository()
+        repository.deliveries.get_recipients = AsyncMock(return_value=[(10, 1), (20, 2), (30, None)])
+        repository.users.get_active_recipients = AsyncMock()
+
+        session_context(repository)
+        result = await service.retry_failed_deliveries(1)
+
+        assert result["total"] == 3
+        assert result["sent"] == 3
+        repository.deliveries.get_recipients.assert_awaited_once_with(1, DeliveryStatus.RETRYABLE)
+        repository.users.get_active_recipients.assert_not_awaited()
+        assert {c.kwargs["chat_id"] for c in main_bot.send_message.call_args_list} == {10, 30}
+        assert {c.kwargs["chat_id"] for c in extra_bot.send_message.call_args_list} == {20}
+        ledger = [row for call in repository.deliveries.upsert_many.call_args_list for row in call.args[1]]
+        assert sorted(ledger) == [(10, DeliveryStatus.SENT, 10), (20, DeliveryStatus.SENT, 20), (30, DeliveryStatus.SENT, 30)]
+        resolved = [user_id for call in repository.dead_letters.delete_many.call_args_list for user_id in call.args[1]]
+        assert sorted(resolved) == [10, 20, 30]
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_retry(self, make_bot, make_repository, session_context):
+        """Без неудачных доставок сообщения не отправляются, статус не меняется."""
+        bot = make_bot(1)
+        service = NotificationService(bot, MagicMock())
+        repository = make_repository()
+        repository.deliveries.get_recipients = AsyncMock(return_value=[])
+
+        session_context(repository)
+        result = await service.retry_failed_deliveries(1)
+
+        assert result["success"] is True
+        assert result["total"] == 0
+        bot.send_message.assert_not_awaited()
+        repository._update.assert_not_awaited()
+
+
+class TestQueueDeadLetters:
+    """Тесты очереди отдельных задач."""
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_completes_task(self, make_bot):
+        """Окончательная ошибка завершает задачу, временная требует повтора."""
+        bot = make_bot(1, {
+            2: TelegramServerError(method=SEND_METHOD, message="Bad Gateway"),
+            3: TelegramForbiddenError(method=SEND_METHOD, message="Forbidden: bot was blocked by the user"),
+        })
+        service = NotificationService(bot, MagicMock())
+        service._update_user_status = AsyncMock()
+        retryable = NotificationTask(notification_id=1, user_id=2, message="x")
+
+        assert await service._send_notification(NotificationTask(notification_id=1, user_id=1, message="x")) is True
+        assert await service._send_notification(NotificationTask(notification_id=1, user_id=3, message="x")) is True
+        assert await service._send_notification(retryable) is False
+        assert retryable.error_type == "server_error"
+
+    @pytest.mark.asyncio
+    async def test_exhausted_task_goes_to_dead_letters(self):
+        """Задача с исчерпанными попытками передается в очередь недоставленных."""
+        dead_letter = AsyncMock()
+        queue = NotificationQueue(MagicMock(max_limit=1), dead_letter=dead_letter)
+        task = NotificationTask(notification_id=1, user_id=2, message="x", retry_count=3)
+        await queue.queue.put(task)
+        await queue.queue.get()
+
+        await queue._process_task(task, "worker-0", AsyncMock(return_value=False))
+
+        dead_letter.assert_awaited_once_with(task)
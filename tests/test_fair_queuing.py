@@ -0,0 +1,150 @@
+"""
+Тесты справедливого разделения бюджета частоты между рассылками.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.broadcast import FairScheduler, Flow, TokenBucket, current_flow, run_virtual
+from app.services.notification_service import NotificationService
+
+
+async def request_as(scheduler: FairScheduler, flow: Flow, count: int, granted: list) -> None:
+    """Выполняет count запросов от имени потока и записывает порядок разрешений."""
+    current_flow.set(flow)
+    for _ in range(count):
+        await scheduler.acquire()
+        granted.append(flow.name)
+
+
+class TestFairScheduler:
+    """Тесты очереди к ограничителю частоты."""
+
+    def test_share_is_proportional_to_weight(self):
+        """Пока оба потока ждут, поток с весом 3 получает втрое больше разрешений."""
+        granted = []
+
+        async def main():
+            scheduler = FairScheduler(TokenBucket(rate=100, capacity=1))
+            heavy, light = Flow("heavy", weight=3), Flow("light")
+            # По несколько обработчиков на поток, как в рассылке
+            await asyncio.gather(
+                *(request_as(scheduler, heavy, 50, granted) for _ in range(5)),
+                *(request_as(scheduler, light, 50, granted) for _ in range(5)),
+            )
+
+        run_virtual(main)
+
+        first = granted[:200]
+        assert first.count("heavy") == pytest.approx(150, abs=5)
+        assert granted.count("heavy") == granted.count("light") == 250
+
+    def test_small_flow_is_not_queued_behind_campaign(self):
+        """Новый поток получает разрешения сразу, а не после очереди кампании."""
+        granted = []
+
+        async def main():
+            scheduler = FairScheduler(TokenBucket(rate=30, capacity=1))
+            flow = Flow("campaign")
+            campaign = asyncio.gather(*(request_as(scheduler, flow, 1000, granted) for _ in range(50)))
+            await asyncio.sleep(10)
+            started = len(granted)
+            await request_as(scheduler, Flow("urgent"), 10, granted)
+            done = len(granted)
+            campaign.cancel()
+            await asyncio.gather(campaign, return_exceptions=True)
+            return started, done
+
+        started, done = run_virtual(main)
+
+        # Срочная рассылка делит бюджет поровну, а не ждет 50 стоящих в очереди запросов
+        assert done - started <= 21
+
+    def test_flow_rate_cap(self):
+        """Предел частоты потока соблюдается, даже если бюджет бота свободен."""
+        granted = []
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            scheduler = FairScheduler(TokenBucket(rate=1000))
+            capped = Flow("capped", max_rate=10)
+            start = loop.time()
+            await asyncio.gather(*(request_as(scheduler, capped, 10, granted) for _ in range(5)))
+            return loop.time() - start
+
+        elapsed = run_virtual(main)
+
+        assert len(granted) == 50
+        # Первые 10 разрешений из начального запаса ведра потока
+        assert elapsed == pytest.approx(4, abs=0.2)
+
+    def test_cancelled_waiter_is_skipped(self):
+        """Отмененное ожидание не забирает разрешение у следующих."""
+        async def main():
+            scheduler = FairScheduler(TokenBucket(rate=10, capacity=1))
+            await scheduler.acquire()
+            waiter = asyncio.ensure_future(scheduler.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.wait_for(scheduler.acquire(), timeout=0.2)
+            return scheduler.waiting
+
+        assert run_virtual(main) == 0
+
+
+class TestConcurrentBroadcasts:
+    """Тесты одновременных рассылок через сервис."""
+
+    def test_urgent_broadcast_finishes_before_campaign(self, tmp_path):
+        """Небольшая рассылка, запущенная во время большой, завершается за секунды."""
+        audience = {1: 600, 2: 20}
+        weights = {1: 1.0, 2: 2.0}
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            bot = MagicMock()
+            bot.id = 1
+            bot.send_message = AsyncMock(return_value=MagicMock(message_id=1))
+            service = NotificationService(bot, MagicMock())
+            service.config.snapshot_dir = tmp_path
+            repository = MagicMock()
+            repository._get = AsyncMock(side_effect=lambda model, condition: SimpleNamespace(
+                id=condition.right.value, version=1, text=f"text {condition.right.value}",
+                paid_broadcast=False, weight=weights[condition.right.value], max_rate=None,
+            ))
+            repository._update = AsyncMock()
+            repository.deliveries.upsert_many = AsyncMock()
+            repository.dead_letters.upsert_many = AsyncMock()
+            size = audience[1]
+            repository.users.get_active_recipients = AsyncMock(
+                side_effect=lambda after_id, limit: [(i, 1) for i in range(after_id + 1, size + 1)][:limit]
+            )
+            finished = {}
+
+            async def send(notification_id):
+                result = await service.send_bulk_notification(notification_id)
+                finished[notification_id] = loop.time()
+                return result
+
+            with patch("app.services.notification_service.SQLSessionContext") as context:
+                cm = AsyncMock()
+                cm.__aenter__.return_value = (repository, MagicMock())
+                context.return_value = cm
+                campaign = asyncio.create_task(send(1))
+                await asyncio.sleep(5)
+                size = audience[2]
+                started = loop.time()
+                urgent = await send(2)
+                result = await campaign
+                await service.cleanup()
+            return result, urgent, finished[2] - started, finished[1] - started
+
+        campaign, urgent, urgent_time, campaign_time = run_virtual(main)
+
+        assert campaign["sent"] == 600 and urgent["sent"] == 20
+        # Две трети бюджета в 30 сообщений/с: около секунды вместо ожидания кампании
+        assert urgent_time < 2
+        assert campaign_time > 10
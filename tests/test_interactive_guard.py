@@ -0,0 +1,129 @@
+"""
+Тесты защиты задержки ответов бота во время рассылки.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import Chat, Message, Update
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import InteractiveGuard, LatencyWindow, RateProfile, TokenBucket, run_virtual
+from app.services.notification_service import NotificationService
+from app.services.redis.interactive import InteractiveLatencyStore
+from app.telegram.middlewares import InteractiveLatencyMiddleware
+from tests.fake_redis import FakeRedis
+
+
+class TestLatencyWindow:
+    """Тесты окна задержек."""
+
+    def test_percentile(self):
+        """p95 из ста измерений — 95-е по величине."""
+        window = LatencyWindow(window=60)
+        for value in range(1, 101):
+            window.add(value / 100, now=0.0)
+
+        assert window.percentile(0.95, now=1.0) == pytest.approx(0.95)
+        assert window.percentile(0.5, now=1.0) == pytest.approx(0.5)
+
+    def test_old_samples_expire(self):
+        """Измерения старше окна не учитываются."""
+        window = LatencyWindow(window=10)
+        window.add(5.0, now=0.0)
+        window.add(0.1, now=8.0)
+
+        assert window.percentile(0.95, now=12.0) == pytest.approx(0.1)
+        assert window.percentile(0.95, now=20.0) is None
+        assert len(window) == 0
+
+
+class TestInteractiveGuard:
+    """Тесты замедления рассылки по задержке ответов."""
+
+    @staticmethod
+    async def count_permits(guard: InteractiveGuard, duration: float) -> int:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        permits = 0
+        while loop.time() < deadline:
+            await guard.acquire()
+            permits += 1
+        return permits
+
+    def test_slows_down_and_recovers(self):
+        """Пока p95 выше порога, темп падает до нижней границы, затем возвращается."""
+        latency = {"p95": 5.0}
+
+        async def main():
+            guard = InteractiveGuard(
+                TokenBucket(rate=30, capacity=1), rate=30, source=AsyncMock(side_effect=lambda: latency["p95"]),
+                threshold=2.0, min_share=0.2, decrease=0.5, increase=0.2,
+            )
+            slow = await self.count_permits(guard, 10)
+            share = guard.share
+            latency["p95"] = 0.3
+            await self.count_permits(guard, 10)
+            fast = await self.count_permits(guard, 10)
+            return slow, share, fast, guard.share
+
+        slow, share, fast, recovered = run_virtual(main)
+
+        assert share == pytest.approx(0.2)
+        # После пары секунд снижения рассылка идет с пятой частью темпа
+        assert slow < 100
+        assert recovered == 1.0
+        assert fast == pytest.approx(300, abs=5)
+
+    def test_source_errors_do_not_stop_broadcast(self):
+        """Недоступный источник задержки не останавливает рассылку."""
+        async def main():
+            guard = InteractiveGuard(
+                TokenBucket(rate=100), rate=100, source=AsyncMock(side_effect=ConnectionError("redis")),
+            )
+            return await self.count_permits(guard, 1)
+
+        assert run_virtual(main) >= 100
+
+
+class TestInteractiveLatency:
+    """Тесты измерения задержки ответов и резерва лимита."""
+
+    async def test_middleware_publishes_p95(self):
+        """Задержка сообщения попадает в Redis, откуда ее читает рассылка."""
+        client = FakeRedis()
+        store = InteractiveLatencyStore(client)
+        middleware = InteractiveLatencyMiddleware(store, publish_interval=0)
+        message = Message(
+            message_id=1,
+            date=datetime.now(timezone.utc) - timedelta(seconds=3),
+            chat=Chat(id=1, type="private"),
+        )
+        handler = AsyncMock(return_value="ok")
+
+        result = await middleware(handler, Update(update_id=1, message=message), {"bot": SimpleNamespace(id=7)})
+
+        assert result == "ok"
+        assert await store.read(7) == pytest.approx(3.0, abs=1.0)
+        assert await store.read(8) is None
+
+    def test_broadcast_profiles_reserve_rate(self):
+        """Профили рассылки оставляют часть лимита ответам бота."""
+        config = BroadcastConfig()
+
+        assert RateProfile.standard(config).rate_limit == pytest.approx(config.rate_limit * 0.9)
+        assert RateProfile.paid(config).rate_limit == pytest.approx(
+            config.paid_rate_limit - config.rate_limit * 0.1
+        )
+
+    def test_service_shards_are_guarded(self):
+        """С Redis лимит каждого бота рассылки проходит через выключатель нагрузки."""
+        bot = MagicMock()
+        bot.id = 1
+        service = NotificationService(bot, MagicMock(), redis=FakeRedis())
+
+        assert isinstance(service.primary_shard.guard, InteractiveGuard)
+        assert service.primary_shard.guard.limiter is service.primary_shard.limiter
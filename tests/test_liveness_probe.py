@@ -0,0 +1,105 @@
+"""
+Тесты фоновой проверки доступности чатов.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendChatAction
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import metrics, run_virtual
+from app.services.notification_service import NotificationService
+
+PROBE_METHOD = SendChatAction(chat_id=1, action="typing")
+
+
+def make_probe_bot(failures: dict) -> MagicMock:
+    """Мок бота, возвращающий ошибки проверки для указанных пользователей."""
+    bot = MagicMock()
+    bot.id = 1
+
+    async def send_chat_action(chat_id, action):
+        error = failures.get(chat_id)
+        if error is not None:
+            raise error
+        return True
+
+    bot.send_chat_action = AsyncMock(side_effect=send_chat_action)
+    bot.get_chat = AsyncMock(return_value=SimpleNamespace(id=1))
+    return bot
+
+
+def make_probe_repository(users: int) -> MagicMock:
+    """Репозиторий с users активными пользователями."""
+    repository = MagicMock()
+    repository.users.get_active_recipients = AsyncMock(
+        side_effect=lambda after_id, limit: [(i, None) for i in range(after_id + 1, users + 1)][:limit]
+    )
+    repository.users.update_many = AsyncMock(
+        side_effect=lambda updates: {user_id: SimpleNamespace(id=user_id) for user_id, _ in updates}
+    )
+    return repository
+
+
+def probe(bot: MagicMock, repository: MagicMock, **config) -> tuple[dict, float]:
+    """Выполняет проход проверки на виртуальных часах и возвращает результат и его длительность."""
+    async def main():
+        loop = asyncio.get_running_loop()
+        service = NotificationService(bot, MagicMock(), config=BroadcastConfig(liveness_page_size=100, **config))
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock(commit=AsyncMock()))
+            context.return_value = cm
+            started = loop.time()
+            result = await service.probe_chats()
+            elapsed = loop.time() - started
+            await service.cleanup()
+        return result, elapsed
+
+    return run_virtual(main)
+
+
+class TestLivenessProbe:
+    """Тесты проверки доступности чатов."""
+
+    def test_dead_chats_are_marked_in_batches(self):
+        """Заблокировавшие бота и удаленные пользователи помечаются пачками записей."""
+        metrics.clear()
+        failures = {
+            3: TelegramForbiddenError(method=PROBE_METHOD, message="Forbidden: bot was blocked by the user"),
+            7: TelegramBadRequest(method=PROBE_METHOD, message="Bad Request: chat not found"),
+            250: TelegramForbiddenError(method=PROBE_METHOD, message="Forbidden: bot was blocked by the user"),
+        }
+        repository = make_probe_repository(300)
+
+        result, _ = probe(make_probe_bot(failures), repository, liveness_max_rate=None)
+
+        assert result["probed"] == 300
+        assert result["alive"] == 297
+        assert result["pruned"] == 3
+        assert result["user_blocked"] == 2 and result["chat_not_found"] == 1
+        updates = [update for call in repository.users.update_many.await_args_list for update in call.args[0]]
+        assert sorted(updates) == [(3, {"status": "blocked"}), (7, {"status": "deleted"}), (250, {"status": "blocked"})]
+        assert metrics.get("liveness_pruned_total", bot=1, reason="user_blocked") == 2
+
+    def test_probe_rate_is_capped(self):
+        """Проверка не тратит больше своего предела частоты."""
+        result, elapsed = probe(make_probe_bot({}), make_probe_repository(50), liveness_max_rate=5.0)
+
+        assert result["alive"] == 50
+        # Первые 5 проверок из начального запаса ведра
+        assert elapsed == pytest.approx(9, abs=0.5)
+
+    def test_get_chat_method(self):
+        """Проверка через getChat не показывает пользователю действий бота."""
+        bot = make_probe_bot({})
+
+        result, _ = probe(bot, make_probe_repository(10), liveness_method="get_chat", liveness_max_rate=None)
+
+        assert result["alive"] == 10
+        assert bot.get_chat.await_count == 10
+        bot.send_chat_action.assert_not_awaited()
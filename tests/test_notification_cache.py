@@ -0,0 +1,106 @@
+"""
+Тесты кэша содержимого уведомлений в Redis.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.redis import NotificationCache, NotificationPayload
+from app.services.notification_service import NotificationService
+from tests.fake_redis import FakeRedis
+
+
+def make_payload(version: int = 1, text: str = "Test message") -> NotificationPayload:
+    """Содержимое уведомления 1."""
+    return NotificationPayload(id=1, version=version, text=text)
+
+
+class TestNotificationCache:
+    """Тесты сквозного кэша с версионированием."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self):
+        """Одновременные промахи выполняют одну загрузку, следующие чтения берутся из кэша."""
+        async def load(notification_id):
+            await asyncio.sleep(0.01)
+            return make_payload()
+
+        loader = AsyncMock(side_effect=load)
+        cache = NotificationCache(FakeRedis(), loader)
+
+        results = await asyncio.gather(*(cache.get(1) for _ in range(20)))
+        assert await cache.get(1) == make_payload()
+
+        assert all(result == make_payload() for result in results)
+        loader.assert_awaited_once_with(1)
+        assert cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_edit_switches_to_new_version(self):
+        """После правки читается новая версия, даже если старую дописал отставший процесс."""
+        client = FakeRedis()
+        loader = AsyncMock(side_effect=[make_payload(), make_payload(2, "Edited")])
+        cache = NotificationCache(client, loader)
+        await cache.get(1)
+
+        await cache.invalidate(1, 2)
+        # Процесс, прочитавший строку до правки, записывает устаревшее содержимое
+        await cache._store(make_payload())
+
+        assert (await cache.get(1)).text == "Edited"
+        assert (await cache.get(1)).text == "Edited"
+        assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_notification_is_not_cached(self):
+        """Отсутствующее уведомление не кэшируется."""
+        loader = AsyncMock(return_value=None)
+        cache = NotificationCache(FakeRedis(), loader)
+
+        assert await cache.get(1) is None
+        assert await cache.get(1) is None
+        assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_database(self):
+        """Ошибка Redis не мешает чтению уведомления из базы."""
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=ConnectionError("redis is down"))
+        cache = NotificationCache(client, AsyncMock(return_value=make_payload()))
+
+        assert await cache.get(1) == make_payload()
+
+
+class TestCachedBroadcast:
+    """Тесты чтения содержимого рассылкой."""
+
+    @pytest.mark.asyncio
+    async def test_retries_read_payload_from_cache(self):
+        """Повторные запуски рассылки не читают уведомление из базы."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(return_value=MagicMock(message_id=5))
+        service = NotificationService(bot, MagicMock(), redis=FakeRedis())
+
+        repository = MagicMock()
+        repository._get = AsyncMock(
+            return_value=SimpleNamespace(id=1, version=1, text="Test message", paid_broadcast=False, weight=1.0, max_rate=None)
+        )
+        repository.deliveries.get_recipients = AsyncMock(return_value=[(10, None)])
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.delete_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+        repository._update = AsyncMock()
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            for _ in range(3):
+                result = await service.retry_failed_deliveries(1)
+                assert result["sent"] == 1
+
+        repository._get.assert_awaited_once()
+        assert service.payloads.hits == 2
@@ -2,9 +2,11 @@
 Тесты для проверки обработки ошибок при отправке уведомлений.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from aiogram.exceptions import TelegramForbiddenError, TelegramAPIError
+from aiogram.exceptions import TelegramForbiddenError, TelegramAPIError, TelegramNetworkError
 
 from app.services.notification_service import NotificationService, UserStatus
 
@@ -142,7 +144,37 @@ class TestNotificationErrorHandling:
         assert result["user_id"] == 303
         assert result["error_type"] == "unknown_error"
         assert "Неизвестная ошибка" in result["message"]
-        assert result["should_retry"] is True
+        # Отказ Telegram не исправится повтором и не расходует бюджет повторов
+        assert result["should_retry"] is False
+
+    @pytest.mark.asyncio
+    async def test_unknown_client_error_is_permanent(self, notification_service, mock_bot):
+        """Неизвестная ошибка 4xx не повторяется."""
+        error = CustomTelegramAPIError("Bad Request: not enough rights", code=400)
+        mock_bot.send_message.side_effect = error
+
+        result = await notification_service.send_notification_to_user(303, "Test message")
+
+        assert result["error_type"] == "unknown_error"
+        assert result["should_retry"] is False
+
+    @pytest.mark.asyncio
+    async def test_network_error_is_retried(self, notification_service, mock_bot):
+        """Сбой соединения повторяется, неожиданное исключение — нет."""
+        mock_bot.send_message.side_effect = TelegramNetworkError(
+            method=MagicMock(), message="HTTP Client says - ClientConnectorError"
+        )
+        network = await notification_service.send_notification_to_user(303, "Test message")
+        mock_bot.send_message.side_effect = asyncio.TimeoutError()
+        timeout = await notification_service.send_notification_to_user(303, "Test message")
+        mock_bot.send_message.side_effect = ValueError("unexpected")
+        unexpected = await notification_service.send_notification_to_user(303, "Test message")
+
+        assert (network["error_type"], network["should_retry"]) == ("network_error", True)
+        assert (timeout["error_type"], timeout["should_retry"]) == ("network_error", True)
+        assert (unexpected["error_type"], unexpected["should_retry"]) == (
+            "unexpected_error", False
+        )
 
     @pytest.mark.asyncio
     async def test_successful_send(self, notification_service, mock_bot):
@@ -175,10 +207,10 @@ class TestNotificationErrorHandling:
         )
 
         mock_users = MagicMock()
-        mock_users.update_user_status = AsyncMock(return_value=MagicMock())
+        mock_users.update_many = AsyncMock(return_value={505: MagicMock()})
         mock_repository = MagicMock()
         mock_repository.users = mock_users
-        mock_uow = MagicMock()
+        mock_uow = MagicMock(commit=AsyncMock())
 
         # Патчим SQLSessionContext только для этого теста
         with patch("app.services.notification_service.SQLSessionContext") as SQLSessionContextMock:
@@ -190,4 +222,5 @@ class TestNotificationErrorHandling:
 
             assert result["success"] is False
             assert result["error_type"] == "user_blocked"
-            mock_users.update_user_status.assert_called_once_with(505, "blocked") 
\ No newline at end of file
+            mock_users.update_many.assert_called_once_with([(505, {"status": "blocked"})])
+            mock_uow.commit.assert_awaited_once()
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Тесты очереди исходящих заданий в Postgres.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.sql.outbox import OutboxKind, OutboxStatus
+from app.services.notification_service import NotificationService
+from app.services.postgres import OutboxWorker
+from app.services.postgres.repositories.outbox import OutboxRepository
+
+
+class FakeOutbox:
+    """Очередь в памяти с семантикой FOR UPDATE SKIP LOCKED."""
+
+    def __init__(self) -> None:
+        self.jobs: Dict[int, SimpleNamespace] = {}
+        self.claims: List[tuple[str, int]] = []
+
+    def add(self, kind: str, notification_id: Optional[int] = None) -> SimpleNamespace:
+        job = SimpleNamespace(
+            id=len(self.jobs) + 1,
+            kind=kind,
+            notification_id=notification_id,
+            payload=None,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+            locked_by=None,
+            error=None,
+        )
+        self.jobs[job.id] = job
+        return job
+
+    async def claim(self, worker: str, limit: int, lease: float) -> List[SimpleNamespace]:
+        await asyncio.sleep(0)
+        claimed = [job for job in self.jobs.values() if job.status == OutboxStatus.PENDING][:limit]
+        for job in claimed:
+            job.status, job.locked_by = OutboxStatus.PROCESSING, worker
+            job.attempts += 1
+            self.claims.append((worker, job.id))
+        return [SimpleNamespace(**vars(job)) for job in claimed]
+
+    async def extend(self, ids, worker: str) -> None:
+        pass
+
+    async def complete(self, job_id: int) -> None:
+        self.jobs[job_id].status = OutboxStatus.DONE
+
+    async def fail(self, job_id: int, error: str, retry_in: Optional[float] = None) -> None:
+        job = self.jobs[job_id]
+        job.error = error
+        job.status = OutboxStatus.FAILED if retry_in is None else OutboxStatus.PENDING
+
+
+def patch_outbox(outbox: FakeOutbox):
+    """Подменяет контекст сессии воркера очередью в памяти."""
+    context = patch("app.services.postgres.outbox.SQLSessionContext")
+    mock = context.start()
+    cm = AsyncMock()
+    cm.__aenter__.return_value = (SimpleNamespace(outbox=outbox), MagicMock())
+    mock.return_value = cm
+    return context
+
+
+def make_worker(handlers, **kwargs) -> OutboxWorker:
+    """Воркер без подписки на NOTIFY: у пула сессий нет движка."""
+    return OutboxWorker(MagicMock(kw={}), handlers, **kwargs)
+
+
+class TestOutboxWorker:
+    """Тесты выборки и выполнения заданий."""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_queue_without_duplicates(self):
+        """Несколько воркеров выполняют каждое задание ровно один раз."""
+        outbox = FakeOutbox()
+        for notification_id in range(30):
+            outbox.add(OutboxKind.BROADCAST, notification_id)
+        done: List[int] = []
+
+        async def handle(job):
+            await asyncio.sleep(0.001)
+            done.append(job.notification_id)
+
+        workers = [
+            make_worker({OutboxKind.BROADCAST: handle}, name=f"worker-{i}", batch_size=3, poll_interval=0.01)
+            for i in range(3)
+        ]
+        context = patch_outbox(outbox)
+        try:
+            runs = [asyncio.create_task(worker.run()) for worker in workers]
+            while len(done) < 30:
+                await asyncio.sleep(0.01)
+            for worker in workers:
+                worker.stop()
+            await asyncio.wait_for(asyncio.gather(*runs), timeout=1)
+        finally:
+            context.stop()
+
+        assert sorted(done) == list(range(30))
+        assert all(job.status == OutboxStatus.DONE for job in outbox.jobs.values())
+        assert len({worker for worker, _ in outbox.claims}) == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_retried_then_failed(self):
+        """Ошибка возвращает задание в очередь, после max_attempts оно отмечается неудачным."""
+        outbox = FakeOutbox()
+        outbox.add(OutboxKind.MESSAGE)
+        handler = AsyncMock(side_effect=RuntimeError("telegram is down"))
+        worker = make_worker({OutboxKind.MESSAGE: handler}, max_attempts=2, retry_delay=0)
+        context = patch_outbox(outbox)
+        try:
+            await worker.run_once()
+            assert outbox.jobs[1].status == OutboxStatus.PENDING
+            await worker.run_once()
+        finally:
+            context.stop()
+
+        assert handler.await_count == 2
+        assert outbox.jobs[1].status == OutboxStatus.FAILED
+        assert outbox.jobs[1].error == "telegram is down"
+        assert worker.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_idle_worker(self):
+        """Воркер без заданий просыпается по NOTIFY, не дожидаясь опроса."""
+        outbox = FakeOutbox()
+        handled = asyncio.Event()
+
+        async def handle(job):
+            handled.set()
+
+        worker = make_worker({OutboxKind.BROADCAST: handle}, poll_interval=60)
+        context = patch_outbox(outbox)
+        try:
+            run = asyncio.create_task(worker.run())
+            await asyncio.sleep(0.01)
+            outbox.add(OutboxKind.BROADCAST, 1)
+            worker.wake(None, 0, "notification_outbox", "broadcast")
+            await asyncio.wait_for(handled.wait(), timeout=1)
+            worker.stop()
+            await asyncio.wait_for(run, timeout=1)
+        finally:
+            context.stop()
+
+        assert outbox.jobs[1].status == OutboxStatus.DONE
+
+
+class TestOutboxRepository:
+    """Тесты запросов очереди."""
+
+    @pytest.mark.asyncio
+    async def test_claim_skips_locked_rows(self):
+        """Выборка пропускает строки, заблокированные другими воркерами."""
+        session = MagicMock()
+        session.scalars = AsyncMock(return_value=[])
+        session.commit = AsyncMock()
+
+        await OutboxRepository(session).claim("worker-1", 10, lease=300)
+
+        query = str(session.scalars.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in query
+        session.commit.assert_awaited_once()
+
+
+class TestOutboxEnqueue:
+    """Тесты постановки рассылки в очередь."""
+
+    @pytest.mark.asyncio
+    async def test_job_and_status_share_transaction(self):
+        """Задание добавляется в транзакцию смены статуса и фиксируется вместе с ней."""
+        bot = MagicMock()
+        bot.id = 1
+        service = NotificationService(bot, MagicMock())
+        calls: List[str] = []
+        repository = MagicMock()
+        repository._get = AsyncMock(return_value=MagicMock(id=5))
+        repository.outbox.add = AsyncMock(
+            side_effect=lambda *args, **kwargs: calls.append("add") or SimpleNamespace(id=42)
+        )
+        repository._update = AsyncMock(side_effect=lambda *args, **kwargs: calls.append("update"))
+        with patch("app.services.notification_service.SQLSessionContext") as context:
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            result = await service.enqueue_broadcast(5)
+
+        assert result["job_id"] == 42
+        assert calls == ["add", "update"]
+        assert context.call_count == 1
+        repository.outbox.add.assert_awaited_once_with(OutboxKind.BROADCAST, notification_id=5)
+        assert repository._update.call_args.kwargs["status"] == "queued"
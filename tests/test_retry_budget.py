@@ -0,0 +1,106 @@
+"""
+Тесты общего бюджета повторов.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramServerError
+from aiogram.methods import SendMessage
+
+from app.models.config.env import BroadcastConfig
+from app.services.broadcast import BlockTask, RecipientBlock, RetryBudget, metrics, run_virtual
+from app.services.notification_service import NotificationQueue, NotificationService, NotificationTask
+
+
+class TestRetryBudget:
+    """Тесты бюджета повторов."""
+
+    def test_retries_are_limited_by_first_attempts(self):
+        """Повторов не больше запаса и доли от первых попыток за окно."""
+        async def main():
+            budget = RetryBudget(ratio=0.1, min_per_second=1.0, window=10.0)
+            budget.record_request(100)
+            allowed = budget.try_retry(50)
+            budget.record_request(allowed)
+            return allowed, budget.try_retry(), budget.amplification
+
+        allowed, extra, amplification = run_virtual(main)
+
+        # 10 повторов запаса на окно и 10% от 100 первых попыток
+        assert allowed == 20
+        assert extra == 0
+        # Выполненные повторы не считаются первыми попытками
+        assert amplification == pytest.approx(1.2)
+
+    def test_budget_recovers_after_window(self):
+        """Повторы за прошедшее окно перестают расходовать бюджет."""
+        async def main():
+            budget = RetryBudget(ratio=0.0, min_per_second=1.0, window=10.0)
+            spent = budget.try_retry(100)
+            await asyncio.sleep(11)
+            return spent, budget.try_retry(100)
+
+        assert run_virtual(main) == (10, 10)
+
+    def test_amplification_metric(self):
+        """Усиление нагрузки повторами видно в метриках."""
+        metrics.clear()
+
+        async def main():
+            budget = RetryBudget(ratio=1.0, min_per_second=0.0, name="test")
+            budget.record_request(10)
+            budget.record_request(budget.try_retry(5))
+
+        run_virtual(main)
+
+        assert metrics.get("broadcast_requests_total", budget="test") == 15
+        assert metrics.get("broadcast_retries_total", budget="test") == 5
+        assert metrics.get("broadcast_retry_amplification", budget="test") == pytest.approx(1.5)
+
+
+class TestBudgetedRetries:
+    """Тесты повторов движка в пределах бюджета."""
+
+    @pytest.mark.asyncio
+    async def test_block_retries_beyond_budget_are_dead_lettered(self):
+        """Получатели сверх бюджета повторов сразу попадают в очередь недоставленных."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(
+            side_effect=TelegramServerError(method=SendMessage(chat_id=1, text="x"), message="Bad Gateway")
+        )
+        config = BroadcastConfig(breaker_min_requests=1000, retry_budget_ratio=0.1, retry_budget_min_per_second=0)
+        service = NotificationService(bot, MagicMock(), config=config)
+        repository = MagicMock()
+        repository.deliveries.upsert_many = AsyncMock()
+        repository.dead_letters.upsert_many = AsyncMock()
+
+        with patch("app.services.notification_service.SQLSessionContext") as context, \
+                patch("app.services.notification_service.asyncio.sleep", AsyncMock()):
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, MagicMock())
+            context.return_value = cm
+            await service._send_block(BlockTask(1, "x", RecipientBlock(1, range(1, 51)), max_retries=3))
+
+        # 50 первых попыток дают 5 повторов, затем 10% от первых попыток исчерпаны
+        assert bot.send_message.await_count == 55
+        dead_letters = [row for call in repository.dead_letters.upsert_many.call_args_list for row in call.args[1]]
+        assert sorted(row[0] for row in dead_letters) == list(range(1, 51))
+        assert sum(row[2] == "retry_budget" for row in dead_letters) == 50
+
+    @pytest.mark.asyncio
+    async def test_queue_retry_needs_budget(self):
+        """Задача очереди без бюджета повторов сразу уходит в недоставленные."""
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0)
+        dead_letter = AsyncMock()
+        queue = NotificationQueue(MagicMock(), dead_letter=dead_letter, retry_budget=budget)
+        task = NotificationTask(notification_id=1, user_id=1, message="x")
+        await queue.queue.put(task)
+        await queue.queue.get()
+
+        await queue._process_task(task, "worker-0", AsyncMock(return_value=False))
+
+        assert task.retry_count == 0
+        dead_letter.assert_awaited_once_with(task)
@@ -0,0 +1,116 @@
+"""
+Тесты общего для процессов ограничителя частоты в Redis.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.config.env import BroadcastConfig
+from app.services.notification_service import NotificationService
+from app.services.redis import SharedRateLimiter
+from tests.fake_redis import FakeRedis
+
+
+async def drain(limiter: SharedRateLimiter, duration: float) -> int:
+    """Забирает разрешения, пока не истечет время, и возвращает их число."""
+    acquired = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        await limiter.acquire()
+        acquired += 1
+    return acquired
+
+
+class TestSharedRateLimiter:
+    """Тесты общего бюджета частоты."""
+
+    @pytest.mark.asyncio
+    async def test_processes_share_one_budget(self):
+        """Несколько ограничителей с одним токеном вместе не превышают лимит."""
+        client = FakeRedis()
+        limiters = [SharedRateLimiter(client, bot_id=1, profile="standard", rate=100, prefetch=5) for _ in range(3)]
+
+        counts = await asyncio.gather(*(drain(limiter, 0.5) for limiter in limiters))
+
+        # 50 разрешений за 0.5 с плюс всплеск одной пачки на каждый процесс
+        assert sum(counts) <= 50 + 3 * 5
+        assert all(count > 0 for count in counts)
+
+    @pytest.mark.asyncio
+    async def test_permits_are_prefetched_in_batches(self):
+        """На пачку разрешений приходится не больше двух обращений к Redis, разрешения не пропадают."""
+        limiter = SharedRateLimiter(FakeRedis(), bot_id=1, profile="standard", rate=1000, prefetch=10)
+
+        for _ in range(100):
+            await limiter.acquire()
+
+        assert limiter._script.calls <= 2 * 100 // 10 + 1
+        assert limiter.wasted == 0
+
+    @pytest.mark.asyncio
+    async def test_stalled_loop_does_not_waste_permits(self):
+        """Пауза цикла событий дольше времени пачки не сжигает разрешения."""
+        limiter = SharedRateLimiter(FakeRedis(), bot_id=1, profile="standard", rate=1000, prefetch=10)
+
+        await limiter.acquire()
+        time.sleep(0.05)
+        for _ in range(9):
+            await limiter.acquire()
+
+        assert limiter._script.calls == 1
+        assert limiter.wasted == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_permits_expire(self):
+        """Разрешения старше секунды не используются: они посчитаны в бюджете давно прошедшего момента."""
+        limiter = SharedRateLimiter(FakeRedis(), bot_id=1, profile="standard", rate=1000, prefetch=10)
+
+        await limiter.acquire()
+        limiter._granted_at -= limiter.lifetime + 1
+        await limiter.acquire()
+
+        assert limiter.wasted == 9
+
+    @pytest.mark.asyncio
+    async def test_budgets_are_per_token_and_profile(self):
+        """Разные боты и профили не делят бюджет."""
+        client = FakeRedis()
+        standard = SharedRateLimiter(client, bot_id=1, profile="standard", rate=10, prefetch=1)
+        paid = SharedRateLimiter(client, bot_id=1, profile="paid", rate=10, prefetch=1)
+        other = SharedRateLimiter(client, bot_id=2, profile="standard", rate=10, prefetch=1)
+
+        started = time.monotonic()
+        await asyncio.gather(standard.acquire(), paid.acquire(), other.acquire())
+
+        assert time.monotonic() - started < 0.05
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_limiter(self):
+        """Без Redis ограничитель продолжает работать локально."""
+        limiter = SharedRateLimiter(FakeRedis(), bot_id=1, profile="standard", rate=1000)
+        limiter._script.error = ConnectionError("redis is down")
+
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+
+class TestServiceBudget:
+    """Тесты общего бюджета рассылки и отдельных отправок."""
+
+    @pytest.mark.asyncio
+    async def test_single_sends_draw_from_shared_budget(self):
+        """Отдельная отправка и рассылка берут разрешения из одного ограничителя."""
+        bot = MagicMock()
+        bot.id = 1
+        bot.send_message = AsyncMock(return_value=MagicMock(message_id=1))
+        service = NotificationService(bot, MagicMock(), config=BroadcastConfig(rate_limit=1000), redis=FakeRedis())
+
+        limiter = service.primary_shard.limiter
+        assert isinstance(limiter, SharedRateLimiter)
+        for user_id in range(1, 6):
+            await service.send_notification_to_user(user_id, "Test message")
+
+        assert limiter._script.calls == 1
+        assert limiter._permits == 0
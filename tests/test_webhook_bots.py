@@ -0,0 +1,91 @@
+"""
+Тесты режима вебхуков с несколькими ботами.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.endpoints.telegram import TelegramRequestHandler, build_webhook_path
+from app.runners.webhook import webhook_shutdown, webhook_startup
+
+UPDATE = {"update_id": 1}
+SECRET = {"X-Telegram-Bot-Api-Secret-Token": "secret"}
+
+
+def make_webhook_bot(bot_id: int) -> MagicMock:
+    bot = AsyncMock(return_value=True)
+    bot.id = bot_id
+    bot.delete_webhook = AsyncMock(return_value=True)
+    bot.session = MagicMock(close=AsyncMock())
+    return bot
+
+
+def make_config() -> SimpleNamespace:
+    return SimpleNamespace(
+        server=SimpleNamespace(build_url=lambda path: f"https://example.com{path}"),
+        telegram=SimpleNamespace(
+            webhook_path="/webhook",
+            webhook_secret=MagicMock(get_secret_value=lambda: "secret"),
+            drop_pending_updates=True,
+            reset_webhook=True,
+        ),
+    )
+
+
+class TestWebhookBots:
+    """Каждый бот получает свой вебхук, обновления уходят своему боту."""
+
+    def test_paths(self):
+        """Основной бот остается на настроенном пути, дополнительные — на пути со своим ID."""
+        main, extra = make_webhook_bot(1), make_webhook_bot(2)
+
+        assert build_webhook_path("/webhook", main, main) == "/webhook"
+        assert build_webhook_path("/webhook/", extra, main) == "/webhook/2"
+
+    def test_updates_are_routed_by_bot(self):
+        """Обновление с пути дополнительного бота обрабатывается этим ботом."""
+        main, extra = make_webhook_bot(1), make_webhook_bot(2)
+        dispatcher = MagicMock(
+            feed_update=AsyncMock(return_value=None),
+            emit_startup=AsyncMock(),
+            emit_shutdown=AsyncMock(),
+        )
+        handler = TelegramRequestHandler(
+            dispatcher=dispatcher, bot=main, path="/webhook", secret_token="secret", bots=[main, extra]
+        )
+        app = FastAPI()
+        app.include_router(handler.router)
+        with TestClient(app) as client:
+            assert client.post("/webhook", json=UPDATE, headers=SECRET).status_code == 200
+            assert client.post("/webhook/2", json=UPDATE, headers=SECRET).status_code == 200
+            assert client.post("/webhook/3", json=UPDATE, headers=SECRET).status_code == 404
+            assert client.post("/webhook/2", json=UPDATE, headers={
+                "X-Telegram-Bot-Api-Secret-Token": "wrong"
+            }).status_code == 401
+
+        fed = [call.kwargs["bot"] for call in dispatcher.feed_update.await_args_list]
+        assert fed == [main, extra]
+        assert dispatcher.emit_startup.await_args.kwargs["bots"] == [main, extra]
+
+    async def test_startup_sets_webhook_for_every_bot(self):
+        """При запуске вебхук ставится каждому боту, при остановке — снимается у каждого."""
+        main, extra = make_webhook_bot(1), make_webhook_bot(2)
+        dispatcher = MagicMock(resolve_used_update_types=MagicMock(return_value=["message"]))
+        redis = MagicMock(
+            is_webhook_set=AsyncMock(return_value=False),
+            clear_webhooks=AsyncMock(),
+            set_webhook=AsyncMock(),
+        )
+        config = make_config()
+
+        await webhook_startup(dispatcher, main, [main, extra], config, redis)
+        await webhook_shutdown([main, extra], config, redis)
+
+        assert main.await_args.args[0].url == "https://example.com/webhook"
+        assert extra.await_args.args[0].url == "https://example.com/webhook/2"
+        assert [call.kwargs["bot_id"] for call in redis.set_webhook.await_args_list] == [1, 2]
+        main.delete_webhook.assert_awaited_once()
+        extra.delete_webhook.assert_awaited_once()
@@ -0,0 +1,127 @@
+"""
+Тесты объединения одиночных записей в пакетные.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.config.env import SQLAlchemyConfig
+from app.models.dto.user import UserDto
+from app.services.crud import UserService
+from app.services.postgres import WriteCoalescer
+
+
+class TestWriteCoalescer:
+    """Тесты буфера записей."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_transactions(self):
+        """Тысяча одновременных записей выполняется несколькими пачками, каждый получает свой результат."""
+        batches = []
+
+        async def writer(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        coalescer = WriteCoalescer(writer, max_items=500, max_delay=0.05)
+        results = await asyncio.gather(*(coalescer.submit(item) for item in range(1000)))
+
+        assert results == [item * 2 for item in range(1000)]
+        assert len(batches) == 2
+        assert coalescer.flushes == 2
+        assert coalescer.written == 1000
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_written_after_delay(self):
+        """Неполная пачка записывается по истечении max_delay."""
+        writer = AsyncMock(side_effect=lambda items: list(items))
+        coalescer = WriteCoalescer(writer, max_items=100, max_delay=0.01)
+
+        assert await asyncio.wait_for(coalescer.submit("a"), timeout=1) == "a"
+        writer.assert_awaited_once_with(["a"])
+
+    @pytest.mark.asyncio
+    async def test_error_fails_whole_batch(self):
+        """Ошибка записи передается всем вызывающим из пачки, следующие пачки пишутся."""
+        writer = AsyncMock(side_effect=[RuntimeError("db is down"), ["c"]])
+        coalescer = WriteCoalescer(writer, max_items=2, max_delay=0.01)
+
+        results = await asyncio.gather(coalescer.submit("a"), coalescer.submit("b"), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await coalescer.submit("c") == "c"
+
+    @pytest.mark.asyncio
+    async def test_backpressure_limits_pending_writes(self):
+        """При медленной записи число ожидающих записей не превышает max_pending."""
+        peak = 0
+        coalescer = None
+
+        async def writer(items):
+            nonlocal peak
+            peak = max(peak, coalescer.pending)
+            await asyncio.sleep(0.01)
+            return list(items)
+
+        coalescer = WriteCoalescer(writer, max_items=10, max_delay=0.001, max_pending=20)
+        results = await asyncio.gather(*(coalescer.submit(item) for item in range(200)))
+
+        assert results == list(range(200))
+        assert peak <= 20
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_writes(self):
+        """Закрытие дописывает накопленные записи и отклоняет новые."""
+        writer = AsyncMock(side_effect=lambda items: list(items))
+        coalescer = WriteCoalescer(writer, max_items=100, max_delay=60)
+        pending = asyncio.create_task(coalescer.submit("a"))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(coalescer.close(), timeout=1)
+
+        assert pending.result() == "a"
+        with pytest.raises(RuntimeError):
+            await coalescer.submit("b")
+
+
+class TestUserServiceCoalescing:
+    """Тесты пакетной записи пользователей."""
+
+    @staticmethod
+    def make_service() -> UserService:
+        config = SimpleNamespace(sql_alchemy=SQLAlchemyConfig(write_batch_delay=0.01))
+        redis = MagicMock()
+        redis.delete = AsyncMock()
+        return UserService(session_pool=MagicMock(), redis=redis, config=config)
+
+    @pytest.mark.asyncio
+    async def test_updates_are_merged_per_user(self):
+        """Одновременные обновления пишутся одной пачкой, изменения одного пользователя объединяются."""
+        service = self.make_service()
+        repository = MagicMock()
+        users = {user_id: MagicMock(id=user_id) for user_id in (1, 2)}
+        for user in users.values():
+            user.dto.return_value = user
+        repository.users.update_many = AsyncMock(return_value=users)
+        uow = MagicMock(commit=AsyncMock())
+        with patch("app.services.crud.user.SQLSessionContext") as context, \
+                patch.object(UserService, "audience", MagicMock(index_user=AsyncMock())):
+            cm = AsyncMock()
+            cm.__aenter__.return_value = (repository, uow)
+            context.return_value = cm
+            results = await asyncio.gather(
+                service.update(UserDto(id=1, name="a", language="ru"), status="blocked"),
+                service.update(UserDto(id=1, name="a", language="ru"), language="en"),
+                service.update(UserDto(id=2, name="b", language="ru"), status="blocked"),
+            )
+
+        repository.users.update_many.assert_awaited_once_with(
+            [(1, {"status": "blocked", "language": "en"}), (2, {"status": "blocked"})]
+        )
+        # Пачка фиксируется сервисом, репозиторий транзакцию не фиксирует
+        uow.commit.assert_awaited_once()
+        assert [result.id for result in results] == [1, 1, 2]
+        assert service.updates.flushes == 1